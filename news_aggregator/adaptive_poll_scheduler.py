@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+ADAPTIVE POLL SCHEDULER
+Per-feed polling intervals driven by each source's publication rate
+
+Fixed schedules poll every feed equally often, so busy sources lag behind
+breaking news while dormant ones waste requests. This scheduler:
+
+- estimates each feed's article arrival rate (articles/hour) from the
+  timestamps already in ``articles_enhanced``, with an exponential decay so
+  recent activity dominates and a small prior so new feeds still get polled
+- polls each feed at the interval expected to yield
+  ``target_articles_per_poll`` new articles, clamped to
+  ``[min_poll_interval, max_poll_interval]``
+- stretches intervals (water-filling) until the planned polls fit
+  ``max_requests_per_hour``, and enforces the same budget at run time
+  (poll times of the last hour are kept in ``source_poll_log``, so a
+  restart does not hand out a fresh budget)
+- skips feeds the source health monitor currently marks as down
+
+Settings come from ``RSS_CONFIG`` in config.py. The plan is persisted in the
+``source_poll_schedule`` table so restarts keep each feed's next poll time.
+
+Usage:
+    python adaptive_poll_scheduler.py --plan        # show estimated rates and intervals
+    python adaptive_poll_scheduler.py --run-due     # poll the feeds that are due now
+"""
+
+import argparse
+import logging
+import math
+import sqlite3
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import RSS_CONFIG
+from source_health_monitor import SourceHealthMonitor, source_key
+
+logger = logging.getLogger(__name__)
+
+# Weak prior so a feed with no history gets a small non-zero rate (and is
+# polled at the maximum interval) without biasing feeds that have history
+PRIOR_ARTICLES = 0.1
+PRIOR_HOURS = 1.0
+
+
+@dataclass
+class FeedSchedule:
+    """Planned polling for one feed"""
+    name: str
+    url: str
+    rate_per_hour: float
+    interval_seconds: float
+    last_polled_at: Optional[float] = None
+    next_poll_at: float = 0.0
+
+
+def default_feeds() -> List[Tuple[str, str]]:
+    """(name, url) of the verified RSS feeds"""
+    from comprehensive_sources_config import WORKING_RSS_SOURCES
+
+    return [
+        (source['name'], source['url'])
+        for sources in WORKING_RSS_SOURCES.values()
+        for source in sources
+        if source.get('status') == 'verified_working'
+    ]
+
+
+def _parse_timestamp(value) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def fit_to_budget(intervals: Dict[str, float], max_requests_per_hour: float,
+                  max_interval: float) -> Dict[str, float]:
+    """
+    Stretch intervals so the total planned polls per hour fit the budget.
+
+    Intervals not yet at ``max_interval`` are scaled by the same factor, which
+    keeps busy feeds proportionally ahead of quiet ones; repeated because
+    clamping at the maximum frees less budget than the factor assumed.
+    """
+    intervals = dict(intervals)
+    for _ in range(len(intervals) + 1):
+        demand = sum(3600.0 / interval for interval in intervals.values())
+        if demand <= max_requests_per_hour * 1.0001:
+            break
+        capped = {name for name, interval in intervals.items() if interval >= max_interval}
+        capped_demand = sum(3600.0 / intervals[name] for name in capped)
+        flexible_demand = demand - capped_demand
+        if flexible_demand <= 0:
+            break  # Every feed at the maximum interval; budget cannot be met
+        remaining_budget = max_requests_per_hour - capped_demand
+        factor = flexible_demand / remaining_budget if remaining_budget > 0 else math.inf
+        for name in intervals:
+            if name not in capped:
+                intervals[name] = min(intervals[name] * factor, max_interval)
+    return intervals
+
+
+class AdaptivePollScheduler:
+    """
+    Plans and runs adaptive per-feed RSS polling.
+
+    Args:
+        db_path: SQLite database with ``articles_enhanced``
+        feeds: (name, url) pairs; defaults to the verified RSS feeds
+        config: Overrides for the ``RSS_CONFIG`` polling settings
+        health_monitor: Source health monitor used to skip down feeds
+    """
+
+    def __init__(self, db_path: str = 'nepal_news_intelligence.db',
+                 feeds: Optional[Sequence[Tuple[str, str]]] = None,
+                 config: Optional[Dict] = None,
+                 health_monitor: Optional[SourceHealthMonitor] = None):
+        self.db_path = db_path
+        self.feeds = list(feeds) if feeds is not None else default_feeds()
+        settings = dict(RSS_CONFIG)
+        settings.update(config or {})
+        self.min_interval = float(settings['min_poll_interval'])
+        self.max_interval = float(settings['max_poll_interval'])
+        self.target_articles_per_poll = float(settings['target_articles_per_poll'])
+        self.max_requests_per_hour = float(settings['max_requests_per_hour'])
+        self.window_hours = float(settings['rate_window_hours'])
+        self.half_life_hours = float(settings['rate_half_life_hours'])
+        self.replan_seconds = float(settings.get('replan_interval', 900))
+
+        self.health_monitor = health_monitor
+        self.schedules: Dict[str, FeedSchedule] = {}
+        self._planned_at = 0.0
+        self.setup_database()
+        self._recent_polls = deque(self._load_recent_polls())
+
+    def setup_database(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS source_poll_schedule (
+                    feed_name TEXT PRIMARY KEY,
+                    feed_url TEXT NOT NULL,
+                    rate_per_hour REAL,
+                    interval_seconds REAL,
+                    last_polled_at REAL,
+                    next_poll_at REAL,
+                    last_new_articles INTEGER,
+                    total_polls INTEGER DEFAULT 0,
+                    updated_at REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS source_poll_log (
+                    feed_name TEXT NOT NULL,
+                    polled_at REAL NOT NULL
+                )
+            """)
+
+    def _load_recent_polls(self) -> List[float]:
+        """Poll times still in the log (record_poll prunes it to the last hour)"""
+        with sqlite3.connect(self.db_path) as conn:
+            return [polled_at for (polled_at,) in conn.execute(
+                "SELECT polled_at FROM source_poll_log ORDER BY polled_at"
+            )]
+
+    # ------------------------------------------------------------ estimation
+
+    def estimate_rates(self, now: Optional[float] = None) -> Dict[str, float]:
+        """
+        Decayed arrival rate (articles/hour) per feed.
+
+        Articles count towards a feed when their ``source_site`` is the feed
+        name (RSS collector) or its host (site scrapers). Each article weighs
+        ``exp(-age / tau)``; for a steady Poisson source the weighted sum over
+        the window is ``rate * tau * (1 - exp(-window / tau))``.
+        """
+        now = now or time.time()
+        tau = self.half_life_hours / math.log(2)
+        effective_hours = tau * (1 - math.exp(-self.window_hours / tau))
+        # Space-separated like the stored dates: an ISO 'T' sorts after ' ' and
+        # would drop the first day's rows. Rows stored with 'T' are over-selected
+        # on that day only, and the age check below drops them
+        window_start = datetime.fromtimestamp(now - self.window_hours * 3600).strftime('%Y-%m-%d %H:%M:%S')
+
+        site_to_feed = {}
+        for name, url in self.feeds:
+            site_to_feed[name] = name
+            site_to_feed.setdefault(source_key(url), name)
+
+        weights = {name: 0.0 for name, _ in self.feeds}
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                placeholders = ','.join('?' * len(site_to_feed))
+                rows = conn.execute(f"""
+                    SELECT source_site, published_date, scraped_date FROM articles_enhanced
+                    WHERE scraped_date >= ? AND source_site IN ({placeholders})
+                """, (window_start, *site_to_feed))
+                for source_site, published_date, scraped_date in rows:
+                    # Publication time when the feed provided one, collection time otherwise
+                    timestamp = _parse_timestamp(published_date) or _parse_timestamp(scraped_date)
+                    if timestamp is None:
+                        continue
+                    age_hours = max(0.0, now - timestamp) / 3600
+                    if age_hours <= self.window_hours:
+                        weights[site_to_feed[source_site]] += math.exp(-age_hours / tau)
+        except sqlite3.Error as e:
+            logger.warning(f"Arrival rate estimation failed, using prior only: {e}")
+
+        return {
+            name: (weight + PRIOR_ARTICLES) / (effective_hours + PRIOR_HOURS)
+            for name, weight in weights.items()
+        }
+
+    def plan(self, now: Optional[float] = None) -> List[FeedSchedule]:
+        """Recompute rates and intervals; keeps each feed's last poll time"""
+        now = now or time.time()
+        rates = self.estimate_rates(now)
+        intervals = {
+            name: min(max(self.target_articles_per_poll / rate * 3600, self.min_interval), self.max_interval)
+            for name, rate in rates.items()
+        }
+        intervals = fit_to_budget(intervals, self.max_requests_per_hour, self.max_interval)
+
+        with sqlite3.connect(self.db_path) as conn:
+            stored = {
+                name: last_polled_at
+                for name, last_polled_at in conn.execute(
+                    "SELECT feed_name, last_polled_at FROM source_poll_schedule"
+                )
+            }
+            for name, url in self.feeds:
+                last_polled_at = stored.get(name)
+                interval = intervals[name]
+                self.schedules[name] = FeedSchedule(
+                    name=name,
+                    url=url,
+                    rate_per_hour=rates[name],
+                    interval_seconds=interval,
+                    last_polled_at=last_polled_at,
+                    next_poll_at=(last_polled_at + interval) if last_polled_at else now,
+                )
+                conn.execute("""
+                    INSERT INTO source_poll_schedule (
+                        feed_name, feed_url, rate_per_hour, interval_seconds, next_poll_at, updated_at
+                    ) VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (feed_name) DO UPDATE SET
+                        feed_url = excluded.feed_url,
+                        rate_per_hour = excluded.rate_per_hour,
+                        interval_seconds = excluded.interval_seconds,
+                        next_poll_at = excluded.next_poll_at,
+                        updated_at = excluded.updated_at
+                """, (name, url, rates[name], interval, self.schedules[name].next_poll_at, now))
+
+        self._planned_at = now
+        return sorted(self.schedules.values(), key=lambda schedule: schedule.interval_seconds)
+
+    # ---------------------------------------------------------------- running
+
+    def _budget_remaining(self, now: float) -> int:
+        while self._recent_polls and self._recent_polls[0] <= now - 3600:
+            self._recent_polls.popleft()
+        return max(0, int(self.max_requests_per_hour) - len(self._recent_polls))
+
+    def due_feeds(self, now: Optional[float] = None) -> List[FeedSchedule]:
+        """Feeds whose next poll time has passed, most overdue (relative to interval) first"""
+        now = now or time.time()
+        if not self.schedules or now - self._planned_at >= self.replan_seconds:
+            self.plan(now)
+
+        due = [schedule for schedule in self.schedules.values() if schedule.next_poll_at <= now]
+        if self.health_monitor is not None:
+            due = [schedule for schedule in due if self.health_monitor.should_collect(schedule.url, now=now)]
+        due.sort(key=lambda schedule: (now - schedule.next_poll_at) / schedule.interval_seconds, reverse=True)
+        return due[:self._budget_remaining(now)]
+
+    def record_poll(self, name: str, new_articles: int, now: Optional[float] = None):
+        """Mark a feed as polled and schedule its next poll"""
+        now = now or time.time()
+        self._recent_polls.append(now)
+        schedule = self.schedules[name]
+        schedule.last_polled_at = now
+        schedule.next_poll_at = now + schedule.interval_seconds
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                UPDATE source_poll_schedule
+                SET last_polled_at = ?, next_poll_at = ?, last_new_articles = ?,
+                    total_polls = total_polls + 1, updated_at = ?
+                WHERE feed_name = ?
+            """, (now, schedule.next_poll_at, new_articles, now, name))
+            conn.execute("INSERT INTO source_poll_log (feed_name, polled_at) VALUES (?, ?)", (name, now))
+            conn.execute("DELETE FROM source_poll_log WHERE polled_at <= ?", (now - 3600,))
+
+    def run_due(self, poll: Callable[[str, str], int], now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Poll every due feed with ``poll(name, url) -> new_articles``.
+
+        Returns new article counts per polled feed. A failing poll still
+        counts against the budget and is rescheduled normally.
+        """
+        results = {}
+        for schedule in self.due_feeds(now):
+            try:
+                new_articles = int(poll(schedule.name, schedule.url) or 0)
+            except Exception as e:
+                logger.error(f"Poll failed for {schedule.name}: {e}")
+                new_articles = 0
+            self.record_poll(schedule.name, new_articles, now)
+            results[schedule.name] = new_articles
+        return results
+
+
+def rss_poll_function(db_path: str, max_articles: int = 25) -> Callable[[str, str], int]:
+    """``poll(name, url)`` backed by ComprehensiveRSSCollector.collect_from_rss_feed"""
+    from comprehensive_rss_collector import ComprehensiveRSSCollector
+
+    collector = ComprehensiveRSSCollector(db_path)
+    return lambda name, url: len(collector.collect_from_rss_feed(url, name, max_articles))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Adaptive per-feed RSS polling')
+    parser.add_argument('--db', default='nepal_news_intelligence.db', help='SQLite database path')
+    parser.add_argument('--plan', action='store_true', help='Show the polling plan and exit')
+    parser.add_argument('--run-due', action='store_true', help='Poll feeds that are due now')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    scheduler = AdaptivePollScheduler(args.db, health_monitor=SourceHealthMonitor(args.db))
+
+    if args.run_due:
+        results = scheduler.run_due(rss_poll_function(args.db))
+        print(f"📡 Polled {len(results)} feeds, {sum(results.values())} new articles")
+        return
+
+    schedules = scheduler.plan()
+    print(f"{'FEED':<25} {'ARTICLES/H':>10} {'INTERVAL':>10}")
+    for schedule in schedules:
+        print(f"{schedule.name:<25} {schedule.rate_per_hour:>10.2f} {schedule.interval_seconds / 60:>8.1f} m")
+    polls_per_hour = sum(3600 / schedule.interval_seconds for schedule in schedules)
+    print(f"\nPlanned requests/hour: {polls_per_hour:.1f} (budget {scheduler.max_requests_per_hour:.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,8 @@ from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_MI
 # Add scrapers directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'scrapers'))
 
+from config import RSS_CONFIG
+
 class ProductionLogger:
     """Enhanced logging for production environment"""
 
@@ -72,7 +74,8 @@ logger_system = ProductionLogger(Path(__file__).parent / 'logs')
 class NepalNewsScheduler:
     """Production-ready automated scheduler with APScheduler and monitoring"""
 
-    def __init__(self):
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = Path(db_path) if db_path else Path(__file__).parent / 'nepal_news_intelligence.db'
         self.scrapers_dir = Path(__file__).parent / 'scrapers'
         self.logs_dir = Path(__file__).parent / 'logs'
         self.data_dir = Path(__file__).parent / 'scheduler_data'
@@ -263,6 +266,41 @@ class NepalNewsScheduler:
         self.scraper_logger.error(f"❌ {description} failed after {max_retries} attempts")
         return False
 
+    def probe_source_health(self):
+        """Probe all configured sources so collectors skip down ones and defer slow ones"""
+        try:
+            from source_health_monitor import SourceHealthMonitor, configured_source_urls
+
+            monitor = SourceHealthMonitor(str(self.db_path))
+            results = monitor.run_probes(configured_source_urls())
+            failed = [result.source for result in results if not result.ok]
+            self.monitor_logger.info(f"🩺 Source health probe: {len(results) - len(failed)}/{len(results)} sources reachable")
+            if failed:
+                self.monitor_logger.warning(f"⚠️ Unreachable sources: {failed}")
+        except Exception as e:
+            self.monitor_logger.error(f"❌ Source health probe failed: {e}")
+
+    def adaptive_rss_poll(self):
+        """Poll the RSS feeds that are due under the adaptive per-feed schedule"""
+        try:
+            if getattr(self, '_adaptive_poller', None) is None:
+                from adaptive_poll_scheduler import AdaptivePollScheduler, rss_poll_function
+                from source_health_monitor import SourceHealthMonitor
+
+                db_path = str(self.db_path)
+                self._adaptive_poller = AdaptivePollScheduler(
+                    db_path, health_monitor=SourceHealthMonitor(db_path)
+                )
+                self._adaptive_poll = rss_poll_function(db_path)
+
+            results = self._adaptive_poller.run_due(self._adaptive_poll)
+            if results:
+                self.scraper_logger.info(
+                    f"📡 Adaptive RSS poll: {len(results)} feeds, {sum(results.values())} new articles {results}"
+                )
+        except Exception as e:
+            self.scraper_logger.error(f"❌ Adaptive RSS poll failed: {e}")
+
     def morning_collection(self):
         """Morning news collection routine (6 AM) - Enhanced with monitoring"""
         collection_start = datetime.now()
@@ -371,7 +409,7 @@ class NepalNewsScheduler:
         try:
             import sqlite3
 
-            db_path = Path(__file__).parent / 'nepal_news_intelligence.db'
+            db_path = self.db_path
             if not db_path.exists():
                 logger.warning("⚠️ Database file not found")
                 return
@@ -522,27 +560,46 @@ class NepalNewsScheduler:
                 replace_existing=True
             )
 
-            # Optional: Hourly light collection for breaking news
+            # Source health probes every 15 minutes (cheap HEAD requests)
             self.scheduler.add_job(
-                func=lambda: self.run_scraper_with_retry(
-                    'realtime_news_collector.py',
-                    'Hourly breaking news check',
-                    max_retries=1
-                ),
-                trigger='cron',
-                minute=0,  # Every hour at minute 0
-                id='hourly_breaking',
-                name='Hourly Breaking News Check',
+                func=self.probe_source_health,
+                trigger='interval',
+                minutes=15,
+                id='source_health_probe',
+                name='Source Health Probe',
                 replace_existing=True
             )
 
+            # Breaking news: adaptive per-feed RSS polling. The tick is cheap;
+            # each feed is only fetched when its rate-based interval is due
+            if RSS_CONFIG.get('adaptive_polling', True):
+                self.scheduler.add_job(
+                    func=self.adaptive_rss_poll,
+                    trigger='interval',
+                    minutes=1,
+                    id='adaptive_rss_poll',
+                    name='Adaptive RSS Polling',
+                    replace_existing=True
+                )
+            else:
+                self.scheduler.add_job(
+                    func=self.run_scraper_with_retry,
+                    args=['realtime_news_collector.py', 'Hourly breaking news check', 1],
+                    trigger='cron',
+                    minute=0,  # Every hour at minute 0
+                    id='hourly_breaking',
+                    name='Hourly Breaking News Check',
+                    replace_existing=True
+                )
+
             self.logger.info("✅ Production schedule configured successfully")
             self.logger.info("📋 Scheduled Jobs:")
             self.logger.info("   🌅 Morning Collection: 6:00 AM daily (comprehensive + RSS + social)")
             self.logger.info("   🌆 Evening Collection: 6:00 PM daily (real-time + social)")
             self.logger.info("   🔧 Weekly Maintenance: Sunday 2:00 AM (maintenance + cleanup)")
             self.logger.info("   📊 Health Check: Every 6 hours")
-            self.logger.info("   ⚡ Breaking News: Every hour (light collection)")
+            self.logger.info("   🩺 Source Health Probe: Every 15 minutes")
+            self.logger.info("   ⚡ Breaking News: Adaptive per-feed RSS polling (rate-based intervals)")
 
         except Exception as e:
             self.logger.error(f"❌ Failed to setup schedule: {e}")
@@ -653,6 +710,10 @@ Examples:
         action='store_true',
         help='Run weekly maintenance once and exit'
     )
+    parser.add_argument(
+        '--db',
+        help='SQLite database path (default: nepal_news_intelligence.db next to this script)'
+    )
     parser.add_argument(
         '--verbose',
         action='store_true',
@@ -663,7 +724,7 @@ Examples:
 
     try:
         # Initialize scheduler
-        scheduler = NepalNewsScheduler()
+        scheduler = NepalNewsScheduler(args.db)
 
         # Handle specific commands
         if args.health_check:
@@ -680,7 +741,8 @@ Examples:
             print("   🌆 Evening Collection: 6:00 PM daily")
             print("   🔧 Weekly Maintenance: Sunday 2:00 AM")
             print("   📊 Health Check: Every 6 hours")
-            print("   ⚡ Breaking News: Every hour")
+            print("   🩺 Source Health Probe: Every 15 minutes")
+            print("   ⚡ Breaking News: Adaptive per-feed RSS polling")
 
         elif args.run_morning:
             print("🌅 Running morning collection...")
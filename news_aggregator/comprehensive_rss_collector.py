@@ -16,6 +16,9 @@ import time
 import hashlib
 import concurrent.futures
 from threading import Lock
+from url_seen_index import UrlSeenIndex
+from url_canonicalizer import ensure_url_hash_column, url_and_hash
+from source_health_monitor import SourceHealthMonitor
 import re
 from comprehensive_sources_config import CONFIRMED_WORKING_SOURCES, RSS_COLLECTION_CONFIG
 
@@ -30,30 +33,30 @@ class ComprehensiveRSSCollector:
         })
         self.existing_urls = self.load_existing_urls()
         self.db_lock = Lock()
+        self.health_monitor = SourceHealthMonitor(db_path)
 
     def load_existing_urls(self):
-        """Load existing URLs for deduplication"""
+        """Open the persisted URL-seen index for deduplication"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.execute("SELECT url FROM articles_enhanced")
-            urls = set(row[0] for row in cursor)
-            conn.close()
-            return urls
+            return UrlSeenIndex(self.db_path, table='articles_enhanced')
         except:
             return set()
 
     def save_article_thread_safe(self, article_data):
         """Thread-safe article saving for current database schema"""
         try:
+            url, url_hash = url_and_hash(article_data['url'])
             with self.db_lock:
                 conn = sqlite3.connect(self.db_path)
+                ensure_url_hash_column(conn, 'articles_enhanced')
                 cursor = conn.execute('''
                     INSERT INTO articles_enhanced (
-                        url, title, content, source_site, scraped_date, published_date,
+                        url, url_hash, title, content, source_site, scraped_date, published_date,
                         word_count, quality_score, language, engagement_score
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
-                    article_data['url'],
+                    url,
+                    url_hash,
                     article_data['title'],
                     article_data['content'],
                     article_data['source_site'],
@@ -66,7 +69,7 @@ class ComprehensiveRSSCollector:
                 ))
                 conn.commit()
                 conn.close()
-                self.existing_urls.add(article_data['url'])
+                self.existing_urls.add(url)
                 return True
         except Exception as e:
             print(f"❌ Save error: {e}")
@@ -213,6 +216,8 @@ class ComprehensiveRSSCollector:
             ("Gorkhapatra Online", "https://gorkhapatraonline.com/rss"),
             ("Desh Sanchar", "https://www.deshsanchar.com/rss")
         ]
+        # Skip sources marked down by the health monitor, slow ones go last
+        rss_sources = self.health_monitor.filter_sources(rss_sources, url_of=lambda source: source[1])
 
         # Collect from each RSS source
         for source_name, rss_url in rss_sources:
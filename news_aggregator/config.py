@@ -89,6 +89,15 @@ RSS_CONFIG = {
     "max_retries": 3,
     "user_agent": "Nepal News Aggregator 1.0",
     "respect_robots_txt": True,
+    # Adaptive per-feed polling (adaptive_poll_scheduler.py); update_interval
+    # remains the fixed fallback when adaptive polling is disabled
+    "adaptive_polling": True,
+    "min_poll_interval": 120,        # 2 minutes for the busiest feeds
+    "max_poll_interval": 3 * 3600,   # 3 hours for dormant feeds
+    "target_articles_per_poll": 2,   # Expected new articles per request
+    "max_requests_per_hour": 60,     # Global budget across all feeds
+    "rate_window_hours": 72,         # History used to estimate arrival rates
+    "rate_half_life_hours": 12,      # Recent articles weigh more
 }
 
 # Performance and Scaling
@@ -142,5 +151,6 @@ DEBUG = ENVIRONMENT == "development"
 if DEBUG:
     # Reduce processing for development
     RSS_CONFIG["update_interval"] = 3600  # 1 hour
+    RSS_CONFIG["max_requests_per_hour"] = 12
     PIPELINE_CONFIG["max_articles_per_hour"] = 100
     SIMILARITY_CONFIG["max_embedding_cache"] = 1000
\ No newline at end of file
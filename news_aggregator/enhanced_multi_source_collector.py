@@ -20,6 +20,10 @@ from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 import os
 
+from url_seen_index import UrlSeenIndex
+from url_canonicalizer import ensure_url_hash_column, url_and_hash
+from source_health_monitor import SourceHealthMonitor
+
 @dataclass
 class SourceConfig:
     """Configuration for a verified working source"""
@@ -51,6 +55,7 @@ class EnhancedMultiSourceCollector:
         self.setup_logging()
         self.setup_database()
         self.load_existing_urls()
+        self.health_monitor = SourceHealthMonitor(db_path)
 
         # Verified working sources from testing
         self.working_sources = {
@@ -198,12 +203,10 @@ class EnhancedMultiSourceCollector:
             raise
 
     def load_existing_urls(self):
-        """Load existing URLs for deduplication"""
+        """Open the persisted URL-seen index for deduplication"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("SELECT url FROM articles_enhanced")
-                self.existing_urls = set(row[0] for row in cursor)
-                self.logger.info(f"Loaded {len(self.existing_urls)} existing URLs for deduplication")
+            self.existing_urls = UrlSeenIndex(self.db_path, table='articles_enhanced')
+            self.logger.info(f"Opened URL index with ~{len(self.existing_urls)} existing URLs for deduplication")
         except Exception as e:
             self.logger.warning(f"Could not load existing URLs: {e}")
             self.existing_urls = set()
@@ -322,20 +325,24 @@ class EnhancedMultiSourceCollector:
     def save_article_safe(self, article_data: Dict) -> bool:
         """Thread-safe article saving with enhanced error handling"""
         try:
+            url, url_hash = url_and_hash(article_data['url'])
             with self.db_lock:
                 with sqlite3.connect(self.db_path) as conn:
+                    ensure_url_hash_column(conn, 'articles_enhanced')
+
                     # Generate hashes
                     content_hash = hashlib.md5(article_data['content'].encode()).hexdigest()
                     title_hash = hashlib.md5(article_data['title'].encode()).hexdigest()
 
                     conn.execute("""
                         INSERT INTO articles_enhanced (
-                            url, title, content, source_site, scraped_date,
+                            url, url_hash, title, content, source_site, scraped_date,
                             word_count, quality_score, language, collection_method,
                             framework_version, content_hash, title_hash
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """, (
-                        article_data['url'],
+                        url,
+                        url_hash,
                         article_data['title'],
                         article_data['content'],
                         article_data['source_site'],
@@ -349,7 +356,7 @@ class EnhancedMultiSourceCollector:
                         title_hash
                     ))
 
-                    self.existing_urls.add(article_data['url'])
+                    self.existing_urls.add(url)
                     return True
 
         except sqlite3.IntegrityError:
@@ -465,11 +472,17 @@ class EnhancedMultiSourceCollector:
             'source_results': {}
         }
 
+        # Skip sources marked down by the health monitor, slow ones go last
+        source_ids = self.health_monitor.filter_sources(
+            self.working_sources.keys(), url_of=lambda source_id: self.working_sources[source_id].url
+        )
+        all_stats['skipped_sources'] = [s for s in self.working_sources if s not in source_ids]
+
         # Collect from all sources in parallel
         with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
             future_to_source = {
                 executor.submit(self.collect_from_source, source_id, max_articles_per_source): source_id
-                for source_id in self.working_sources.keys()
+                for source_id in source_ids
             }
 
             for future in concurrent.futures.as_completed(future_to_source):
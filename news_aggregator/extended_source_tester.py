@@ -23,6 +23,7 @@ from threading import Lock
 
 # Import both configurations
 from nepal_news_intelligence_config import NEPAL_NEWS_SOURCES
+from source_health_monitor import SourceHealthMonitor
 try:
     from nepal_config import SOURCES as RATENEPAL_SOURCES
 except ImportError:
@@ -61,6 +62,7 @@ class ExtendedSourceTester:
         })
         self.db_lock = Lock()
         self.setup_logging()
+        self.health_monitor = SourceHealthMonitor(db_path)
 
     def setup_logging(self):
         """Setup logging for test results"""
@@ -401,6 +403,9 @@ class ExtendedSourceTester:
                 try:
                     result = future.result()
                     results.append(result)
+                    self.health_monitor.record_test_result(
+                        result.website_url, result.response_time, result.status, result.error_message
+                    )
                     self.logger.info(f"✓ {source_id}: {result.status} ({result.articles_found} articles) - {result.collection_strategy}")
                 except Exception as e:
                     self.logger.error(f"✗ {source_id}: Test failed - {e}")
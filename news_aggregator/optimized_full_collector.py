@@ -13,6 +13,8 @@ import time
 import hashlib
 import concurrent.futures
 from threading import Lock
+from url_seen_index import UrlSeenIndex
+from url_canonicalizer import ensure_url_hash_column, url_and_hash
 
 class OptimizedFullCollector:
     """Full content collector with speed optimizations"""
@@ -27,31 +29,30 @@ class OptimizedFullCollector:
         self.db_lock = Lock()
 
     def load_existing_urls(self):
-        """Load existing URLs for deduplication"""
+        """Open the persisted URL-seen index for deduplication"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.execute("SELECT url FROM articles")
-            urls = set(row[0] for row in cursor)
-            conn.close()
-            return urls
+            return UrlSeenIndex(self.db_path, table='articles')
         except:
             return set()
 
     def save_article_thread_safe(self, article_data):
         """Thread-safe article saving"""
         try:
+            url, url_hash = url_and_hash(article_data['url'])
             with self.db_lock:
                 conn = sqlite3.connect(self.db_path)
+                ensure_url_hash_column(conn, 'articles')
                 cursor = conn.execute('''
                     INSERT INTO articles (
-                        url, source_id, title, content, author,
+                        url, url_hash, source_id, title, content, author,
                         published_date, collected_date, language,
                         word_count, content_hash, title_hash,
                         source_site, category, scraped_date,
                         collection_method, quality_score, framework_version
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
-                    article_data['url'],
+                    url,
+                    url_hash,
                     str(article_data.get('source_id', 13)),
                     article_data['title'],
                     article_data['content'],
@@ -71,7 +72,7 @@ class OptimizedFullCollector:
                 ))
                 conn.commit()
                 conn.close()
-                self.existing_urls.add(article_data['url'])
+                self.existing_urls.add(url)
                 return True
         except Exception as e:
             return False
@@ -22,6 +22,10 @@ import pickle
 import os
 from pathlib import Path
 import gzip
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from url_canonicalizer import canonicalize_url, ensure_url_hash_column, url_and_hash
 
 # Enhanced logging with structured format
 logging.basicConfig(
@@ -146,10 +150,11 @@ class StreamingDataWriter:
 
     async def write_article(self, article: Article) -> bool:
         """Stream article to temporary storage, then batch insert to DB"""
-        if article.url in self.processed_urls:
+        canonical = canonicalize_url(article.url)
+        if canonical in self.processed_urls:
             return False
 
-        self.processed_urls.add(article.url)
+        self.processed_urls.add(canonical)
         self.article_batch.append(article)
 
         # Write to compressed temporary file for memory efficiency
@@ -183,17 +188,20 @@ class StreamingDataWriter:
         """Synchronous batch database insert with optimized SQL"""
         conn = sqlite3.connect(self.db_path)
         try:
-            # Optimized SQL with ON CONFLICT handling
+            ensure_url_hash_column(conn, 'articles_enhanced')
+
+            # Variants of a stored URL (same url_hash) are skipped, not replaced
             insert_sql = """
-            INSERT OR REPLACE INTO articles_enhanced (
-                url, title, content, source_site, published_date, scraped_date,
+            INSERT OR IGNORE INTO articles_enhanced (
+                url, url_hash, title, content, source_site, published_date, scraped_date,
                 word_count, language, quality_score
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """
 
             article_data = [
                 (
-                    article.url, article.title, article.content, article.source_site,
+                    *url_and_hash(article.url),
+                    article.title, article.content, article.source_site,
                     article.published_date.isoformat(), article.scraped_date.isoformat(),
                     article.word_count, article.language, article.quality_score
                 )
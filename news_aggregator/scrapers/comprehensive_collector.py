@@ -11,6 +11,12 @@ import sqlite3
 from datetime import datetime
 import time
 import feedparser
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from url_seen_index import UrlSeenIndex
+from url_canonicalizer import ensure_url_hash_column, url_and_hash
 
 class ComprehensiveNepalCollector:
     """Complete systematic collector for all Nepal news sources"""
@@ -34,13 +40,9 @@ class ComprehensiveNepalCollector:
         self.existing_urls = self.load_existing_urls()
 
     def load_existing_urls(self):
-        """Load existing URLs"""
+        """Open the persisted URL-seen index"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.execute("SELECT url FROM articles")
-            urls = set(row[0] for row in cursor)
-            conn.close()
-            return urls
+            return UrlSeenIndex(self.db_path, table='articles')
         except:
             return set()
 
@@ -526,15 +528,18 @@ class ComprehensiveNepalCollector:
     def save_article(self, article_data):
         """Save article to database"""
         try:
+            url, url_hash = url_and_hash(article_data['url'])
             conn = sqlite3.connect(self.db_path)
+            ensure_url_hash_column(conn, 'articles')
 
             conn.execute('''
                 INSERT OR IGNORE INTO articles (
-                    url, title, content, source_site, source_id,
+                    url, url_hash, title, content, source_site, source_id,
                     scraped_date, word_count, published_date, language, collection_method
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
-                article_data['url'],
+                url,
+                url_hash,
                 article_data['title'],
                 article_data['content'],
                 article_data['source_site'],
@@ -549,7 +554,7 @@ class ComprehensiveNepalCollector:
             conn.commit()
             conn.close()
 
-            self.existing_urls.add(article_data['url'])
+            self.existing_urls.add(url)
             return True
 
         except Exception as e:
@@ -17,6 +17,11 @@ import feedparser
 import hashlib
 from contextlib import asynccontextmanager
 import concurrent.futures
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from url_canonicalizer import canonicalize_url, ensure_url_hash_column, url_and_hash
 
 # Enhanced logging
 logging.basicConfig(
@@ -80,6 +85,7 @@ class OptimizedDatabaseWriter:
                 conn.execute("CREATE INDEX IF NOT EXISTS idx_source_site ON articles_enhanced(source_site)")
                 conn.execute("CREATE INDEX IF NOT EXISTS idx_published_date ON articles_enhanced(published_date)")
                 conn.execute("CREATE INDEX IF NOT EXISTS idx_scraped_date ON articles_enhanced(scraped_date)")
+                ensure_url_hash_column(conn, 'articles_enhanced')
 
                 conn.commit()
                 logger.info("✅ Database tables initialized")
@@ -88,10 +94,11 @@ class OptimizedDatabaseWriter:
 
     async def add_article(self, article: Article) -> bool:
         """Add article to buffer for batch processing"""
-        if article.url in self.processed_urls:
+        canonical = canonicalize_url(article.url)
+        if canonical in self.processed_urls:
             return False
 
-        self.processed_urls.add(article.url)
+        self.processed_urls.add(canonical)
         self.article_buffer.append(article)
 
         if len(self.article_buffer) >= self.batch_size:
@@ -130,17 +137,17 @@ class OptimizedDatabaseWriter:
             conn.execute("PRAGMA cache_size=10000")
 
             insert_sql = """
-                INSERT OR REPLACE INTO articles_enhanced (
-                    url, title, content, source_site, published_date, scraped_date,
+                INSERT OR IGNORE INTO articles_enhanced (
+                    url, url_hash, title, content, source_site, published_date, scraped_date,
                     word_count, language, quality_score
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """
 
             # Prepare batch data
             batch_data = []
             for article in self.article_buffer:
                 batch_data.append((
-                    article.url,
+                    *url_and_hash(article.url),
                     article.title,
                     article.content,
                     article.source_site,
@@ -17,6 +17,11 @@ import hashlib
 import re
 import threading
 from urllib.parse import urljoin, urlparse
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from url_canonicalizer import ensure_url_hash_column, url_and_hash
 
 from nepal_news_intelligence_config import NEPAL_NEWS_SOURCES
 
@@ -213,26 +218,29 @@ class RealTimeNewsCollector:
 
         try:
             conn = sqlite3.connect(self.db_path)
+            ensure_url_hash_column(conn, 'articles_enhanced')
             cursor = conn.cursor()
 
             for article in articles:
                 try:
+                    url, url_hash = url_and_hash(article['url'])
+
                     # Check if article already exists
-                    cursor.execute("SELECT id FROM articles_enhanced WHERE url = ?", (article['url'],))
+                    cursor.execute("SELECT id FROM articles_enhanced WHERE url_hash = ?", (url_hash,))
                     if cursor.fetchone():
                         continue  # Skip existing articles
 
                     # Insert new article
                     cursor.execute("""
                         INSERT INTO articles_enhanced (
-                            url, title, content, source_site, source_category,
+                            url, url_hash, title, content, source_site, source_category,
                             political_leaning, scraped_date, published_date,
                             word_count, language, quality_score, story_id,
                             story_phase, first_source_flag, sentiment_score,
                             topic_category
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """, (
-                        article['url'], article['title'], article['content'],
+                        url, url_hash, article['title'], article['content'],
                         article['source_site'], article['source_category'],
                         article['political_leaning'], article['scraped_date'],
                         article['published_date'], article['word_count'],
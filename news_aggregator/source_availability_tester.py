@@ -14,6 +14,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass, asdict
 from nepal_news_intelligence_config import NEPAL_NEWS_SOURCES, NewsSource
+from source_health_monitor import SourceHealthMonitor
 import logging
 import concurrent.futures
 from threading import Lock
@@ -50,6 +51,7 @@ class SourceAvailabilityTester:
         self.db_lock = Lock()
         self.setup_logging()
         self.setup_test_database()
+        self.health_monitor = SourceHealthMonitor(db_path)
 
     def setup_logging(self):
         """Setup logging for test results"""
@@ -305,12 +307,22 @@ class SourceAvailabilityTester:
                     result = future.result()
                     results.append(result)
                     self.save_test_result(result)
+                    self.record_health(result)
                     self.logger.info(f"✓ {source.name}: {result.status} ({result.articles_found} articles)")
                 except Exception as e:
                     self.logger.error(f"✗ {source.name}: Test failed - {e}")
 
         return results
 
+    def record_health(self, result: SourceTestResult):
+        """Feed the test outcome into the shared source health state used by collectors"""
+        try:
+            self.health_monitor.record_test_result(
+                result.website_url, result.response_time, result.status, result.error_message
+            )
+        except Exception as e:
+            self.logger.error(f"Failed to record source health: {e}")
+
     def save_test_result(self, result: SourceTestResult):
         """Save test result to database"""
         try:
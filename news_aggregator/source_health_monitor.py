@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+"""
+SOURCE HEALTH MONITOR
+Async health probes for news sources, with rolling latency/error histograms in SQLite
+
+Probes every source concurrently with a cheap HEAD request (falling back to a
+one-byte ``Range`` GET when HEAD is refused) and times each phase separately:
+DNS resolution, TCP+TLS connect, time to first byte and total. Results are
+folded into hourly histogram buckets, so the database keeps a bounded rolling
+window instead of a row per probe.
+
+Collectors ask the monitor before fetching a source:
+
+- ``down`` sources (repeated failures) are skipped until their back-off
+  expires, instead of burning a 30-45 s timeout every cycle
+- ``slow`` sources (p95 total time above the threshold) are deferred to the
+  end of the collection order
+- unknown sources are always collected
+
+Usage:
+    python source_health_monitor.py                 # probe all configured sources
+    python source_health_monitor.py --report        # show current health table
+"""
+
+import asyncio
+import argparse
+import bisect
+import logging
+import re
+import socket
+import sqlite3
+import ssl
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urljoin, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Upper edges (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (25, 50, 100, 200, 400, 800, 1600, 3200, 6400, 12800, 25600)
+
+STATE_UP = 'up'
+STATE_SLOW = 'slow'
+STATE_DOWN = 'down'
+
+HTTP_STATUS_MESSAGE = re.compile(r'^HTTP (\d{3})')
+
+USER_AGENT = 'Mozilla/5.0 (compatible; NepalNewsHealthProbe/1.0)'
+MAX_REDIRECTS = 3
+
+
+@dataclass
+class ProbeResult:
+    """Timings (milliseconds) and outcome of one health probe"""
+    url: str
+    source: str
+    ok: bool
+    status_code: Optional[int] = None
+    dns_ms: Optional[float] = None
+    connect_ms: Optional[float] = None
+    ttfb_ms: Optional[float] = None
+    total_ms: Optional[float] = None
+    page_ms: Optional[float] = None  # Full-page GET timed by the source testers, parsing included
+    error_kind: Optional[str] = None  # 'dns', 'connect', 'tls', 'timeout', 'http_5xx', 'protocol'
+    error_message: str = ''
+    probed_at: float = field(default_factory=time.time)
+
+    def metrics(self) -> Dict[str, float]:
+        values = {
+            'dns': self.dns_ms,
+            'connect': self.connect_ms,
+            'ttfb': self.ttfb_ms,
+            'total': self.total_ms,
+            'page': self.page_ms,
+        }
+        return {metric: value for metric, value in values.items() if value is not None}
+
+
+def source_key(url: str) -> str:
+    """Health is tracked per host: ``https://www.ratopati.com/rss`` -> ``ratopati.com``"""
+    host = urlsplit(url if '://' in url else f'https://{url}').hostname or url
+    host = host.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def bucket_index(value_ms: float) -> int:
+    return bisect.bisect_left(LATENCY_BUCKETS_MS, value_ms)
+
+
+def histogram_percentile(counts: Dict[int, int], percentile: float) -> Optional[float]:
+    """Upper bucket edge containing ``percentile`` (0-100) of the observations"""
+    total = sum(counts.values())
+    if not total:
+        return None
+    threshold = total * percentile / 100.0
+    running = 0
+    for index in sorted(counts):
+        running += counts[index]
+        if running >= threshold:
+            if index < len(LATENCY_BUCKETS_MS):
+                return float(LATENCY_BUCKETS_MS[index])
+            return float(LATENCY_BUCKETS_MS[-1] * 2)
+    return float(LATENCY_BUCKETS_MS[-1] * 2)
+
+
+class SourceHealthMonitor:
+    """
+    Persistent source health state shared by probes, testers and collectors.
+
+    Args:
+        db_path: SQLite database for the health tables
+        slow_threshold_ms: p95 total time above which a source is ``slow``
+        window_hours: Rolling window kept in the histograms
+        down_after_failures: Consecutive failures before a source is ``down``
+        base_backoff_seconds: First back-off once a source is down (doubles per failure)
+        max_backoff_seconds: Back-off ceiling
+        probe_timeout: Per-probe timeout in seconds
+        concurrency: Maximum probes in flight
+    """
+
+    def __init__(self, db_path: str = 'nepal_news_intelligence.db',
+                 slow_threshold_ms: float = 5000,
+                 window_hours: int = 24,
+                 down_after_failures: int = 3,
+                 base_backoff_seconds: int = 900,
+                 max_backoff_seconds: int = 6 * 3600,
+                 probe_timeout: float = 10.0,
+                 concurrency: int = 20):
+        self.db_path = db_path
+        self.slow_threshold_ms = slow_threshold_ms
+        self.window_hours = window_hours
+        self.down_after_failures = down_after_failures
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.probe_timeout = probe_timeout
+        self.concurrency = concurrency
+        self.db_lock = Lock()
+        self.setup_database()
+
+    # ---------------------------------------------------------------- schema
+
+    def setup_database(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS source_latency_histogram (
+                    source TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    hour_start INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (source, metric, hour_start, bucket)
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS source_error_histogram (
+                    source TEXT NOT NULL,
+                    hour_start INTEGER NOT NULL,
+                    error_kind TEXT NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (source, hour_start, error_kind)
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS source_health_status (
+                    source TEXT PRIMARY KEY,
+                    url TEXT,
+                    state TEXT NOT NULL DEFAULT 'up',
+                    consecutive_failures INTEGER NOT NULL DEFAULT 0,
+                    last_status_code INTEGER,
+                    last_error TEXT,
+                    p50_total_ms REAL,
+                    p95_total_ms REAL,
+                    last_probe_at REAL,
+                    last_success_at REAL,
+                    defer_until REAL
+                );
+            """)
+
+    # ------------------------------------------------------------- recording
+
+    def record(self, result: ProbeResult) -> str:
+        """Fold one probe result into the histograms and update the source state"""
+        hour_start = int(result.probed_at // 3600 * 3600)
+        with self.db_lock:
+            with sqlite3.connect(self.db_path) as conn:
+                # Failed probes only feed the error histogram: a timeout says
+                # nothing about how fast the source answers when it is up
+                for metric, value in (result.metrics() if result.ok else {}).items():
+                    conn.execute("""
+                        INSERT INTO source_latency_histogram (source, metric, hour_start, bucket, count)
+                        VALUES (?, ?, ?, ?, 1)
+                        ON CONFLICT (source, metric, hour_start, bucket) DO UPDATE SET count = count + 1
+                    """, (result.source, metric, hour_start, bucket_index(value)))
+
+                if not result.ok:
+                    conn.execute("""
+                        INSERT INTO source_error_histogram (source, hour_start, error_kind, count)
+                        VALUES (?, ?, ?, 1)
+                        ON CONFLICT (source, hour_start, error_kind) DO UPDATE SET count = count + 1
+                    """, (result.source, hour_start, result.error_kind or 'unknown'))
+
+                return self._update_status(conn, result)
+
+    def _update_status(self, conn: sqlite3.Connection, result: ProbeResult) -> str:
+        row = conn.execute(
+            "SELECT consecutive_failures, last_success_at FROM source_health_status WHERE source = ?",
+            (result.source,)
+        ).fetchone()
+        failures, last_success_at = row if row else (0, None)
+
+        counts = self._metric_counts(conn, result.source, 'total', result.probed_at)
+        p50 = histogram_percentile(counts, 50)
+        p95 = histogram_percentile(counts, 95)
+
+        defer_until = None
+        if result.ok:
+            failures = 0
+            last_success_at = result.probed_at
+            state = STATE_SLOW if p95 is not None and p95 > self.slow_threshold_ms else STATE_UP
+        else:
+            failures += 1
+            if failures >= self.down_after_failures:
+                state = STATE_DOWN
+                backoff = self.base_backoff_seconds * 2 ** (failures - self.down_after_failures)
+                defer_until = result.probed_at + min(backoff, self.max_backoff_seconds)
+            else:
+                state = STATE_UP
+
+        conn.execute("""
+            INSERT OR REPLACE INTO source_health_status (
+                source, url, state, consecutive_failures, last_status_code, last_error,
+                p50_total_ms, p95_total_ms, last_probe_at, last_success_at, defer_until
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            result.source, result.url, state, failures, result.status_code,
+            None if result.ok else f"{result.error_kind}: {result.error_message}"[:300],
+            p50, p95, result.probed_at, last_success_at, defer_until
+        ))
+        return state
+
+    def _metric_counts(self, conn: sqlite3.Connection, source: str, metric: str,
+                       now: Optional[float] = None) -> Dict[int, int]:
+        since = (now or time.time()) - self.window_hours * 3600
+        rows = conn.execute("""
+            SELECT bucket, SUM(count) FROM source_latency_histogram
+            WHERE source = ? AND metric = ? AND hour_start >= ?
+            GROUP BY bucket
+        """, (source, metric, int(since // 3600 * 3600)))
+        return dict(rows.fetchall())
+
+    def record_observation(self, url: str, response_time: Optional[float], ok: bool,
+                           status_code: Optional[int] = None, error_kind: Optional[str] = None,
+                           error_message: str = '') -> str:
+        """
+        Record a full-page fetch timed elsewhere (source testers, collectors);
+        ``response_time`` in seconds. The timing includes the page body (and
+        usually parsing), so it goes to the ``page`` histogram, not the probes'
+        ``total``
+        """
+        return self.record(ProbeResult(
+            url=url,
+            source=source_key(url),
+            ok=ok,
+            status_code=status_code,
+            page_ms=response_time * 1000 if response_time is not None else None,
+            error_kind=None if ok else (error_kind or 'unknown'),
+            error_message=error_message or '',
+        ))
+
+    def record_test_result(self, url: str, response_time: Optional[float], status: str,
+                           error_message: str = '') -> str:
+        """
+        Record a source tester outcome (``working``/``limited``/``broken``/``error``).
+
+        Only transport failures count against the source: exceptions and
+        timeouts (``error``) and 5xx answers. A page that loads but yields too
+        few articles, or a 4xx, means the host is up and the selectors or URL
+        need fixing, which backing off collection would not help.
+        """
+        match = HTTP_STATUS_MESSAGE.match(error_message or '')
+        status_code = int(match.group(1)) if match else None
+        if status == 'error':
+            ok = False
+            error_kind = 'timeout' if 'timeout' in (error_message or '').lower() else 'connect'
+        elif status_code is not None and status_code >= 500:
+            ok = False
+            error_kind = 'http_5xx'
+        else:
+            ok, error_kind = True, None
+        return self.record_observation(url, response_time, ok, status_code=status_code,
+                                       error_kind=error_kind, error_message=error_message)
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Drop histogram buckets that fell out of the rolling window"""
+        cutoff = int(((now or time.time()) - self.window_hours * 3600) // 3600 * 3600)
+        with self.db_lock:
+            with sqlite3.connect(self.db_path) as conn:
+                removed = conn.execute(
+                    "DELETE FROM source_latency_histogram WHERE hour_start < ?", (cutoff,)
+                ).rowcount
+                removed += conn.execute(
+                    "DELETE FROM source_error_histogram WHERE hour_start < ?", (cutoff,)
+                ).rowcount
+        return removed
+
+    # ---------------------------------------------------------- collector API
+
+    def get_status(self, url_or_source: str) -> Optional[Dict]:
+        source = source_key(url_or_source)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                "SELECT * FROM source_health_status WHERE source = ?", (source,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def should_collect(self, url: str, now: Optional[float] = None) -> bool:
+        """False while a down source is inside its back-off window"""
+        status = self.get_status(url)
+        if not status or status['state'] != STATE_DOWN:
+            return True
+        return (now or time.time()) >= (status['defer_until'] or 0)
+
+    def filter_sources(self, items: Iterable, url_of=lambda item: item,
+                       now: Optional[float] = None) -> List:
+        """
+        Drop down sources and move slow ones to the end, preserving order otherwise.
+
+        ``url_of`` extracts the URL from each item (e.g. ``lambda s: s[1]`` for
+        ``(name, url)`` tuples).
+        """
+        now = now or time.time()
+        with sqlite3.connect(self.db_path) as conn:
+            states = {
+                source: (state, defer_until)
+                for source, state, defer_until in conn.execute(
+                    "SELECT source, state, defer_until FROM source_health_status"
+                )
+            }
+
+        ready, deferred = [], []
+        for item in items:
+            url = url_of(item)
+            state, defer_until = states.get(source_key(url), (STATE_UP, None))
+            if state == STATE_DOWN and now < (defer_until or 0):
+                logger.info(f"Skipping {url}: source down until "
+                            f"{datetime.fromtimestamp(defer_until):%H:%M}")
+                continue
+            (deferred if state == STATE_SLOW else ready).append(item)
+        return ready + deferred
+
+    def health_report(self) -> List[Dict]:
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("""
+                SELECT source, state, consecutive_failures, p50_total_ms, p95_total_ms,
+                       last_status_code, last_error, last_probe_at, defer_until
+                FROM source_health_status
+                ORDER BY CASE state WHEN 'down' THEN 0 WHEN 'slow' THEN 1 ELSE 2 END, source
+            """).fetchall()
+        return [dict(row) for row in rows]
+
+    # ---------------------------------------------------------------- probing
+
+    async def probe(self, url: str) -> ProbeResult:
+        """Probe one URL; never raises"""
+        started = time.perf_counter()
+        result = ProbeResult(url=url, source=source_key(url), ok=False)
+        try:
+            await asyncio.wait_for(self._probe_url(url, result, started), timeout=self.probe_timeout)
+        except asyncio.TimeoutError:
+            result.error_kind = 'timeout'
+            result.error_message = f'No response within {self.probe_timeout}s'
+        except socket.gaierror as e:
+            result.error_kind = 'dns'
+            result.error_message = str(e)
+        except ssl.SSLError as e:
+            result.error_kind = 'tls'
+            result.error_message = str(e)
+        except (ConnectionError, OSError) as e:
+            result.error_kind = 'connect'
+            result.error_message = str(e)
+        except ValueError as e:
+            result.error_kind = 'protocol'
+            result.error_message = str(e)
+        result.total_ms = (time.perf_counter() - started) * 1000
+        return result
+
+    async def _probe_url(self, url: str, result: ProbeResult, started: float):
+        method = 'HEAD'
+        for _ in range(MAX_REDIRECTS + 1):
+            status, headers = await self._request(url, method, result, started)
+            if status in (405, 501) and method == 'HEAD':
+                method = 'GET'
+                continue
+            if status in (301, 302, 303, 307, 308) and headers.get('location'):
+                url = urljoin(url, headers['location'])
+                continue
+            break
+
+        result.status_code = status
+        result.ok = status < 500
+        if not result.ok:
+            result.error_kind = 'http_5xx'
+            result.error_message = f'HTTP {status}'
+
+    async def _request(self, url: str, method: str, result: ProbeResult,
+                       started: float) -> Tuple[int, Dict[str, str]]:
+        """One request on a fresh connection; fills the phase timings of ``result``"""
+        parts = urlsplit(url)
+        use_tls = parts.scheme == 'https'
+        host = parts.hostname
+        port = parts.port or (443 if use_tls else 80)
+        if not host:
+            raise ValueError(f'Invalid URL: {url}')
+
+        loop = asyncio.get_running_loop()
+        phase_start = time.perf_counter()
+        addresses = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        result.dns_ms = (time.perf_counter() - phase_start) * 1000
+
+        phase_start = time.perf_counter()
+        reader, writer = await asyncio.open_connection(
+            addresses[0][4][0], port,
+            ssl=ssl.create_default_context() if use_tls else None,
+            server_hostname=host if use_tls else None,
+        )
+        result.connect_ms = (time.perf_counter() - phase_start) * 1000
+
+        try:
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+            request_lines = [
+                f'{method} {path} HTTP/1.1',
+                f'Host: {parts.netloc}',
+                f'User-Agent: {USER_AGENT}',
+                'Accept: */*',
+                'Connection: close',
+            ]
+            if method == 'GET':
+                request_lines.append('Range: bytes=0-0')
+            writer.write(('\r\n'.join(request_lines) + '\r\n\r\n').encode('ascii'))
+            await writer.drain()
+
+            status_line = await reader.readline()
+            result.ttfb_ms = (time.perf_counter() - started) * 1000
+            fields = status_line.decode('latin-1').split()
+            if len(fields) < 2 or not fields[1].isdigit():
+                raise ValueError(f'Malformed status line: {status_line[:80]!r}')
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            return int(fields[1]), headers
+        finally:
+            writer.close()
+
+    async def probe_all(self, urls: Sequence[str]) -> List[ProbeResult]:
+        """Probe all URLs concurrently and record the results"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(url):
+            async with semaphore:
+                return await self.probe(url)
+
+        results = await asyncio.gather(*(bounded(url) for url in urls))
+        for result in results:
+            state = self.record(result)
+            if result.ok:
+                logger.info(f"✓ {result.source}: {state} ({result.total_ms:.0f} ms, HTTP {result.status_code})")
+            else:
+                logger.warning(f"✗ {result.source}: {state} ({result.error_kind}: {result.error_message})")
+        self.prune()
+        return results
+
+    def run_probes(self, urls: Sequence[str]) -> List[ProbeResult]:
+        """Synchronous entry point for schedulers and scripts"""
+        return asyncio.run(self.probe_all(urls))
+
+
+def configured_source_urls() -> List[str]:
+    """One URL per host from the RSS and website source configurations"""
+    urls = []
+    try:
+        from comprehensive_sources_config import WORKING_RSS_SOURCES
+        for sources in WORKING_RSS_SOURCES.values():
+            urls.extend(source['url'] for source in sources)
+    except ImportError:
+        pass
+    try:
+        from nepal_news_intelligence_config import NEPAL_NEWS_SOURCES
+        urls.extend(source.website_url for source in NEPAL_NEWS_SOURCES)
+    except ImportError:
+        pass
+
+    unique = {}
+    for url in urls:
+        unique.setdefault(source_key(url), url)
+    return list(unique.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Probe news source health')
+    parser.add_argument('--db', default='nepal_news_intelligence.db', help='SQLite database path')
+    parser.add_argument('--report', action='store_true', help='Show stored health and exit')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Per-probe timeout (seconds)')
+    parser.add_argument('urls', nargs='*', help='URLs to probe (default: all configured sources)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    monitor = SourceHealthMonitor(args.db, probe_timeout=args.timeout)
+
+    if not args.report:
+        urls = args.urls or configured_source_urls()
+        print(f"🩺 Probing {len(urls)} sources...")
+        monitor.run_probes(urls)
+
+    print()
+    print(f"{'SOURCE':<40} {'STATE':<6} {'FAILS':>5} {'P50 ms':>8} {'P95 ms':>8}")
+    for row in monitor.health_report():
+        p50 = f"{row['p50_total_ms']:.0f}" if row['p50_total_ms'] else '-'
+        p95 = f"{row['p95_total_ms']:.0f}" if row['p95_total_ms'] else '-'
+        print(f"{row['source']:<40} {row['state']:<6} {row['consecutive_failures']:>5} {p50:>8} {p95:>8}")
+
+
+if __name__ == "__main__":
+    main()
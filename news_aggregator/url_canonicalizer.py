@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+URL CANONICALIZER
+Canonical article URLs and 64-bit ``url_hash`` keys for deduplication
+
+The same article reaches the database as several URL variants: tracking
+parameters, trailing slashes, http vs https, ``www.``/``m.`` hosts. Writers
+store the URL as published alongside the ``url_hash`` of its canonical form
+(a signed 64-bit integer with a unique index) and insert with ``INSERT OR
+IGNORE``, so variants collapse onto the first row stored and lookups use a
+small integer index instead of the long TEXT ``url`` key.
+
+Writers only add the column (``ensure_url_hash_column``); rows stored before
+it existed are hashed once by ``python url_canonicalizer.py --db <path>``.
+"""
+
+import argparse
+import hashlib
+import re
+import sqlite3
+import struct
+from typing import Optional
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
+
+# Query parameters that never identify an article (generic names such as
+# ``ref``, ``share`` or ``amp`` are kept: some sites route articles by them)
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid',
+    'ref_src', 'ref_url', 'referrer', 'ncid', 'cmpid', 'spm', '_ga', 'yclid',
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'hsa_', 'fb_', 'ga_')
+
+# Host prefixes that serve the same content as the bare domain
+MIRROR_HOST_PREFIXES = ('www.', 'm.', 'mobile.', 'amp.')
+_MIRROR_URL_PREFIXES = tuple('https://' + prefix for prefix in MIRROR_HOST_PREFIXES)
+
+_DUPLICATE_SLASHES = re.compile(r'/{2,}')
+# Already-canonical URLs (the common case for stored rows) skip urlsplit and
+# re-quoting: https, lower-case host, unreserved path chars, no query/fragment
+_CANONICAL_FAST_PATH = re.compile(r'https://[a-z0-9-]+(?:\.[a-z0-9-]+)+(?:/[A-Za-z0-9._~-]+)*')
+_SAFE_PATH_CHARS = "/:@!$&'()*+,;=-._~%"
+
+
+def canonicalize_url(url: Optional[str]) -> Optional[str]:
+    """
+    Return the canonical form of an article URL.
+
+    - scheme forced to https, host lower-cased, default port dropped
+    - ``www.``, ``m.``, ``mobile.`` and ``amp.`` host prefixes removed
+    - fragment and tracking query parameters removed, remaining params sorted
+    - duplicate and trailing slashes and ``/amp`` suffixes removed from the path
+    - percent-encoding normalised (Devanagari paths compare equal whether
+      encoded or not)
+    """
+    if not url:
+        return url
+
+    url = url.strip()
+    if (_CANONICAL_FAST_PATH.fullmatch(url)
+            and not url.startswith(_MIRROR_URL_PREFIXES)
+            and not url.endswith('/amp')):
+        return url
+
+    if '://' not in url:
+        if url.startswith('//'):
+            url = 'https:' + url
+        else:
+            return url
+
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+
+    if parts.scheme.lower() not in ('http', 'https'):
+        return url
+
+    host = (parts.hostname or '').lower().rstrip('.')
+    for prefix in MIRROR_HOST_PREFIXES:
+        if host.startswith(prefix) and host.count('.') > 1:
+            host = host[len(prefix):]
+            break
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = _DUPLICATE_SLASHES.sub('/', parts.path or '/')
+    path = quote(unquote(path), safe=_SAFE_PATH_CHARS)
+    if path.endswith('/amp') or path.endswith('/amp/'):
+        path = path[:path.rindex('/amp')] or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    query_pairs = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query = urlencode(sorted(query_pairs), doseq=True)
+
+    return urlunsplit(('https', host, path if path != '/' else '', query, ''))
+
+
+def url_hash(url: Optional[str]) -> Optional[int]:
+    """Signed 64-bit hash of the canonical URL (fits an SQLite INTEGER)."""
+    canonical = canonicalize_url(url)
+    if not canonical:
+        return None
+    digest = hashlib.blake2b(canonical.encode('utf-8'), digest_size=8).digest()
+    return struct.unpack('<q', digest)[0]
+
+
+def url_and_hash(url: Optional[str]):
+    """Return ``(url, url_hash)`` for a writer's INSERT parameters (the URL as published, hashed canonically)."""
+    return url, url_hash(url)
+
+
+def register_sqlite_functions(conn: sqlite3.Connection):
+    """Expose ``canonical_url(url)`` and ``url_hash(url)`` to SQL on ``conn``."""
+    conn.create_function('canonical_url', 1, canonicalize_url, deterministic=True)
+    conn.create_function('url_hash', 1, url_hash, deterministic=True)
+
+
+_migrated = set()
+
+
+def ensure_url_hash_column(conn: sqlite3.Connection, table: str = 'articles_enhanced') -> bool:
+    """
+    Add the ``url_hash`` column and its unique index to ``table`` if missing.
+
+    Schema only, so writers can call it before inserting: existing rows are
+    hashed by the one-off ``backfill_url_hashes`` migration. Returns True if
+    the column was added; cheap no-op once done for a given database and
+    table in this process.
+    """
+    try:
+        db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    except (sqlite3.Error, TypeError):
+        db_file = None
+    key = (db_file, table)
+    if db_file and key in _migrated:
+        return False
+
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if not columns:
+        return False  # Table not created yet
+
+    added = 'url_hash' not in columns
+    if added:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN url_hash INTEGER")
+    conn.execute(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_url_hash ON {table}(url_hash)"
+    )
+    conn.commit()
+
+    if db_file:
+        _migrated.add(key)
+    return added
+
+
+def backfill_url_hashes(conn: sqlite3.Connection, table: str = 'articles_enhanced') -> int:
+    """
+    Hash the existing rows of ``table`` (run once, see ``main``).
+
+    Rows are hashed in rowid order with ``UPDATE OR IGNORE``, so the oldest
+    row of a group of URL variants gets the hash. The later variants keep a
+    NULL ``url_hash`` and are never deleted: other tables may reference them
+    by URL. Returns the number of rows hashed.
+    """
+    ensure_url_hash_column(conn, table)
+    register_sqlite_functions(conn)
+    backfilled = conn.execute(
+        f"UPDATE OR IGNORE {table} SET url_hash = url_hash(url) "
+        f"WHERE url_hash IS NULL AND url IS NOT NULL"
+    ).rowcount
+    conn.commit()
+    return backfilled
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Add and backfill url_hash on the article tables')
+    parser.add_argument('--db', default='nepal_news_intelligence.db', help='SQLite database path')
+    parser.add_argument('--table', action='append', help='Table to migrate (default: articles_enhanced)')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        for table in args.table or ['articles_enhanced']:
+            backfilled = backfill_url_hashes(conn, table)
+            variants = conn.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE url_hash IS NULL AND url IS NOT NULL"
+            ).fetchone()[0]
+            print(f"✅ {table}: {backfilled} rows hashed, {variants} URL variants of older rows left unhashed")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+URL SEEN INDEX
+Shared, persisted "have we already collected this URL?" index for collectors.
+
+Replaces the per-collector ``set(SELECT url FROM ...)`` loaded at startup with a
+scalable Bloom filter stored in a memory-mapped file next to the database:
+
+- Opening the index maps the file and catches up on rows inserted since the
+  last run (rowid watermark), so startup cost does not grow with the archive.
+- ``url in index`` answers "definitely new" from the filter alone; only on a
+  positive is the exact ``url_hash`` (or ``url``) lookup run in SQLite.
+- URLs are canonicalized first (see ``url_canonicalizer``), so tracking
+  parameters and host/scheme variants hit the same filter bits.
+- ``index.add(url)`` sets the bits in the mapped file, so the next collector
+  run sees URLs inserted by this one.
+- Collectors in separate processes share the file: writes (bits, slice
+  counts, new slices, the watermark) hold an exclusive ``flock`` on it and
+  lookups a shared one. After taking the lock each checks the header's
+  slice count and layout generation (bumped by every new slice or reset) and
+  re-reads the slices only when they changed, so a slice added by another
+  process is mapped before it is used without re-parsing on every lookup.
+- If the exact lookup fails (locked or missing table), the error is logged
+  and the URL is reported as seen: the filter already matched it.
+
+File layout (little endian):
+    header:  magic(4s) version(I) watermark(q) slice_count(I) generation(I) pad(8x) = 32 bytes
+    slice:   capacity(Q) count(Q) num_bits(Q) num_hashes(I) pad(4x)      = 32 bytes
+             followed by ceil(num_bits / 8) bytes rounded up to 8
+"""
+
+import hashlib
+import logging
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows: single-process use only
+    FCNTL_AVAILABLE = False
+
+from url_canonicalizer import canonicalize_url, url_hash
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'NUSI'
+VERSION = 3
+
+_HEADER = struct.Struct('<4sIqII8x')
+_SLICE_HEADER = struct.Struct('<QQQI4x')
+
+
+class _BloomSlice:
+    """One fixed-size Bloom filter living at ``offset`` inside the mapped file."""
+
+    def __init__(self, index: 'UrlSeenIndex', offset: int):
+        self.index = index
+        self.offset = offset
+        self.capacity, _, self.num_bits, self.num_hashes = _SLICE_HEADER.unpack_from(index._mm, offset)
+        self.bits_offset = offset + _SLICE_HEADER.size
+
+    @staticmethod
+    def byte_size(num_bits: int) -> int:
+        """Bytes occupied by a slice (header + 8-byte aligned bit array)."""
+        bit_bytes = (num_bits + 7) // 8
+        return _SLICE_HEADER.size + bit_bytes + (-bit_bytes) % 8
+
+    @staticmethod
+    def dimensions(capacity: int, error_rate: float):
+        """Return ``(num_bits, num_hashes)`` for the given capacity and error rate."""
+        num_bits = max(64, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        num_hashes = max(1, int(round((num_bits / capacity) * math.log(2))))
+        return num_bits, num_hashes
+
+    @property
+    def count(self) -> int:
+        """URLs added so far, read from the file: other processes count into it too."""
+        return _SLICE_HEADER.unpack_from(self.index._mm, self.offset)[1]
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.byte_size(self.num_bits)
+
+    def _positions(self, h1: int, h2: int):
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def contains(self, h1: int, h2: int) -> bool:
+        mm = self.index._mm
+        base = self.bits_offset
+        for pos in self._positions(h1, h2):
+            if not mm[base + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def add(self, h1: int, h2: int):
+        mm = self.index._mm
+        base = self.bits_offset
+        for pos in self._positions(h1, h2):
+            byte = base + (pos >> 3)
+            mm[byte] = mm[byte] | (1 << (pos & 7))
+        _SLICE_HEADER.pack_into(mm, self.offset, self.capacity, self.count + 1,
+                                self.num_bits, self.num_hashes)
+
+    @property
+    def is_full(self) -> bool:
+        return self.count >= self.capacity
+
+
+class UrlSeenIndex:
+    """
+    Set-like URL index backed by a persisted, scalable Bloom filter.
+
+    Drop-in replacement for the ``existing_urls`` set used by the collectors:
+    supports ``in``, ``add`` and ``len``. Membership is exact — Bloom positives
+    are confirmed against the database, so false positives never drop a new
+    article.
+
+    Args:
+        db_path: SQLite database holding the collected articles
+        table: Table with a ``url`` column (``articles_enhanced`` or ``articles``)
+        index_path: Index file (default: ``<db_path>.<table>.urlidx``)
+        initial_capacity: URLs the first filter slice holds before a new slice is added
+        error_rate: Target false-positive rate of the first slice
+        growth: Capacity multiplier for each additional slice
+        tightening: Error-rate multiplier for each additional slice
+    """
+
+    def __init__(self, db_path: str, table: str = 'articles_enhanced',
+                 index_path: Optional[str] = None,
+                 initial_capacity: int = 100_000,
+                 error_rate: float = 0.001,
+                 growth: int = 2,
+                 tightening: float = 0.5):
+        self.db_path = str(db_path)
+        self.table = table
+        self.index_path = str(index_path or f"{self.db_path}.{table}.urlidx")
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        # URLs added during this run that may not be in the database (e.g.
+        # links marked as visited before the article is saved)
+        self._session_urls = set()
+        self._file = None
+        self._mm = None
+        self._slices: List[_BloomSlice] = []
+        self._layout = None  # (slice_count, generation) the slices were loaded from
+        self._has_url_hash = False
+
+        self._open()
+        self.sync()
+
+    # ------------------------------------------------------------------ file
+
+    def _open(self):
+        """Map the index file, creating (or resetting) an empty one if needed."""
+        self._file = os.fdopen(os.open(self.index_path, os.O_RDWR | os.O_CREAT, 0o644), 'r+b')
+        with self._file_lock(exclusive=True):
+            header = self._file.read(_HEADER.size)
+            if len(header) < _HEADER.size or _HEADER.unpack(header)[:2] != (MAGIC, VERSION):
+                self._reset_file(generation=0)
+            self._mm = mmap.mmap(self._file.fileno(), 0)
+            self._load_slices()
+
+    def _reset_file(self, generation: int):
+        """Empty the file down to a fresh header (caller holds the exclusive lock)."""
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(_HEADER.pack(MAGIC, VERSION, 0, 0, generation))
+        self._file.flush()
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        if not FCNTL_AVAILABLE:
+            yield
+            return
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    @contextmanager
+    def _locked(self, exclusive: bool = True):
+        """
+        Hold the thread lock and the file lock, with the mapping and slices
+        current: other processes may have grown or reset the file. Slices are
+        only re-read when the header's layout changed.
+        """
+        with self._lock, self._file_lock(exclusive):
+            if os.fstat(self._file.fileno()).st_size != len(self._mm):
+                self._mm.close()
+                self._mm = mmap.mmap(self._file.fileno(), 0)
+            if _HEADER.unpack_from(self._mm, 0)[3:] != self._layout:
+                self._load_slices()
+            yield
+
+    def _load_slices(self):
+        _, _, _, slice_count, generation = _HEADER.unpack_from(self._mm, 0)
+        self._layout = (slice_count, generation)
+        self._slices = []
+        offset = _HEADER.size
+        for _ in range(slice_count):
+            bloom = _BloomSlice(self, offset)
+            self._slices.append(bloom)
+            offset = bloom.end
+
+    def _slice_error_rate(self, position: int) -> float:
+        return self.error_rate * (self.tightening ** position)
+
+    def _add_slice(self) -> _BloomSlice:
+        """Grow the file by one slice and remap it (caller holds the exclusive lock)."""
+        position = len(self._slices)
+        capacity = self.initial_capacity * (self.growth ** position)
+        num_bits, num_hashes = _BloomSlice.dimensions(capacity, self._slice_error_rate(position))
+
+        offset = self._slices[-1].end if self._slices else _HEADER.size
+        self._mm.flush()
+        self._mm.close()
+        self._file.truncate(offset + _BloomSlice.byte_size(num_bits))
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+
+        _SLICE_HEADER.pack_into(self._mm, offset, capacity, 0, num_bits, num_hashes)
+        self._write_header(slice_count=position + 1, generation=self._layout[1] + 1)
+        self._load_slices()
+        return self._slices[-1]
+
+    def _write_header(self, watermark: Optional[int] = None, slice_count: Optional[int] = None,
+                      generation: Optional[int] = None):
+        _, _, current_watermark, current_count, current_generation = _HEADER.unpack_from(self._mm, 0)
+        _HEADER.pack_into(
+            self._mm, 0, MAGIC, VERSION,
+            current_watermark if watermark is None else watermark,
+            current_count if slice_count is None else slice_count,
+            current_generation if generation is None else generation
+        )
+
+    def _close_file(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def watermark(self) -> int:
+        """Highest table rowid already folded into the filter."""
+        return _HEADER.unpack_from(self._mm, 0)[2]
+
+    # --------------------------------------------------------------- hashing
+
+    @staticmethod
+    def _hashes(url: str):
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        return h1, h2 | 1
+
+    def _bloom_contains(self, url: str) -> bool:
+        h1, h2 = self._hashes(url)
+        return any(bloom.contains(h1, h2) for bloom in self._slices)
+
+    def _bloom_add(self, url: str):
+        h1, h2 = self._hashes(url)
+        if any(bloom.contains(h1, h2) for bloom in self._slices):
+            return
+        bloom = self._slices[-1] if self._slices and not self._slices[-1].is_full else self._add_slice()
+        bloom.add(h1, h2)
+
+    # -------------------------------------------------------------- database
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def _exists_in_db(self, url: str, canonical: str) -> bool:
+        try:
+            if self._has_url_hash:
+                query, keys = f"SELECT 1 FROM {self.table} WHERE url_hash = ? LIMIT 1", (url_hash(canonical),)
+            else:
+                # Rows keep the URL as published: match it or its canonical form
+                query, keys = f"SELECT 1 FROM {self.table} WHERE url IN (?, ?) LIMIT 1", (url, canonical)
+            return self._connection().execute(query, keys).fetchone() is not None
+        except sqlite3.Error as e:
+            # Fail closed: the filter matched, so re-collecting is the likelier mistake
+            logger.warning(f"URL lookup in {self.table} failed, treating {canonical} as seen: {e}")
+            return True
+
+    def sync(self) -> int:
+        """
+        Fold rows inserted since the last sync into the filter.
+
+        Rebuilds from scratch if the table's rowids went backwards (table was
+        recreated). Returns the number of rows scanned.
+        """
+        with self._lock:
+            try:
+                conn = self._connection()
+                max_rowid = conn.execute(f"SELECT MAX(rowid) FROM {self.table}").fetchone()[0] or 0
+                self._has_url_hash = any(
+                    row[1] == 'url_hash' for row in conn.execute(f"PRAGMA table_info({self.table})")
+                )
+            except sqlite3.Error:
+                return 0
+
+        with self._locked():
+            watermark = self.watermark
+            if max_rowid < watermark:
+                self._reset_locked()
+                watermark = 0
+            if max_rowid == watermark:
+                return 0
+
+            scanned = 0
+            cursor = conn.execute(
+                f"SELECT url FROM {self.table} WHERE rowid > ? AND rowid <= ? AND url IS NOT NULL",
+                (watermark, max_rowid)
+            )
+            for (url,) in cursor:
+                self._bloom_add(canonicalize_url(url))
+                scanned += 1
+            self._write_header(watermark=max_rowid)
+            self._mm.flush()
+            return scanned
+
+    def rebuild(self):
+        """Discard the filter and rebuild it from the table."""
+        with self._locked():
+            self._reset_locked()
+        self.sync()
+
+    def _reset_locked(self):
+        # Emptied in place rather than replaced: other processes keep the file
+        # mapped, and see the new generation even if the same slices come back
+        generation = _HEADER.unpack_from(self._mm, 0)[4] + 1
+        self._mm.close()
+        self._reset_file(generation)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        self._load_slices()
+
+    # ----------------------------------------------------------- set protocol
+
+    def __contains__(self, url) -> bool:
+        canonical = canonicalize_url(url)
+        if not canonical:
+            return False
+        with self._lock:
+            if canonical in self._session_urls:
+                return True
+        with self._locked(exclusive=False):
+            if not self._bloom_contains(canonical):
+                return False
+        return self._exists_in_db(url.strip(), canonical)
+
+    def add(self, url: str):
+        """Record a URL as seen (call after inserting it)."""
+        url = canonicalize_url(url)
+        if not url:
+            return
+        with self._locked():
+            self._session_urls.add(url)
+            self._bloom_add(url)
+
+    def update(self, urls: Iterable[str]):
+        for url in urls:
+            self.add(url)
+
+    def __len__(self) -> int:
+        """Approximate number of distinct URLs in the index."""
+        with self._locked(exclusive=False):
+            return sum(bloom.count for bloom in self._slices)
+
+    def flush(self):
+        with self._lock:
+            if self._mm is not None:
+                self._mm.flush()
+
+    def close(self):
+        with self._lock:
+            if self._mm is not None:
+                self._mm.flush()
+            self._close_file()
+            conn = getattr(self._local, 'conn', None)
+            if conn is not None:
+                conn.close()
+                self._local.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
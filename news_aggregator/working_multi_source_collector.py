@@ -13,6 +13,8 @@ import time
 import hashlib
 import concurrent.futures
 from threading import Lock
+from url_seen_index import UrlSeenIndex
+from url_canonicalizer import ensure_url_hash_column, url_and_hash
 
 class WorkingMultiSourceCollector:
     """Multi-source collector based on proven working code"""
@@ -27,28 +29,27 @@ class WorkingMultiSourceCollector:
         self.db_lock = Lock()
 
     def load_existing_urls(self):
-        """Load existing URLs for deduplication"""
+        """Open the persisted URL-seen index for deduplication"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.execute("SELECT url FROM articles_enhanced")
-            urls = set(row[0] for row in cursor)
-            conn.close()
-            return urls
+            return UrlSeenIndex(self.db_path, table='articles_enhanced')
         except:
             return set()
 
     def save_article_thread_safe(self, article_data):
         """Thread-safe article saving for current database schema"""
         try:
+            url, url_hash = url_and_hash(article_data['url'])
             with self.db_lock:
                 conn = sqlite3.connect(self.db_path)
+                ensure_url_hash_column(conn, 'articles_enhanced')
                 cursor = conn.execute('''
                     INSERT INTO articles_enhanced (
-                        url, title, content, source_site, scraped_date,
+                        url, url_hash, title, content, source_site, scraped_date,
                         word_count, quality_score, language
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
-                    article_data['url'],
+                    url,
+                    url_hash,
                     article_data['title'],
                     article_data['content'],
                     article_data['source_site'],
@@ -59,7 +60,7 @@ class WorkingMultiSourceCollector:
                 ))
                 conn.commit()
                 conn.close()
-                self.existing_urls.add(article_data['url'])
+                self.existing_urls.add(url)
                 return True
         except Exception as e:
             print(f"❌ Save error: {e}")
@@ -42,22 +42,29 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.executors.pool import ThreadPoolExecutor
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'news_aggregator'))
+from url_canonicalizer import ensure_url_hash_column, register_sqlite_functions
+
 
 class NewsCollectorService:
     """Standalone news collection service that feeds the main aggregator database."""
 
     def __init__(self,
                  interval_hours: int = 2,
-                 main_db_path: str = "news_aggregator/nepal_news_intelligence.db"):
+                 main_db_path: str = "news_aggregator/nepal_news_intelligence.db",
+                 transfer_chunk_size: Optional[int] = None):
         """
         Initialize the news collection service.
 
         Args:
             interval_hours: Hours between collection runs
             main_db_path: Path to main aggregator database
+            transfer_chunk_size: Rows per transaction when transferring from
+                the temp database (None = single transaction)
         """
         self.interval_hours = interval_hours
         self.main_db_path = Path(main_db_path)
+        self.transfer_chunk_size = transfer_chunk_size
         self.service_dir = Path("collector_service")
         self.service_dir.mkdir(exist_ok=True)
 
@@ -142,6 +149,7 @@ class NewsCollectorService:
                     CREATE INDEX IF NOT EXISTS idx_articles_enhanced_source_site
                     ON articles_enhanced(source_site)
                 """)
+                ensure_url_hash_column(conn, 'articles_enhanced')
 
         except Exception as e:
             self.logger.error(f"Database schema setup failed: {e}")
@@ -209,7 +217,7 @@ class NewsCollectorService:
 
                 if result.returncode == 0:
                     # Collection successful, transfer data
-                    articles_transferred = self._transfer_articles()
+                    articles_transferred = self._transfer_articles(self.transfer_chunk_size)
 
                     self.logger.info(f"Collection completed successfully:")
                     self.logger.info(f"  - Duration: {duration:.2f} seconds")
@@ -228,74 +236,81 @@ class NewsCollectorService:
             self.logger.error(f"Collection error: {e}")
             raise
 
-    def _transfer_articles(self) -> int:
-        """Transfer articles from temporary database to main database."""
+    # Column mapping from the collector's ``articles`` table to
+    # ``articles_enhanced``; defaults mirror the old per-row dict mapping.
+    _TRANSFER_SELECT = """
+        SELECT url, url_hash(url),
+               COALESCE(source_id, 'unknown'),
+               title, content, author, published_date,
+               COALESCE(collected_date, :now),
+               COALESCE(language, 'ne'),
+               COALESCE(word_count, 0),
+               content_hash, title_hash
+        FROM temp_db.articles
+    """
+
+    def _transfer_articles(self, chunk_size: Optional[int] = None) -> int:
+        """
+        Transfer articles from temporary database to main database.
+
+        The temp database is attached to the main connection and copied with a
+        single ``INSERT OR IGNORE ... SELECT`` inside one transaction, so no
+        rows are materialised in Python.
+
+        Args:
+            chunk_size: If set, copy in rowid ranges of this size and commit
+                after each range. Keeps write locks short for very large
+                temp databases.
+
+        Returns:
+            Number of rows actually inserted (duplicates are not counted).
+        """
         try:
             if not self.temp_db.exists():
                 self.logger.warning("No temporary database found, nothing to transfer")
                 return 0
 
             transferred = 0
-
-            # Connect to both databases
-            with sqlite3.connect(self.temp_db) as temp_conn, \
-                 sqlite3.connect(self.main_db_path) as main_conn:
-
-                # Get articles from temporary database
-                temp_cursor = temp_conn.execute("""
-                    SELECT url, source_id as source_site, title, content, author,
-                           published_date, collected_date as scraped_date, language,
-                           word_count, content_hash, title_hash
-                    FROM articles
-                """)
-
-                # Prepare main database insert
-                main_cursor = main_conn.cursor()
-
-                for row in temp_cursor:
-                    try:
-                        # Map fields from collector format to main database format
-                        article_data = {
-                            'url': row[0],
-                            'source_site': row[1] or 'unknown',
-                            'title': row[2],
-                            'content': row[3],
-                            'author': row[4],
-                            'published_date': row[5],
-                            'scraped_date': row[6] or datetime.now().isoformat(),
-                            'language': row[7] or 'ne',
-                            'word_count': row[8] or 0,
-                            'content_hash': row[9],
-                            'title_hash': row[10]
-                        }
-
-                        # Insert into main database (ignore duplicates)
-                        main_cursor.execute("""
-                            INSERT OR IGNORE INTO articles_enhanced
-                            (url, source_site, title, content, author, published_date,
-                             scraped_date, language, word_count, content_hash, title_hash)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            article_data['url'],
-                            article_data['source_site'],
-                            article_data['title'],
-                            article_data['content'],
-                            article_data['author'],
-                            article_data['published_date'],
-                            article_data['scraped_date'],
-                            article_data['language'],
-                            article_data['word_count'],
-                            article_data['content_hash'],
-                            article_data['title_hash']
-                        ))
-
-                        if main_cursor.rowcount > 0:
-                            transferred += 1
-
-                    except Exception as e:
-                        self.logger.warning(f"Failed to transfer article {row[0]}: {e}")
-
-                main_conn.commit()
+            insert_sql = """
+                INSERT OR IGNORE INTO articles_enhanced
+                (url, url_hash, source_site, title, content, author, published_date,
+                 scraped_date, language, word_count, content_hash, title_hash)
+            """ + self._TRANSFER_SELECT
+            params = {'now': datetime.now().isoformat()}
+
+            # Autocommit mode so ATTACH/DETACH run outside a transaction and
+            # BEGIN/COMMIT are explicit.
+            conn = sqlite3.connect(self.main_db_path, isolation_level=None)
+            try:
+                register_sqlite_functions(conn)  # url_hash column added by _setup_database_schema
+                conn.execute("ATTACH DATABASE ? AS temp_db", (str(self.temp_db),))
+                try:
+                    if chunk_size:
+                        low, high = conn.execute(
+                            "SELECT MIN(rowid), MAX(rowid) FROM temp_db.articles"
+                        ).fetchone()
+                        chunk_sql = insert_sql + " WHERE rowid BETWEEN :low AND :high"
+                        start = low if low is not None else 1
+                        while high is not None and start <= high:
+                            conn.execute("BEGIN")
+                            conn.execute(chunk_sql, dict(params, low=start,
+                                                         high=start + chunk_size - 1))
+                            transferred += conn.execute("SELECT changes()").fetchone()[0]
+                            conn.execute("COMMIT")
+                            start += chunk_size
+                    else:
+                        conn.execute("BEGIN")
+                        conn.execute(insert_sql, params)
+                        transferred = conn.execute("SELECT changes()").fetchone()[0]
+                        conn.execute("COMMIT")
+                except Exception:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    raise
+                finally:
+                    conn.execute("DETACH DATABASE temp_db")
+            finally:
+                conn.close()
 
             # Clean up temporary database
             self.temp_db.unlink()
@@ -433,6 +448,9 @@ def main():
                        help='Hours between collections (default: 2)')
     parser.add_argument('--database', type=str, default='news_aggregator/nepal_news_intelligence.db',
                        help='Main database path')
+    parser.add_argument('--transfer-chunk-size', type=int, default=None,
+                       help='Rows per transaction when transferring collected articles '
+                            '(default: single transaction)')
 
     args = parser.parse_args()
 
@@ -442,7 +460,8 @@ def main():
 
     service = NewsCollectorService(
         interval_hours=args.interval,
-        main_db_path=args.database
+        main_db_path=args.database,
+        transfer_chunk_size=args.transfer_chunk_size
     )
 
     try:
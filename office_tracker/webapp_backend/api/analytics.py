@@ -4,22 +4,29 @@ API endpoints for analytics dashboard and office comparisons
 Includes radar charts, rankings, and performance metrics
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, asc
-from typing import List, Dict, Any
-from datetime import datetime, timedelta
-
-from database.connection import get_database
-from models.database_models import (
-    Office, OfficeVisit, OfficeService, OfficeAnalytics, User, ServiceStatus
-)
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+
+from database.connection import get_async_database
+from database.aggregations import dashboard_aggregates, office_comparison_chunks
+from database.rollups import RANKING_METRICS
+from database.anomaly_detector import SIGNALS
+from database.feedback_terms import FEEDBACK_KINDS, top_feedback_terms
+from database.visit_cube import best_time_heatmap
+from database.wait_sketches import merged_wait_sketch, sketch_summary
+from models.database_models import Office, OfficeAlert, OfficeAnalytics, OfficeRanking
 from models.pydantic_models import (
-    OfficeAnalyticsResponse, ComparisonRequest, RadarChartData, 
+    OfficeAnalyticsResponse, ComparisonRequest,
     ComparisonResponse, AnalyticsDashboard
 )
 
 from api.dependencies import get_api_key
+from api.responses import FastJSONResponse, dumps
 
 router = APIRouter(
     prefix="/api/analytics",
@@ -27,187 +34,64 @@ router = APIRouter(
     dependencies=[Depends(get_api_key)]
 )
 
+# Upper bound on offices per comparison; above COMPARISON_CHUNK_SIZE the
+# response is streamed and offices are aggregated one chunk at a time
+COMPARISON_MAX_OFFICES = int(os.getenv("COMPARISON_MAX_OFFICES", 500))
+COMPARISON_CHUNK_SIZE = int(os.getenv("COMPARISON_CHUNK_SIZE", 50))
+
+# Largest rankings page; bigger scopes are paged through with offset
+RANKING_MAX_PAGE_SIZE = int(os.getenv("RANKING_MAX_PAGE_SIZE", 1000))
+
+# Most terms returned by one feedback-terms request
+FEEDBACK_TERMS_MAX_LIMIT = int(os.getenv("FEEDBACK_TERMS_MAX_LIMIT", 100))
+
+# Most alerts returned by one alerts request
+ALERTS_MAX_LIMIT = int(os.getenv("ALERTS_MAX_LIMIT", 500))
+
+# scope -> (rank column, scope column); each pair is led by an office_rankings index
+RANKING_SCOPES = {
+    "national": (OfficeRanking.national_rank, None),
+    "province": (OfficeRanking.province_rank, OfficeRanking.province),
+    "district": (OfficeRanking.district_rank, OfficeRanking.district),
+}
+
+WAIT_TIME_SCOPES = ("national", "province", "district", "office")
+
+COMPARISON_METRICS_INFO = {
+    "overall_rating": "Overall satisfaction rating (1-5 stars)",
+    "efficiency": "Service efficiency based on wait time",
+    "staff_behavior": "Staff helpfulness and behavior rating", 
+    "cleanliness": "Office cleanliness and environment rating",
+    "integrity": "Corruption-free service (higher = no bribes reported)"
+}
+
 
 @router.get("/dashboard", response_model=AnalyticsDashboard)
-async def get_dashboard_data(db: Session = Depends(get_database)):
+async def get_dashboard_data(db: AsyncSession = Depends(get_async_database)):
     """Main analytics dashboard with key metrics"""
     
-    # Overall statistics
-    total_offices = db.query(Office).count()
-    total_visits = db.query(OfficeVisit).count()
-    
-    # Success rate calculation
-    successful_visits = db.query(OfficeVisit).filter(
-        OfficeVisit.service_status == ServiceStatus.SUCCESS
-    ).count()
-    avg_success_rate = (successful_visits / total_visits * 100) if total_visits > 0 else 0
-    
-    # Average overall rating
-    avg_rating_result = db.query(func.avg(OfficeVisit.overall_rating)).filter(
-        OfficeVisit.overall_rating.isnot(None)
-    ).scalar()
-    avg_overall_rating = round(avg_rating_result, 2) if avg_rating_result else 0
-    
-    # Top rated offices (with at least 3 reviews)
-    top_rated_offices = db.query(
-        Office,
-        func.avg(OfficeVisit.overall_rating).label('avg_rating'),
-        func.count(OfficeVisit.id).label('review_count')
-    ).join(OfficeVisit).filter(
-        OfficeVisit.overall_rating.isnot(None)
-    ).group_by(Office.id).having(
-        func.count(OfficeVisit.id) >= 3
-    ).order_by(
-        desc('avg_rating')
-    ).limit(5).all()
-    
-    # Most efficient offices (lowest wait time)
-    most_efficient_offices = db.query(
-        Office,
-        func.avg(OfficeVisit.wait_duration_minutes).label('avg_wait'),
-        func.count(OfficeVisit.id).label('visit_count')
-    ).join(OfficeVisit).filter(
-        OfficeVisit.wait_duration_minutes.isnot(None)
-    ).group_by(Office.id).having(
-        func.count(OfficeVisit.id) >= 3
-    ).order_by(
-        asc('avg_wait')
-    ).limit(5).all()
-    
-    # Offices with bribe reports
-    offices_with_bribes = db.query(
-        Office,
-        func.count(OfficeVisit.id).label('bribe_count'),
-        func.count(OfficeVisit.id).label('total_visits')
-    ).join(OfficeVisit).filter(
-        OfficeVisit.asked_for_bribe == True
-    ).group_by(Office.id).order_by(
-        desc('bribe_count')
-    ).limit(10).all()
-    
-    # Lowest rated offices
-    lowest_rated_offices = db.query(
-        Office,
-        func.avg(OfficeVisit.overall_rating).label('avg_rating'),
-        func.count(OfficeVisit.id).label('review_count')
-    ).join(OfficeVisit).filter(
-        OfficeVisit.overall_rating.isnot(None)
-    ).group_by(Office.id).having(
-        func.count(OfficeVisit.id) >= 3
-    ).order_by(
-        asc('avg_rating')
-    ).limit(5).all()
-    
-    # Provincial statistics
-    provincial_stats = {}
-    provinces = db.query(Office.province).distinct().all()
-    
-    for (province,) in provinces:
-        province_visits = db.query(OfficeVisit).join(Office).filter(
-            Office.province == province
-        )
-        
-        total_province_visits = province_visits.count()
-        successful_province_visits = province_visits.filter(
-            OfficeVisit.service_status == ServiceStatus.SUCCESS
-        ).count()
-        
-        avg_province_rating = province_visits.filter(
-            OfficeVisit.overall_rating.isnot(None)
-        ).with_entities(
-            func.avg(OfficeVisit.overall_rating)
-        ).scalar() or 0
-        
-        avg_province_wait = province_visits.filter(
-            OfficeVisit.wait_duration_minutes.isnot(None)
-        ).with_entities(
-            func.avg(OfficeVisit.wait_duration_minutes)
-        ).scalar() or 0
-        
-        provincial_stats[province] = {
-            "total_visits": total_province_visits,
-            "success_rate": (successful_province_visits / total_province_visits * 100) if total_province_visits > 0 else 0,
-            "avg_rating": round(avg_province_rating, 2),
-            "avg_wait_minutes": round(avg_province_wait, 1)
-        }
-    
-    # Recent visits (last 10)
-    recent_visits = db.query(OfficeVisit).join(Office).join(OfficeService).order_by(
-        desc(OfficeVisit.visit_date)
-    ).limit(10).all()
-    
-    recent_visits_data = []
-    for visit in recent_visits:
-        recent_visits_data.append({
-            "office_name": visit.office.name,
-            "service_name": visit.service.service_name,
-            "district": visit.office.district,
-            "rating": visit.overall_rating,
-            "wait_minutes": visit.wait_duration_minutes,
-            "service_status": visit.service_status,
-            "visit_date": visit.visit_date
-        })
-    
-    return AnalyticsDashboard(
-        total_offices=total_offices,
-        total_visits=total_visits,
-        avg_success_rate=round(avg_success_rate, 1),
-        avg_overall_rating=avg_overall_rating,
-        top_rated_offices=[
-            {
-                "name": office.name,
-                "district": office.district,
-                "avg_rating": round(avg_rating, 2),
-                "review_count": review_count
-            }
-            for office, avg_rating, review_count in top_rated_offices
-        ],
-        most_efficient_offices=[
-            {
-                "name": office.name,
-                "district": office.district,
-                "avg_wait_minutes": round(avg_wait, 1),
-                "visit_count": visit_count
-            }
-            for office, avg_wait, visit_count in most_efficient_offices
-        ],
-        offices_with_bribe_reports=[
-            {
-                "name": office.name,
-                "district": office.district,
-                "bribe_reports": bribe_count,
-                "total_visits": total_visits
-            }
-            for office, bribe_count, total_visits in offices_with_bribes
-        ],
-        lowest_rated_offices=[
-            {
-                "name": office.name,
-                "district": office.district,
-                "avg_rating": round(avg_rating, 2),
-                "review_count": review_count
-            }
-            for office, avg_rating, review_count in lowest_rated_offices
-        ],
-        provincial_stats=provincial_stats,
-        recent_visits=recent_visits_data,
-        last_updated=datetime.utcnow()
-    )
+    # National, provincial and top-N statistics come from grouped queries
+    # (constant query count regardless of the number of provinces); the dict
+    # is already shaped like AnalyticsDashboard, so it is serialized directly
+    return FastJSONResponse(await db.run_sync(dashboard_aggregates))
 
 
 @router.get("/office/{office_id}", response_model=OfficeAnalyticsResponse)
-async def get_office_analytics(office_id: int, db: Session = Depends(get_database)):
+async def get_office_analytics(office_id: int, db: AsyncSession = Depends(get_async_database)):
     """Detailed analytics for a specific office"""
     
-    office = db.query(Office).filter(Office.id == office_id).first()
-    if not office:
+    # Single-row lookup of the maintained rollup (see database/rollups.py)
+    result = (await db.execute(
+        select(Office, OfficeAnalytics).outerjoin(
+            OfficeAnalytics, OfficeAnalytics.office_id == Office.id
+        ).where(Office.id == office_id)
+    )).first()
+    if not result:
         raise HTTPException(status_code=404, detail="Office not found")
     
-    # Visit statistics
-    visits = db.query(OfficeVisit).filter(OfficeVisit.office_id == office_id)
-    total_visits = visits.count()
+    office, analytics = result
     
-    if total_visits == 0:
+    if analytics is None or not analytics.total_visits:
         return OfficeAnalyticsResponse(
             office_id=office.id,
             office_name=office.name,
@@ -234,151 +118,80 @@ async def get_office_analytics(office_id: int, db: Session = Depends(get_databas
             last_updated=datetime.utcnow()
         )
     
-    # Success/failure counts
-    successful_visits = visits.filter(OfficeVisit.service_status == ServiceStatus.SUCCESS).count()
-    failed_visits = visits.filter(OfficeVisit.service_status == ServiceStatus.FAILED).count()
-    success_rate = (successful_visits / total_visits * 100)
-    
-    # Average ratings
-    ratings_query = visits.filter(OfficeVisit.overall_rating.isnot(None))
-    avg_overall = ratings_query.with_entities(func.avg(OfficeVisit.overall_rating)).scalar() or 0
-    avg_staff = ratings_query.with_entities(func.avg(OfficeVisit.staff_behavior_rating)).scalar() or 0
-    avg_clean = ratings_query.with_entities(func.avg(OfficeVisit.office_cleanliness_rating)).scalar() or 0
-    avg_efficiency = ratings_query.with_entities(func.avg(OfficeVisit.process_efficiency_rating)).scalar() or 0
-    avg_info = ratings_query.with_entities(func.avg(OfficeVisit.information_clarity_rating)).scalar() or 0
-    
-    # Wait time statistics
-    wait_times = visits.filter(OfficeVisit.wait_duration_minutes.isnot(None))
-    avg_wait = wait_times.with_entities(func.avg(OfficeVisit.wait_duration_minutes)).scalar() or 0
-    min_wait = wait_times.with_entities(func.min(OfficeVisit.wait_duration_minutes)).scalar() or 0
-    max_wait = wait_times.with_entities(func.max(OfficeVisit.wait_duration_minutes)).scalar() or 0
-    
-    # Bribe statistics
-    bribe_reports = visits.filter(OfficeVisit.asked_for_bribe == True).count()
-    bribe_rate = (bribe_reports / total_visits * 100) if total_visits > 0 else 0
-    
     return OfficeAnalyticsResponse(
         office_id=office.id,
         office_name=office.name,
         office_name_nepali=office.name_nepali,
         district=office.district,
         province=office.province,
-        total_visits=total_visits,
-        successful_visits=successful_visits,
-        failed_visits=failed_visits,
-        success_rate=round(success_rate, 1),
-        avg_overall_rating=round(avg_overall, 2),
-        avg_staff_behavior=round(avg_staff, 2),
-        avg_cleanliness=round(avg_clean, 2),
-        avg_efficiency=round(avg_efficiency, 2),
-        avg_information_clarity=round(avg_info, 2),
-        avg_wait_time_minutes=round(avg_wait, 1),
-        min_wait_time_minutes=int(min_wait),
-        max_wait_time_minutes=int(max_wait),
-        bribe_reports=bribe_reports,
-        bribe_rate=round(bribe_rate, 1),
-        district_rank=None,  # TODO: Calculate rankings
-        province_rank=None,
-        national_rank=None,
-        last_updated=datetime.utcnow()
+        total_visits=analytics.total_visits,
+        successful_visits=analytics.successful_visits,
+        failed_visits=analytics.failed_visits,
+        success_rate=round(analytics.success_rate, 1),
+        avg_overall_rating=round(analytics.avg_overall_rating, 2),
+        avg_staff_behavior=round(analytics.avg_staff_behavior, 2),
+        avg_cleanliness=round(analytics.avg_cleanliness, 2),
+        avg_efficiency=round(analytics.avg_efficiency, 2),
+        avg_information_clarity=round(analytics.avg_information_clarity, 2),
+        avg_wait_time_minutes=round(analytics.avg_wait_time_minutes, 1),
+        min_wait_time_minutes=int(analytics.min_wait_time_minutes or 0),
+        max_wait_time_minutes=int(analytics.max_wait_time_minutes or 0),
+        bribe_reports=analytics.bribe_reports,
+        bribe_rate=round(analytics.bribe_rate, 1),
+        district_rank=analytics.district_rank,
+        province_rank=analytics.province_rank,
+        national_rank=analytics.national_rank,
+        last_updated=analytics.last_calculated or datetime.utcnow()
     )
 
 
 @router.post("/compare", response_model=ComparisonResponse)
 async def compare_offices(
     request: ComparisonRequest,
-    db: Session = Depends(get_database)
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_database)
 ):
     """Compare multiple offices with radar chart data"""
     
     if len(request.office_ids) < 2:
         raise HTTPException(status_code=400, detail="At least 2 offices required for comparison")
+    if len(request.office_ids) > COMPARISON_MAX_OFFICES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {COMPARISON_MAX_OFFICES} offices can be compared at once"
+        )
     
-    radar_data = []
-    
-    for office_id in request.office_ids:
-        office = db.query(Office).filter(Office.id == office_id).first()
-        if not office:
-            continue
-        
-        # Get analytics for this office
-        visits = db.query(OfficeVisit).filter(OfficeVisit.office_id == office_id)
-        total_visits = visits.count()
-        
-        if total_visits == 0:
-            # Default values for offices with no visits
-            metrics = {
-                "overall_rating": 0,
-                "efficiency": 0,
-                "staff_behavior": 0,
-                "cleanliness": 0,
-                "bribe_rate": 0  # Inverted: 0 = no bribes (good), 5 = many bribes (bad)
-            }
-        else:
-            # Calculate metrics (all normalized to 0-5 scale)
-            ratings_query = visits.filter(OfficeVisit.overall_rating.isnot(None))
-            overall_rating = ratings_query.with_entities(func.avg(OfficeVisit.overall_rating)).scalar() or 0
-            staff_behavior = ratings_query.with_entities(func.avg(OfficeVisit.staff_behavior_rating)).scalar() or 0
-            cleanliness = ratings_query.with_entities(func.avg(OfficeVisit.office_cleanliness_rating)).scalar() or 0
-            
-            # Efficiency: convert wait time to 1-5 scale (lower wait = higher score)
-            avg_wait = visits.filter(OfficeVisit.wait_duration_minutes.isnot(None)).with_entities(
-                func.avg(OfficeVisit.wait_duration_minutes)
-            ).scalar() or 60  # Default 60 minutes
-            
-            # Convert wait time to efficiency score (5 = very fast, 1 = very slow)
-            if avg_wait <= 15:
-                efficiency = 5
-            elif avg_wait <= 30:
-                efficiency = 4
-            elif avg_wait <= 60:
-                efficiency = 3
-            elif avg_wait <= 120:
-                efficiency = 2
-            else:
-                efficiency = 1
-            
-            # Bribe rate (inverted: lower bribe rate = higher score)
-            bribe_count = visits.filter(OfficeVisit.asked_for_bribe == True).count()
-            bribe_rate = (bribe_count / total_visits * 100) if total_visits > 0 else 0
-            
-            # Convert bribe rate to score (5 = no bribes, 1 = many bribes)
-            if bribe_rate == 0:
-                bribe_score = 5
-            elif bribe_rate <= 5:
-                bribe_score = 4
-            elif bribe_rate <= 15:
-                bribe_score = 3
-            elif bribe_rate <= 30:
-                bribe_score = 2
-            else:
-                bribe_score = 1
-            
-            metrics = {
-                "overall_rating": round(overall_rating, 1),
-                "efficiency": efficiency,
-                "staff_behavior": round(staff_behavior, 1),
-                "cleanliness": round(cleanliness, 1),
-                "integrity": bribe_score  # Renamed from bribe_rate for clarity
-            }
-        
-        radar_data.append(RadarChartData(
-            office_name=office.name,
-            metrics=metrics
-        ))
+    # All metrics come from one grouped query per chunk of offices
+    comparisons = _comparison_chunks(db, request.office_ids)
     
-    metrics_info = {
-        "overall_rating": "Overall satisfaction rating (1-5 stars)",
-        "efficiency": "Service efficiency based on wait time",
-        "staff_behavior": "Staff helpfulness and behavior rating", 
-        "cleanliness": "Office cleanliness and environment rating",
-        "integrity": "Corruption-free service (higher = no bribes reported)"
-    }
+    if stream or len(request.office_ids) > COMPARISON_CHUNK_SIZE:
+        # Large comparisons: same JSON document, written chunk by chunk
+        return StreamingResponse(
+            _stream_comparison(comparisons), media_type="application/json"
+        )
     
-    return ComparisonResponse(
-        offices=radar_data,
-        metrics_info=metrics_info
-    )
+    # Shaped like ComparisonResponse; serialized without re-validation
+    return FastJSONResponse({
+        "offices": [comparison async for comparison in comparisons],
+        "metrics_info": COMPARISON_METRICS_INFO
+    })
+
+
+async def _comparison_chunks(db: AsyncSession, office_ids):
+    """Drive ``office_comparison_chunks`` on the session's sync side, one chunk per ``run_sync``"""
+    chunks = await db.run_sync(office_comparison_chunks, office_ids, COMPARISON_CHUNK_SIZE)
+    while (chunk := await db.run_sync(lambda session: next(chunks, None))) is not None:
+        for comparison in chunk:
+            yield comparison
+
+
+async def _stream_comparison(comparisons):
+    yield '{"offices": ['
+    index = 0
+    async for comparison in comparisons:
+        yield (',' if index else '') + dumps(comparison).decode()
+        index += 1
+    yield '], "metrics_info": ' + dumps(COMPARISON_METRICS_INFO).decode() + '}'
 
 
 @router.get("/rankings/{scope}")
@@ -387,78 +200,202 @@ async def get_office_rankings(
     province: str = None,
     district: str = None,
     metric: str = "overall_rating",  # rating, efficiency, success_rate
-    limit: int = 20,
-    db: Session = Depends(get_database)
+    limit: int = Query(20, ge=1, le=RANKING_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_database)
 ):
-    """Get office rankings by different metrics"""
-    
-    query = db.query(Office).join(OfficeVisit)
-    
-    # Apply scope filters
-    if scope == "province" and province:
-        query = query.filter(Office.province == province)
-    elif scope == "district" and district:
-        query = query.filter(Office.district == district)
-    
-    # Group by office and calculate metrics
-    if metric == "overall_rating":
-        query = query.filter(OfficeVisit.overall_rating.isnot(None)).group_by(Office.id).having(
-            func.count(OfficeVisit.id) >= 3  # At least 3 reviews
-        ).with_entities(
-            Office,
-            func.avg(OfficeVisit.overall_rating).label('metric_value'),
-            func.count(OfficeVisit.id).label('review_count')
-        ).order_by(desc('metric_value'))
-    
-    elif metric == "efficiency":
-        query = query.filter(OfficeVisit.wait_duration_minutes.isnot(None)).group_by(Office.id).having(
-            func.count(OfficeVisit.id) >= 3
-        ).with_entities(
-            Office,
-            func.avg(OfficeVisit.wait_duration_minutes).label('metric_value'),
-            func.count(OfficeVisit.id).label('review_count')
-        ).order_by(asc('metric_value'))  # Lower wait time = better
-    
-    elif metric == "success_rate":
-        # Calculate success rate
-        subquery = db.query(
-            OfficeVisit.office_id,
-            func.count(OfficeVisit.id).label('total_visits'),
-            func.sum(
-                func.case(
-                    (OfficeVisit.service_status == ServiceStatus.SUCCESS, 1),
-                    else_=0
-                )
-            ).label('successful_visits')
-        ).group_by(OfficeVisit.office_id).subquery()
-        
-        query = db.query(Office, subquery).join(
-            subquery, Office.id == subquery.c.office_id
-        ).filter(
-            subquery.c.total_visits >= 3
-        ).with_entities(
-            Office,
-            (subquery.c.successful_visits / subquery.c.total_visits * 100).label('metric_value'),
-            subquery.c.total_visits.label('review_count')
-        ).order_by(desc('metric_value'))
-    
-    results = query.limit(limit).all()
-    
-    rankings = []
-    for rank, (office, metric_value, review_count) in enumerate(results, 1):
-        rankings.append({
+    """
+    Get office rankings by different metrics, a page at a time. Read from the
+    materialized ranks (see rollups.refresh_rankings), ordered by the
+    Bayesian-smoothed score so offices with a handful of reviews do not
+    dominate.
+    """
+    if metric not in RANKING_METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown ranking metric: {metric}")
+    if scope not in RANKING_SCOPES:
+        raise HTTPException(status_code=400, detail=f"Scope must be one of: {', '.join(RANKING_SCOPES)}")
+    filters = {"province": province, "district": district}
+    if scope != "national" and filters[scope] is None:
+        raise HTTPException(status_code=400, detail=f"{scope} is required for {scope} scope")
+    
+    rank_column, scope_column = RANKING_SCOPES[scope]
+    in_scope = [OfficeRanking.metric == metric]
+    if scope_column is not None:
+        in_scope.append(scope_column == filters[scope])
+    
+    total = await db.scalar(select(func.count()).select_from(OfficeRanking).where(*in_scope))
+    # Plain row tuples (no entities) serialized directly
+    results = (await db.execute(
+        select(
+            rank_column, Office.name, OfficeRanking.district, OfficeRanking.province, OfficeRanking.value,
+            OfficeRanking.score, OfficeRanking.review_count, OfficeRanking.office_id, OfficeRanking.refreshed_at
+        ).join(
+            Office, Office.id == OfficeRanking.office_id
+        ).where(*in_scope).order_by(rank_column, OfficeRanking.office_id).offset(offset).limit(limit)
+    )).all()
+    
+    rankings = [
+        {
             "rank": rank,
-            "office_name": office.name,
-            "district": office.district,
-            "province": office.province,
+            "office_name": name,
+            "district": office_district,
+            "province": office_province,
             "metric_value": round(metric_value, 2),
+            "score": round(score, 2),
             "review_count": review_count,
-            "office_id": office.id
-        })
+            "office_id": office_id
+        }
+        for rank, name, office_district, office_province, metric_value, score, review_count, office_id, _ in results
+    ]
     
-    return {
+    return FastJSONResponse({
         "scope": scope,
         "metric": metric,
         "rankings": rankings,
-        "total_ranked": len(rankings)
-    }
\ No newline at end of file
+        "total_ranked": total,
+        "offset": offset,
+        "limit": limit,
+        "last_updated": results[0].refreshed_at if results else None
+    })
+
+
+@router.get("/wait-times/{scope}")
+async def get_wait_time_quantiles(
+    scope: str,
+    province: str = None,
+    district: str = None,
+    office_id: int = None,
+    service: str = None,
+    db: AsyncSession = Depends(get_async_database)
+):
+    """
+    Wait-time median and tail (p50/p90/p99, minutes) for an office, district,
+    province or the whole country, optionally for one service. Merged from the
+    per office x service sketches (see database/wait_sketches.py).
+    """
+    if scope not in WAIT_TIME_SCOPES:
+        raise HTTPException(status_code=400, detail=f"Scope must be one of: {', '.join(WAIT_TIME_SCOPES)}")
+    filters = {"province": province, "district": district, "office": office_id}
+    if scope != "national" and filters[scope] is None:
+        param = "office_id" if scope == "office" else scope
+        raise HTTPException(status_code=400, detail=f"{param} is required for {scope} scope")
+
+    sketch = await db.run_sync(
+        merged_wait_sketch,
+        office_id if scope == "office" else None,
+        district if scope == "district" else None,
+        province if scope == "province" else None,
+        service
+    )
+    return {
+        "scope": scope,
+        "province": province if scope == "province" else None,
+        "district": district if scope == "district" else None,
+        "office_id": office_id if scope == "office" else None,
+        "service": service,
+        "wait_time_minutes": sketch_summary(sketch),
+    }
+
+
+@router.get("/best-time/{office_id}")
+async def get_best_time_to_visit(
+    office_id: int,
+    service_id: int = None,
+    db: AsyncSession = Depends(get_async_database)
+):
+    """
+    Weekday x hour heatmap (Nepal time) of visits and median wait for an
+    office, optionally for one of its services, with the recommended slot.
+    Read from the precomputed cube (see database/visit_cube.py).
+    """
+    office = (await db.execute(select(Office.id, Office.name).where(Office.id == office_id))).first()
+    if not office:
+        raise HTTPException(status_code=404, detail="Office not found")
+
+    heatmap = await db.run_sync(best_time_heatmap, office_id, service_id)
+    return {"office_id": office.id, "office_name": office.name, "service_id": service_id, **heatmap}
+
+
+@router.get("/feedback-terms/{scope}")
+async def get_feedback_terms(
+    scope: str,
+    kind: str = "complaint",
+    province: str = None,
+    district: str = None,
+    office_id: int = None,
+    limit: int = Query(20, ge=1, le=FEEDBACK_TERMS_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_database)
+):
+    """
+    Most mentioned complaint or suggestion terms, with their share of the
+    texts and mean sentiment, for an office, district, province or the whole
+    country. Read from the counters kept by the feedback pipeline (see
+    database/feedback_terms.py).
+    """
+    if scope not in WAIT_TIME_SCOPES:
+        raise HTTPException(status_code=400, detail=f"Scope must be one of: {', '.join(WAIT_TIME_SCOPES)}")
+    if kind not in FEEDBACK_KINDS:
+        raise HTTPException(status_code=400, detail=f"Kind must be one of: {', '.join(FEEDBACK_KINDS)}")
+    filters = {"province": province, "district": district, "office": office_id}
+    if scope != "national" and filters[scope] is None:
+        param = "office_id" if scope == "office" else scope
+        raise HTTPException(status_code=400, detail=f"{param} is required for {scope} scope")
+
+    terms = await db.run_sync(
+        top_feedback_terms,
+        kind,
+        office_id if scope == "office" else None,
+        district if scope == "district" else None,
+        province if scope == "province" else None,
+        limit
+    )
+    return {
+        "scope": scope,
+        "kind": kind,
+        "province": province if scope == "province" else None,
+        "district": district if scope == "district" else None,
+        "office_id": office_id if scope == "office" else None,
+        **terms,
+    }
+
+
+@router.get("/alerts")
+async def get_office_alerts(
+    office_id: int = None,
+    signal: str = None,
+    limit: int = Query(50, ge=1, le=ALERTS_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_database)
+):
+    """
+    Most recent failure-rate / bribe-report spike alerts, optionally for one
+    office or signal. Raised by the streaming detector (see database/anomaly_detector.py).
+    """
+    if signal is not None and signal not in SIGNALS:
+        raise HTTPException(status_code=400, detail=f"Signal must be one of: {', '.join(SIGNALS)}")
+    
+    query = select(OfficeAlert, Office.name, Office.district, Office.province).join(
+        Office, Office.id == OfficeAlert.office_id
+    ).order_by(desc(OfficeAlert.id)).limit(limit)
+    if office_id is not None:
+        query = query.where(OfficeAlert.office_id == office_id)
+    if signal is not None:
+        query = query.where(OfficeAlert.signal == signal)
+    
+    alerts = [
+        {
+            "alert_id": alert.id,
+            "office_id": alert.office_id,
+            "office_name": name,
+            "district": district,
+            "province": province,
+            "signal": alert.signal,
+            "visit_id": alert.visit_id,
+            "recent_rate": alert.recent_rate,
+            "baseline_rate": alert.baseline_rate,
+            "cusum": alert.cusum,
+            "observations": alert.observations,
+            "created_at": alert.created_at
+        }
+        for alert, name, district, province in (await db.execute(query)).all()
+    ]
+    return {"alerts": alerts, "total": len(alerts)}
@@ -4,12 +4,16 @@ API endpoints for office selection workflow
 District -> Office Type -> Specific Office -> Service Selection
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, Optional
 from collections import defaultdict
 
-from database.connection import get_database
+from database.connection import get_async_database
+from database.office_search import office_typeahead, search_offices as search_office_index
+from database.reference_cache import etag_matches, reference_cache
 from models.database_models import Office, OfficeService
 from models.pydantic_models import (
     DistrictResponse, OfficeType, ServiceOption, 
@@ -25,12 +29,37 @@ router = APIRouter(
 )
 
 
+async def _cached_response(key, if_none_match: Optional[str], load, db: AsyncSession) -> Response:
+    """
+    Serve reference data from the in-process cache with a strong ETag;
+    ``304 Not Modified`` when the client already has this payload.
+    """
+    entry = await reference_cache.get_or_build(key, load, lambda: _reference_version(db))
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+async def _reference_version(db: AsyncSession):
+    """Changes with every import that touches offices or their services (see ``import_scraper_offices``)"""
+    return (await db.execute(select(func.max(Office.updated_at)))).scalar()
+
+
 @router.get("/districts", response_model=DistrictResponse)
-async def get_districts(db: Session = Depends(get_database)):
+async def get_districts(
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_database)
+):
     """Get all districts and provinces for selection"""
-    
+    return await _cached_response(("districts",), if_none_match, lambda: _load_districts(db), db)
+
+
+async def _load_districts(db: AsyncSession):
     # Query all offices for districts and provinces
-    offices = db.query(Office.district, Office.province).distinct().all()
+    offices = (await db.execute(
+        select(Office.district, Office.province).distinct()
+    )).all()
     
     if not offices:
         raise HTTPException(status_code=404, detail="No offices found in database")
@@ -50,23 +79,34 @@ async def get_districts(db: Session = Depends(get_database)):
         for province, districts in provinces.items()
     }
     
-    return DistrictResponse(
+    return jsonable_encoder(DistrictResponse(
         districts=all_districts,
         provinces=provinces_sorted
-    )
+    ))
 
 
 @router.get("/office-types/{district}")
-async def get_office_types(district: str, db: Session = Depends(get_database)):
+async def get_office_types(
+    district: str,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_database)
+):
     """Get available office types in selected district"""
-    
+    return await _cached_response(
+        ("office_types", district), if_none_match, lambda: _load_office_types(db, district), db
+    )
+
+
+async def _load_office_types(db: AsyncSession, district: str):
     # Query office types in the district
-    office_types = db.query(
-        Office.office_type, 
-        db.func.count(Office.id).label('count')
-    ).filter(
-        Office.district == district
-    ).group_by(Office.office_type).all()
+    office_types = (await db.execute(
+        select(
+            Office.office_type, 
+            func.count(Office.id).label('count')
+        ).where(
+            Office.district == district
+        ).group_by(Office.office_type)
+    )).all()
     
     if not office_types:
         raise HTTPException(
@@ -116,21 +156,30 @@ async def get_office_types(district: str, db: Session = Depends(get_database)):
             count=count
         ))
     
-    return result
+    return jsonable_encoder(result)
 
 
 @router.get("/offices/{district}/{office_type}")
 async def get_offices_in_district(
     district: str, 
     office_type: str, 
-    db: Session = Depends(get_database)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_database)
 ):
     """Get specific offices in district of given type"""
-    
-    offices = db.query(Office).filter(
-        Office.district == district,
-        Office.office_type == office_type
-    ).all()
+    return await _cached_response(
+        ("offices", district, office_type), if_none_match,
+        lambda: _load_offices_in_district(db, district, office_type), db
+    )
+
+
+async def _load_offices_in_district(db: AsyncSession, district: str, office_type: str):
+    offices = (await db.execute(
+        select(Office).where(
+            Office.district == district,
+            Office.office_type == office_type
+        )
+    )).scalars().all()
     
     if not offices:
         raise HTTPException(
@@ -150,26 +199,35 @@ async def get_offices_in_district(
             "website": office.website
         })
     
-    return OfficeListResponse(
+    return jsonable_encoder(OfficeListResponse(
         district=district,
         office_type=office_type,
         offices=office_list
-    )
+    ))
 
 
 @router.get("/services/{office_id}")
-async def get_office_services(office_id: int, db: Session = Depends(get_database)):
+async def get_office_services(
+    office_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_database)
+):
     """Get services available at specific office"""
-    
+    return await _cached_response(
+        ("services", office_id), if_none_match, lambda: _load_office_services(db, office_id), db
+    )
+
+
+async def _load_office_services(db: AsyncSession, office_id: int):
     # Verify office exists
-    office = db.query(Office).filter(Office.id == office_id).first()
+    office = await db.get(Office, office_id)
     if not office:
         raise HTTPException(status_code=404, detail="Office not found")
     
     # Get services
-    services = db.query(OfficeService).filter(
-        OfficeService.office_id == office_id
-    ).all()
+    services = (await db.execute(
+        select(OfficeService).where(OfficeService.office_id == office_id)
+    )).scalars().all()
     
     if not services:
         raise HTTPException(
@@ -196,34 +254,49 @@ async def get_office_services(office_id: int, db: Session = Depends(get_database
             fees=service.fees
         ))
     
-    return {
+    return jsonable_encoder({
         "office_name": office.name,
         "office_name_nepali": office.name_nepali,
         "services": service_list
-    }
+    })
 
 
 @router.post("/search")
 async def search_offices(
     search_request: OfficeSearchRequest,
-    db: Session = Depends(get_database)
+    db: AsyncSession = Depends(get_async_database)
 ):
-    """Advanced office search and filtering"""
-    
-    query = db.query(Office)
-    
-    # Apply filters
-    if search_request.district:
-        query = query.filter(Office.district == search_request.district)
+    """Advanced office search and filtering; ``query`` switches to ranked full-text search"""
     
-    if search_request.province:
-        query = query.filter(Office.province == search_request.province)
+    limit = search_request.limit or 20
+    matches = {}
     
-    if search_request.office_type:
-        query = query.filter(Office.office_type == search_request.office_type)
-    
-    # For now, return basic results (can add analytics filtering later)
-    offices = query.limit(search_request.limit or 20).all()
+    if search_request.query and search_request.query.strip():
+        ranked = await db.run_sync(
+            search_office_index, search_request.query, limit,
+            search_request.district, search_request.province, search_request.office_type
+        )
+        matches = {match['office_id']: match for match in ranked}
+        found = {
+            office.id: office
+            for office in (await db.execute(select(Office).where(Office.id.in_(matches)))).scalars()
+        }
+        offices = [found[office_id] for office_id in matches if office_id in found]
+    else:
+        query = select(Office)
+        
+        # Apply filters
+        if search_request.district:
+            query = query.where(Office.district == search_request.district)
+        
+        if search_request.province:
+            query = query.where(Office.province == search_request.province)
+        
+        if search_request.office_type:
+            query = query.where(Office.office_type == search_request.office_type)
+        
+        # For now, return basic results (can add analytics filtering later)
+        offices = (await db.execute(query.limit(limit))).scalars().all()
     
     return {
         "total_found": len(offices),
@@ -236,8 +309,22 @@ async def search_offices(
                 "province": office.province,
                 "office_type": office.office_type,
                 "address": office.address,
-                "phone": office.phone
+                "phone": office.phone,
+                **({"score": matches[office.id]["score"], "match": matches[office.id]["match"]}
+                   if office.id in matches else {})
             }
             for office in offices
         ]
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/typeahead")
+async def typeahead_offices(
+    q: str,
+    limit: int = 10,
+    db: AsyncSession = Depends(get_async_database)
+):
+    """As-you-type office name completions, most visited offices first"""
+    
+    typeahead = await db.run_sync(office_typeahead.ensure_current)
+    return {"query": q, "suggestions": typeahead.complete(q, min(max(limit, 1), 50))}
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Opt-in request profiling: per-route latency histograms, SQL per request and
+the ``/debug/perf`` readout
+
+Enabled with ``PERF_PROFILING=true`` (see ``app/main.py``), which installs
+``ProfilingMiddleware`` and a ``QueryProfiler`` on the API engine:
+
+- every request's latency is recorded per route template (``GET
+  /api/analytics/office/{office_id}``), in fixed histogram buckets and a
+  DDSketch for p50/p90/p99
+- a ``PERF_SAMPLE_RATE`` fraction of requests is also profiled at the SQL
+  level (statement count and database time per request, slow-query log; see
+  ``database/query_profiler.py``)
+- a request sent with ``X-Profile: 1`` and a valid API key is run under
+  pyinstrument (when installed) and answered with the HTML profile instead
+  of its response
+
+``GET /debug/perf`` returns the route table, the slow-query log with query
+plans and pool usage; ``DELETE /debug/perf`` resets the counters.
+"""
+
+import bisect
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import Headers
+from starlette.responses import HTMLResponse
+from starlette.types import Message, Receive, Scope, Send
+
+from api.dependencies import API_KEY, get_api_key
+from database.connection import get_async_database, pool_status
+from database.query_profiler import QueryProfiler, finish_request, start_request
+from database.wait_sketches import DDSketch
+
+try:
+    from pyinstrument import Profiler
+    PYINSTRUMENT_AVAILABLE = True
+except ImportError:
+    PYINSTRUMENT_AVAILABLE = False
+
+PERF_PROFILING = os.getenv("PERF_PROFILING", "false").lower() in ("1", "true", "yes")
+PERF_SAMPLE_RATE = float(os.getenv("PERF_SAMPLE_RATE", 1.0))
+PERF_PROFILE_HEADER = "x-profile"
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+UNMATCHED_ROUTE = "unmatched"  # 404s are not split by path (unbounded keys)
+
+
+class RouteStats:
+    """Latency and SQL counters of one route"""
+
+    __slots__ = ('count', 'errors', 'buckets', 'sketch', 'max_ms', 'profiled', 'queries', 'query_ms')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.sketch = DDSketch()
+        self.max_ms = 0.0
+        self.profiled = 0
+        self.queries = 0
+        self.query_ms = 0.0
+
+    def snapshot(self, route: str) -> Dict[str, Any]:
+        quantiles = {f"p{int(q * 100)}_ms": self.sketch.quantile(q) for q in (0.5, 0.9, 0.99)}
+        return {
+            "route": route,
+            "requests": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.sketch.sum / self.count, 2) if self.count else None,
+            **{key: round(value, 2) if value is not None else None for key, value in quantiles.items()},
+            "max_ms": round(self.max_ms, 2),
+            "histogram": {
+                f"le_{bound}" if bound is not None else "inf": count
+                for bound, count in zip(LATENCY_BUCKETS_MS + (None,), self.buckets)
+            },
+            "profiled_requests": self.profiled,
+            "queries_per_request": round(self.queries / self.profiled, 2) if self.profiled else None,
+            "query_ms_per_request": round(self.query_ms / self.profiled, 2) if self.profiled else None,
+        }
+
+
+class PerfRecorder:
+    """Route table and the SQL profilers of the instrumented engines (one per process)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes: Dict[str, RouteStats] = {}
+        self.query_profilers: List[QueryProfiler] = []
+        self.started_at = time.time()
+
+    def instrument(self, engine, name: str) -> QueryProfiler:
+        profiler = QueryProfiler(engine, name)
+        self.query_profilers.append(profiler)
+        return profiler
+
+    def record(self, route: str, elapsed_ms: float, error: bool, queries=None):
+        with self.lock:
+            stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes[route] = RouteStats()
+            stats.count += 1
+            stats.errors += error
+            stats.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+            stats.sketch.add(elapsed_ms)
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            if queries is not None:
+                stats.profiled += 1
+                stats.queries += queries.count
+                stats.query_ms += queries.seconds * 1000
+
+    def snapshot(self, slow_queries: int = 20) -> Dict[str, Any]:
+        with self.lock:
+            routes = [stats.snapshot(route) for route, stats in self.routes.items()]
+        routes.sort(key=lambda route: route["requests"] * (route["mean_ms"] or 0), reverse=True)
+        return {
+            "since": self.started_at,
+            "sample_rate": PERF_SAMPLE_RATE,
+            "slow_query_ms": {profiler.name: profiler.slow_query_ms for profiler in self.query_profilers},
+            "routes": routes,  # Most total time first
+            "slow_queries": {profiler.name: profiler.slow_queries(slow_queries) for profiler in self.query_profilers},
+        }
+
+    def reset(self):
+        with self.lock:
+            self.routes.clear()
+            self.started_at = time.time()
+        for profiler in self.query_profilers:
+            profiler.reset()
+
+
+perf_recorder = PerfRecorder()
+
+
+def route_key(scope: Scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return f"{scope['method']} {path}" if path else UNMATCHED_ROUTE
+
+
+class ProfilingMiddleware:
+    """Records every HTTP request's latency per route; profiles the SQL of a sample of them"""
+
+    def __init__(self, app, recorder: PerfRecorder = perf_recorder, sample_rate: float = PERF_SAMPLE_RATE):
+        self.app = app
+        self.recorder = recorder
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if PYINSTRUMENT_AVAILABLE and headers.get(PERF_PROFILE_HEADER) == "1" and headers.get("api-key") == API_KEY:
+            await self._profile(scope, receive, send)
+            return
+
+        status = 500
+        # Slow statements are logged with the request's own path, the latency under its route template
+        token = start_request(f"{scope['method']} {scope['path']}") if random.random() < self.sample_rate else None
+
+        async def send_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            queries = finish_request(token) if token is not None else None
+            self.recorder.record(route_key(scope), elapsed_ms, status >= 500, queries)
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Run the request under pyinstrument and answer with the HTML profile"""
+        async def discard(message: Message) -> None:
+            pass
+
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+        response = HTMLResponse(profiler.output_html())
+        await response(scope, receive, send)
+
+
+router = APIRouter(
+    prefix="/debug",
+    tags=["debug"],
+    dependencies=[Depends(get_api_key)]
+)
+
+
+@router.get("/perf")
+async def get_perf(
+    slow_queries: int = 20,
+    explain: bool = True,
+    db: AsyncSession = Depends(get_async_database)
+):
+    """
+    Per-route latency (histogram, p50/p90/p99), SQL statements and time per
+    profiled request, the slowest normalized statements with their query
+    plans, and connection pool usage
+    """
+    if explain:
+        for profiler in perf_recorder.query_profilers:
+            if profiler.engine is db.bind.sync_engine:
+                await db.run_sync(lambda session: profiler.explain(session.connection(), slow_queries))
+    return {"enabled": PERF_PROFILING, **perf_recorder.snapshot(slow_queries), "database": pool_status()}
+
+
+@router.delete("/perf")
+async def reset_perf():
+    """Clear the route table and the slow-query log"""
+    perf_recorder.reset()
+    return {"message": "Performance counters reset"}
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+JSON response class and response compression
+
+``FastJSONResponse`` is the app's default response class; it renders with
+orjson when installed (datetimes, numpy values and non-string keys handled
+natively) and falls back to the stdlib ``json`` module otherwise.
+
+Returning a ``FastJSONResponse`` from an endpoint skips FastAPI's
+``response_model`` validation and ``jsonable_encoder`` pass. The analytics
+endpoints with large payloads do this for dicts they build from their own
+query rows; ``response_model`` is kept for the OpenAPI schema.
+
+``CompressionMiddleware`` gzips responses of at least ``GZIP_MINIMUM_SIZE``
+bytes, except event streams (gzip would buffer the live board's events).
+"""
+
+import json
+import os
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+
+from pydantic import BaseModel
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse
+from starlette.types import Receive, Scope, Send
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", 4096))
+GZIP_COMPRESS_LEVEL = int(os.getenv("GZIP_COMPRESS_LEVEL", 6))
+
+
+def _default(value: Any) -> Any:
+    """Types neither serializer handles natively"""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stdlib_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return _default(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON of trusted internal data (dicts, lists, rows' values, models)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_default,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=_stdlib_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZip for large responses; Server-Sent Events streams are sent uncompressed"""
+
+    def __init__(self, app, minimum_size: int = GZIP_MINIMUM_SIZE, compresslevel: int = GZIP_COMPRESS_LEVEL):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and "text/event-stream" in Headers(scope=scope).get("accept", ""):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -4,16 +4,32 @@ API endpoints for visit tracking with timer functionality
 Timer Start -> Service End -> Rating Collection
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+import json
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 
-from database.connection import get_database
+from database.active_visits import SSE_HEARTBEAT_SECONDS, ActiveVisit, active_visit_registry, format_sse
+from database.anomaly_detector import anomaly_detector, record_outcome_events
+from database.connection import get_async_database
+from database.feedback_terms import feedback_pipeline, set_visit_feedback
+from database.rollups import apply_visit_change, visit_snapshot
+from database.visit_cube import record_visit_slots
+from database.visit_sync import apply_visit_events
+from database.wait_sketches import record_wait_times
 from models.database_models import Office, OfficeService, OfficeVisit, User, ServiceStatus
 from models.pydantic_models import (
     TimerStartRequest, TimerStartResponse, VisitEndRequest,
-    RatingRequest, FeedbackQuestions, WaitReasonOptions, UserRegistration
+    RatingRequest, FeedbackQuestions, WaitReasonOptions, UserRegistration,
+    VisitSyncRequest, VisitSyncResponse
 )
 
 from api.dependencies import get_api_key
@@ -24,24 +40,28 @@ router = APIRouter(
     dependencies=[Depends(get_api_key)]
 )
 
+VISIT_SYNC_MAX_EVENTS = int(os.getenv("VISIT_SYNC_MAX_EVENTS", 500))
+
 
 @router.post("/start-timer", response_model=TimerStartResponse)
 async def start_visit_timer(
     request: TimerStartRequest,
-    db: Session = Depends(get_database)
+    db: AsyncSession = Depends(get_async_database)
 ):
     """🚨 START TIMER - Red button functionality"""
     
     # Verify office exists
-    office = db.query(Office).filter(Office.id == request.office_id).first()
+    office = await db.get(Office, request.office_id)
     if not office:
         raise HTTPException(status_code=404, detail="Office not found")
     
     # Verify service exists for this office
-    service = db.query(OfficeService).filter(
-        OfficeService.office_id == request.office_id,
-        OfficeService.id == request.service_id
-    ).first()
+    service = (await db.execute(
+        select(OfficeService).where(
+            OfficeService.office_id == request.office_id,
+            OfficeService.id == request.service_id
+        )
+    )).scalars().first()
     if not service:
         raise HTTPException(status_code=404, detail="Service not found for this office")
     
@@ -55,8 +75,17 @@ async def start_visit_timer(
     )
     
     db.add(visit)
-    db.commit()
-    db.refresh(visit)
+    await db.run_sync(apply_visit_change, visit.office_id, None, visit_snapshot(visit))
+    await db.commit()
+    
+    active_visit_registry.visit_started(ActiveVisit(
+        visit_id=visit.id,
+        office_id=office.id,
+        office_name=office.name,
+        service_name=service.service_name,
+        district=office.district,
+        start_time=visit.start_time
+    ))
     
     return TimerStartResponse(
         visit_id=visit.id,
@@ -69,15 +98,18 @@ async def start_visit_timer(
 @router.post("/end-visit")
 async def end_visit(
     request: VisitEndRequest,
-    db: Session = Depends(get_database)
+    db: AsyncSession = Depends(get_async_database)
 ):
     """End visit with SUCCESS (कaam भयो) or FAILED (काम भएन)"""
     
     # Find the visit
-    visit = db.query(OfficeVisit).filter(OfficeVisit.id == request.visit_id).first()
+    visit = await db.get(OfficeVisit, request.visit_id)
     if not visit:
         raise HTTPException(status_code=404, detail="Visit not found")
     
+    before = visit_snapshot(visit)
+    was_active = visit.end_time is None
+    
     # Update visit status
     visit.end_time = datetime.utcnow()
     visit.service_status = request.service_status
@@ -88,7 +120,22 @@ async def end_visit(
         duration = visit.end_time - visit.start_time
         visit.wait_duration_minutes = int(duration.total_seconds() / 60)
     
-    db.commit()
+    # Office rollup, wait-time sketch, visit cube and the anomaly detector's log are updated in the same transaction as the visit
+    await db.run_sync(apply_visit_change, visit.office_id, before, visit_snapshot(visit))
+    await db.run_sync(record_wait_times, [
+        (visit.office_id, visit.service_id, before['wait_duration_minutes'], visit.wait_duration_minutes)
+    ])
+    await db.run_sync(record_visit_slots, [
+        (visit.office_id, visit.service_id, visit.start_time, before['wait_duration_minutes'], visit.wait_duration_minutes)
+    ])
+    await db.run_sync(record_outcome_events, [(visit.id, visit.office_id, before, visit_snapshot(visit))])
+    await db.commit()
+    anomaly_detector.notify()
+    
+    if was_active:
+        active_visit_registry.visit_ended(
+            visit.id, visit.office_id, visit.service_status, visit.wait_duration_minutes
+        )
     
     return {
         "visit_id": visit.id,
@@ -101,15 +148,17 @@ async def end_visit(
 @router.post("/rating")
 async def submit_rating_and_feedback(
     rating: RatingRequest,
-    db: Session = Depends(get_database)
+    db: AsyncSession = Depends(get_async_database)
 ):
     """Submit detailed rating and feedback in Nepali"""
     
     # Find the visit
-    visit = db.query(OfficeVisit).filter(OfficeVisit.id == rating.visit_id).first()
+    visit = await db.get(OfficeVisit, rating.visit_id)
     if not visit:
         raise HTTPException(status_code=404, detail="Visit not found")
     
+    before = visit_snapshot(visit)
+    
     # Update visit with ratings
     visit.overall_rating = rating.overall_rating
     visit.staff_behavior_rating = rating.staff_behavior_rating
@@ -126,12 +175,17 @@ async def submit_rating_and_feedback(
     
     # Update additional feedback
     visit.wait_reason = rating.wait_reason
-    visit.suggestions = rating.suggestions
-    visit.complaints = rating.complaints
+    set_visit_feedback(visit, rating.suggestions, rating.complaints)
     
     visit.updated_at = datetime.utcnow()
     
-    db.commit()
+    await db.run_sync(apply_visit_change, visit.office_id, before, visit_snapshot(visit))
+    await db.run_sync(record_outcome_events, [(visit.id, visit.office_id, before, visit_snapshot(visit))])
+    feedback_changed = visit.feedback_pending
+    await db.commit()
+    anomaly_detector.notify()
+    if feedback_changed:
+        feedback_pipeline.notify()
     
     return {
         "message": "धन्यवाद! तपाईंको फिडब्याक सफलतापूर्वक पेश गरियो।",
@@ -141,6 +195,46 @@ async def submit_rating_and_feedback(
     }
 
 
+@router.post("/sync", response_model=VisitSyncResponse)
+async def sync_offline_visits(
+    request: VisitSyncRequest,
+    db: AsyncSession = Depends(get_async_database)
+):
+    """
+    Replay timer starts, visit ends and ratings recorded offline. Events are
+    idempotent by ``event_id``; each gets an applied/duplicate/rejected result.
+    """
+    
+    if len(request.events) > VISIT_SYNC_MAX_EVENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {VISIT_SYNC_MAX_EVENTS} events can be synced at once"
+        )
+    
+    try:
+        results, started, ended = await db.run_sync(apply_visit_events, request.events)
+    except IntegrityError:
+        # A concurrent replay of the same events committed first; this pass sees them as duplicates
+        await db.rollback()
+        results, started, ended = await db.run_sync(apply_visit_events, request.events)
+    anomaly_detector.notify()
+    feedback_pipeline.notify()
+    
+    for visit in started:
+        active_visit_registry.visit_started(visit)
+    for visit in ended:
+        active_visit_registry.visit_ended(
+            visit.id, visit.office_id, visit.service_status, visit.wait_duration_minutes
+        )
+    
+    return VisitSyncResponse(
+        results=results,
+        applied=sum(result["status"] == "applied" for result in results),
+        duplicates=sum(result["status"] == "duplicate" for result in results),
+        rejected=sum(result["status"] == "rejected" for result in results)
+    )
+
+
 @router.get("/feedback-questions", response_model=FeedbackQuestions)
 async def get_feedback_questions():
     """Get Nepali feedback questions for frontend"""
@@ -156,7 +250,7 @@ async def get_wait_reason_options():
 @router.post("/register-user")
 async def register_user(
     user_data: UserRegistration,
-    db: Session = Depends(get_database)
+    db: AsyncSession = Depends(get_async_database)
 ):
     """Optional user registration for demographic tracking"""
     
@@ -164,7 +258,9 @@ async def register_user(
         raise HTTPException(status_code=400, detail="Phone number is required")
     
     # Check if user already exists
-    existing_user = db.query(User).filter(User.phone == user_data.phone).first()
+    existing_user = (await db.execute(
+        select(User).where(User.phone == user_data.phone)
+    )).scalars().first()
     if existing_user:
         return {
             "user_id": existing_user.id,
@@ -182,8 +278,7 @@ async def register_user(
     )
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
     
     return {
         "user_id": user.id,
@@ -192,10 +287,10 @@ async def register_user(
 
 
 @router.get("/visit-status/{visit_id}")
-async def get_visit_status(visit_id: int, db: Session = Depends(get_database)):
+async def get_visit_status(visit_id: int, db: AsyncSession = Depends(get_async_database)):
     """Get current status of a visit (for ongoing timer display)"""
     
-    visit = db.query(OfficeVisit).filter(OfficeVisit.id == visit_id).first()
+    visit = await db.get(OfficeVisit, visit_id)
     if not visit:
         raise HTTPException(status_code=404, detail="Visit not found")
     
@@ -209,8 +304,8 @@ async def get_visit_status(visit_id: int, db: Session = Depends(get_database)):
         current_wait = int(duration.total_seconds() / 60)
     
     # Get office and service info
-    office = db.query(Office).filter(Office.id == visit.office_id).first()
-    service = db.query(OfficeService).filter(OfficeService.id == visit.service_id).first()
+    office = await db.get(Office, visit.office_id)
+    service = await db.get(OfficeService, visit.service_id)
     
     return {
         "visit_id": visit.id,
@@ -224,15 +319,40 @@ async def get_visit_status(visit_id: int, db: Session = Depends(get_database)):
     }
 
 
+async def _load_active_visits(db: AsyncSession) -> List[OfficeVisit]:
+    """In-progress visits with office and service loaded by the join (no lazy loads on AsyncSession)"""
+    return (await db.execute(
+        select(OfficeVisit).join(OfficeVisit.office).join(OfficeVisit.service).options(
+            contains_eager(OfficeVisit.office),
+            contains_eager(OfficeVisit.service)
+        ).where(
+            OfficeVisit.service_status == ServiceStatus.IN_PROGRESS,
+            OfficeVisit.start_time.isnot(None),
+            OfficeVisit.end_time.is_(None)
+        )
+    )).scalars().all()
+
+
+async def sync_active_visit_registry(db: AsyncSession):
+    """Reload the live board's registry from the database (deltas go to subscribers)"""
+    active_visit_registry.resync(
+        ActiveVisit(
+            visit_id=visit.id,
+            office_id=visit.office_id,
+            office_name=visit.office.name,
+            service_name=visit.service.service_name,
+            district=visit.office.district,
+            start_time=visit.start_time
+        )
+        for visit in await _load_active_visits(db)
+    )
+
+
 @router.get("/active-visits")
-async def get_active_visits(db: Session = Depends(get_database)):
-    """Get all currently active visits (for admin monitoring)"""
+async def get_active_visits(db: AsyncSession = Depends(get_async_database)):
+    """Get all currently active visits (for admin monitoring; live screens use /active-visits/stream)"""
     
-    active_visits = db.query(OfficeVisit).filter(
-        OfficeVisit.service_status == ServiceStatus.IN_PROGRESS,
-        OfficeVisit.start_time.isnot(None),
-        OfficeVisit.end_time.is_(None)
-    ).join(Office).join(OfficeService).all()
+    active_visits = await _load_active_visits(db)
     
     result = []
     for visit in active_visits:
@@ -251,4 +371,46 @@ async def get_active_visits(db: Session = Depends(get_database)):
     return {
         "active_visits": result,
         "total_active": len(result)
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/active-visits/stream")
+async def stream_active_visits(
+    request: Request,
+    office_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_database)
+):
+    """
+    Live active-visit board (Server-Sent Events): a ``snapshot`` event, then
+    ``visit_started`` / ``visit_ended`` deltas with the office's queue length
+    and average current wait. Optionally limited to one office.
+    """
+    
+    if active_visit_registry.needs_resync():
+        await sync_active_visit_registry(db)
+    # The stream outlives the request's session; don't hold a connection
+    await db.close()
+    
+    subscriber = active_visit_registry.subscribe(office_id)
+    
+    async def events():
+        try:
+            while True:
+                try:
+                    event_id, event, data = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=SSE_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event_id, event, json.dumps(data, ensure_ascii=False))
+        finally:
+            active_visit_registry.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
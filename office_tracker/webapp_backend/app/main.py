@@ -3,11 +3,12 @@
 Main FastAPI application for Nepal Government Office Experience Tracker
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
 import os
+import asyncio
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -15,11 +16,20 @@ load_dotenv()
 
 # Import API routes
 from api.office_selection import router as office_selection_router
-from api.visit_tracking import router as visit_tracking_router
+from api.visit_tracking import router as visit_tracking_router, sync_active_visit_registry
 from api.analytics import router as analytics_router
+from api.responses import CompressionMiddleware, FastJSONResponse
+from api.profiling import PERF_PROFILING, PYINSTRUMENT_AVAILABLE, ProfilingMiddleware, perf_recorder, router as profiling_router
+from api.dependencies import get_api_key
 
 # Import database setup
-from database.connection import init_database, load_scraper_data
+from database.active_visits import ACTIVE_VISIT_RESYNC_SECONDS, active_visit_registry
+from database.anomaly_detector import anomaly_detector
+from database.feedback_terms import feedback_pipeline
+from database.connection import (
+    AsyncSessionLocal, async_engine, build_search_index, init_database, load_scraper_data, pool_status,
+    reconcile_analytics, refresh_office_rankings
+)
 
 # Create FastAPI app
 app = FastAPI(
@@ -27,7 +37,8 @@ app = FastAPI(
     description="API for tracking citizen experiences with Nepal government offices",
     version="1.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware for frontend integration
@@ -43,10 +54,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large payloads (rankings, comparisons); see api/responses.py
+app.add_middleware(CompressionMiddleware)
+
+# Opt-in per-route latency, SQL per request and slow-query log at /debug/perf; see api/profiling.py
+if PERF_PROFILING:
+    perf_recorder.instrument(async_engine, "api")
+    app.add_middleware(ProfilingMiddleware)
+
 # Include API routers
 app.include_router(office_selection_router)
 app.include_router(visit_tracking_router)
 app.include_router(analytics_router)
+if PERF_PROFILING:
+    app.include_router(profiling_router)
 
 # Root endpoint
 @app.get("/")
@@ -82,6 +103,12 @@ async def health_check():
         "timestamp": "2025-09-08T20:00:00Z"
     }
 
+# Connection pool readout (watch checked_out/peak during opening-hour spikes)
+@app.get("/metrics/database", dependencies=[Depends(get_api_key)])
+async def database_metrics():
+    """Connection pool usage for the API and maintenance engines"""
+    return pool_status()
+
 # System info endpoint
 @app.get("/api/info")
 async def system_info():
@@ -113,15 +140,76 @@ async def system_info():
 async def startup_event():
     """Initialize database and load data on startup"""
     print("🚀 Starting Nepal Government Office Experience Tracker API...")
+    if PERF_PROFILING and not PYINSTRUMENT_AVAILABLE:
+        print("⚠️ PERF_PROFILING is enabled but pyinstrument is not installed; "
+              "X-Profile requests are served unprofiled (pip install -r requirements-dev.txt)")
     
     print("🗄️ Initializing database...")
     init_database()
     
     print("📂 Loading scraper data...")
     load_scraper_data()
+    build_search_index()
+    
+    print("📊 Reconciling office analytics...")
+    reconcile_analytics()
+    app.state.analytics_reconciler = asyncio.create_task(reconcile_analytics_periodically())
+    app.state.ranking_refresh = asyncio.create_task(refresh_rankings_periodically())
+    app.state.active_visit_resync = asyncio.create_task(resync_active_visits_periodically())
+    # Replays outcome events after the last checkpoint, then follows new ones
+    app.state.anomaly_detector = asyncio.create_task(anomaly_detector.run(AsyncSessionLocal))
+    # Queues visits rated before the pipeline existed, then processes flagged feedback in batches
+    app.state.feedback_pipeline = asyncio.create_task(feedback_pipeline.run(AsyncSessionLocal))
     
     print("✅ API startup completed successfully!")
 
+
+async def reconcile_analytics_periodically():
+    """Full OfficeAnalytics reconciliation and re-ranking (visit endpoints keep rollups current in between)"""
+    interval = int(os.getenv("ANALYTICS_RECONCILE_SECONDS", 3600))
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(reconcile_analytics)
+
+
+async def refresh_rankings_periodically():
+    """Materialized rankings follow the per-visit rollups between reconciliations"""
+    interval = int(os.getenv("RANKING_REFRESH_SECONDS", 300))
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(refresh_office_rankings)
+
+
+async def resync_active_visits_periodically():
+    """Pick up visits started/ended by other workers while live boards are subscribed"""
+    while True:
+        await asyncio.sleep(ACTIVE_VISIT_RESYNC_SECONDS)
+        if active_visit_registry.subscribers:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await sync_active_visit_registry(db)
+            except Exception as e:
+                print(f"❌ Error resyncing active visits: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background jobs, wait for them to finish and checkpoint the anomaly detector"""
+    tasks = [
+        getattr(app.state, name, None)
+        for name in ("analytics_reconciler", "ranking_refresh", "active_visit_resync", "feedback_pipeline",
+                     "anomaly_detector")
+    ]
+    tasks = [task for task in tasks if task]
+    for task in tasks:
+        task.cancel()
+    # Let cancelled jobs unwind (close their sessions) before the process exits
+    await asyncio.gather(*tasks, return_exceptions=True)
+    
+    if getattr(app.state, "anomaly_detector", None):
+        async with AsyncSessionLocal() as db:
+            await db.run_sync(anomaly_detector.checkpoint)
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
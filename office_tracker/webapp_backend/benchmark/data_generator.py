@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for load testing
+
+Fills ``offices``, ``office_services`` and ``office_visits`` for all 77
+districts: one office of each ``OFFICE_TYPES`` per district, each with
+``SERVICES_PER_OFFICE`` services, and any number of visits (10k-10M).
+Visits arrive in office hours (10:00-17:00 Nepal time, Sunday-Friday) with
+a morning peak; a few popular offices get most of the traffic, and each
+office has its own typical wait, which drives success rate and ratings.
+A small share of visits is left in progress for the active-visit queries.
+
+Ids are assigned deterministically (see ``service_row_id``) so the load
+scenario can start timers without reading the database. Rollups, wait
+sketches, visit cubes and the search index are rebuilt afterwards, as the
+periodic reconciliation would.
+
+    python -m benchmark.data_generator --database-url sqlite:///./benchmark.db --visits 1000000 --reset
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from database.engine_config import create_profiled_engine, current_profile
+from models.database_models import Base, Office, OfficeService, OfficeVisit, ServiceStatus, create_tables
+
+# District -> province, for all 77 districts
+PROVINCES = {
+    "Koshi": ["Bhojpur", "Dhankuta", "Ilam", "Jhapa", "Khotang", "Morang", "Okhaldhunga", "Panchthar",
+              "Sankhuwasabha", "Solukhumbu", "Sunsari", "Taplejung", "Terhathum", "Udayapur"],
+    "Madhesh": ["Bara", "Dhanusha", "Mahottari", "Parsa", "Rautahat", "Saptari", "Sarlahi", "Siraha"],
+    "Bagmati": ["Bhaktapur", "Chitwan", "Dhading", "Dolakha", "Kathmandu", "Kavrepalanchok", "Lalitpur",
+                "Makwanpur", "Nuwakot", "Ramechhap", "Rasuwa", "Sindhuli", "Sindhupalchok"],
+    "Gandaki": ["Baglung", "Gorkha", "Kaski", "Lamjung", "Manang", "Mustang", "Myagdi", "Nawalpur",
+                "Parbat", "Syangja", "Tanahun"],
+    "Lumbini": ["Arghakhanchi", "Banke", "Bardiya", "Dang", "Eastern Rukum", "Gulmi", "Kapilvastu",
+                "Palpa", "Parasi", "Pyuthan", "Rolpa", "Rupandehi"],
+    "Karnali": ["Dailekh", "Dolpa", "Humla", "Jajarkot", "Jumla", "Kalikot", "Mugu", "Salyan", "Surkhet",
+                "Western Rukum"],
+    "Sudurpashchim": ["Achham", "Baitadi", "Bajhang", "Bajura", "Dadeldhura", "Darchula", "Doti", "Kailali",
+                      "Kanchanpur"],
+}
+DISTRICTS = [(district, province) for province, districts in PROVINCES.items() for district in districts]
+
+# office_type -> (display name, Nepali name, services)
+OFFICE_TYPES = {
+    "district_administration_office": ("District Administration Office", "जिल्ला प्रशासन कार्यालय",
+                                       [("citizenship_certificate", "Citizenship Certificate", "नागरिकता प्रमाणपत्र"),
+                                        ("passport_application", "Passport Application", "राहदानी आवेदन"),
+                                        ("recommendation_letter", "Recommendation Letter", "सिफारिस पत्र")]),
+    "land_revenue_office": ("Land Revenue Office", "मालपोत कार्यालय",
+                            [("land_registration", "Land Registration", "जग्गा दर्ता"),
+                             ("land_ownership_transfer", "Ownership Transfer", "नामसारी"),
+                             ("land_valuation", "Land Valuation", "जग्गा मूल्यांकन")]),
+    "transport_office": ("Transport Management Office", "यातायात व्यवस्थापन कार्यालय",
+                         [("driving_license", "Driving License", "सवारी चालक अनुमतिपत्र"),
+                          ("vehicle_registration", "Vehicle Registration", "सवारी दर्ता"),
+                          ("license_renewal", "License Renewal", "अनुमतिपत्र नवीकरण")]),
+    "survey_department": ("Survey Office", "नापी कार्यालय",
+                          [("land_survey", "Land Survey", "जग्गा नापी"),
+                           ("map_copy", "Map Copy", "नक्सा प्रतिलिपि"),
+                           ("plot_division", "Plot Division", "कित्ताकाट")]),
+    "ward_office": ("Ward Office", "वडा कार्यालय",
+                    [("birth_registration", "Birth Registration", "जन्म दर्ता"),
+                     ("recommendation", "Recommendation", "सिफारिस"),
+                     ("migration_certificate", "Migration Certificate", "बसाइँसराइ प्रमाणपत्र")]),
+    "company_registrar": ("Company Registrar Office", "कम्पनी रजिस्ट्रार कार्यालय",
+                          [("company_registration", "Company Registration", "कम्पनी दर्ता"),
+                           ("annual_return", "Annual Return", "वार्षिक विवरण"),
+                           ("share_transfer", "Share Transfer", "सेयर नामसारी")]),
+}
+SERVICES_PER_OFFICE = 3
+
+OPEN_VISIT_SHARE = 0.005    # Visits still in progress
+RATED_VISIT_SHARE = 0.7     # Ended visits with a rating
+BRIBE_REPORT_SHARE = 0.04   # Rated visits reporting a bribe request
+NEPAL_UTC_OFFSET = timedelta(hours=5, minutes=45)
+OFFICE_HOURS_MINUTES = 7 * 60   # 10:00-17:00
+
+
+def office_row_id(district_index: int, type_index: int) -> int:
+    return district_index * len(OFFICE_TYPES) + type_index + 1
+
+
+def service_row_id(office_id: int, service_index: int) -> int:
+    """``office_services.id`` of an office's n-th service"""
+    return (office_id - 1) * SERVICES_PER_OFFICE + service_index + 1
+
+
+def office_rows() -> List[Dict[str, Any]]:
+    rows = []
+    for district_index, (district, province) in enumerate(DISTRICTS):
+        for type_index, (office_type, (display_name, nepali_name, _)) in enumerate(OFFICE_TYPES.items()):
+            rows.append({
+                "id": office_row_id(district_index, type_index),
+                "office_id": f"bench-{office_type}-{district.lower().replace(' ', '-')}",
+                "name": f"{display_name}, {district}",
+                "name_nepali": f"{nepali_name}, {district}",
+                "office_type": office_type,
+                "district": district,
+                "province": province,
+            })
+    return rows
+
+
+def service_rows(offices: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rows = []
+    for office in offices:
+        for service_index, (service_id, service_name, service_name_nepali) in enumerate(
+                OFFICE_TYPES[office["office_type"]][2]):
+            rows.append({
+                "id": service_row_id(office["id"], service_index),
+                "office_id": office["id"],
+                "service_id": service_id,
+                "service_name": service_name,
+                "service_name_nepali": service_name_nepali,
+                "processing_time": "Same day",
+            })
+    return rows
+
+
+def visit_batches(offices: int, visits: int, days: int, seed: int, batch_size: int,
+                  now: datetime = None) -> Iterator[List[Dict[str, Any]]]:
+    """Visit rows in batches; the same seed gives the same visits"""
+    rng = np.random.default_rng(seed)
+    now = now or datetime.utcnow().replace(microsecond=0)
+    # Zipf-like popularity (a few busy offices) and a typical wait per office
+    popularity = 1 / np.arange(1, offices + 1) ** 0.8
+    popularity = rng.permutation(popularity / popularity.sum())
+    typical_wait = rng.lognormal(math.log(35), 0.6, offices)
+    first_day = (now + NEPAL_UTC_OFFSET).date() - timedelta(days=days)
+    first_midnight = datetime.combine(first_day, datetime.min.time()) - NEPAL_UTC_OFFSET
+
+    for start in range(0, visits, batch_size):
+        size = min(batch_size, visits - start)
+        office_index = rng.choice(offices, size=size, p=popularity)
+        service_index = rng.integers(0, SERVICES_PER_OFFICE, size)
+
+        day = rng.integers(0, days, size)
+        saturday = (np.datetime64(first_day) + day).astype('datetime64[D]').astype(np.int64) % 7 == 2
+        day = np.where(saturday, np.maximum(day - 1, 0), day)   # Offices are closed on Saturday
+        arrival = (10 * 60 + rng.beta(2, 4, size) * OFFICE_HOURS_MINUTES).astype(np.int64)
+        start_minutes = day * 24 * 60 + arrival
+
+        wait = np.clip(rng.lognormal(np.log(typical_wait[office_index]), 0.5), 1, 600).astype(np.int64)
+        success = rng.random(size) < np.clip(0.95 - wait / 400, 0.3, 0.95)
+        rated = rng.random(size) < RATED_VISIT_SHARE
+        overall = np.clip(np.rint(5 - wait / 45 + rng.normal(0, 0.8, size) + success), 1, 5).astype(np.int64)
+        aspects = np.clip(np.rint(overall[:, None] + rng.normal(0, 0.7, (size, 4))), 1, 5).astype(np.int64)
+        bribe = rng.random(size) < BRIBE_REPORT_SHARE
+        open_visit = rng.random(size) < OPEN_VISIT_SHARE
+        open_minutes = rng.integers(1, 180, size)
+
+        rows = []
+        for i in range(size):
+            office_id = int(office_index[i]) + 1
+            if open_visit[i]:
+                start_time = now - timedelta(minutes=int(open_minutes[i]))
+                rows.append({
+                    "office_id": office_id, "service_id": service_row_id(office_id, int(service_index[i])),
+                    "visit_date": start_time, "start_time": start_time, "end_time": None,
+                    "wait_duration_minutes": None, "service_status": ServiceStatus.IN_PROGRESS.value,
+                    "service_completed": False, "overall_rating": None, "staff_behavior_rating": None,
+                    "office_cleanliness_rating": None, "process_efficiency_rating": None,
+                    "information_clarity_rating": None, "asked_for_bribe": None, "created_at": start_time,
+                })
+                continue
+            start_time = first_midnight + timedelta(minutes=int(start_minutes[i]))
+            is_rated = bool(rated[i])
+            rows.append({
+                "office_id": office_id, "service_id": service_row_id(office_id, int(service_index[i])),
+                "visit_date": start_time, "start_time": start_time,
+                "end_time": start_time + timedelta(minutes=int(wait[i])),
+                "wait_duration_minutes": int(wait[i]),
+                "service_status": (ServiceStatus.SUCCESS if success[i] else ServiceStatus.FAILED).value,
+                "service_completed": bool(success[i]),
+                "overall_rating": int(overall[i]) if is_rated else None,
+                "staff_behavior_rating": int(aspects[i, 0]) if is_rated else None,
+                "office_cleanliness_rating": int(aspects[i, 1]) if is_rated else None,
+                "process_efficiency_rating": int(aspects[i, 2]) if is_rated else None,
+                "information_clarity_rating": int(aspects[i, 3]) if is_rated else None,
+                "asked_for_bribe": bool(bribe[i]) if is_rated else None,
+                "created_at": start_time,
+            })
+        yield rows
+
+
+def rebuild_derived_data(engine) -> Dict[str, int]:
+    """Closed-month summaries, rollups, rankings, wait sketches, visit cubes and search index, as the reconciliation job does"""
+    from database.office_search import rebuild_search_index
+    from database.rollups import reconcile_office_analytics
+    from database.visit_cube import rebuild_visit_cubes
+    from database.visit_partitions import close_months
+    from database.wait_sketches import rebuild_wait_sketches
+
+    db = sessionmaker(bind=engine)()
+    try:
+        return {
+            "closed_months": len(close_months(db)),
+            "office_analytics": reconcile_office_analytics(db),
+            "wait_sketches": rebuild_wait_sketches(db),
+            "visit_cubes": rebuild_visit_cubes(db),
+            "search_index": rebuild_search_index(db),
+        }
+    finally:
+        db.close()
+
+
+def generate(engine, visits: int, days: int = 365, seed: int = 42, batch_size: int = 50_000,
+             reset: bool = False, rebuild: bool = True, progress=None) -> Dict[str, Any]:
+    """Fill an empty (or ``reset``) database; returns row counts and timings"""
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    create_tables(engine)
+    with engine.connect() as conn:
+        if conn.execute(select(func.count(Office.id))).scalar():
+            raise RuntimeError("Database already has offices; use an empty database or reset=True")
+
+    started = time.perf_counter()
+    offices = office_rows()
+    services = service_rows(offices)
+    with engine.begin() as conn:
+        conn.execute(insert(Office), offices)
+        conn.execute(insert(OfficeService), services)
+
+    inserted = 0
+    for rows in visit_batches(len(offices), visits, days, seed, batch_size):
+        with engine.begin() as conn:
+            conn.execute(insert(OfficeVisit), rows)
+        inserted += len(rows)
+        if progress:
+            progress(inserted, visits)
+    stats = {
+        "districts": len(DISTRICTS),
+        "offices": len(offices),
+        "services": len(services),
+        "visits": inserted,
+        "insert_seconds": round(time.perf_counter() - started, 1),
+    }
+
+    if rebuild:
+        started = time.perf_counter()
+        stats["derived"] = rebuild_derived_data(engine)
+        stats["rebuild_seconds"] = round(time.perf_counter() - started, 1)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill an office tracker database with synthetic visits")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./benchmark_office_tracker.db"))
+    parser.add_argument("--visits", type=int, default=10_000, help="Number of visits (10k-10M)")
+    parser.add_argument("--days", type=int, default=365, help="Visits are spread over this many past days")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate all tables first")
+    parser.add_argument("--skip-rebuild", action="store_true", help="Do not rebuild rollups, sketches and cubes")
+    args = parser.parse_args()
+
+    engine = create_profiled_engine(args.database_url, current_profile())
+    print(f"🏗️ Generating {args.visits:,} visits for {len(DISTRICTS)} districts into {engine.url!r}")
+    stats = generate(
+        engine, args.visits, args.days, args.seed, args.batch_size, reset=args.reset,
+        rebuild=not args.skip_rebuild,
+        progress=lambda done, total: print(f"   {done:,}/{total:,} visits", end="\r", flush=True)
+    )
+    print()
+    print(f"✅ {stats['offices']} offices, {stats['services']} services, {stats['visits']:,} visits "
+          f"in {stats['insert_seconds']}s")
+    if "derived" in stats:
+        print(f"✅ Rebuilt derived data in {stats['rebuild_seconds']}s: {stats['derived']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Load scenario: citizen visit flows mixed with dashboard and ranking reads
+
+Each of ``concurrency`` virtual users loops over flows until the duration
+(or iteration count) is reached:
+
+- citizen (``--citizen-share``): pick a district -> office type -> office
+  -> service, start the timer, end the visit and (usually) rate it
+- reader: dashboard, rankings, office analytics, wait-time quantiles or the
+  best-time heatmap
+
+Service ids follow ``data_generator.service_row_id``, so run it against a
+database filled by the generator. Targets a running server (``--base-url``,
+SQLite or PostgreSQL behind it) or the app in-process (``--in-process``,
+no network in the numbers):
+
+    python -m benchmark.load_scenario --base-url http://localhost:8000 --concurrency 50 --duration 60
+    python -m benchmark.load_scenario --in-process --database-url sqlite:///./benchmark.db --json report.json
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import Optional
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmark.data_generator import SERVICES_PER_OFFICE, service_row_id
+from benchmark.report import LatencyRecorder, format_report, write_report
+
+CITIZEN_SHARE = 0.6     # Share of flows that are citizen visits (the rest are reads)
+RATING_SHARE = 0.7      # Citizens who rate their visit
+SUCCESS_SHARE = 0.8     # Visits ending kaam_bhayo
+RANKING_METRICS = ["overall_rating", "efficiency", "success_rate"]
+
+
+class LoadScenario:
+    """Citizen and reader flows against one client; latencies go to ``recorder``"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: LatencyRecorder, seed: int = 0,
+                 citizen_share: float = CITIZEN_SHARE):
+        self.client = client
+        self.recorder = recorder
+        self.rng = random.Random(seed)
+        self.citizen_share = citizen_share
+        self.provinces = None
+        self.office_ids = []
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        """Timed request recorded under ``endpoint`` (the route template)"""
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(endpoint, time.perf_counter() - started, ok=False)
+            return None
+        self.recorder.record(endpoint, time.perf_counter() - started, ok=response.status_code < 400)
+        return response if response.status_code < 400 else None
+
+    async def citizen_flow(self):
+        response = await self.request("GET /api/selection/districts", "GET", "/api/selection/districts")
+        if response is None:
+            return
+        self.provinces = response.json()["provinces"]
+        district = self.rng.choice(response.json()["districts"])
+
+        response = await self.request("GET /api/selection/office-types/{district}", "GET",
+                                      f"/api/selection/office-types/{district}")
+        if response is None:
+            return
+        office_type = self.rng.choice(response.json())["office_type"]
+
+        response = await self.request("GET /api/selection/offices/{district}/{office_type}", "GET",
+                                      f"/api/selection/offices/{district}/{office_type}")
+        if response is None:
+            return
+        office_id = self.rng.choice(response.json()["offices"])["id"]
+        self.office_ids.append(office_id)
+
+        response = await self.request("GET /api/selection/services/{office_id}", "GET",
+                                      f"/api/selection/services/{office_id}")
+        if response is None:
+            return
+        service_index = self.rng.randrange(min(len(response.json()["services"]), SERVICES_PER_OFFICE))
+
+        response = await self.request("POST /api/visit/start-timer", "POST", "/api/visit/start-timer", json={
+            "office_id": office_id, "service_id": service_row_id(office_id, service_index)
+        })
+        if response is None:
+            return
+        visit_id = response.json()["visit_id"]
+
+        status = "kaam_bhayo" if self.rng.random() < SUCCESS_SHARE else "kaam_bhayena"
+        response = await self.request("POST /api/visit/end-visit", "POST", "/api/visit/end-visit",
+                                      json={"visit_id": visit_id, "service_status": status})
+        if response is None or self.rng.random() >= RATING_SHARE:
+            return
+
+        overall = self.rng.randint(1, 5)
+        rating = {name: max(1, min(5, overall + self.rng.randint(-1, 1))) for name in (
+            "staff_behavior_rating", "office_cleanliness_rating", "process_efficiency_rating",
+            "information_clarity_rating")}
+        await self.request("POST /api/visit/rating", "POST", "/api/visit/rating", json=dict(
+            rating, visit_id=visit_id, overall_rating=overall, asked_for_bribe=self.rng.random() < 0.05
+        ))
+
+    async def reader_flow(self):
+        choice = self.rng.random()
+        if choice < 0.3:
+            await self.request("GET /api/analytics/dashboard", "GET", "/api/analytics/dashboard")
+        elif choice < 0.5:
+            await self.request("GET /api/analytics/rankings/national", "GET", "/api/analytics/rankings/national",
+                               params={"metric": self.rng.choice(RANKING_METRICS)})
+        elif choice < 0.65 and self.provinces:
+            await self.request("GET /api/analytics/rankings/province", "GET", "/api/analytics/rankings/province",
+                               params={"province": self.rng.choice(list(self.provinces)),
+                                       "metric": self.rng.choice(RANKING_METRICS)})
+        elif choice < 0.8 and self.office_ids:
+            await self.request("GET /api/analytics/office/{office_id}", "GET",
+                               f"/api/analytics/office/{self.rng.choice(self.office_ids)}")
+        elif choice < 0.9 and self.office_ids:
+            await self.request("GET /api/analytics/best-time/{office_id}", "GET",
+                               f"/api/analytics/best-time/{self.rng.choice(self.office_ids)}")
+        else:
+            await self.request("GET /api/analytics/wait-times/national", "GET", "/api/analytics/wait-times/national")
+
+    async def user(self, deadline: Optional[float], iterations: Optional[int]):
+        done = 0
+        while (deadline is None or time.perf_counter() < deadline) and (iterations is None or done < iterations):
+            if self.rng.random() < self.citizen_share:
+                await self.citizen_flow()
+            else:
+                await self.reader_flow()
+            done += 1
+
+
+async def run_load(client: httpx.AsyncClient, concurrency: int = 20, duration: float = None,
+                   iterations: int = None, seed: int = 0, citizen_share: float = CITIZEN_SHARE) -> LatencyRecorder:
+    """Run ``concurrency`` virtual users for ``duration`` seconds or ``iterations`` flows each"""
+    if duration is None and iterations is None:
+        raise ValueError("Give a duration or a number of iterations")
+    recorder = LatencyRecorder()
+    users = [LoadScenario(client, recorder, seed + n, citizen_share) for n in range(concurrency)]
+    recorder.start()
+    deadline = time.perf_counter() + duration if duration is not None else None
+    await asyncio.gather(*(user.user(deadline, iterations) for user in users))
+    recorder.finish()
+    return recorder
+
+
+def _in_process_client(database_url: str, api_key: str) -> httpx.AsyncClient:
+    # The app reads DATABASE_URL when database.connection is first imported
+    os.environ["DATABASE_URL"] = database_url
+    from app.main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark",
+                             headers={"api-key": api_key})
+
+
+async def _main(args):
+    if args.in_process:
+        client = _in_process_client(args.database_url, args.api_key)
+        target = f"in-process ({args.database_url})"
+    else:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=args.base_url, headers={"api-key": args.api_key},
+                                   limits=limits, timeout=args.timeout)
+        target = args.base_url
+    print(f"🚦 {args.concurrency} users against {target}, "
+          f"{f'{args.duration}s' if args.iterations is None else f'{args.iterations} flows each'}")
+    async with client:
+        recorder = await run_load(client, args.concurrency, None if args.iterations else args.duration,
+                                  args.iterations, args.seed, args.citizen_share)
+    summary = recorder.summary()
+    print(format_report(summary))
+    if args.json:
+        write_report(summary, args.json, target=target, concurrency=args.concurrency,
+                     citizen_share=args.citizen_share)
+        print(f"📝 Report written to {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the office tracker API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--in-process", action="store_true", help="Call the app through ASGI instead of HTTP")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./benchmark_office_tracker.db"),
+                        help="Database for --in-process")
+    parser.add_argument("--api-key", default=os.getenv("API_KEY", "default_api_key"))
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--iterations", type=int, help="Flows per user (instead of a duration)")
+    parser.add_argument("--citizen-share", type=float, default=CITIZEN_SHARE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--json", help="Write the report as JSON to this path")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
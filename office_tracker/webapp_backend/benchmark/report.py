@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Latency and throughput report for load runs
+
+``LatencyRecorder`` collects one sample per request under the endpoint's
+route template (``GET /api/selection/offices/{district}/{office_type}``),
+so requests for different offices aggregate together. The report has
+p50/p95/p99 latency and requests/second per endpoint over the run's wall
+time, printed as a table or written as JSON for comparing runs.
+"""
+
+import json
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class LatencyRecorder:
+    """Per-endpoint latency samples (seconds) and error counts for one run"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    def record(self, endpoint: str, seconds: float, ok: bool = True):
+        self.samples[endpoint].append(seconds)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    @property
+    def wall_seconds(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return max(end - (self.started_at if self.started_at is not None else end), 1e-9)
+
+    def summary(self) -> Dict[str, Any]:
+        wall = self.wall_seconds
+        endpoints = {}
+        for endpoint in sorted(self.samples):
+            samples = np.array(self.samples[endpoint]) * 1000
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "errors": self.errors.get(endpoint, 0),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "max_ms": round(float(samples.max()), 2),
+                "requests_per_second": round(len(samples) / wall, 1),
+            }
+        all_samples = np.concatenate([np.array(s) for s in self.samples.values()]) * 1000 if self.samples else np.array([0.0])
+        total = sum(len(s) for s in self.samples.values())
+        return {
+            "wall_seconds": round(wall, 2),
+            "total": {
+                "requests": total,
+                "errors": sum(self.errors.values()),
+                "p50_ms": round(float(np.percentile(all_samples, 50)), 2),
+                "p95_ms": round(float(np.percentile(all_samples, 95)), 2),
+                "requests_per_second": round(total / wall, 1),
+            },
+            "endpoints": endpoints,
+        }
+
+
+def format_report(summary: Dict[str, Any]) -> str:
+    """Plain-text table of a ``LatencyRecorder.summary()``"""
+    width = max([len(endpoint) for endpoint in summary["endpoints"]] + [8])
+    lines = [
+        f"{'Endpoint':<{width}}  {'reqs':>7}  {'errs':>5}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  {'req/s':>8}",
+        "-" * (width + 56),
+    ]
+    for endpoint, stats in summary["endpoints"].items():
+        lines.append(
+            f"{endpoint:<{width}}  {stats['requests']:>7}  {stats['errors']:>5}  {stats['p50_ms']:>8.1f}  "
+            f"{stats['p95_ms']:>8.1f}  {stats['p99_ms']:>8.1f}  {stats['requests_per_second']:>8.1f}"
+        )
+    total = summary["total"]
+    lines.append("-" * (width + 56))
+    lines.append(
+        f"{'Total':<{width}}  {total['requests']:>7}  {total['errors']:>5}  {total['p50_ms']:>8.1f}  "
+        f"{total['p95_ms']:>8.1f}  {'':>8}  {total['requests_per_second']:>8.1f}"
+    )
+    lines.append(f"Wall time: {summary['wall_seconds']}s")
+    return "\n".join(lines)
+
+
+def write_report(summary: Dict[str, Any], path: str, **context):
+    """Write the summary (plus run settings such as target and concurrency) as JSON"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(summary, **context), f, indent=2)
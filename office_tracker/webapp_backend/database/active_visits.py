@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+In-memory registry of in-progress visits for the live admin board
+
+``start_visit_timer`` and ``end_visit`` report to the registry after their
+commit; subscribers (the Server-Sent Events stream) receive a snapshot on
+connect, then ``visit_started`` / ``visit_ended`` deltas carrying the visit
+and its office's queue (length and average current wait).
+
+The database stays authoritative. The registry is loaded from it on first
+use and resynced every ``ACTIVE_VISIT_RESYNC_SECONDS`` (visits started or
+ended by another worker process show up then, as ordinary deltas).
+A subscriber that falls ``SUBSCRIBER_QUEUE_SIZE`` events behind is sent
+a fresh snapshot instead of the backlog.
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Set
+
+ACTIVE_VISIT_RESYNC_SECONDS = int(os.getenv("ACTIVE_VISIT_RESYNC_SECONDS", 60))
+SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class ActiveVisit:
+    visit_id: int
+    office_id: int
+    office_name: str
+    service_name: str
+    district: Optional[str]
+    start_time: datetime
+
+    def as_event(self, now: datetime) -> Dict[str, Any]:
+        return dict(asdict(self), start_time=self.start_time.isoformat(),
+                    current_wait_minutes=int((now - self.start_time).total_seconds() / 60))
+
+
+class _Subscriber:
+    __slots__ = ('queue', 'office_id')
+
+    def __init__(self, office_id: Optional[int]):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.office_id = office_id
+
+
+class ActiveVisitRegistry:
+    """Active visits by id and by office, plus the event subscribers (event-loop only)"""
+
+    def __init__(self, resync_seconds: int = ACTIVE_VISIT_RESYNC_SECONDS):
+        self.resync_seconds = resync_seconds
+        self.visits: Dict[int, ActiveVisit] = {}
+        self.by_office: Dict[int, Set[int]] = {}
+        self.subscribers: Set[_Subscriber] = set()
+        self.loaded_at: Optional[float] = None
+        self.sequence = 0
+
+    # -- state -------------------------------------------------------------
+
+    def needs_resync(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.resync_seconds
+
+    def office_queue(self, office_id: int, now: datetime = None) -> Dict[str, Any]:
+        now = now or datetime.utcnow()
+        waits = [(now - self.visits[visit_id].start_time).total_seconds() / 60
+                 for visit_id in self.by_office.get(office_id, ())]
+        return {
+            "office_id": office_id,
+            "queue_length": len(waits),
+            "avg_wait_minutes": round(sum(waits) / len(waits), 1) if waits else 0.0,
+        }
+
+    def snapshot(self, office_id: int = None) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        visits = [visit for visit in self.visits.values() if office_id is None or visit.office_id == office_id]
+        offices = {office_id} if office_id is not None else set(self.by_office)
+        return {
+            "active_visits": [visit.as_event(now) for visit in sorted(visits, key=lambda v: v.start_time)],
+            "offices": [self.office_queue(office, now) for office in sorted(offices)],
+            "total_active": len(visits),
+        }
+
+    def _add(self, visit: ActiveVisit):
+        self._remove(visit.visit_id)  # SQLite may reuse the id of a deleted visit
+        self.visits[visit.visit_id] = visit
+        self.by_office.setdefault(visit.office_id, set()).add(visit.visit_id)
+
+    def _remove(self, visit_id: int) -> Optional[ActiveVisit]:
+        visit = self.visits.pop(visit_id, None)
+        if visit is not None:
+            office_visits = self.by_office.get(visit.office_id)
+            office_visits.discard(visit_id)
+            if not office_visits:
+                del self.by_office[visit.office_id]
+        return visit
+
+    # -- updates -----------------------------------------------------------
+
+    def visit_started(self, visit: ActiveVisit):
+        self._add(visit)
+        now = datetime.utcnow()
+        self.publish("visit_started", visit.office_id, {
+            "visit": visit.as_event(now), "office": self.office_queue(visit.office_id, now)
+        })
+
+    def visit_ended(self, visit_id: int, office_id: int, service_status: str = None,
+                    wait_duration_minutes: int = None):
+        self._remove(visit_id)
+        self.publish("visit_ended", office_id, {
+            "visit_id": visit_id,
+            "office_id": office_id,
+            "service_status": service_status,
+            "wait_duration_minutes": wait_duration_minutes,
+            "office": self.office_queue(office_id),
+        })
+
+    def resync(self, visits: Iterable[ActiveVisit]):
+        """Replace the registry with the database's active visits; differences are published as deltas"""
+        current = {visit.visit_id: visit for visit in visits}
+        initial = self.loaded_at is None
+        self.loaded_at = time.monotonic()
+        if initial:
+            for visit in current.values():
+                self._add(visit)
+            return
+
+        for visit_id in set(self.visits) - set(current):
+            self.visit_ended(visit_id, self.visits[visit_id].office_id)
+        for visit_id in set(current) - set(self.visits):
+            self.visit_started(current[visit_id])
+
+    # -- subscriptions -----------------------------------------------------
+
+    def publish(self, event: str, office_id: int, data: Dict[str, Any]):
+        self.sequence += 1
+        message = (self.sequence, event, data)
+        for subscriber in list(self.subscribers):
+            if subscriber.office_id is not None and subscriber.office_id != office_id:
+                continue
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too far behind: replace the backlog with the current state
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.queue.put_nowait((self.sequence, "snapshot", self.snapshot(subscriber.office_id)))
+
+    def subscribe(self, office_id: int = None) -> _Subscriber:
+        """New subscriber whose queue starts with a snapshot"""
+        subscriber = _Subscriber(office_id)
+        subscriber.queue.put_nowait((self.sequence, "snapshot", self.snapshot(office_id)))
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def stats(self) -> Dict[str, int]:
+        return {"active_visits": len(self.visits), "offices": len(self.by_office),
+                "subscribers": len(self.subscribers), "sequence": self.sequence}
+
+
+def format_sse(event_id: int, event: str, data: str) -> str:
+    """One Server-Sent Events message (``data`` is a single-line JSON document)"""
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+
+active_visit_registry = ActiveVisitRegistry()
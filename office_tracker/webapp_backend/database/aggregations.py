@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Aggregation layer for analytics endpoints
+
+Computes dashboard statistics in a fixed number of grouped queries instead of
+one query per metric per province:
+
+1. Province rollup: one GROUP BY over offices LEFT JOIN visits with
+   conditional aggregates (SUM(CASE ...)); national totals are summed from it
+2. Office rollup: one GROUP BY per office feeding all top-N lists
+3. Recent visits with their office and service eagerly loaded
+
+Office comparisons use the same approach: one GROUP BY over the requested
+offices (``office_id IN (...)``) returning every radar metric per office.
+
+The rollups read ``visit_totals`` (closed-month summaries UNION ALL the live
+visits), so "all time" statistics scan only the live partition.
+"""
+
+import heapq
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Sequence
+
+from sqlalchemy import desc, func
+from sqlalchemy.orm import Session, contains_eager
+
+from database.rollups import visit_totals
+from models.database_models import Office, OfficeVisit
+
+MIN_REVIEWS_FOR_RANKING = 3
+TOP_N = 5
+BRIBE_LIST_SIZE = 10
+RECENT_VISITS = 10
+DEFAULT_WAIT_MINUTES = 60
+
+# visit_totals columns read by each rollup
+PROVINCE_COLUMNS = ('total_visits', 'successful_visits', 'overall_rating_sum', 'overall_rating_count',
+                    'wait_time_sum', 'wait_time_count')
+OFFICE_COLUMNS = ('total_visits', 'overall_rating_sum', 'overall_rating_count', 'wait_time_sum', 'wait_time_count',
+                  'bribe_reports')
+COMPARISON_COLUMNS = ('total_visits', 'overall_rating_sum', 'overall_rating_count', 'rated_staff_behavior_sum',
+                      'rated_staff_behavior_count', 'rated_cleanliness_sum', 'rated_cleanliness_count',
+                      'wait_time_sum', 'wait_time_count', 'bribe_reports')
+
+
+def _total(column):
+    """SUM over ``visit_totals`` rows, 0 when there are none"""
+    return func.coalesce(func.sum(column), 0)
+
+
+def _mean(sum_column, count_column):
+    """Average from summed sums and counts; NULL without values (like AVG)"""
+    return func.sum(sum_column) * 1.0 / func.nullif(func.sum(count_column), 0)
+
+
+def _average(total, count):
+    return total / count if count else 0
+
+
+def province_rollup(db: Session) -> List[Dict[str, Any]]:
+    """Visit counts, outcome counts and rating/wait sums per province in one query"""
+    visits = visit_totals(columns=PROVINCE_COLUMNS)
+    rows = db.query(
+        Office.province,
+        func.count(func.distinct(Office.id)).label('office_count'),
+        _total(visits.c.total_visits).label('total_visits'),
+        _total(visits.c.successful_visits).label('successful_visits'),
+        _total(visits.c.overall_rating_sum).label('rating_sum'),
+        _total(visits.c.overall_rating_count).label('rating_count'),
+        _total(visits.c.wait_time_sum).label('wait_sum'),
+        _total(visits.c.wait_time_count).label('wait_count'),
+    ).outerjoin(
+        visits, visits.c.office_id == Office.id
+    ).group_by(Office.province).all()
+
+    return [row._asdict() for row in rows]
+
+
+def office_rollup(db: Session) -> List[Dict[str, Any]]:
+    """Per-office rating, wait and bribe aggregates for offices with visits"""
+    visits = visit_totals(columns=OFFICE_COLUMNS)
+    rows = db.query(
+        Office.id,
+        Office.name,
+        Office.district,
+        _total(visits.c.total_visits).label('total_visits'),
+        _mean(visits.c.overall_rating_sum, visits.c.overall_rating_count).label('avg_rating'),
+        _total(visits.c.overall_rating_count).label('rating_count'),
+        _mean(visits.c.wait_time_sum, visits.c.wait_time_count).label('avg_wait'),
+        _total(visits.c.wait_time_count).label('wait_count'),
+        _total(visits.c.bribe_reports).label('bribe_count'),
+    ).join(
+        visits, visits.c.office_id == Office.id
+    ).group_by(Office.id, Office.name, Office.district).all()
+
+    return [row._asdict() for row in rows]
+
+
+def recent_visits(db: Session, limit: int = RECENT_VISITS) -> List[OfficeVisit]:
+    """Latest visits with office and service loaded in the same query"""
+    return db.query(OfficeVisit).join(
+        OfficeVisit.office
+    ).join(
+        OfficeVisit.service
+    ).options(
+        contains_eager(OfficeVisit.office),
+        contains_eager(OfficeVisit.service),
+    ).order_by(
+        desc(OfficeVisit.visit_date)
+    ).limit(limit).all()
+
+
+def dashboard_aggregates(db: Session) -> Dict[str, Any]:
+    """All dashboard statistics, shaped like ``AnalyticsDashboard``; three queries in total"""
+    provinces = province_rollup(db)
+
+    total_offices = sum(row['office_count'] for row in provinces)
+    total_visits = sum(row['total_visits'] for row in provinces)
+    successful_visits = sum(row['successful_visits'] or 0 for row in provinces)
+    rating_sum = sum(row['rating_sum'] or 0 for row in provinces)
+    rating_count = sum(row['rating_count'] for row in provinces)
+
+    provincial_stats = {
+        row['province']: {
+            "total_visits": row['total_visits'],
+            "success_rate": _average((row['successful_visits'] or 0) * 100, row['total_visits']),
+            "avg_rating": round(_average(row['rating_sum'] or 0, row['rating_count']), 2),
+            "avg_wait_minutes": round(_average(row['wait_sum'] or 0, row['wait_count']), 1)
+        }
+        for row in provinces
+    }
+
+    offices = office_rollup(db)
+    rated = [row for row in offices if row['rating_count'] >= MIN_REVIEWS_FOR_RANKING]
+    timed = [row for row in offices if row['wait_count'] >= MIN_REVIEWS_FOR_RANKING]
+    bribed = [row for row in offices if row['bribe_count']]
+
+    def rating_entry(row):
+        return {
+            "name": row['name'],
+            "district": row['district'],
+            "avg_rating": round(row['avg_rating'], 2),
+            "review_count": row['rating_count']
+        }
+
+    visits = recent_visits(db)
+
+    return {
+        "total_offices": total_offices,
+        "total_visits": total_visits,
+        "avg_success_rate": round(_average(successful_visits * 100, total_visits), 1),
+        "avg_overall_rating": round(_average(rating_sum, rating_count), 2),
+        "top_rated_offices": [
+            rating_entry(row)
+            for row in heapq.nlargest(TOP_N, rated, key=lambda row: row['avg_rating'])
+        ],
+        "most_efficient_offices": [
+            {
+                "name": row['name'],
+                "district": row['district'],
+                "avg_wait_minutes": round(row['avg_wait'], 1),
+                "visit_count": row['wait_count']
+            }
+            for row in heapq.nsmallest(TOP_N, timed, key=lambda row: row['avg_wait'])
+        ],
+        "offices_with_bribe_reports": [
+            {
+                "name": row['name'],
+                "district": row['district'],
+                "bribe_reports": row['bribe_count'],
+                "total_visits": row['total_visits']
+            }
+            for row in heapq.nlargest(BRIBE_LIST_SIZE, bribed, key=lambda row: row['bribe_count'])
+        ],
+        "lowest_rated_offices": [
+            rating_entry(row)
+            for row in heapq.nsmallest(TOP_N, rated, key=lambda row: row['avg_rating'])
+        ],
+        "provincial_stats": provincial_stats,
+        "recent_visits": [
+            {
+                "office_name": visit.office.name,
+                "service_name": visit.service.service_name,
+                "district": visit.office.district,
+                "rating": visit.overall_rating,
+                "wait_minutes": visit.wait_duration_minutes,
+                "service_status": visit.service_status,
+                "visit_date": visit.visit_date
+            }
+            for visit in visits
+        ],
+        "last_updated": datetime.utcnow()
+    }
+
+
+def _efficiency_score(avg_wait: float) -> int:
+    """Wait time on a 1-5 scale (5 = very fast, 1 = very slow)"""
+    if avg_wait <= 15:
+        return 5
+    elif avg_wait <= 30:
+        return 4
+    elif avg_wait <= 60:
+        return 3
+    elif avg_wait <= 120:
+        return 2
+    return 1
+
+
+def _integrity_score(bribe_rate: float) -> int:
+    """Bribe rate on a 1-5 scale (5 = no bribes, 1 = many bribes)"""
+    if bribe_rate == 0:
+        return 5
+    elif bribe_rate <= 5:
+        return 4
+    elif bribe_rate <= 15:
+        return 3
+    elif bribe_rate <= 30:
+        return 2
+    return 1
+
+
+def comparison_rollup(db: Session, office_ids: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+    """Radar-chart inputs for the given offices in one grouped query, keyed by office id"""
+    visits = visit_totals(office_ids, COMPARISON_COLUMNS)
+    rows = db.query(
+        Office.id,
+        Office.name,
+        _total(visits.c.total_visits).label('total_visits'),
+        _mean(visits.c.overall_rating_sum, visits.c.overall_rating_count).label('overall_rating'),
+        _mean(visits.c.rated_staff_behavior_sum, visits.c.rated_staff_behavior_count).label('staff_behavior'),
+        _mean(visits.c.rated_cleanliness_sum, visits.c.rated_cleanliness_count).label('cleanliness'),
+        _mean(visits.c.wait_time_sum, visits.c.wait_time_count).label('avg_wait'),
+        _total(visits.c.bribe_reports).label('bribe_count'),
+    ).outerjoin(
+        visits, visits.c.office_id == Office.id
+    ).filter(
+        Office.id.in_(office_ids)
+    ).group_by(Office.id, Office.name).all()
+
+    return {row.id: row._asdict() for row in rows}
+
+
+def comparison_metrics(row: Dict[str, Any]) -> Dict[str, float]:
+    """Normalise one ``comparison_rollup`` row to the 0-5 radar metrics"""
+    if not row['total_visits']:
+        # Default values for offices with no visits
+        return {
+            "overall_rating": 0,
+            "efficiency": 0,
+            "staff_behavior": 0,
+            "cleanliness": 0,
+            "bribe_rate": 0  # Inverted: 0 = no bribes (good), 5 = many bribes (bad)
+        }
+
+    bribe_rate = (row['bribe_count'] or 0) / row['total_visits'] * 100
+    return {
+        "overall_rating": round(row['overall_rating'] or 0, 1),
+        "efficiency": _efficiency_score(row['avg_wait'] or DEFAULT_WAIT_MINUTES),
+        "staff_behavior": round(row['staff_behavior'] or 0, 1),
+        "cleanliness": round(row['cleanliness'] or 0, 1),
+        "integrity": _integrity_score(bribe_rate)
+    }
+
+
+def office_comparisons(db: Session, office_ids: Sequence[int]) -> List[Dict[str, Any]]:
+    """
+    ``{"office_name", "metrics"}`` per requested office in request order, from
+    one grouped query. Unknown ids are skipped.
+    """
+    rows = comparison_rollup(db, office_ids)
+    return [
+        {"office_name": rows[office_id]['name'], "metrics": comparison_metrics(rows[office_id])}
+        for office_id in office_ids
+        if office_id in rows
+    ]
+
+
+def office_comparison_chunks(db: Session, office_ids: Sequence[int], chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    ``office_comparisons`` of ``chunk_size`` offices at a time, one grouped
+    query per chunk (the compare endpoint advances it with ``run_sync``)
+    """
+    for start in range(0, len(office_ids), chunk_size):
+        yield office_comparisons(db, office_ids[start:start + chunk_size])
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Streaming detector for failure-rate and bribe-report spikes per office
+
+``end_visit`` and ``submit_rating_and_feedback`` (and the offline sync)
+append each visit outcome to ``visit_outcome_events`` in the visit's own
+transaction: a ``failure`` event when a visit ends (failed or not) and a
+``bribe`` event when the bribe question is answered. The detector consumes
+that log in id order, so detection is O(1) per event and never scans
+``office_visits``.
+
+Each office x signal keeps, in memory:
+
+- a baseline rate: the mean of the first ``ANOMALY_WARMUP_EVENTS`` events,
+  then a slow EWMA (it follows a shift far slower than the CUSUM detects it)
+- a fast EWMA of the recent rate (reported with alerts)
+- a one-sided Bernoulli CUSUM, ``S = max(0, S + x - baseline - slack)``;
+  when ``S`` crosses ``ANOMALY_CUSUM_THRESHOLD`` an ``office_alerts`` row
+  is written and the baseline moves to the recent rate, so one shift raises
+  one alert
+
+State is checkpointed to ``anomaly_detector_state`` with the log position
+every ``ANOMALY_CHECKPOINT_EVENTS`` events, together with any alert and on
+shutdown. After a restart the detector loads the checkpoint and replays only
+the events after it. Alerts are keyed by the event that raised them, so a
+replay (or a second worker consuming the same log) never duplicates one.
+
+The log is read by id, which assumes ids become visible in order; SQLite's
+single writer guarantees that. On PostgreSQL a visit transaction that commits
+after a later-numbered one can be skipped (a missed observation, not an error).
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from models.database_models import AnomalyDetectorState, OfficeAlert, ServiceStatus, VisitOutcomeEvent
+
+ANOMALY_WARMUP_EVENTS = int(os.getenv("ANOMALY_WARMUP_EVENTS", 20))
+ANOMALY_EWMA_ALPHA = float(os.getenv("ANOMALY_EWMA_ALPHA", 0.1))
+ANOMALY_BASELINE_ALPHA = float(os.getenv("ANOMALY_BASELINE_ALPHA", 0.01))
+ANOMALY_CUSUM_SLACK = float(os.getenv("ANOMALY_CUSUM_SLACK", 0.1))
+ANOMALY_CUSUM_THRESHOLD = float(os.getenv("ANOMALY_CUSUM_THRESHOLD", 4.0))
+ANOMALY_CHECKPOINT_EVENTS = int(os.getenv("ANOMALY_CHECKPOINT_EVENTS", 200))
+ANOMALY_POLL_SECONDS = int(os.getenv("ANOMALY_POLL_SECONDS", 5))
+ANOMALY_REPLAY_BATCH = 5000
+
+SIGNALS = ("failure", "bribe")
+
+
+def outcome_events(visit_id: int, office_id: int, before: Optional[Dict], after: Dict) -> List[Dict[str, Any]]:
+    """Detector events for a visit change (``visit_snapshot`` before/after; ``before`` None for new visits)"""
+    before = before or {}
+    events = []
+    status = after['service_status']
+    if status in (ServiceStatus.SUCCESS, ServiceStatus.FAILED) and before.get('service_status') != status:
+        events.append({'office_id': office_id, 'visit_id': visit_id, 'signal': 'failure',
+                       'value': status == ServiceStatus.FAILED})
+    bribe = after['asked_for_bribe']
+    if bribe is not None and before.get('asked_for_bribe') != bribe:
+        events.append({'office_id': office_id, 'visit_id': visit_id, 'signal': 'bribe', 'value': bribe})
+    return events
+
+
+def record_outcome_events(db: Session, changes: Iterable[Tuple[int, int, Optional[Dict], Dict]]):
+    """
+    Append ``(visit_id, office_id, before, after)`` visit changes to the
+    detector's log. Must run inside the visit's transaction, before ``db.commit()``.
+    """
+    rows = [event for visit_id, office_id, before, after in changes
+            for event in outcome_events(visit_id, office_id, before, after)]
+    if rows:
+        now = datetime.utcnow()
+        db.execute(insert(VisitOutcomeEvent), [dict(row, created_at=now) for row in rows])
+
+
+class SignalState:
+    """EWMA / CUSUM state of one office x signal"""
+
+    __slots__ = ('count', 'baseline', 'ewma', 'cusum')
+
+    def __init__(self, count: int = 0, baseline: float = 0.0, ewma: float = 0.0, cusum: float = 0.0):
+        self.count = count
+        self.baseline = baseline
+        self.ewma = ewma
+        self.cusum = cusum
+
+    def update(self, value: bool) -> bool:
+        """Add one observation; True when it completes a detected upward shift"""
+        x = 1.0 if value else 0.0
+        self.count += 1
+        if self.count <= ANOMALY_WARMUP_EVENTS:
+            self.baseline += (x - self.baseline) / self.count
+            self.ewma = self.baseline
+            return False
+
+        self.ewma += ANOMALY_EWMA_ALPHA * (x - self.ewma)
+        self.cusum = max(0.0, self.cusum + x - self.baseline - ANOMALY_CUSUM_SLACK)
+        if self.cusum > ANOMALY_CUSUM_THRESHOLD:
+            return True
+        self.baseline += ANOMALY_BASELINE_ALPHA * (x - self.baseline)
+        return False
+
+    def rebaseline(self):
+        """After an alert: the shifted rate becomes the new normal"""
+        self.baseline = max(self.baseline, self.ewma)
+        self.cusum = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'count': self.count, 'baseline': self.baseline, 'ewma': self.ewma, 'cusum': self.cusum}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SignalState':
+        return cls(data.get('count', 0), data.get('baseline', 0.0), data.get('ewma', 0.0), data.get('cusum', 0.0))
+
+
+class AnomalyDetector:
+    """Per office x signal state plus the consumed log position (one consumer task per process)"""
+
+    def __init__(self, checkpoint_events: int = ANOMALY_CHECKPOINT_EVENTS):
+        self.checkpoint_events = checkpoint_events
+        self.states: Dict[Tuple[int, str], SignalState] = {}
+        self.last_event_id = 0
+        self.loaded = False
+        self.dirty: Set[Tuple[int, str]] = set()
+        self.since_checkpoint = 0
+        self.wakeup: Optional[asyncio.Event] = None
+
+    def notify(self):
+        """New outcome events were committed (called by the visit endpoints)"""
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def load(self, db: Session):
+        """Restore the checkpointed state; events after ``last_event_id`` are replayed by ``catch_up``"""
+        self.states = {
+            (row.office_id, row.signal): SignalState.from_dict(row.state)
+            for row in db.execute(select(
+                AnomalyDetectorState.office_id, AnomalyDetectorState.signal, AnomalyDetectorState.state
+            ))
+        }
+        # Rows not rewritten by a later checkpoint had no events since theirs
+        self.last_event_id = db.execute(select(func.max(AnomalyDetectorState.last_event_id))).scalar() or 0
+        self.dirty.clear()
+        self.since_checkpoint = 0
+        self.loaded = True
+
+    def observe(self, event_id: int, office_id: int, visit_id: int, signal: str, value: bool) -> Optional[Dict[str, Any]]:
+        """Apply one event in log order; returns the alert it raises, if any"""
+        key = (office_id, signal)
+        state = self.states.get(key)
+        if state is None:
+            state = self.states[key] = SignalState()
+        self.last_event_id = event_id
+        self.dirty.add(key)
+        self.since_checkpoint += 1
+        if not state.update(value):
+            return None
+        alert = {
+            'office_id': office_id, 'signal': signal, 'event_id': event_id, 'visit_id': visit_id,
+            'recent_rate': round(state.ewma, 4), 'baseline_rate': round(state.baseline, 4),
+            'cusum': round(state.cusum, 3), 'observations': state.count,
+        }
+        state.rebaseline()
+        return alert
+
+    def catch_up(self, db: Session) -> int:
+        """Consume every event after the current position (the restart replay too); commits"""
+        if not self.loaded:
+            self.load(db)
+        try:
+            return self._consume(db)
+        except BaseException:
+            # Memory may be ahead of the rolled-back alerts: reload from the checkpoint next time
+            self.loaded = False
+            raise
+
+    def _consume(self, db: Session) -> int:
+        consumed = 0
+        while True:
+            events = db.execute(
+                select(VisitOutcomeEvent.id, VisitOutcomeEvent.office_id, VisitOutcomeEvent.visit_id,
+                       VisitOutcomeEvent.signal, VisitOutcomeEvent.value)
+                .where(VisitOutcomeEvent.id > self.last_event_id)
+                .order_by(VisitOutcomeEvent.id)
+                .limit(ANOMALY_REPLAY_BATCH)
+            ).all()
+            alerts = [alert for alert in (self.observe(*event) for event in events) if alert]
+            consumed += len(events)
+            if alerts:
+                self._store_alerts(db, alerts)
+            if alerts or self.since_checkpoint >= self.checkpoint_events:
+                self.checkpoint(db)
+            else:
+                db.commit()  # Ends the read transaction so the next poll sees new commits
+            if len(events) < ANOMALY_REPLAY_BATCH:
+                return consumed
+
+    def _store_alerts(self, db: Session, alerts: List[Dict[str, Any]]):
+        existing = set(db.execute(
+            select(OfficeAlert.event_id).where(OfficeAlert.event_id.in_([alert['event_id'] for alert in alerts]))
+        ).scalars())
+        now = datetime.utcnow()
+        new_alerts = [dict(alert, created_at=now) for alert in alerts if alert['event_id'] not in existing]
+        if new_alerts:
+            db.execute(insert(OfficeAlert), new_alerts)
+
+    def checkpoint(self, db: Session):
+        """Write the changed states with the current log position; commits"""
+        if not self.loaded:
+            return
+        if self.dirty:
+            existing = {
+                (row.office_id, row.signal): row.id
+                for row in db.execute(
+                    select(AnomalyDetectorState.id, AnomalyDetectorState.office_id, AnomalyDetectorState.signal)
+                    .where(AnomalyDetectorState.office_id.in_({office_id for office_id, _ in self.dirty}))
+                )
+            }
+            now = datetime.utcnow()
+            new_rows, changed_rows = [], []
+            for office_id, signal in self.dirty:
+                values = {'state': self.states[(office_id, signal)].to_dict(),
+                          'last_event_id': self.last_event_id, 'updated_at': now}
+                if (office_id, signal) in existing:
+                    changed_rows.append(dict(values, id=existing[(office_id, signal)]))
+                else:
+                    new_rows.append(dict(values, office_id=office_id, signal=signal))
+            if new_rows:
+                db.execute(insert(AnomalyDetectorState), new_rows)
+            if changed_rows:
+                db.execute(update(AnomalyDetectorState), changed_rows)
+        db.commit()
+        self.dirty.clear()
+        self.since_checkpoint = 0
+
+    async def run(self, session_factory, poll_seconds: int = ANOMALY_POLL_SECONDS):
+        """Consumer task: replay after the checkpoint, then follow the log (woken by ``notify``)"""
+        self.wakeup = asyncio.Event()
+        try:
+            while True:
+                try:
+                    async with session_factory() as db:
+                        await db.run_sync(self.catch_up)
+                except Exception as e:
+                    print(f"❌ Anomaly detector: {e}")
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+        finally:
+            self.wakeup = None
+
+
+anomaly_detector = AnomalyDetector()
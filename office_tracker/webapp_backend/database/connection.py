@@ -4,26 +4,28 @@ Database connection and session management
 """
 
 import os
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Imported after load_dotenv: engine settings are read from the environment
+from database.engine_config import PoolMetrics, create_profiled_engine, current_profile
+
 # Database Configuration - Default to SQLite for development
 DATABASE_URL = os.getenv(
     "DATABASE_URL", 
     "sqlite:///./nepal_office_tracker.db"
 )
 
+# Engine profile (pool sizing, statement cache, SQLite pragmas) from DB_PROFILE;
+# SQL logging is opt-in with SQL_ECHO=true
+DB_PROFILE = current_profile()
+
 # Create engine
-engine = create_engine(
-    DATABASE_URL,
-    # SQLite specific settings
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
-    echo=True  # Set to False in production
-)
+engine = create_profiled_engine(DATABASE_URL, DB_PROFILE)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -31,6 +33,38 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL to its async driver (aiosqlite / asyncpg)"""
+    scheme, separator, rest = url.partition("://")
+    driver = scheme.split("+")[0]
+    if driver == "sqlite":
+        return f"sqlite+aiosqlite{separator}{rest}"
+    if driver in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{separator}{rest}"
+    return url
+
+
+# Async engine used by the API routers; the sync engine above stays for
+# startup/maintenance jobs (table creation, scraper import, reconciliation)
+ASYNC_DATABASE_URL = async_database_url(DATABASE_URL)
+
+async_engine = create_profiled_engine(ASYNC_DATABASE_URL, DB_PROFILE, is_async=True)
+
+pool_metrics = [PoolMetrics(async_engine, "api"), PoolMetrics(engine, "maintenance")]
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+def pool_status():
+    """Connection pool usage of both engines (served at /metrics/database)"""
+    return {
+        "profile": DB_PROFILE,
+        "pools": [metrics.snapshot() for metrics in pool_metrics]
+    }
+
+
 def get_database():
     """Dependency to get database session"""
     db = SessionLocal()
@@ -40,6 +74,12 @@ def get_database():
         db.close()
 
 
+async def get_async_database():
+    """Dependency to get an async database session (does not block the event loop)"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_database():
     """Initialize database with tables"""
     from models.database_models import Base, create_tables
@@ -47,75 +87,28 @@ def init_database():
     print("✅ Database tables created successfully")
 
 
-def load_scraper_data():
-    """Load office data from scraper JSON files"""
-    import json
+def load_scraper_data(path: str = None, streaming: bool = None):
+    """Load (or refresh) office data from scraper JSON files with the bulk upsert path"""
     import glob
-    from models.database_models import Office, OfficeService
-    from sqlalchemy.orm import Session
+    from database.scraper_import import import_scraper_offices, iter_scraper_offices
     
     db = SessionLocal()
     
     try:
         # Find the latest comprehensive scraper output
-        json_files = glob.glob("../data/comprehensive_nepal_offices_*.json")
-        if not json_files:
-            print("⚠️ No scraper data files found in ../data/")
-            return
-            
-        latest_file = sorted(json_files)[-1]
-        print(f"📂 Loading data from: {latest_file}")
-        
-        with open(latest_file, 'r', encoding='utf-8') as f:
-            scraper_data = json.load(f)
+        if path is None:
+            json_files = glob.glob("../data/comprehensive_nepal_offices_*.json")
+            if not json_files:
+                print("⚠️ No scraper data files found in ../data/")
+                return
+            path = sorted(json_files)[-1]
+        print(f"📂 Loading data from: {path}")
         
-        offices_data = scraper_data.get('offices', [])
-        
-        for office_data in offices_data:
-            # Check if office already exists
-            existing_office = db.query(Office).filter(
-                Office.office_id == office_data['id']
-            ).first()
-            
-            if existing_office:
-                continue  # Skip if already exists
-            
-            # Create new office
-            office = Office(
-                office_id=office_data['id'],
-                name=office_data['name'],
-                name_nepali=office_data.get('name_nepali'),
-                office_type=office_data['type'],
-                district=office_data['location']['district'],
-                province=office_data['location']['province'],
-                address=office_data['location'].get('address'),
-                phone=office_data.get('contact', {}).get('phone_general'),
-                website=office_data.get('contact', {}).get('website')
-            )
-            
-            db.add(office)
-            db.flush()  # Get the ID
-            
-            # Add services
-            for service_data in office_data.get('services', []):
-                service = OfficeService(
-                    office_id=office.id,
-                    service_id=service_data['service_id'],
-                    service_name=service_data['service_name'],
-                    service_name_nepali=service_data.get('service_name_nepali'),
-                    fees=service_data.get('fees', {}),
-                    processing_time=service_data.get('processing_times', {}).get('total_normal'),
-                    required_documents=service_data.get('required_documents', [])
-                )
-                db.add(service)
-        
-        db.commit()
+        stats = import_scraper_offices(db, iter_scraper_offices(path, streaming))
         
-        # Count loaded data
-        office_count = db.query(Office).count()
-        service_count = db.query(OfficeService).count()
-        
-        print(f"✅ Loaded {office_count} offices and {service_count} services")
+        print(f"✅ Offices: {stats['offices_inserted']} new, {stats['offices_updated']} updated "
+              f"({stats['offices_seen']} in file); services: {stats['services_inserted']} new, "
+              f"{stats['services_updated']} updated")
         
     except Exception as e:
         print(f"❌ Error loading scraper data: {e}")
@@ -124,8 +117,70 @@ def load_scraper_data():
         db.close()
 
 
+def reconcile_analytics():
+    """
+    Close the visit months past their grace period (and re-close those with late
+    changes), then rebuild OfficeAnalytics
+    rollups, rankings, wait-time sketches and visit cubes from the summaries and live visits
+    """
+    from database.rollups import reconcile_office_analytics
+    from database.visit_cube import rebuild_visit_cubes
+    from database.visit_partitions import close_months
+    from database.wait_sketches import rebuild_wait_sketches
+    
+    db = SessionLocal()
+    
+    try:
+        for month in close_months(db):
+            print(f"🗓️ Closed visit month {month}")
+        offices = reconcile_office_analytics(db)
+        print(f"✅ Reconciled analytics for {offices} offices")
+        sketches = rebuild_wait_sketches(db)
+        print(f"✅ Rebuilt {sketches} wait-time sketches")
+        cubes = rebuild_visit_cubes(db)
+        print(f"✅ Rebuilt {cubes} best-time-to-visit cubes")
+    except Exception as e:
+        print(f"❌ Error reconciling analytics: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def build_search_index():
+    """Rebuild the office search index from the office tables (imports keep it current afterwards)"""
+    from database.office_search import rebuild_search_index
+    
+    db = SessionLocal()
+    
+    try:
+        print(f"🔎 Search index: {rebuild_search_index(db)} offices")
+    except Exception as e:
+        print(f"❌ Error building office search index: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def refresh_office_rankings():
+    """Re-rank offices from the maintained OfficeAnalytics rollups (no visit scan)"""
+    from database.rollups import refresh_rankings
+    
+    db = SessionLocal()
+    
+    try:
+        refresh_rankings(db)
+        db.commit()
+    except Exception as e:
+        print(f"❌ Error refreshing office rankings: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
 if __name__ == "__main__":
     print("🗄️ Initializing Nepal Office Tracker Database...")
     init_database()
     load_scraper_data()
+    build_search_index()
+    reconcile_analytics()
     print("✅ Database setup complete!")
\ No newline at end of file
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Engine profiles, SQLite pragmas and pool metrics
+
+``DB_PROFILE`` selects a profile (dev, prod, test) with pool sizing,
+pre-ping/recycle and compiled-statement cache size; individual values can be
+overridden with ``DB_POOL_SIZE``, ``DB_MAX_OVERFLOW``, ``DB_POOL_TIMEOUT``,
+``DB_POOL_RECYCLE``, ``DB_STATEMENT_CACHE_SIZE`` and ``SQL_ECHO``.
+
+SQLite connections get WAL journaling, ``synchronous=NORMAL`` and a
+``busy_timeout`` on connect, so readers no longer block the timer writes.
+PostgreSQL uses psycopg2's batched ``executemany_mode`` (sync engine) and
+asyncpg's prepared statement cache (async engine).
+"""
+
+import os
+import threading
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool, StaticPool
+
+ENGINE_PROFILES = {
+    "dev": {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "query_cache_size": 500,
+    },
+    "prod": {
+        # Sized for opening-hour spikes of timer starts across offices
+        "pool_size": 20,
+        "max_overflow": 30,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "query_cache_size": 1200,
+    },
+    "test": {
+        "poolclass": NullPool,
+        "query_cache_size": 500,
+    },
+}
+
+ENVIRONMENT_OVERRIDES = {
+    "DB_POOL_SIZE": ("pool_size", int),
+    "DB_MAX_OVERFLOW": ("max_overflow", int),
+    "DB_POOL_TIMEOUT": ("pool_timeout", int),
+    "DB_POOL_RECYCLE": ("pool_recycle", int),
+    "DB_STATEMENT_CACHE_SIZE": ("query_cache_size", int),
+}
+
+POOL_ARGUMENTS = ("pool_size", "max_overflow", "pool_timeout", "pool_recycle")
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 30000))
+PG_EXECUTEMANY_MODE = os.getenv("PG_EXECUTEMANY_MODE", "values_plus_batch")
+ASYNCPG_STATEMENT_CACHE_SIZE = int(os.getenv("ASYNCPG_STATEMENT_CACHE_SIZE", 500))
+
+
+def current_profile() -> str:
+    profile = os.getenv("DB_PROFILE", "dev").lower()
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE '{profile}', expected one of {sorted(ENGINE_PROFILES)}")
+    return profile
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_arguments(database_url: str, profile: str = None, is_async: bool = False) -> Tuple[URL, Dict[str, Any]]:
+    """URL and keyword arguments for ``create_engine``/``create_async_engine``"""
+    profile = profile or current_profile()
+    url = make_url(database_url)
+    options = dict(ENGINE_PROFILES[profile])
+    for variable, (option, cast) in ENVIRONMENT_OVERRIDES.items():
+        if os.getenv(variable):
+            options[option] = cast(os.getenv(variable))
+    options["echo"] = os.getenv("SQL_ECHO", "false").lower() in ("1", "true", "yes")
+
+    backend, driver = url.get_backend_name(), url.get_driver_name()
+    if backend == "sqlite":
+        connect_args = {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+        if driver == "pysqlite":
+            connect_args["check_same_thread"] = False
+        options["connect_args"] = connect_args
+        if _is_memory_sqlite(url):
+            # One shared connection, otherwise every checkout is a new empty database
+            options["poolclass"] = StaticPool
+            for argument in POOL_ARGUMENTS + ("pool_pre_ping",):
+                options.pop(argument, None)
+    elif backend == "postgresql":
+        if driver == "psycopg2":
+            options["executemany_mode"] = PG_EXECUTEMANY_MODE
+        elif driver == "asyncpg":
+            url = url.update_query_dict({"prepared_statement_cache_size": str(ASYNCPG_STATEMENT_CACHE_SIZE)})
+
+    if options.get("poolclass") is NullPool:
+        for argument in POOL_ARGUMENTS:
+            options.pop(argument, None)
+    elif "pool_size" in options:
+        # Some dialects (e.g. aiosqlite) default to NullPool; sizing needs a queue pool
+        options.setdefault("poolclass", AsyncAdaptedQueuePool if is_async else QueuePool)
+
+    return url, options
+
+
+def create_profiled_engine(database_url: str, profile: str = None, is_async: bool = False):
+    """Engine configured from the active profile, with SQLite pragmas installed"""
+    url, options = engine_arguments(database_url, profile, is_async)
+    engine = (create_async_engine if is_async else create_engine)(url, **options)
+    install_sqlite_pragmas(engine)
+    return engine
+
+
+def install_sqlite_pragmas(engine):
+    """Apply journal/sync/busy pragmas to every new SQLite connection (sync or async engine)"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if sync_engine.dialect.name != "sqlite":
+        return
+    in_memory = _is_memory_sqlite(sync_engine.url)
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+
+class PoolMetrics:
+    """Checkout counters and high-water mark for one engine's connection pool"""
+
+    def __init__(self, engine, name: str):
+        self.name = name
+        self.engine = getattr(engine, "sync_engine", engine)
+        self.lock = threading.Lock()
+        self.connections_opened = 0
+        self.checkouts = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.invalidated = 0
+
+        event.listen(self.engine, "connect", self._on_connect)
+        event.listen(self.engine, "checkout", self._on_checkout)
+        event.listen(self.engine, "checkin", self._on_checkin)
+        event.listen(self.engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self.lock:
+            self.connections_opened += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self.lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self.lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self.lock:
+            self.invalidated += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        status = {
+            "engine": self.name,
+            "pool_class": type(pool).__name__,
+            "checked_out": self.checked_out,
+            "peak_checked_out": self.peak_checked_out,
+            "checkouts": self.checkouts,
+            "connections_opened": self.connections_opened,
+            "invalidated": self.invalidated,
+        }
+        if hasattr(pool, "size") and hasattr(pool, "overflow"):
+            # QueuePool: capacity is pool_size + max_overflow
+            status.update({
+                "pool_size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "max_overflow": pool._max_overflow,
+                "timeout_seconds": pool.timeout(),
+            })
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            status["utilization"] = round(self.checked_out / capacity, 3) if capacity else None
+        return status
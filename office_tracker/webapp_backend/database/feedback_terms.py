@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Top terms and sentiment of visit complaints and suggestions
+
+The rating endpoint (and the offline sync) flag a visit with
+``feedback_pending`` whenever its ``complaints`` or ``suggestions`` text
+changes. A background pipeline takes the flagged visits in batches of
+``FEEDBACK_BATCH_SIZE``:
+
+1. each text is tokenized with the news aggregator's
+   ``NepaliTextProcessor.extract_devanagari_words`` (Devanagari and English
+   words, stop words removed) and its distinct terms kept
+2. the batch is scored with a Nepali/English opinion lexicon, -1 (negative)
+   to 1 (positive); a negation flips the next opinion word
+3. ``office_feedback_terms`` counters (texts mentioning each term per office
+   and kind, plus their summed sentiment) are moved from the visit's previous
+   terms (``visit_feedback``) to the new ones, in one transaction with
+   clearing the flag
+
+Reading the top complaints of an office, district or province is one grouped
+query over those counters; raw text is never read at request time. The
+counters survive archival of the visits (see ``visit_partitions.py``).
+"""
+
+import asyncio
+import os
+import re
+import sys
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, or_, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from models.database_models import Office, OfficeFeedbackTerm, OfficeVisit, VisitFeedback
+
+# The tokenizer is shared with the news aggregator (plain Python, no model dependencies)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'news_aggregator'))
+try:
+    from nepali_text_processor import NepaliTextProcessor
+    NEPALI_TEXT_PROCESSOR_AVAILABLE = True
+except ImportError:
+    NEPALI_TEXT_PROCESSOR_AVAILABLE = False
+
+FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", 500))
+FEEDBACK_POLL_SECONDS = int(os.getenv("FEEDBACK_POLL_SECONDS", 60))
+
+# kind -> OfficeVisit text column
+FEEDBACK_KINDS = {'complaint': 'complaints', 'suggestion': 'suggestions'}
+FEEDBACK_COLUMNS = [f'{kind}_{part}' for kind in FEEDBACK_KINDS for part in ('terms', 'sentiment')]
+TOTAL_TERM = '*'  # Counts every text of a kind; never produced by the tokenizer
+MAX_TERM_LENGTH = 64
+
+# Words too common in office feedback to be a "top complaint"
+FEEDBACK_STOP_WORDS = {
+    'कार्यालय', 'अफिस', 'कर्मचारी', 'सेवा', 'काम', 'गर्नुपर्छ', 'हुनुपर्छ', 'गरियोस्', 'होस्',
+    'office', 'staff', 'service', 'this', 'that', 'they', 'there', 'their', 'very', 'also', 'should',
+    'would', 'could', 'please', 'will', 'more', 'much', 'some', 'any',
+}
+
+# Opinion lexicon; Devanagari entries also match inflected forms (ढिलो -> ढिलोको)
+POSITIVE_TERMS = {
+    'राम्रो', 'छिटो', 'सफा', 'सहयोगी', 'धन्यवाद', 'उत्कृष्ट', 'सजिलो', 'सन्तुष्ट', 'व्यवस्थित', 'सहज',
+    'इमान्दार', 'विनम्र', 'स्पष्ट',
+    'good', 'great', 'fast', 'quick', 'clean', 'helpful', 'friendly', 'easy', 'efficient', 'excellent',
+    'smooth', 'satisfied', 'thanks', 'thank', 'polite', 'honest', 'clear', 'organized',
+}
+NEGATIVE_TERMS = {
+    'ढिलो', 'ढिलाइ', 'ढिलासुस्ती', 'घुस', 'भ्रष्टाचार', 'फोहोर', 'नराम्रो', 'झन्झट', 'अव्यवस्थित',
+    'दुर्व्यवहार', 'समस्या', 'असुविधा', 'बिचौलिया', 'दलाल', 'अन्याय', 'भीड', 'अलमल', 'हैरानी',
+    'slow', 'rude', 'bribe', 'bribes', 'corruption', 'corrupt', 'dirty', 'delay', 'delayed', 'crowded',
+    'bad', 'worst', 'poor', 'problem', 'broker', 'brokers', 'middleman', 'unhelpful', 'confusing',
+    'harassment', 'careless', 'lazy', 'absent',
+}
+NEGATIONS = {'not', 'never', 'without', 'नभएको', 'छैनन्', 'होइन'}
+
+_processor = NepaliTextProcessor() if NEPALI_TEXT_PROCESSOR_AVAILABLE else None
+
+
+def _is_devanagari(word: str) -> bool:
+    return any('ऀ' <= char <= 'ॿ' for char in word)
+
+
+def _prefix_lengths(terms) -> List[int]:
+    return sorted({len(term) for term in terms if _is_devanagari(term)})
+
+
+_POSITIVE_PREFIXES = _prefix_lengths(POSITIVE_TERMS)
+_NEGATIVE_PREFIXES = _prefix_lengths(NEGATIVE_TERMS)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Words of a complaint / suggestion in order (English lower-cased, stop words removed)"""
+    if not text:
+        return []
+    if _processor is not None:
+        words = _processor.extract_devanagari_words(text)
+    else:
+        words = [word for word in re.findall(r'[\wऀ-ॿ]+', text) if len(word) >= 3 or _is_devanagari(word)]
+    words = [word if _is_devanagari(word) else word.lower() for word in words]
+    return [word for word in words
+            if word not in FEEDBACK_STOP_WORDS and not word.isdigit() and len(word) <= MAX_TERM_LENGTH]
+
+
+def _polarity(word: str) -> int:
+    if word in POSITIVE_TERMS:
+        return 1
+    if word in NEGATIVE_TERMS:
+        return -1
+    if _is_devanagari(word):
+        if any(word[:length] in NEGATIVE_TERMS for length in _NEGATIVE_PREFIXES):
+            return -1
+        if any(word[:length] in POSITIVE_TERMS for length in _POSITIVE_PREFIXES):
+            return 1
+    return 0
+
+
+def score_sentiments(token_lists: Sequence[Sequence[str]]) -> List[Optional[float]]:
+    """
+    Lexicon sentiment of each tokenized text, (positive - negative) /
+    opinion words, in -1..1; 0 for texts without opinion words and None for
+    empty ones
+    """
+    scores = []
+    for tokens in token_lists:
+        if not tokens:
+            scores.append(None)
+            continue
+        positive = negative = 0
+        negated = False
+        for token in tokens:
+            if token in NEGATIONS:
+                negated = True
+                continue
+            polarity = _polarity(token)
+            if polarity:
+                if negated:
+                    polarity = -polarity
+                positive += polarity > 0
+                negative += polarity < 0
+            negated = False
+        opinions = positive + negative
+        scores.append(round((positive - negative) / opinions, 4) if opinions else 0.0)
+    return scores
+
+
+def set_visit_feedback(visit, suggestions: Optional[str], complaints: Optional[str]):
+    """Set a visit's feedback texts, flagging it for the pipeline when they change"""
+    if (visit.suggestions, visit.complaints) != (suggestions, complaints):
+        visit.feedback_pending = True
+    visit.suggestions = suggestions
+    visit.complaints = complaints
+
+
+def process_pending_feedback(db: Session, batch_size: int = FEEDBACK_BATCH_SIZE) -> int:
+    """Process one batch of flagged visits; commits. Returns the number of visits processed."""
+    started = datetime.utcnow()
+    visits = db.execute(
+        select(OfficeVisit.id, OfficeVisit.office_id, OfficeVisit.complaints, OfficeVisit.suggestions)
+        .where(OfficeVisit.feedback_pending == True)
+        .order_by(OfficeVisit.id).limit(batch_size)
+    ).all()
+    if not visits:
+        return 0
+    ids = [visit.id for visit in visits]
+    previous = db.execute(select(VisitFeedback).where(VisitFeedback.visit_id.in_(ids))).scalars().all()
+
+    # (office_id, kind, term) -> [mentions, sentiment_sum]
+    deltas: Dict[Tuple[int, str, str], List] = defaultdict(lambda: [0, 0.0])
+
+    def count(office_id, kind, terms, sentiment, sign):
+        for term in (TOTAL_TERM, *terms):
+            delta = deltas[(office_id, kind, term)]
+            delta[0] += sign
+            delta[1] += sign * sentiment
+
+    for row in previous:
+        for kind in FEEDBACK_KINDS:
+            terms = getattr(row, f'{kind}_terms')
+            if terms is not None:
+                count(row.office_id, kind, terms, getattr(row, f'{kind}_sentiment') or 0.0, -1)
+
+    feedback = {visit.id: {'visit_id': visit.id, 'office_id': visit.office_id} for visit in visits}
+    for kind, column in FEEDBACK_KINDS.items():
+        token_lists = [tokenize(getattr(visit, column)) for visit in visits]
+        for visit, tokens, sentiment in zip(visits, token_lists, score_sentiments(token_lists)):
+            if sentiment is None:
+                continue
+            terms = sorted(set(tokens) - NEGATIONS)
+            feedback[visit.id].update({f'{kind}_terms': terms, f'{kind}_sentiment': sentiment})
+            count(visit.office_id, kind, terms, sentiment, 1)
+
+    _apply_term_deltas(db, deltas)
+    db.execute(delete(VisitFeedback).where(VisitFeedback.visit_id.in_(ids)))
+    feedback_rows = [
+        dict(dict.fromkeys(FEEDBACK_COLUMNS), processed_at=started, **row)
+        for row in feedback.values() if len(row) > 2
+    ]
+    if feedback_rows:
+        db.execute(insert(VisitFeedback), feedback_rows)
+    # Visits re-rated while this batch ran stay flagged for the next one
+    db.execute(
+        update(OfficeVisit.__table__)
+        .where(OfficeVisit.id.in_(ids), or_(OfficeVisit.updated_at <= started, OfficeVisit.updated_at.is_(None)))
+        .values(feedback_pending=False, updated_at=OfficeVisit.updated_at)
+    )
+    db.commit()
+    return len(visits)
+
+
+def _apply_term_deltas(db: Session, deltas: Dict[Tuple[int, str, str], List]):
+    deltas = {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+    if not deltas:
+        return
+    existing = {
+        (row.office_id, row.kind, row.term): row
+        for row in db.execute(
+            select(OfficeFeedbackTerm.id, OfficeFeedbackTerm.office_id, OfficeFeedbackTerm.kind, OfficeFeedbackTerm.term,
+                   OfficeFeedbackTerm.mentions, OfficeFeedbackTerm.sentiment_sum)
+            .where(tuple_(OfficeFeedbackTerm.office_id, OfficeFeedbackTerm.kind, OfficeFeedbackTerm.term).in_(list(deltas)))
+        )
+    }
+    now = datetime.utcnow()
+    new_rows, changed_rows, emptied = [], [], []
+    for (office_id, kind, term), (mentions, sentiment) in deltas.items():
+        row = existing.get((office_id, kind, term))
+        if row is None:
+            if mentions > 0:
+                new_rows.append({'office_id': office_id, 'kind': kind, 'term': term, 'mentions': mentions,
+                                 'sentiment_sum': sentiment, 'updated_at': now})
+        elif row.mentions + mentions <= 0:
+            emptied.append(row.id)
+        else:
+            changed_rows.append({'id': row.id, 'mentions': row.mentions + mentions,
+                                 'sentiment_sum': row.sentiment_sum + sentiment, 'updated_at': now})
+    if emptied:
+        db.execute(delete(OfficeFeedbackTerm).where(OfficeFeedbackTerm.id.in_(emptied)))
+    if changed_rows:
+        db.execute(update(OfficeFeedbackTerm), changed_rows)
+    if new_rows:
+        db.execute(insert(OfficeFeedbackTerm), new_rows)
+
+
+def queue_unprocessed_feedback(db: Session) -> int:
+    """Flag visits with feedback but no ``visit_feedback`` row (texts written before the pipeline existed); commits"""
+    result = db.execute(
+        update(OfficeVisit.__table__)
+        .where(or_(OfficeVisit.complaints.isnot(None), OfficeVisit.suggestions.isnot(None)),
+               OfficeVisit.feedback_pending.isnot(True),
+               OfficeVisit.id.notin_(select(VisitFeedback.visit_id)))
+        .values(feedback_pending=True, updated_at=OfficeVisit.updated_at)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def top_feedback_terms(db: Session, kind: str = 'complaint', office_id: int = None, district: str = None,
+                       province: str = None, limit: int = 20) -> Dict[str, Any]:
+    """Most mentioned terms of an office, district, province or the whole country, from the counters"""
+    query = select(
+        OfficeFeedbackTerm.term,
+        func.sum(OfficeFeedbackTerm.mentions).label('mentions'),
+        func.sum(OfficeFeedbackTerm.sentiment_sum).label('sentiment_sum'),
+    ).where(OfficeFeedbackTerm.kind == kind)
+    if office_id is not None:
+        query = query.where(OfficeFeedbackTerm.office_id == office_id)
+    elif district is not None or province is not None:
+        query = query.join(Office, Office.id == OfficeFeedbackTerm.office_id).where(
+            Office.district == district if district is not None else Office.province == province
+        )
+    query = query.group_by(OfficeFeedbackTerm.term)
+
+    total = db.execute(query.where(OfficeFeedbackTerm.term == TOTAL_TERM)).first()
+    terms = db.execute(
+        query.where(OfficeFeedbackTerm.term != TOTAL_TERM)
+        .order_by(func.sum(OfficeFeedbackTerm.mentions).desc(), OfficeFeedbackTerm.term).limit(limit)
+    ).all()
+    texts = total.mentions if total else 0
+    return {
+        'texts': texts,
+        'avg_sentiment': round(total.sentiment_sum / texts, 3) if texts else None,
+        'terms': [
+            {'term': row.term, 'mentions': row.mentions, 'share': round(row.mentions / texts, 3) if texts else None,
+             'avg_sentiment': round(row.sentiment_sum / row.mentions, 3)}
+            for row in terms
+        ],
+    }
+
+
+class FeedbackPipeline:
+    """Background batching of flagged visits (one task per process)"""
+
+    def __init__(self, batch_size: int = FEEDBACK_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.queued = 0
+        self.wakeup: Optional[asyncio.Event] = None
+
+    def notify(self):
+        """A visit's feedback changed (called by the visit endpoints); wakes the task once a batch is queued"""
+        self.queued += 1
+        if self.wakeup is not None and self.queued >= self.batch_size:
+            self.wakeup.set()
+
+    def process(self, db: Session) -> int:
+        """Process every flagged visit, a batch at a time; commits"""
+        processed = 0
+        while True:
+            batch = process_pending_feedback(db, self.batch_size)
+            processed += batch
+            if batch < self.batch_size:
+                self.queued = 0
+                return processed
+
+    async def run(self, session_factory, poll_seconds: int = FEEDBACK_POLL_SECONDS):
+        """Consumer task: backfill unprocessed feedback, then process batches as they fill (or every poll)"""
+        self.wakeup = asyncio.Event()
+        try:
+            try:
+                async with session_factory() as db:
+                    await db.run_sync(queue_unprocessed_feedback)
+            except Exception as e:
+                print(f"❌ Feedback pipeline backfill: {e}")
+            while True:
+                try:
+                    async with session_factory() as db:
+                        await db.run_sync(self.process)
+                except Exception as e:
+                    print(f"❌ Feedback pipeline: {e}")
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+        finally:
+            self.wakeup = None
+
+
+feedback_pipeline = FeedbackPipeline()
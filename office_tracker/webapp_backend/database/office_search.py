@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Office search index and typeahead
+
+Full-text search over office name, Nepali name, address, district, service
+names and a romanised form of the Devanagari text:
+
+- SQLite: FTS5 virtual table ``office_search`` (rowid = office id) ranked
+  with column-weighted bm25 and prefix indexes. Devanagari vowel signs are
+  declared token characters, otherwise unicode61 splits words at every
+  matra. A trigram FTS5 table is the fuzzy fallback for substrings.
+- PostgreSQL: plain ``office_search`` table with a pg_trgm GIN index,
+  ranked by trigram similarity.
+- Other dialects: no index; searches fall back to ILIKE over the office
+  and service columns.
+
+The index is rebuilt from the office tables where they change
+(``import_scraper_offices``) and at API startup (``build_search_index``),
+never on the request path. The in-memory ``OfficeTypeahead`` trie answers
+as-you-type completions and is rebuilt on the first completion after the
+reference-data generation changes.
+"""
+
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import or_, select, text
+from sqlalchemy.orm import Session
+
+from database.reference_cache import reference_cache
+from models.database_models import Office, OfficeAnalytics, OfficeService
+
+SEARCH_INDEX_DIALECTS = ('sqlite', 'postgresql')
+SEARCH_COLUMNS = ['name', 'name_nepali', 'address', 'district', 'services', 'transliteration']
+# bm25 column weights, in SEARCH_COLUMNS order
+SEARCH_WEIGHTS = [10.0, 10.0, 1.0, 3.0, 2.0, 5.0]
+
+DEVANAGARI_MARKS = ''.join(
+    chr(code) for code in range(0x0900, 0x0980) if unicodedata.category(chr(code)) in ('Mn', 'Mc')
+)
+
+TOKEN_PATTERN = re.compile(r'[\w' + DEVANAGARI_MARKS + r']+')
+
+# Simplified romanisation (no diacritics), enough for Latin-script prefix search
+_CONSONANTS = {
+    'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'ङ': 'ng', 'च': 'ch', 'छ': 'chh', 'ज': 'j', 'झ': 'jh',
+    'ञ': 'ny', 'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh', 'ण': 'n', 'त': 't', 'थ': 'th', 'द': 'd',
+    'ध': 'dh', 'न': 'n', 'प': 'p', 'फ': 'ph', 'ब': 'b', 'भ': 'bh', 'म': 'm', 'य': 'y', 'र': 'r',
+    'ल': 'l', 'व': 'w', 'श': 'sh', 'ष': 'sh', 'स': 's', 'ह': 'h',
+}
+_VOWELS = {
+    'अ': 'a', 'आ': 'aa', 'इ': 'i', 'ई': 'i', 'उ': 'u', 'ऊ': 'u', 'ऋ': 'ri', 'ए': 'e', 'ऐ': 'ai',
+    'ओ': 'o', 'औ': 'au',
+}
+_VOWEL_SIGNS = {
+    'ा': 'a', 'ि': 'i', 'ी': 'i', 'ु': 'u', 'ू': 'u', 'ृ': 'ri', 'े': 'e', 'ै': 'ai', 'ो': 'o', 'ौ': 'au',
+}
+_NASALS = {'ं': 'n', 'ँ': 'n'}
+_VIRAMA = '्'
+
+
+def transliterate(value: Optional[str], schwa_deletion: bool = False) -> str:
+    """
+    Romanise Devanagari text. The inherent vowel is dropped before vowel
+    signs, viramas and at word ends; with ``schwa_deletion`` it is also
+    dropped between an explicit vowel and a consonant carrying one
+    (मालपोत -> malpot instead of malapot).
+    """
+    if not value:
+        return ''
+    output = []
+    characters = list(value)
+    for index, character in enumerate(characters):
+        previous = characters[index - 1] if index else ''
+        following = characters[index + 1] if index + 1 < len(characters) else ''
+        after_following = characters[index + 2] if index + 2 < len(characters) else ''
+        if character in _CONSONANTS:
+            output.append(_CONSONANTS[character])
+            if following in _CONSONANTS or following in _NASALS:
+                medial = (previous in _VOWEL_SIGNS or previous in _VOWELS) and after_following in _VOWEL_SIGNS
+                if not (schwa_deletion and medial):
+                    output.append('a')
+        elif character in _VOWELS:
+            output.append(_VOWELS[character])
+        elif character in _VOWEL_SIGNS:
+            output.append(_VOWEL_SIGNS[character])
+        elif character in _NASALS:
+            output.append(_NASALS[character])
+        elif character in (_VIRAMA, '़', 'ः'):
+            continue
+        else:
+            output.append(character)
+    return ''.join(output)
+
+
+def romanised_forms(value: Optional[str]) -> List[str]:
+    """Distinct romanisations of ``value`` (with and without schwa deletion)"""
+    forms = [transliterate(value), transliterate(value, schwa_deletion=True)]
+    return [form for position, form in enumerate(forms) if form and form not in forms[:position]]
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    return [token.lower() for token in TOKEN_PATTERN.findall(value or '')]
+
+
+def _fts_tokenizer() -> str:
+    return f"unicode61 remove_diacritics 2 tokenchars '{DEVANAGARI_MARKS}'"
+
+
+def ensure_search_index(db: Session) -> bool:
+    """Create the search tables for the current dialect (idempotent); False where there is no index"""
+    dialect = db.get_bind().dialect.name
+    if dialect not in SEARCH_INDEX_DIALECTS:
+        return False
+    columns = ', '.join(SEARCH_COLUMNS)
+    if dialect == 'sqlite':
+        db.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS office_search USING fts5("
+            f"{columns}, tokenize=\"{_fts_tokenizer()}\", prefix='2 3')"
+        ))
+        db.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS office_search_trigram USING fts5("
+            "document, tokenize='trigram')"
+        ))
+    else:
+        db.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        db.execute(text(
+            "CREATE TABLE IF NOT EXISTS office_search ("
+            "office_id INTEGER PRIMARY KEY REFERENCES offices(id) ON DELETE CASCADE, "
+            + ', '.join(f"{column} TEXT" for column in SEARCH_COLUMNS) + ", document TEXT)"
+        ))
+        db.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_office_search_document_trgm "
+            "ON office_search USING gin (document gin_trgm_ops)"
+        ))
+    return True
+
+
+def search_documents(db: Session) -> List[Dict[str, Any]]:
+    """One search document per office, assembled from the office and service tables"""
+    services: Dict[int, List[str]] = {}
+    for office_id, service_name, service_name_nepali in db.query(
+        OfficeService.office_id, OfficeService.service_name, OfficeService.service_name_nepali
+    ):
+        services.setdefault(office_id, []).extend(filter(None, (service_name, service_name_nepali)))
+
+    documents = []
+    for office in db.query(Office.id, Office.name, Office.name_nepali, Office.address, Office.district):
+        service_names = services.get(office.id, [])
+        transliteration = ' '.join(romanised_forms(office.name_nepali) + [
+            form for name in service_names if not name.isascii() for form in romanised_forms(name)
+        ])
+        documents.append({
+            'office_id': office.id,
+            'name': office.name,
+            'name_nepali': office.name_nepali or '',
+            'address': office.address or '',
+            'district': office.district or '',
+            'services': ' '.join(service_names),
+            'transliteration': transliteration,
+        })
+    return documents
+
+
+def rebuild_search_index(db: Session) -> int:
+    """Replace the search index contents with the current offices; commits. Returns the offices indexed"""
+    if not ensure_search_index(db):
+        return 0
+    documents = search_documents(db)
+    columns = ', '.join(SEARCH_COLUMNS)
+    values = ', '.join(f':{column}' for column in SEARCH_COLUMNS)
+
+    if db.get_bind().dialect.name == 'sqlite':
+        db.execute(text("DELETE FROM office_search"))
+        db.execute(text("DELETE FROM office_search_trigram"))
+        if documents:
+            db.execute(text(f"INSERT INTO office_search (rowid, {columns}) VALUES (:office_id, {values})"), documents)
+            db.execute(text(
+                "INSERT INTO office_search_trigram (rowid, document) VALUES (:office_id, :document)"
+            ), [
+                {'office_id': d['office_id'], 'document': ' '.join([d['name'], d['name_nepali'], d['transliteration']])}
+                for d in documents
+            ])
+    else:
+        db.execute(text("DELETE FROM office_search"))
+        if documents:
+            db.execute(text(
+                f"INSERT INTO office_search (office_id, {columns}, document) "
+                f"VALUES (:office_id, {values}, :document)"
+            ), [
+                dict(d, document=' '.join(str(d[column]) for column in SEARCH_COLUMNS).lower())
+                for d in documents
+            ])
+    db.commit()
+    return len(documents)
+
+
+def _fts_query(tokens: Sequence[str], operator: str) -> str:
+    """Prefix query: every token quoted (FTS5 syntax is not user input) and starred"""
+    return f' {operator} '.join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+
+
+def _filters(district: Optional[str], province: Optional[str], office_type: Optional[str]):
+    clauses, params = [], {}
+    for column, value in (('district', district), ('province', province), ('office_type', office_type)):
+        if value:
+            clauses.append(f"o.{column} = :{column}")
+            params[column] = value
+    return ''.join(f" AND {clause}" for clause in clauses), params
+
+
+def search_offices(db: Session, query: str, limit: int = 20, district: str = None,
+                   province: str = None, office_type: str = None) -> List[Dict[str, Any]]:
+    """
+    Ranked office ids for ``query`` as ``[{"office_id", "score", "match"}]``.
+    Lower score is better on SQLite (bm25); ``match`` is all_terms, any_term,
+    fuzzy or, without a search index, like.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    if db.get_bind().dialect.name not in SEARCH_INDEX_DIALECTS:
+        return _like_search(db, tokens, limit, district, province, office_type)
+    where, params = _filters(district, province, office_type)
+    params['limit'] = limit
+
+    if db.get_bind().dialect.name == 'postgresql':
+        params['query'] = ' '.join(tokens)
+        params['pattern'] = '%' + '%'.join(tokens) + '%'
+        rows = db.execute(text(
+            "SELECT s.office_id, -similarity(s.document, :query) AS score FROM office_search s "
+            "JOIN offices o ON o.id = s.office_id "
+            f"WHERE (s.document ILIKE :pattern OR s.document % :query){where} "
+            "ORDER BY score, o.name LIMIT :limit"
+        ), params)
+        return [{'office_id': row.office_id, 'score': row.score, 'match': 'fuzzy'} for row in rows]
+
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    attempts = [('all_terms', _fts_query(tokens, 'AND'))]
+    if len(tokens) > 1:
+        attempts.append(('any_term', _fts_query(tokens, 'OR')))
+    for match, fts_query in attempts:
+        rows = db.execute(text(
+            f"SELECT office_search.rowid AS office_id, bm25(office_search, {weights}) AS score "
+            "FROM office_search JOIN offices o ON o.id = office_search.rowid "
+            f"WHERE office_search MATCH :fts_query{where} ORDER BY score LIMIT :limit"
+        ), dict(params, fts_query=fts_query)).all()
+        if rows:
+            return [{'office_id': row.office_id, 'score': row.score, 'match': match} for row in rows]
+
+    # Substring fallback (trigram needs at least 3 characters per term)
+    trigram_tokens = [token for token in tokens if len(token) >= 3]
+    if not trigram_tokens:
+        return []
+    rows = db.execute(text(
+        "SELECT t.rowid AS office_id, bm25(office_search_trigram) AS score "
+        "FROM office_search_trigram t JOIN offices o ON o.id = t.rowid "
+        f"WHERE office_search_trigram MATCH :fts_query{where} ORDER BY score LIMIT :limit"
+    ), dict(params, fts_query=' OR '.join('"{}"'.format(t.replace('"', '""')) for t in trigram_tokens))).all()
+    return [{'office_id': row.office_id, 'score': row.score, 'match': 'fuzzy'} for row in rows]
+
+
+def _like_search(db: Session, tokens: Sequence[str], limit: int, district: Optional[str],
+                 province: Optional[str], office_type: Optional[str]) -> List[Dict[str, Any]]:
+    """Unranked ILIKE match of every term on the office and service columns"""
+    statement = select(Office.id).outerjoin(OfficeService)
+    for token in tokens:
+        pattern = f"%{token}%"
+        statement = statement.where(or_(
+            Office.name.ilike(pattern), Office.name_nepali.ilike(pattern), Office.address.ilike(pattern),
+            Office.district.ilike(pattern), OfficeService.service_name.ilike(pattern),
+            OfficeService.service_name_nepali.ilike(pattern)
+        ))
+    for column, value in ((Office.district, district), (Office.province, province), (Office.office_type, office_type)):
+        if value:
+            statement = statement.where(column == value)
+    rows = db.execute(statement.distinct().order_by(Office.id).limit(limit))
+    return [{'office_id': office_id, 'score': None, 'match': 'like'} for office_id, in rows]
+
+
+class _TrieNode:
+    __slots__ = ('children', 'offices')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.offices: List[int] = []
+
+
+class OfficeTypeahead:
+    """
+    Prefix trie over the words of office names (English, Nepali and
+    romanised). Completions are ranked by office popularity (visit count).
+    """
+
+    def __init__(self):
+        self.root = _TrieNode()
+        self.generation = None
+        self.offices: Dict[int, Dict[str, Any]] = {}
+        self.rank: Dict[int, int] = {}
+
+    def build(self, offices: Iterable[Dict[str, Any]], generation: int = None):
+        """``offices``: dicts with id, name, name_nepali, district, office_type, most popular first"""
+        root, details, rank = _TrieNode(), {}, {}
+        for position, office in enumerate(offices):
+            details[office['id']] = office
+            rank[office['id']] = position
+            words = set(tokenize(office['name']) + tokenize(office.get('name_nepali'))
+                        + tokenize(' '.join(romanised_forms(office.get('name_nepali')))))
+            for word in words:
+                node = root
+                for character in word:
+                    node = node.children.setdefault(character, _TrieNode())
+                node.offices.append(office['id'])
+        self.root, self.offices, self.rank, self.generation = root, details, rank, generation
+
+    def _prefix_matches(self, prefix: str) -> set:
+        node = self.root
+        for character in prefix:
+            node = node.children.get(character)
+            if node is None:
+                return set()
+        matches, stack = set(), [node]
+        while stack:
+            node = stack.pop()
+            matches.update(node.offices)
+            stack.extend(node.children.values())
+        return matches
+
+    def complete(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Offices whose name words start with every word of ``query``"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        candidates = None
+        for token in sorted(tokens, key=len, reverse=True):  # Most selective first
+            matches = self._prefix_matches(token)
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return []
+        best = sorted(candidates, key=self.rank.__getitem__)[:limit]
+        return [self.offices[office_id] for office_id in best]
+
+    def ensure_current(self, db: Session) -> 'OfficeTypeahead':
+        """Rebuild from the database when the reference-data generation changed"""
+        if self.generation != reference_cache.generation:
+            generation = reference_cache.generation
+            rows = db.query(
+                Office.id, Office.name, Office.name_nepali, Office.district, Office.office_type
+            ).outerjoin(
+                OfficeAnalytics, OfficeAnalytics.office_id == Office.id
+            ).order_by(
+                OfficeAnalytics.total_visits.desc().nullslast(), Office.name
+            )
+            self.build((row._asdict() for row in rows), generation)
+        return self
+
+
+office_typeahead = OfficeTypeahead()
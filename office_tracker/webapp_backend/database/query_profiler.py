@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Per-request SQL timing and the slow-query log
+
+``QueryProfiler`` listens to an engine's ``before/after_cursor_execute``
+events. Statements run while a request is being profiled (``start_request``,
+called by ``api.profiling.ProfilingMiddleware`` for sampled requests) add to
+that request's query count and database time; statements slower than
+``SLOW_QUERY_MS`` go to the slow-query log, keyed by their normalized text
+(literals and bind parameters replaced by ``?``, IN lists collapsed), which
+keeps the ``SLOW_QUERY_LOG_SIZE`` slowest statements with their call count,
+total and worst time and the route and parameters of the worst call.
+
+The query plan of a logged statement (``EXPLAIN QUERY PLAN`` on SQLite,
+``EXPLAIN`` on PostgreSQL) is taken on demand with the worst call's
+parameters (``QueryProfiler.explain``, served at ``/debug/perf``), so
+profiling never issues extra statements on the request path.
+"""
+
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 100))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", 50))
+
+EXPLAIN_PREFIX = {"sqlite": "EXPLAIN QUERY PLAN", "postgresql": "EXPLAIN"}
+
+
+class RequestQueries:
+    """Statements and database time of one profiled request"""
+
+    __slots__ = ('route', 'count', 'seconds')
+
+    def __init__(self, route: str = None):
+        self.route = route
+        self.count = 0
+        self.seconds = 0.0
+
+
+_current_request: ContextVar[Optional[RequestQueries]] = ContextVar("profiled_request", default=None)
+
+
+def start_request(route: str = None):
+    """Profile the statements of the current request (task); returns the token for ``finish_request``"""
+    return _current_request.set(RequestQueries(route))
+
+
+def finish_request(token) -> RequestQueries:
+    queries = _current_request.get()
+    _current_request.reset(token)
+    return queries
+
+
+def current_request() -> Optional[RequestQueries]:
+    return _current_request.get()
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_BIND_PARAMETER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_ROWS = re.compile(r"(\(\?(?:, \?)*\))(?:\s*,\s*\1)+")
+
+
+def normalize_statement(statement: str) -> str:
+    """Statement text with literals and parameters as ``?`` and IN lists / VALUES rows collapsed"""
+    normalized = " ".join(statement.split())
+    normalized = _STRING_LITERAL.sub("?", normalized)
+    normalized = _BIND_PARAMETER.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _VALUES_ROWS.sub(r"\1", normalized)
+    return _PLACEHOLDER_LIST.sub("(?, ...)", normalized)
+
+
+class QueryProfiler:
+    """Cursor hooks on one engine (sync or async) feeding the profiled request and the slow-query log"""
+
+    def __init__(self, engine, name: str, slow_query_ms: float = SLOW_QUERY_MS,
+                 log_size: int = SLOW_QUERY_LOG_SIZE):
+        self.name = name
+        self.engine = getattr(engine, "sync_engine", engine)
+        self.slow_query_ms = slow_query_ms
+        self.log_size = log_size
+        self.lock = threading.Lock()
+        self.slow: Dict[str, Dict[str, Any]] = {}
+
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(self.engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def remove(self):
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(self.engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if _current_request.get() is not None:
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        request = _current_request.get()
+        started = conn.info.get("query_started")
+        if request is None or not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        request.count += 1
+        request.seconds += elapsed
+        if elapsed * 1000 >= self.slow_query_ms and not statement.lstrip().upper().startswith("EXPLAIN"):
+            self._log_slow(statement, parameters, executemany, elapsed * 1000, request.route)
+
+    def _log_slow(self, statement: str, parameters, executemany: bool, elapsed_ms: float, route: Optional[str]):
+        key = normalize_statement(statement)
+        with self.lock:
+            entry = self.slow.get(key)
+            if entry is None:
+                if len(self.slow) >= self.log_size:
+                    fastest = min(self.slow, key=lambda k: self.slow[k]['max_ms'])
+                    if self.slow[fastest]['max_ms'] >= elapsed_ms:
+                        return
+                    del self.slow[fastest]
+                entry = self.slow[key] = {'statement': key, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+            entry['calls'] += 1
+            entry['total_ms'] += elapsed_ms
+            if elapsed_ms >= entry['max_ms']:
+                # The plan is taken for the worst call; executemany batches cannot be explained
+                entry.update(max_ms=elapsed_ms, route=route, last_seen=time.time(),
+                             sql=None if executemany else statement, parameters=None if executemany else parameters)
+                entry.pop('plan', None)
+
+    def slow_queries(self, limit: int = None) -> List[Dict[str, Any]]:
+        """Logged statements, slowest first"""
+        with self.lock:
+            entries = sorted(self.slow.values(), key=lambda entry: entry['max_ms'], reverse=True)[:limit]
+            return [
+                {
+                    'statement': entry['statement'],
+                    'calls': entry['calls'],
+                    'total_ms': round(entry['total_ms'], 2),
+                    'mean_ms': round(entry['total_ms'] / entry['calls'], 2),
+                    'max_ms': round(entry['max_ms'], 2),
+                    'route': entry['route'],
+                    'plan': entry.get('plan'),
+                }
+                for entry in entries
+            ]
+
+    def explain(self, connection, limit: int = None) -> int:
+        """
+        Plan the logged statements that have none yet on ``connection`` (a
+        sync Connection, e.g. ``Session.connection()`` inside ``run_sync``);
+        returns the number of statements planned
+        """
+        prefix = EXPLAIN_PREFIX.get(connection.dialect.name)
+        with self.lock:
+            pending = [
+                entry for entry in sorted(self.slow.values(), key=lambda entry: entry['max_ms'], reverse=True)[:limit]
+                if 'plan' not in entry
+            ]
+        for entry in pending:
+            if prefix is None or entry['sql'] is None:
+                plan = None
+            elif not entry['sql'].lstrip().upper().startswith(("SELECT", "WITH")):
+                plan = None  # EXPLAIN of a write still takes its locks
+            else:
+                try:
+                    # In a savepoint: on PostgreSQL a failed EXPLAIN would abort the caller's transaction
+                    with connection.begin_nested():
+                        rows = connection.exec_driver_sql(f"{prefix} {entry['sql']}", entry['parameters'] or ()).all()
+                    plan = [str(row[-1]) for row in rows]
+                except Exception as e:
+                    plan = [f"EXPLAIN failed: {e}"]
+            entry['plan'] = plan
+        return len(pending)
+
+    def reset(self):
+        with self.lock:
+            self.slow.clear()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+In-process cache for office picker reference data
+
+Districts, office types, offices and services only change when scraper data
+is imported, so their JSON payloads are serialised once per data generation
+and served from memory with a strong ETag (the payload digest, so every
+worker answers the same data with the same tag). ``invalidate()`` (called
+by the scraper import) bumps the generation and drops every entry.
+
+Imports run from another process (``python database/connection.py``) are
+picked up through a version marker, ``max(offices.updated_at)``: it is read
+at most every ``REFERENCE_CACHE_VERSION_CHECK_SECONDS`` and a change starts
+a new generation. Entries also expire after ``REFERENCE_CACHE_TTL_SECONDS``.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional
+
+REFERENCE_CACHE_TTL_SECONDS = int(os.getenv("REFERENCE_CACHE_TTL_SECONDS", 3600))
+REFERENCE_CACHE_VERSION_CHECK_SECONDS = int(os.getenv("REFERENCE_CACHE_VERSION_CHECK_SECONDS", 30))
+
+
+@dataclass(frozen=True)
+class CachedPayload:
+    body: bytes
+    etag: str
+    generation: int
+    created_at: float
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for GET/HEAD)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class ReferenceDataCache:
+    """Generation-versioned map of cache key -> serialised JSON payload"""
+
+    def __init__(self, ttl_seconds: int = REFERENCE_CACHE_TTL_SECONDS,
+                 version_check_seconds: int = REFERENCE_CACHE_VERSION_CHECK_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self.version: Any = None
+        self.version_checked_at: Optional[float] = None
+        self.generation = 0
+        self.entries: Dict[Hashable, CachedPayload] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        """Start a new data generation (reference data changed)"""
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+    def get(self, key: Hashable) -> Optional[CachedPayload]:
+        entry = self.entries.get(key)
+        if entry is None or entry.generation != self.generation:
+            return None
+        if time.monotonic() - entry.created_at > self.ttl_seconds:
+            return None
+        return entry
+
+    def put(self, key: Hashable, data: Any, generation: int) -> CachedPayload:
+        """Serialise ``data`` once; stored only if no invalidation happened while it was built"""
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        entry = CachedPayload(body=body, etag=f'"{digest}"', generation=generation, created_at=time.monotonic())
+        with self.lock:
+            if generation == self.generation:
+                self.entries[key] = entry
+        return entry
+
+    async def check_version(self, version: Callable):
+        """
+        Await ``version()`` (the database's reference-data version marker) if
+        the last check is older than ``version_check_seconds``; a marker that
+        moved since the previous check starts a new generation
+        """
+        now = time.monotonic()
+        if self.version_checked_at is not None and now - self.version_checked_at < self.version_check_seconds:
+            return
+        self.version_checked_at = now
+        marker = await version()
+        if self.version is not None and marker != self.version:
+            self.invalidate()
+        self.version = marker
+
+    async def get_or_build(self, key: Hashable, build: Callable, version: Callable = None) -> CachedPayload:
+        """
+        Cached payload for ``key``, awaiting ``build()`` (JSON-ready data) on a
+        miss; ``version`` is the marker checked by ``check_version``
+        """
+        if version is not None:
+            await self.check_version(version)
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        generation = self.generation
+        return self.put(key, await build(), generation)
+
+    def stats(self) -> Dict[str, int]:
+        return {"generation": self.generation, "entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+reference_cache = ReferenceDataCache()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Maintained OfficeAnalytics rollups
+
+Visit endpoints apply every visit change to the office's ``OfficeAnalytics``
+row in the same transaction as the visit itself: running sums and counts are
+adjusted with atomic ``column = column + delta`` updates and the derived
+rates/averages are recomputed from them in SQL, so analytics reads become a
+single-row lookup.
+
+``reconcile_office_analytics`` rebuilds every row from ``OfficeVisit`` in one
+GROUP BY. It runs at startup and periodically to repair any drift (e.g.
+visits written outside the API).
+
+``refresh_rankings`` materializes the district/province/national ranks of
+every ranking metric into ``office_rankings`` with RANK() window functions
+over those rows; it runs after each reconciliation and on its own shorter
+schedule, so the rankings endpoint is an indexed page read.
+
+Visits of closed months are read from their monthly summaries instead
+(``visit_totals``: summaries UNION ALL the live visits, see
+``visit_partitions.py``), so rebuilds keep archived visits and only scan the
+live partition.
+"""
+
+import os
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import DateTime, case, delete, func, insert, literal, or_, select, union_all, update
+from sqlalchemy.orm import Session
+
+from models.database_models import (
+    MonthlyVisitSummary, Office, OfficeAnalytics, OfficeRanking, OfficeVisit, ServiceStatus, VisitMonth
+)
+
+MIN_REVIEWS_FOR_RANKING = 3
+# Weight of the national mean in ranking scores, in reviews
+RANKING_PRIOR_REVIEWS = int(os.getenv("RANKING_PRIOR_REVIEWS", 10))
+
+# metric -> (sum column, count column, scale, higher is better); the columns are
+# OfficeAnalytics counters, and visit_totals columns of the same name
+RANKING_METRICS = {
+    'overall_rating': ('overall_rating_sum', 'overall_rating_count', 1.0, True),
+    'efficiency': ('wait_time_sum', 'wait_time_count', 1.0, False),  # Lower wait time = better
+    'success_rate': ('successful_visits', 'total_visits', 100.0, True),
+}
+
+# Visit field -> (sum column, count column, average column)
+AVERAGED_FIELDS = {
+    'overall_rating': ('overall_rating_sum', 'overall_rating_count', 'avg_overall_rating'),
+    'staff_behavior_rating': ('staff_behavior_sum', 'staff_behavior_count', 'avg_staff_behavior'),
+    'office_cleanliness_rating': ('cleanliness_sum', 'cleanliness_count', 'avg_cleanliness'),
+    'process_efficiency_rating': ('efficiency_sum', 'efficiency_count', 'avg_efficiency'),
+    'information_clarity_rating': ('information_clarity_sum', 'information_clarity_count', 'avg_information_clarity'),
+    'wait_duration_minutes': ('wait_time_sum', 'wait_time_count', 'avg_wait_time_minutes'),
+}
+
+# Visit field -> (sum column, count column) over visits with an overall rating only
+# (the comparison radar's staff behavior and cleanliness)
+RATED_FIELDS = {
+    'staff_behavior_rating': ('rated_staff_behavior_sum', 'rated_staff_behavior_count'),
+    'office_cleanliness_rating': ('rated_cleanliness_sum', 'rated_cleanliness_count'),
+}
+
+COUNTER_COLUMNS = ['total_visits', 'successful_visits', 'failed_visits', 'bribe_reports'] + [
+    column for sum_column, count_column, _ in AVERAGED_FIELDS.values() for column in (sum_column, count_column)
+]
+
+
+PARTITION_EPOCH = datetime(1970, 1, 1)
+
+
+def live_visits():
+    """Visits not yet in a closed month's summary (WHERE clause on ``office_visits``)"""
+    live_since = select(func.max(VisitMonth.ends_at)).scalar_subquery()
+    return or_(OfficeVisit.visit_date >= func.coalesce(live_since, PARTITION_EPOCH), OfficeVisit.visit_date.is_(None))
+
+
+def _visit_counter_columns() -> List:
+    """Per-visit values of the rollup counters, labelled like the ``monthly_visit_summaries`` columns"""
+    def counted(value):
+        return case((value.isnot(None), 1), else_=0)
+
+    columns = [
+        literal(1).label('total_visits'),
+        case((OfficeVisit.service_status == ServiceStatus.SUCCESS, 1), else_=0).label('successful_visits'),
+        case((OfficeVisit.service_status == ServiceStatus.FAILED, 1), else_=0).label('failed_visits'),
+        case((OfficeVisit.asked_for_bribe == True, 1), else_=0).label('bribe_reports'),
+    ]
+    for field, (sum_column, count_column, _) in AVERAGED_FIELDS.items():
+        columns += [getattr(OfficeVisit, field).label(sum_column), counted(getattr(OfficeVisit, field)).label(count_column)]
+    rated = OfficeVisit.overall_rating.isnot(None)
+    for field, (sum_column, count_column) in RATED_FIELDS.items():
+        value = case((rated, getattr(OfficeVisit, field)))
+        columns += [value.label(sum_column), counted(value).label(count_column)]
+    return columns
+
+
+WAIT_RANGE_COLUMNS = ('min_wait_time_minutes', 'max_wait_time_minutes')
+
+
+def visit_counters(*conditions, columns: Sequence[str] = None, per_service: bool = True):
+    """
+    Rollup counters and min/max wait of the visits matching ``conditions``
+    per office x service (the columns of ``monthly_visit_summaries``) or per
+    office, or only the named ``columns`` of those
+    """
+    aggregates = [func.coalesce(func.sum(column.element), 0).label(column.name) for column in _visit_counter_columns()]
+    aggregates += [func.min(OfficeVisit.wait_duration_minutes).label('min_wait_time_minutes'),
+                   func.max(OfficeVisit.wait_duration_minutes).label('max_wait_time_minutes')]
+    if columns is not None:
+        aggregates = [aggregate for aggregate in aggregates if aggregate.name in columns]
+    keys = [OfficeVisit.office_id, OfficeVisit.service_id] if per_service else [OfficeVisit.office_id]
+    return select(*keys, *aggregates).where(*conditions).group_by(*keys)
+
+
+def visit_totals(office_ids: Iterable[int] = None, columns: Sequence[str] = None):
+    """
+    Closed-month summaries UNION ALL the live visits' counters per office,
+    with office_id, the rollup counters and min/max wait as columns, or only
+    the named ``columns`` of those (the union cannot skip unused ones).
+    Summing a counter over it gives the all-time value.
+    """
+    conditions = [live_visits()]
+    if office_ids is not None:
+        conditions.append(OfficeVisit.office_id.in_(office_ids))
+    live = visit_counters(*conditions, columns=columns, per_service=False)
+    closed = select(*[getattr(MonthlyVisitSummary, column.name) for column in live.selected_columns])
+    if office_ids is not None:
+        closed = closed.where(MonthlyVisitSummary.office_id.in_(office_ids))
+    return union_all(closed, live).subquery('visit_totals')
+
+
+def visit_snapshot(visit: OfficeVisit) -> Dict:
+    """The visit fields that contribute to the office rollup"""
+    snapshot = {field: getattr(visit, field) for field in AVERAGED_FIELDS}
+    snapshot['service_status'] = visit.service_status
+    snapshot['asked_for_bribe'] = visit.asked_for_bribe
+    return snapshot
+
+
+def _contribution(snapshot: Optional[Dict]) -> Dict[str, int]:
+    if snapshot is None:
+        return {}
+    contribution = {
+        'total_visits': 1,
+        'successful_visits': int(snapshot['service_status'] == ServiceStatus.SUCCESS),
+        'failed_visits': int(snapshot['service_status'] == ServiceStatus.FAILED),
+        'bribe_reports': int(snapshot['asked_for_bribe'] is True),
+    }
+    for field, (sum_column, count_column, _) in AVERAGED_FIELDS.items():
+        value = snapshot[field]
+        if value is not None:
+            contribution[sum_column] = value
+            contribution[count_column] = 1
+    return contribution
+
+
+def _ratio(numerator, denominator, scale=1.0):
+    return case((denominator > 0, numerator * scale / denominator), else_=0.0)
+
+
+def _derived_values() -> Dict:
+    """SQL expressions recomputing rates and averages from the running sums"""
+    values = {
+        OfficeAnalytics.success_rate: _ratio(OfficeAnalytics.successful_visits, OfficeAnalytics.total_visits, 100.0),
+        OfficeAnalytics.bribe_rate: _ratio(OfficeAnalytics.bribe_reports, OfficeAnalytics.total_visits, 100.0),
+        OfficeAnalytics.last_calculated: datetime.utcnow(),
+    }
+    for sum_column, count_column, average_column in AVERAGED_FIELDS.values():
+        values[getattr(OfficeAnalytics, average_column)] = _ratio(
+            getattr(OfficeAnalytics, sum_column), getattr(OfficeAnalytics, count_column)
+        )
+    return values
+
+
+def _ensure_row(db: Session, office_id: int):
+    """Create the office's rollup row if missing, tolerating a concurrent insert"""
+    values = {column: 0 for column in COUNTER_COLUMNS}
+    dialect = db.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        db.execute(
+            insert(OfficeAnalytics).values(office_id=office_id, **values)
+            .on_conflict_do_nothing(index_elements=['office_id'])
+        )
+    elif db.query(OfficeAnalytics.id).filter(OfficeAnalytics.office_id == office_id).first() is None:
+        db.add(OfficeAnalytics(office_id=office_id, **values))
+        db.flush()
+
+
+def apply_visit_change(db: Session, office_id: int, before: Optional[Dict], after: Optional[Dict]):
+    """
+    Move one visit's contribution in the office rollup from ``before`` to ``after``.
+
+    Pass ``before=None`` for a new visit. Must run inside the request's
+    transaction, before ``db.commit()``.
+    """
+    apply_visit_changes(db, [(office_id, before, after)])
+
+
+def apply_visit_changes(db: Session, changes: Iterable[Tuple[int, Optional[Dict], Optional[Dict]]]):
+    """
+    Batch form of ``apply_visit_change`` for ``(office_id, before, after)``
+    triples: the deltas are summed so each office's rollup is updated once.
+    """
+    deltas: Dict[int, Counter] = defaultdict(Counter)
+    new_waits: Dict[int, List[int]] = defaultdict(list)
+    replaced_waits = set()
+    for office_id, before, after in changes:
+        before_contribution, after_contribution = _contribution(before), _contribution(after)
+        for column in set(before_contribution) | set(after_contribution):
+            deltas[office_id][column] += after_contribution.get(column, 0) - before_contribution.get(column, 0)
+
+        old_wait = (before or {}).get('wait_duration_minutes')
+        new_wait = (after or {}).get('wait_duration_minutes')
+        if old_wait is not None and old_wait != new_wait:
+            replaced_waits.add(office_id)
+        elif new_wait is not None and old_wait != new_wait:
+            new_waits[office_id].append(new_wait)
+
+    flushed = False
+    for office_id, delta in deltas.items():
+        delta = {column: change for column, change in delta.items() if change}
+        if not delta:
+            continue
+        if not flushed:
+            db.flush()  # The visits' own changes must be visible to the recomputation below
+            flushed = True
+        _ensure_row(db, office_id)
+        row = OfficeAnalytics.office_id == office_id
+
+        db.execute(update(OfficeAnalytics).where(row).values({
+            getattr(OfficeAnalytics, column): getattr(OfficeAnalytics, column) + change
+            for column, change in delta.items()
+        }).execution_options(synchronize_session=False))
+
+        values = _derived_values()
+        if office_id in replaced_waits:
+            # A wait time was replaced or removed: min/max cannot be decremented
+            totals = visit_totals([office_id], WAIT_RANGE_COLUMNS)
+            min_wait, max_wait = db.execute(select(
+                func.min(totals.c.min_wait_time_minutes),
+                func.max(totals.c.max_wait_time_minutes)
+            )).one()
+            values[OfficeAnalytics.min_wait_time_minutes] = min_wait or 0
+            values[OfficeAnalytics.max_wait_time_minutes] = max_wait or 0
+        elif new_waits[office_id]:
+            lowest, highest = min(new_waits[office_id]), max(new_waits[office_id])
+            first_waits = OfficeAnalytics.wait_time_count <= len(new_waits[office_id])
+            values[OfficeAnalytics.min_wait_time_minutes] = case(
+                (first_waits | (OfficeAnalytics.min_wait_time_minutes > lowest), lowest),
+                else_=OfficeAnalytics.min_wait_time_minutes
+            )
+            values[OfficeAnalytics.max_wait_time_minutes] = case(
+                (first_waits | (OfficeAnalytics.max_wait_time_minutes < highest), highest),
+                else_=OfficeAnalytics.max_wait_time_minutes
+            )
+
+        db.execute(update(OfficeAnalytics).where(row).values(values).execution_options(synchronize_session=False))
+
+
+def refresh_rankings(db: Session, now: datetime = None) -> int:
+    """
+    Rebuild ``office_rankings`` from the OfficeAnalytics counters: per
+    metric, offices with ``MIN_REVIEWS_FOR_RANKING`` reviews are ordered by
+    their Bayesian-smoothed score (``RANKING_PRIOR_REVIEWS`` pseudo-reviews
+    at the national mean) and ranked with RANK() window functions
+    nationally and per province / district. The overall rating ranks are
+    copied to OfficeAnalytics. Returns the number of ranked offices.
+    """
+    now = now or datetime.utcnow()
+    db.execute(delete(OfficeRanking))
+    for metric, (sum_column, count_column, scale, higher_is_better) in RANKING_METRICS.items():
+        value_sum, count = getattr(OfficeAnalytics, sum_column), getattr(OfficeAnalytics, count_column)
+        total_sum, total_count = db.execute(select(func.sum(value_sum), func.sum(count))).one()
+        if not total_count:
+            continue
+        prior = literal(float(total_sum) / total_count)
+        score = (value_sum + prior * RANKING_PRIOR_REVIEWS) * scale / (count + RANKING_PRIOR_REVIEWS)
+        order = score.desc() if higher_is_better else score.asc()
+        ranked = select(
+            literal(metric).label('metric'),
+            OfficeAnalytics.office_id,
+            Office.district,
+            Office.province,
+            (value_sum * scale / count).label('value'),
+            score.label('score'),
+            count.label('review_count'),
+            func.rank().over(order_by=order).label('national_rank'),
+            func.rank().over(partition_by=Office.province, order_by=order).label('province_rank'),
+            func.rank().over(partition_by=Office.district, order_by=order).label('district_rank'),
+            literal(now, DateTime).label('refreshed_at'),
+        ).join(
+            Office, Office.id == OfficeAnalytics.office_id
+        ).where(
+            count >= MIN_REVIEWS_FOR_RANKING
+        )
+        db.execute(insert(OfficeRanking).from_select(list(ranked.selected_columns.keys()), ranked))
+
+    ranked = db.execute(
+        select(OfficeAnalytics.id, OfficeRanking.district_rank, OfficeRanking.province_rank, OfficeRanking.national_rank)
+        .join(OfficeRanking, OfficeRanking.office_id == OfficeAnalytics.office_id)
+        .where(OfficeRanking.metric == 'overall_rating')
+    ).all()
+    db.execute(update(OfficeAnalytics).values(
+        district_rank=None, province_rank=None, national_rank=None
+    ).execution_options(synchronize_session=False))
+    if ranked:
+        db.execute(update(OfficeAnalytics), [row._asdict() for row in ranked])
+    return len(ranked)
+
+
+def reconcile_office_analytics(db: Session) -> int:
+    """Rebuild every OfficeAnalytics row from closed-month summaries and live visits in one grouped query, then re-rank"""
+    visits = visit_totals()
+    columns = [
+        visits.c.office_id,
+        func.min(visits.c.min_wait_time_minutes).label('min_wait_time_minutes'),
+        func.max(visits.c.max_wait_time_minutes).label('max_wait_time_minutes'),
+    ] + [func.coalesce(func.sum(visits.c[column]), 0).label(column) for column in COUNTER_COLUMNS]
+
+    totals = {
+        row.office_id: row._asdict()
+        for row in db.execute(select(*columns).group_by(visits.c.office_id))
+    }
+    existing = {analytics.office_id: analytics for analytics in db.query(OfficeAnalytics)}
+
+    now = datetime.utcnow()
+    for office_id in set(totals) | set(existing):
+        stats = totals.get(office_id, {})
+        analytics = existing.get(office_id)
+        if analytics is None:
+            analytics = OfficeAnalytics(office_id=office_id)
+            db.add(analytics)
+
+        for column in COUNTER_COLUMNS:
+            setattr(analytics, column, stats.get(column) or 0)
+        analytics.min_wait_time_minutes = stats.get('min_wait_time_minutes') or 0
+        analytics.max_wait_time_minutes = stats.get('max_wait_time_minutes') or 0
+
+        total = analytics.total_visits
+        analytics.success_rate = analytics.successful_visits * 100.0 / total if total else 0.0
+        analytics.bribe_rate = analytics.bribe_reports * 100.0 / total if total else 0.0
+        for sum_column, count_column, average_column in AVERAGED_FIELDS.values():
+            count = getattr(analytics, count_column)
+            setattr(analytics, average_column, getattr(analytics, sum_column) / count if count else 0.0)
+        analytics.last_calculated = now
+
+    db.flush()
+    refresh_rankings(db)
+    db.commit()
+    return len(totals)
+
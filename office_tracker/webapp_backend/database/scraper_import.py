@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Bulk import of scraper office data
+
+Offices and services from ``comprehensive_nepal_offices_*.json`` are upserted
+in batches instead of one existence check, insert and flush per office:
+
+1. Existing offices (by scraper ``office_id``) are pre-loaded in one query
+2. Each batch of new offices is inserted with one executemany INSERT ...
+   RETURNING to get their ids; changed offices are bulk-updated by id
+3. Services of the batch are matched on (office, ``service_id``) with one
+   query, then bulk-inserted or bulk-updated. Services are never deleted or
+   re-created, so existing visits keep pointing at them.
+
+Large files are parsed incrementally with ``ijson`` when it is installed.
+Any change invalidates the office picker's reference-data cache.
+"""
+
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, Iterator, List
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from database.office_search import rebuild_search_index
+from database.reference_cache import reference_cache
+from models.database_models import Office, OfficeService
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+BATCH_SIZE = 500
+
+OFFICE_FIELDS = ['name', 'name_nepali', 'office_type', 'district', 'province', 'address', 'phone', 'website']
+SERVICE_FIELDS = ['service_name', 'service_name_nepali', 'fees', 'processing_time', 'required_documents']
+
+
+def iter_scraper_offices(path: str, streaming: bool = None) -> Iterator[Dict[str, Any]]:
+    """Yield the ``offices`` entries of a scraper JSON file (streamed when ijson is available)"""
+    streaming = IJSON_AVAILABLE if streaming is None else streaming
+    if streaming and not IJSON_AVAILABLE:
+        raise RuntimeError("Streaming JSON import requires the 'ijson' package")
+
+    with open(path, 'rb' if streaming else 'r', **({} if streaming else {'encoding': 'utf-8'})) as f:
+        if streaming:
+            # use_float keeps fees as floats instead of Decimal (JSON column)
+            yield from ijson.items(f, 'offices.item', use_float=True)
+        else:
+            yield from json.load(f).get('offices', [])
+
+
+def office_values(office_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Scraper office entry -> ``Office`` column values"""
+    location = office_data['location']
+    contact = office_data.get('contact', {})
+    return {
+        'office_id': office_data['id'],
+        'name': office_data['name'],
+        'name_nepali': office_data.get('name_nepali'),
+        'office_type': office_data['type'],
+        'district': location['district'],
+        'province': location['province'],
+        'address': location.get('address'),
+        'phone': contact.get('phone_general'),
+        'website': contact.get('website'),
+    }
+
+
+def service_values(service_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Scraper service entry -> ``OfficeService`` column values (without office id)"""
+    return {
+        'service_id': service_data['service_id'],
+        'service_name': service_data['service_name'],
+        'service_name_nepali': service_data.get('service_name_nepali'),
+        'fees': service_data.get('fees', {}),
+        'processing_time': service_data.get('processing_times', {}).get('total_normal'),
+        'required_documents': service_data.get('required_documents', []),
+    }
+
+
+def _changed(existing, values: Dict[str, Any], fields: List[str]) -> bool:
+    return any(getattr(existing, field) != values[field] for field in fields)
+
+
+def _batches(items: Iterable, size: int) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _upsert_offices(db: Session, batch: List[Dict[str, Any]], existing: Dict[str, Any], stats: Dict[str, int]) -> Dict[str, int]:
+    """Insert/update one batch of offices; returns scraper office_id -> database id"""
+    ids, new_rows, changed_rows = {}, [], []
+    now = datetime.utcnow()
+    for office_data in batch:
+        values = office_values(office_data)
+        current = existing.get(values['office_id'])
+        if current is None:
+            new_rows.append(dict(values, created_at=now, updated_at=now))
+        else:
+            ids[values['office_id']] = current.id
+            if _changed(current, values, OFFICE_FIELDS):
+                changed_rows.append(dict({field: values[field] for field in OFFICE_FIELDS}, id=current.id, updated_at=now))
+
+    # Later duplicates of the same office_id in one batch win, as in a refresh
+    new_rows = {row['office_id']: row for row in new_rows}
+    if new_rows:
+        inserted = db.execute(insert(Office).returning(Office.id, Office.office_id), list(new_rows.values()))
+        for office_pk, office_id in inserted:
+            ids[office_id] = office_pk
+            # Later batches compare against what was just inserted
+            existing[office_id] = SimpleNamespace(id=office_pk, **{f: new_rows[office_id][f] for f in OFFICE_FIELDS})
+    if changed_rows:
+        db.execute(update(Office), changed_rows)
+
+    stats['offices_inserted'] += len(new_rows)
+    stats['offices_updated'] += len(changed_rows)
+    return ids
+
+
+def _upsert_services(db: Session, batch: List[Dict[str, Any]], ids: Dict[str, int], stats: Dict[str, int],
+                     touched: set):
+    """Insert/update one batch of services; adds the offices whose services changed to ``touched``"""
+    columns = [OfficeService.id, OfficeService.office_id, OfficeService.service_id]
+    existing = {
+        (service.office_id, service.service_id): service
+        for service in db.execute(
+            select(*columns, *[getattr(OfficeService, f) for f in SERVICE_FIELDS])
+            .where(OfficeService.office_id.in_(set(ids.values())))
+        )
+    }
+
+    new_rows, changed_rows = {}, []
+    for office_data in batch:
+        office_pk = ids[office_data['id']]
+        for service_data in office_data.get('services', []):
+            values = service_values(service_data)
+            current = existing.get((office_pk, values['service_id']))
+            if current is None:
+                new_rows[(office_pk, values['service_id'])] = dict(values, office_id=office_pk)
+                touched.add(office_pk)
+            elif _changed(current, values, SERVICE_FIELDS):
+                changed_rows.append(dict({field: values[field] for field in SERVICE_FIELDS}, id=current.id))
+                touched.add(office_pk)
+
+    if new_rows:
+        db.execute(insert(OfficeService), list(new_rows.values()))
+    if changed_rows:
+        db.execute(update(OfficeService), changed_rows)
+
+    stats['services_inserted'] += len(new_rows)
+    stats['services_updated'] += len(changed_rows)
+
+
+def import_scraper_offices(db: Session, offices: Iterable[Dict[str, Any]], batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """
+    Upsert scraper offices and their services in batches; commits once at
+    the end, then rebuilds the office search index if anything changed
+    """
+    stats = dict.fromkeys(['offices_seen', 'offices_inserted', 'offices_updated',
+                           'services_inserted', 'services_updated'], 0)
+
+    existing = {
+        office.office_id: office
+        for office in db.execute(select(Office.id, Office.office_id, *[getattr(Office, f) for f in OFFICE_FIELDS]))
+    }
+
+    touched = set()
+    for batch in _batches(offices, batch_size):
+        stats['offices_seen'] += len(batch)
+        ids = _upsert_offices(db, batch, existing, stats)
+        _upsert_services(db, batch, ids, stats, touched)
+
+    if touched:
+        # offices.updated_at is the reference-data version marker other processes check
+        db.execute(update(Office).where(Office.id.in_(touched)).values(updated_at=datetime.utcnow()))
+    db.commit()
+    if stats['offices_inserted'] or stats['offices_updated'] or stats['services_inserted'] or stats['services_updated']:
+        rebuild_search_index(db)
+        reference_cache.invalidate()
+    return stats
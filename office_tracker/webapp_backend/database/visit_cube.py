@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+"Best time to visit" cube: visits and wait times by weekday x hour
+
+Every office x service keeps one ``visit_time_cubes`` row holding two dense
+NumPy arrays indexed by the weekday and hour (Nepal time) the citizen
+arrived:
+
+- ``histogram``: int32 [7, 24, len(WAIT_BUCKET_EDGES)] visit counts per
+  wait-time bucket, from which per-slot medians are interpolated
+- ``wait_totals``: float64 [7, 24] summed wait minutes (exact means)
+
+Visit endpoints add ended visits in the same transaction as the visit; a
+wait time that is replaced is rebuilt from that office x service's visits
+(as in ``wait_sketches.py``). ``rebuild_visit_cubes`` is the rollup job and
+runs with the periodic analytics reconciliation; it adds the closed months'
+cubes (kept zlib-compressed in ``monthly_visit_summaries``) to the live
+visits. Reading an office's heatmap is one indexed query and a sum of small
+arrays.
+"""
+
+import os
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from database.rollups import live_visits
+from models.database_models import MonthlyVisitSummary, OfficeVisit, VisitTimeCube
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+HOURS = 24
+# Lower bound (minutes) of each wait bucket; the last bucket is open-ended
+WAIT_BUCKET_EDGES = np.array([0, 5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 240, 360, 480])
+OPEN_BUCKET_WIDTH = 240  # Assumed width of the last bucket when interpolating medians
+CUBE_SHAPE = (len(WEEKDAYS), HOURS, len(WAIT_BUCKET_EDGES))
+
+# Slots are reported in local time (Nepal Standard Time, UTC+5:45)
+VISIT_CUBE_UTC_OFFSET_MINUTES = int(os.getenv("VISIT_CUBE_UTC_OFFSET_MINUTES", 345))
+# A slot needs this many visits before it can be recommended
+BEST_TIME_MIN_VISITS = int(os.getenv("BEST_TIME_MIN_VISITS", 3))
+
+Pair = Tuple[int, int]
+
+
+class _Cube:
+    __slots__ = ('histogram', 'wait_totals')
+
+    def __init__(self, histogram: np.ndarray = None, wait_totals: np.ndarray = None):
+        self.histogram = np.zeros(CUBE_SHAPE, dtype=np.int32) if histogram is None else histogram
+        self.wait_totals = np.zeros(CUBE_SHAPE[:2], dtype=np.float64) if wait_totals is None else wait_totals
+
+    @classmethod
+    def from_row(cls, row) -> '_Cube':
+        return cls(
+            np.frombuffer(row.histogram, dtype=np.int32).reshape(CUBE_SHAPE).copy(),
+            np.frombuffer(row.wait_totals, dtype=np.float64).reshape(CUBE_SHAPE[:2]).copy()
+        )
+
+    @classmethod
+    def from_compressed(cls, histogram: bytes, wait_totals: bytes) -> '_Cube':
+        return cls.from_row(SimpleNamespace(histogram=zlib.decompress(histogram), wait_totals=zlib.decompress(wait_totals)))
+
+    def compressed(self) -> Tuple[bytes, bytes]:
+        """(histogram, wait_totals) as stored in a closed month's summary"""
+        return zlib.compress(self.histogram.tobytes()), zlib.compress(self.wait_totals.tobytes())
+
+    def merge(self, other: '_Cube'):
+        self.histogram += other.histogram
+        self.wait_totals += other.wait_totals
+
+    def add(self, weekdays: np.ndarray, hours: np.ndarray, waits: np.ndarray):
+        np.add.at(self.histogram, (weekdays, hours, wait_buckets(waits)), 1)
+        np.add.at(self.wait_totals, (weekdays, hours), waits)
+
+
+def compressed_cube(start_times: Sequence[datetime], waits: Sequence[int]) -> Tuple[bytes, bytes]:
+    """zlib-compressed (histogram, wait_totals) of the given visits, as kept for a closed month"""
+    cube = _Cube()
+    cube.add(*arrival_slots(start_times), np.array(waits))
+    return cube.compressed()
+
+
+def arrival_slots(start_times: Sequence[datetime]) -> Tuple[np.ndarray, np.ndarray]:
+    """Local (weekday, hour) of naive UTC start times; Monday is weekday 0"""
+    minutes = np.array(start_times, dtype='datetime64[m]') + np.timedelta64(VISIT_CUBE_UTC_OFFSET_MINUTES, 'm')
+    days = minutes.astype('datetime64[D]')
+    weekdays = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    hours = (minutes - days).astype(np.int64) // 60
+    return weekdays, hours
+
+
+def wait_buckets(waits: np.ndarray) -> np.ndarray:
+    return np.searchsorted(WAIT_BUCKET_EDGES, np.maximum(waits, 0), side='right') - 1
+
+
+def median_waits(histogram: np.ndarray) -> np.ndarray:
+    """Per-slot median wait (minutes) interpolated within its bucket; NaN for empty slots"""
+    counts = histogram.sum(axis=-1)
+    cumulative = histogram.cumsum(axis=-1)
+    half = counts[..., None] / 2
+    bucket = np.minimum((cumulative < half).sum(axis=-1), len(WAIT_BUCKET_EDGES) - 1)
+    below = np.take_along_axis(cumulative, bucket[..., None], axis=-1)[..., 0] - \
+        np.take_along_axis(histogram, bucket[..., None], axis=-1)[..., 0]
+    in_bucket = np.take_along_axis(histogram, bucket[..., None], axis=-1)[..., 0]
+    widths = np.append(np.diff(WAIT_BUCKET_EDGES), OPEN_BUCKET_WIDTH)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = np.where(in_bucket > 0, (counts / 2 - below) / in_bucket, 0)
+        return np.where(counts > 0, WAIT_BUCKET_EDGES[bucket] + fraction * widths[bucket], np.nan)
+
+
+def _visit_cubes(db: Session, pairs: Optional[Sequence[Pair]] = None) -> Dict[Pair, _Cube]:
+    """
+    Cubes built from the ended live visits and the closed months' cubes (all,
+    or only the given office x service pairs)
+    """
+    query = select(OfficeVisit.office_id, OfficeVisit.service_id, OfficeVisit.start_time,
+                   OfficeVisit.wait_duration_minutes).where(
+        OfficeVisit.wait_duration_minutes.isnot(None), OfficeVisit.start_time.isnot(None), live_visits()
+    )
+    closed = select(MonthlyVisitSummary.office_id, MonthlyVisitSummary.service_id,
+                    MonthlyVisitSummary.cube_histogram, MonthlyVisitSummary.cube_wait_totals).where(
+        MonthlyVisitSummary.cube_histogram.isnot(None)
+    )
+    if pairs is not None:
+        service_ids = {service_id for _, service_id in pairs}
+        query = query.where(OfficeVisit.service_id.in_(service_ids))
+        closed = closed.where(MonthlyVisitSummary.service_id.in_(service_ids))
+    grouped: Dict[Pair, Tuple[List[datetime], List[int]]] = defaultdict(lambda: ([], []))
+    for office_id, service_id, start_time, wait in db.execute(query):
+        if pairs is None or (office_id, service_id) in pairs:
+            start_times, waits = grouped[(office_id, service_id)]
+            start_times.append(start_time)
+            waits.append(wait)
+
+    cubes = {}
+    for pair, (start_times, waits) in grouped.items():
+        cube = cubes[pair] = _Cube()
+        cube.add(*arrival_slots(start_times), np.array(waits))
+    for office_id, service_id, histogram, wait_totals in db.execute(closed):
+        if pairs is None or (office_id, service_id) in pairs:
+            cubes.setdefault((office_id, service_id), _Cube()).merge(_Cube.from_compressed(histogram, wait_totals))
+    return cubes
+
+
+def _store(db: Session, cubes: Dict[Pair, _Cube], existing: Dict[Pair, int]):
+    """Insert or update cube rows; ``existing`` maps office x service to row id"""
+    now = datetime.utcnow()
+    new_rows, changed_rows = [], []
+    for (office_id, service_id), cube in cubes.items():
+        values = {'histogram': cube.histogram.tobytes(), 'wait_totals': cube.wait_totals.tobytes(),
+                  'count': int(cube.histogram.sum()), 'updated_at': now}
+        if (office_id, service_id) in existing:
+            changed_rows.append(dict(values, id=existing[(office_id, service_id)]))
+        else:
+            new_rows.append(dict(values, office_id=office_id, service_id=service_id))
+    if new_rows:
+        db.execute(insert(VisitTimeCube), new_rows)
+    if changed_rows:
+        db.execute(update(VisitTimeCube), changed_rows)
+
+
+def record_visit_slots(db: Session, changes: Iterable[Tuple[int, int, Optional[datetime], Optional[int], Optional[int]]]):
+    """
+    Apply ``(office_id, service_id, start_time, old_wait, new_wait)`` visit
+    changes to the cubes. Must run inside the visit's transaction, before
+    ``db.commit()``.
+    """
+    added: Dict[Pair, Tuple[List[datetime], List[int]]] = defaultdict(lambda: ([], []))
+    rebuild = set()
+    for office_id, service_id, start_time, old_wait, new_wait in changes:
+        if old_wait == new_wait or start_time is None:
+            continue
+        if old_wait is not None:
+            rebuild.add((office_id, service_id))
+        elif new_wait is not None:
+            start_times, waits = added[(office_id, service_id)]
+            start_times.append(start_time)
+            waits.append(new_wait)
+    pairs = set(added) | rebuild
+    if not pairs:
+        return
+
+    db.flush()  # Rebuilds read the visits' new wait times
+    rows = db.execute(
+        select(VisitTimeCube.id, VisitTimeCube.office_id, VisitTimeCube.service_id,
+               VisitTimeCube.histogram, VisitTimeCube.wait_totals)
+        .where(VisitTimeCube.office_id.in_({office_id for office_id, _ in pairs}))
+        .with_for_update()
+    ).all()
+    rows = {(row.office_id, row.service_id): row for row in rows if (row.office_id, row.service_id) in pairs}
+
+    cubes = _visit_cubes(db, sorted(rebuild)) if rebuild else {}
+    for pair in rebuild:
+        cubes.setdefault(pair, _Cube())
+    for pair, (start_times, waits) in added.items():
+        if pair in rebuild:
+            continue
+        cube = _Cube.from_row(rows[pair]) if pair in rows else _Cube()
+        cube.add(*arrival_slots(start_times), np.array(waits))
+        cubes[pair] = cube
+    _store(db, cubes, {pair: row.id for pair, row in rows.items()})
+
+
+def rebuild_visit_cubes(db: Session) -> int:
+    """Recompute every cube from the visits (one scan); commits"""
+    cubes = _visit_cubes(db)
+    existing = {
+        (row.office_id, row.service_id): row.id
+        for row in db.execute(select(VisitTimeCube.id, VisitTimeCube.office_id, VisitTimeCube.service_id))
+    }
+    stale = [row_id for pair, row_id in existing.items() if pair not in cubes]
+    if stale:
+        db.execute(delete(VisitTimeCube).where(VisitTimeCube.id.in_(stale)))
+    _store(db, cubes, existing)
+    db.commit()
+    return len(cubes)
+
+
+def best_time_heatmap(db: Session, office_id: int, service_id: int = None) -> Dict[str, Any]:
+    """
+    7 x 24 heatmap of visits and median wait for an office (optionally one
+    service), plus the slot with the shortest median wait among slots with at
+    least ``BEST_TIME_MIN_VISITS`` visits.
+    """
+    query = select(VisitTimeCube.histogram, VisitTimeCube.wait_totals).where(VisitTimeCube.office_id == office_id)
+    if service_id is not None:
+        query = query.where(VisitTimeCube.service_id == service_id)
+    cube = _Cube()
+    for row in db.execute(query):
+        cube.merge(_Cube.from_row(row))
+
+    visits = cube.histogram.sum(axis=-1)
+    medians = median_waits(cube.histogram)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        averages = cube.wait_totals / visits
+
+    recommended = None
+    candidates = np.where(visits >= BEST_TIME_MIN_VISITS, medians, np.inf)
+    if np.isfinite(candidates).any():
+        # Shortest median wait; among equal medians the busiest (best-known) slot
+        order = np.lexsort((-visits.ravel(), candidates.ravel()))
+        weekday, hour = np.unravel_index(order[0], visits.shape)
+        recommended = {
+            'weekday': int(weekday),
+            'weekday_name': WEEKDAYS[weekday],
+            'hour': int(hour),
+            'visits': int(visits[weekday, hour]),
+            'median_wait_minutes': round(float(medians[weekday, hour]), 1),
+            'avg_wait_minutes': round(float(averages[weekday, hour]), 1),
+        }
+
+    def grid(values, digits=None):
+        return [[None if np.isnan(value) else round(float(value), digits) for value in day] for day in values]
+
+    return {
+        'weekdays': list(WEEKDAYS),
+        'hours': list(range(HOURS)),
+        'utc_offset_minutes': VISIT_CUBE_UTC_OFFSET_MINUTES,
+        'total_visits': int(visits.sum()),
+        'visits': visits.tolist(),
+        'median_wait_minutes': grid(medians, 1),
+        'avg_wait_minutes': grid(averages, 1),
+        'recommended': recommended,
+    }
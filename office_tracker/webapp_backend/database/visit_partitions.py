@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Monthly partitions of ``office_visits``: closed-month summaries and archival
+
+``office_visits`` is split by calendar month (UTC, by ``visit_date``) into
+closed months and the live partition:
+
+- ``close_months`` closes every month that ended at least
+  ``VISIT_MONTH_CLOSE_GRACE_DAYS`` ago, oldest first. Closing writes one
+  ``monthly_visit_summaries`` row per office x service with the rollup
+  counters, the month's wait-time sketch and its zlib-compressed visit cube,
+  then a ``visit_months`` row. Months are closed contiguously, so the live
+  partition is simply ``visit_date >= max(visit_months.ends_at)``
+  (``rollups.live_visits``).
+- Rollups, rankings, sketches and cubes read summaries UNION ALL the live
+  partition (``rollups.visit_totals``), so all-time figures never scan
+  closed months' visits, and they stay correct once those are archived.
+- ``archive_month`` copies a closed month's visits (with their sync and
+  outcome events and processed feedback) to ``office_visits_YYYY_MM.sqlite``
+  in ``VISIT_ARCHIVE_DIR``, checks the copy and deletes them from the
+  database.
+
+A late offline sync, end or rating dated in a closed month is kept in
+``office_visits`` and, like any change, applied to ``office_analytics``
+straight away. Its summaries catch up on the next ``close_months`` (the
+hourly reconcile, which would otherwise rebuild the rollups from the stale
+summaries): months with visits written after their ``closed_at`` are closed
+again, which is possible until they are archived. The grace period is what
+keeps that rare.
+
+Native PostgreSQL partitioning (``PARTITION BY RANGE (visit_date)``) would
+need ``visit_date`` in the primary key of ``office_visits``, whose ``id`` is
+referenced by ``synced_visit_events``, ``visit_outcome_events`` and
+``office_alerts``; the summaries give the same pruning on SQLite and
+PostgreSQL.
+
+    python -m database.visit_partitions close
+    python -m database.visit_partitions archive --before 2025-01
+    python -m database.visit_partitions status
+"""
+
+import argparse
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import create_engine, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from database.rollups import visit_counters
+from database.visit_cube import compressed_cube
+from database.wait_sketches import DDSketch
+from models.database_models import (
+    Base, MonthlyVisitSummary, OfficeAlert, OfficeVisit, SyncedVisitEvent, VisitFeedback, VisitMonth,
+    VisitOutcomeEvent
+)
+
+# A month is closed this many days after it ends (late syncs and ratings still land in it)
+VISIT_MONTH_CLOSE_GRACE_DAYS = int(os.getenv("VISIT_MONTH_CLOSE_GRACE_DAYS", 7))
+VISIT_ARCHIVE_DIR = os.getenv("VISIT_ARCHIVE_DIR", "./visit_archive")
+ARCHIVE_BATCH = 5000
+
+# Tables moved to a month's archive file: the visits and the rows that reference them
+ARCHIVED_TABLES = (OfficeVisit, SyncedVisitEvent, VisitOutcomeEvent, VisitFeedback)
+
+
+def month_key(moment: datetime) -> str:
+    return f"{moment.year:04d}-{moment.month:02d}"
+
+
+def month_bounds(month: str) -> Tuple[datetime, datetime]:
+    """[start, end) of a ``YYYY-MM`` month"""
+    start = datetime.strptime(month, "%Y-%m")
+    end = datetime(start.year + 1, 1, 1) if start.month == 12 else datetime(start.year, start.month + 1, 1)
+    return start, end
+
+
+def _in_month(start: datetime, end: datetime):
+    return OfficeVisit.visit_date >= start, OfficeVisit.visit_date < end
+
+
+def close_month(db: Session, month: str) -> int:
+    """
+    (Re)build the summaries of one month from its visits and mark it closed;
+    commits. Returns the month's visit count.
+    """
+    start, end = month_bounds(month)
+    closed_at = datetime.utcnow()  # Before the visits are read, so a write racing the close is picked up again
+    closed = db.get(VisitMonth, month)
+    if closed is not None and closed.archived_at is not None:
+        raise ValueError(f"{month} is archived; its visits are in {closed.archive_path}")
+
+    summaries = {
+        (row.office_id, row.service_id): dict(row._asdict(), month=month)
+        for row in db.execute(visit_counters(*_in_month(start, end)))
+    }
+
+    waits: Dict[Tuple[int, int], Tuple[List[datetime], List[int]]] = defaultdict(lambda: ([], []))
+    for office_id, service_id, start_time, wait in db.execute(
+        select(OfficeVisit.office_id, OfficeVisit.service_id, OfficeVisit.start_time, OfficeVisit.wait_duration_minutes)
+        .where(*_in_month(start, end), OfficeVisit.wait_duration_minutes.isnot(None))
+    ):
+        start_times, pair_waits = waits[(office_id, service_id)]
+        start_times.append(start_time)
+        pair_waits.append(wait)
+    for pair, (start_times, pair_waits) in waits.items():
+        sketch = DDSketch()
+        for wait in pair_waits:
+            sketch.add(max(wait, 0))
+        summaries[pair]['wait_sketch'] = sketch.to_dict()
+        slotted = [(moment, wait) for moment, wait in zip(start_times, pair_waits) if moment is not None]
+        if slotted:
+            summaries[pair]['cube_histogram'], summaries[pair]['cube_wait_totals'] = compressed_cube(*zip(*slotted))
+
+    total = sum(summary['total_visits'] for summary in summaries.values())
+    db.execute(delete(MonthlyVisitSummary).where(MonthlyVisitSummary.month == month))
+    if closed is None:
+        db.add(VisitMonth(month=month, starts_at=start, ends_at=end, visits=total, closed_at=closed_at))
+    else:
+        closed.visits = total
+        closed.closed_at = closed_at
+    db.flush()
+    if summaries:
+        db.execute(insert(MonthlyVisitSummary), list(summaries.values()))
+    db.commit()
+    return total
+
+
+def stale_months(db: Session) -> List[str]:
+    """
+    Closed, unarchived months holding visits written after they were closed
+    (late syncs, ends and ratings dated in them), oldest first
+    """
+    closed_at = dict(db.execute(
+        select(VisitMonth.month, VisitMonth.closed_at).where(VisitMonth.archived_at.is_(None))
+    ).all())
+    if not closed_at:
+        return []
+    live_since = db.execute(select(func.max(VisitMonth.ends_at))).scalar()
+    stale = set()
+    # Only visits written since the oldest close are read (ix_office_visits_updated_at)
+    for visit_date, updated_at in db.execute(
+        select(OfficeVisit.visit_date, OfficeVisit.updated_at)
+        .where(OfficeVisit.updated_at > min(closed_at.values()), OfficeVisit.visit_date < live_since)
+    ):
+        month = month_key(visit_date)
+        if month in closed_at and updated_at > closed_at[month]:
+            stale.add(month)
+    return sorted(stale)
+
+
+def close_months(db: Session, now: datetime = None) -> List[str]:
+    """
+    Close, oldest first, every unclosed month that ended
+    ``VISIT_MONTH_CLOSE_GRACE_DAYS`` ago, then close again the closed months
+    that changed since (``stale_months``); commits. Returns the months closed.
+    """
+    now = now or datetime.utcnow()
+    closed = []
+    for month in stale_months(db):
+        close_month(db, month)
+        closed.append(month)
+
+    live_since = db.execute(select(func.max(VisitMonth.ends_at))).scalar()
+    if live_since is None:
+        live_since = db.execute(select(func.min(OfficeVisit.visit_date))).scalar()
+        if live_since is None:
+            return closed
+    month = month_key(live_since)
+    while month_bounds(month)[1] + timedelta(days=VISIT_MONTH_CLOSE_GRACE_DAYS) <= now:
+        close_month(db, month)
+        closed.append(month)
+        month = month_key(month_bounds(month)[1])
+    return closed
+
+
+def archive_path(month: str, archive_dir: str = VISIT_ARCHIVE_DIR) -> str:
+    return os.path.join(archive_dir, f"office_visits_{month.replace('-', '_')}.sqlite")
+
+
+def _copy(db: Session, archive, table, query) -> List[Dict[str, Any]]:
+    """Copy the rows of ``table`` selected by ``query`` to the archive; returns them"""
+    rows = [dict(row._mapping) for row in db.execute(query)]
+    if rows:
+        with archive.begin() as conn:
+            conn.execute(insert(table.__table__), rows)
+    return rows
+
+
+def archive_month(db: Session, month: str, archive_dir: str = VISIT_ARCHIVE_DIR) -> Dict[str, Any]:
+    """
+    Move a closed month's visits, and the sync / outcome events and
+    processed feedback referencing them, to the month's SQLite archive;
+    commits. Alerts keep their history but lose the link to the visit, and
+    office feedback term counts keep counting the archived texts.
+    """
+    closed = db.get(VisitMonth, month)
+    if closed is None:
+        raise ValueError(f"{month} is not closed")
+    if closed.archived_at is not None:
+        raise ValueError(f"{month} is already archived in {closed.archive_path}")
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = archive_path(month, archive_dir)
+    if os.path.exists(path):
+        os.remove(path)  # Left by an interrupted run; the live rows were not deleted
+    archive = create_engine(f"sqlite:///{path}")
+    counts = dict.fromkeys((table.__tablename__ for table in ARCHIVED_TABLES), 0)
+    try:
+        Base.metadata.create_all(archive, tables=[table.__table__ for table in ARCHIVED_TABLES])
+        visit_ids: List[int] = []
+        while True:
+            last_id = visit_ids[-1] if visit_ids else 0
+            visits = _copy(db, archive, OfficeVisit, select(OfficeVisit.__table__).where(
+                *_in_month(closed.starts_at, closed.ends_at), OfficeVisit.id > last_id
+            ).order_by(OfficeVisit.id).limit(ARCHIVE_BATCH))
+            if not visits:
+                break
+            ids = [visit['id'] for visit in visits]
+            counts[OfficeVisit.__tablename__] += len(ids)
+            for table in ARCHIVED_TABLES[1:]:
+                counts[table.__tablename__] += len(_copy(db, archive, table,
+                                                         select(table.__table__).where(table.visit_id.in_(ids))))
+            visit_ids += ids
+
+        with archive.connect() as conn:
+            archived = {table.__tablename__: conn.execute(select(func.count()).select_from(table.__table__)).scalar()
+                        for table in ARCHIVED_TABLES}
+    finally:
+        archive.dispose()
+    if archived != counts:
+        raise RuntimeError(f"Archive of {month} is incomplete: {archived} rows copied of {counts}")
+    if counts[OfficeVisit.__tablename__] != closed.visits:
+        # Visits dated in the month arrived after it was closed: re-close it so the summaries keep them
+        raise RuntimeError(f"{month} has {counts[OfficeVisit.__tablename__]} visits but {closed.visits} were "
+                           f"summarized; close it again before archiving")
+
+    for offset in range(0, len(visit_ids), ARCHIVE_BATCH):
+        ids = visit_ids[offset:offset + ARCHIVE_BATCH]
+        db.execute(update(OfficeAlert).where(OfficeAlert.visit_id.in_(ids)).values(visit_id=None))
+        for table in reversed(ARCHIVED_TABLES):
+            column = table.id if table is OfficeVisit else table.visit_id
+            db.execute(delete(table).where(column.in_(ids)))
+    closed.archived_at = datetime.utcnow()
+    closed.archive_path = path
+    db.commit()
+    return dict(counts, month=month, path=path)
+
+
+def visit_months(db: Session) -> List[Dict[str, Any]]:
+    return [
+        {'month': row.month, 'visits': row.visits, 'closed_at': row.closed_at,
+         'archived_at': row.archived_at, 'archive_path': row.archive_path}
+        for row in db.execute(select(VisitMonth).order_by(VisitMonth.month)).scalars()
+    ]
+
+
+def main():
+    from database.connection import DATABASE_URL
+    from database.engine_config import create_profiled_engine, current_profile
+    from sqlalchemy.orm import sessionmaker
+
+    parser = argparse.ArgumentParser(description="Close and archive monthly partitions of office_visits")
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    commands = parser.add_subparsers(dest="command", required=True)
+    close = commands.add_parser("close", help="Close every month past the grace period and re-close changed ones (or re-close one)")
+    close.add_argument("--month", help="YYYY-MM month to (re)close")
+    archive = commands.add_parser("archive", help="Move closed months' visits to per-month SQLite files")
+    which = archive.add_mutually_exclusive_group(required=True)
+    which.add_argument("--month", help="YYYY-MM month to archive")
+    which.add_argument("--before", help="Archive every closed month before this YYYY-MM month")
+    archive.add_argument("--archive-dir", default=VISIT_ARCHIVE_DIR)
+    commands.add_parser("status", help="List closed and archived months")
+    args = parser.parse_args()
+
+    engine = create_profiled_engine(args.database_url, current_profile())
+    db = sessionmaker(bind=engine)()
+    try:
+        if args.command == "close":
+            if args.month:
+                close_month(db, args.month)
+            months = [args.month] if args.month else close_months(db)
+            for month in months:
+                print(f"✅ Closed {month}")
+            if not months:
+                print("⚠️ No month is past the grace period")
+        elif args.command == "archive":
+            months = [args.month] if args.month else [
+                row['month'] for row in visit_months(db) if row['month'] < args.before and row['archived_at'] is None
+            ]
+            for month in months:
+                stats = archive_month(db, month, args.archive_dir)
+                print(f"📦 {month}: {stats['office_visits']:,} visits, {stats['synced_visit_events']:,} sync events, "
+                      f"{stats['visit_outcome_events']:,} outcome events -> {stats['path']}")
+        else:
+            for row in visit_months(db):
+                state = f"archived to {row['archive_path']}" if row['archived_at'] else "closed"
+                print(f"{row['month']}: {row['visits']:,} visits, {state}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
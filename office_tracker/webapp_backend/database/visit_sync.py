@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Batch ingestion of visit events recorded offline
+
+Clients with poor connectivity queue start/end/rating events (each with an
+``event_id`` UUID, grouped by the ``client_visit_id`` UUID assigned when the
+timer started) and replay them in one request. The whole batch is applied in
+one transaction with set-based lookups:
+
+1. Already-applied ``event_id``s (``synced_visit_events``), referenced
+   offices, services and client visits are each loaded with one query
+2. Events are applied in start -> end -> rating order, so a batch may hold
+   a complete visit; invalid events are rejected individually
+3. New visits are inserted with one executemany INSERT ... RETURNING,
+   office rollups, wait-time sketches and visit cubes are updated once per
+   office (and office x service), outcomes are logged for the anomaly
+   detector, changed feedback texts are flagged for the feedback pipeline
+   and the applied event ids are recorded, so replaying the batch (or any
+   part of it) is a no-op
+"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from database.active_visits import ActiveVisit
+from database.anomaly_detector import record_outcome_events
+from database.feedback_terms import set_visit_feedback
+from database.rollups import apply_visit_changes, visit_snapshot
+from database.visit_cube import record_visit_slots
+from database.wait_sketches import record_wait_times
+from models.database_models import Office, OfficeService, OfficeVisit, ServiceStatus, SyncedVisitEvent
+from models.pydantic_models import SyncEventType, VisitRating, VisitSyncEvent
+
+EVENT_ORDER = {SyncEventType.START: 0, SyncEventType.END: 1, SyncEventType.RATING: 2}
+RATING_FIELDS = [field for field in VisitRating.model_fields if field not in ('suggestions', 'complaints')]
+
+
+def _utc(moment: datetime, now: datetime) -> datetime:
+    """Naive UTC like the rest of the schema; client clocks ahead of the server are clamped"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(moment, now)
+
+
+def _start(event: VisitSyncEvent, offices: Dict[int, Office], services: Dict[int, OfficeService],
+           occurred_at: datetime, now: datetime) -> Tuple[Optional[SimpleNamespace], Optional[str]]:
+    """New visit as plain column values (inserted in bulk once the batch is applied)"""
+    if event.office_id is None or event.service_id is None:
+        return None, "office_id and service_id are required"
+    if event.office_id not in offices:
+        return None, "Office not found"
+    service = services.get(event.service_id)
+    if service is None or service.office_id != event.office_id:
+        return None, "Service not found for this office"
+    values = {column.key: None for column in OfficeVisit.__table__.columns}
+    values.update(
+        office_id=event.office_id,
+        service_id=event.service_id,
+        user_id=event.user_id,
+        client_visit_id=str(event.client_visit_id),
+        visit_date=occurred_at,
+        start_time=occurred_at,
+        service_status=ServiceStatus.IN_PROGRESS,
+        service_completed=False,
+        feedback_pending=False,
+        created_at=now,
+        updated_at=now
+    )
+    return SimpleNamespace(**values), None
+
+
+def _end(visit: OfficeVisit, event: VisitSyncEvent, occurred_at: datetime) -> Optional[str]:
+    if visit.end_time is not None:
+        return "Visit already ended"
+    if event.service_status not in (ServiceStatus.SUCCESS, ServiceStatus.FAILED):
+        return "service_status must be kaam_bhayo or kaam_bhayena"
+    visit.end_time = max(occurred_at, visit.start_time) if visit.start_time else occurred_at
+    visit.service_status = event.service_status
+    visit.service_completed = (event.service_status == ServiceStatus.SUCCESS)
+    if visit.start_time:
+        visit.wait_duration_minutes = int((visit.end_time - visit.start_time).total_seconds() / 60)
+    return None
+
+
+def _rate(visit: OfficeVisit, event: VisitSyncEvent, now: datetime) -> Optional[str]:
+    if event.rating is None:
+        return "rating is required"
+    for field in RATING_FIELDS:
+        setattr(visit, field, getattr(event.rating, field))
+    set_visit_feedback(visit, event.rating.suggestions, event.rating.complaints)
+    visit.updated_at = now
+    return None
+
+
+def apply_visit_events(db: Session, events: Sequence[VisitSyncEvent]) -> Tuple[List[Dict[str, Any]], List[ActiveVisit], List[OfficeVisit]]:
+    """
+    Apply a batch of offline events in one transaction; commits.
+
+    Returns the per-event results (in request order), the visits left
+    in progress by this batch and the previously active visits it ended
+    (for the live board, after the commit).
+    """
+    now = datetime.utcnow()
+    results: List[Dict[str, Any]] = [None] * len(events)
+    first_index: Dict[str, int] = {}
+    for index, event in enumerate(events):
+        first_index.setdefault(str(event.event_id), index)
+
+    applied_before = dict(db.execute(
+        select(SyncedVisitEvent.event_id, SyncedVisitEvent.visit_id)
+        .where(SyncedVisitEvent.event_id.in_(list(first_index)))
+    ).all())
+
+    pending = []
+    for index, event in enumerate(events):
+        event_id = str(event.event_id)
+        if event_id in applied_before:
+            results[index] = {"event_id": event.event_id, "status": "duplicate", "visit_id": applied_before[event_id]}
+        elif first_index[event_id] == index:
+            pending.append(index)
+
+    starts = [events[index] for index in pending if events[index].type == SyncEventType.START]
+    offices = {office.id: office for office in db.execute(
+        select(Office).where(Office.id.in_({event.office_id for event in starts if event.office_id is not None}))
+    ).scalars()}
+    services = {service.id: service for service in db.execute(
+        select(OfficeService).where(OfficeService.id.in_({event.service_id for event in starts if event.service_id is not None}))
+    ).scalars()}
+    visits = {visit.client_visit_id: visit for visit in db.execute(
+        select(OfficeVisit).where(OfficeVisit.client_visit_id.in_({str(events[index].client_visit_id) for index in pending}))
+    ).scalars()}
+
+    # id(visit) -> (visit, rollup snapshot before the batch); None marks visits created by it
+    before: Dict[int, Tuple[Any, Optional[Dict]]] = {}
+    was_active = {id(visit) for visit in visits.values() if visit.end_time is None}
+    applied: List[Tuple[int, OfficeVisit]] = []
+
+    for index in sorted(pending, key=lambda i: (EVENT_ORDER[events[i].type], events[i].occurred_at.timestamp())):
+        event = events[index]
+        client_visit_id = str(event.client_visit_id)
+        occurred_at = _utc(event.occurred_at, now)
+        visit = visits.get(client_visit_id)
+        error = None
+
+        if event.type == SyncEventType.START:
+            if visit is not None:
+                # Same visit started again under another event id (client retried with a new id)
+                results[index] = {"event_id": event.event_id, "status": "duplicate", "visit": visit}
+                continue
+            visit, error = _start(event, offices, services, occurred_at, now)
+            if visit is not None:
+                visits[client_visit_id] = visit
+                before[id(visit)] = (visit, None)
+        elif visit is None:
+            error = "Unknown visit (its start event has not been synced)"
+        else:
+            if id(visit) not in before:
+                before[id(visit)] = (visit, visit_snapshot(visit))
+            error = _end(visit, event, occurred_at) if event.type == SyncEventType.END else _rate(visit, event, now)
+
+        if error:
+            results[index] = {"event_id": event.event_id, "status": "rejected", "error": error}
+        else:
+            results[index] = {"event_id": event.event_id, "status": "applied", "visit": visit}
+            applied.append((index, visit))
+
+    new_visits = [visit for visit, snapshot in before.values() if snapshot is None]
+    if new_visits:
+        inserted = dict(db.execute(
+            insert(OfficeVisit).returning(OfficeVisit.client_visit_id, OfficeVisit.id),
+            [{key: value for key, value in vars(visit).items() if key != 'id'} for visit in new_visits]
+        ).all())
+        for visit in new_visits:
+            visit.id = inserted[visit.client_visit_id]
+    apply_visit_changes(db, [
+        (visit.office_id, snapshot, visit_snapshot(visit)) for visit, snapshot in before.values()
+    ])
+    record_wait_times(db, [
+        (visit.office_id, visit.service_id, (snapshot or {}).get('wait_duration_minutes'), visit.wait_duration_minutes)
+        for visit, snapshot in before.values()
+    ])
+    record_visit_slots(db, [
+        (visit.office_id, visit.service_id, visit.start_time,
+         (snapshot or {}).get('wait_duration_minutes'), visit.wait_duration_minutes)
+        for visit, snapshot in before.values()
+    ])
+    record_outcome_events(db, [
+        (visit.id, visit.office_id, snapshot, visit_snapshot(visit)) for visit, snapshot in before.values()
+    ])
+    if applied:
+        db.execute(insert(SyncedVisitEvent), [
+            {
+                "event_id": str(events[index].event_id),
+                "client_visit_id": str(events[index].client_visit_id),
+                "visit_id": visit.id,
+                "event_type": events[index].type.value,
+                "occurred_at": _utc(events[index].occurred_at, now),
+                "synced_at": now,
+            }
+            for index, visit in applied
+        ])
+    db.commit()
+
+    for index, event in enumerate(events):
+        if results[index] is None:  # Repeated within this batch
+            first = results[first_index[str(event.event_id)]]
+            results[index] = dict(first) if first["status"] == "rejected" else {
+                "event_id": event.event_id, "status": "duplicate",
+                "visit": first.get("visit"), "visit_id": first.get("visit_id")
+            }
+    for result in results:
+        visit = result.pop("visit", None)
+        if visit is not None:
+            result["visit_id"] = visit.id
+
+    started = [
+        ActiveVisit(visit_id=visit.id, office_id=visit.office_id, office_name=offices[visit.office_id].name,
+                    service_name=services[visit.service_id].service_name, district=offices[visit.office_id].district,
+                    start_time=visit.start_time)
+        for visit, snapshot in before.values() if snapshot is None and visit.end_time is None
+    ]
+    ended = [visit for visit, snapshot in before.values() if id(visit) in was_active and visit.end_time is not None]
+    return results, started, ended
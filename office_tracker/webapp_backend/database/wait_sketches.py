@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Wait-time quantile sketches per office x service
+
+Averages hide skewed queues, so every office x service keeps a DDSketch of
+its visits' ``wait_duration_minutes`` in ``wait_time_sketches``. Quantiles
+from a DDSketch are within ``SKETCH_RELATIVE_ACCURACY`` (1%) of the true
+value, and sketches merge exactly, so district, province and national
+quantiles are merged from the stored sketches without reading
+``office_visits``.
+
+Visit endpoints add new wait times in the same transaction as the visit.
+A wait time that is replaced or removed cannot be subtracted from a sketch,
+so that office x service is rebuilt from its visits (as for min/max in
+``rollups.py``). ``rebuild_wait_sketches`` rebuilds everything and runs with
+the periodic analytics reconciliation. Rebuilds merge the closed months'
+stored sketches with the live visits (see ``visit_partitions.py``).
+"""
+
+import math
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from database.rollups import live_visits
+from models.database_models import MonthlyVisitSummary, Office, OfficeService, OfficeVisit, WaitTimeSketch
+
+SKETCH_RELATIVE_ACCURACY = 0.01
+SKETCH_MAX_BINS = 2048
+REPORTED_QUANTILES = {'p50': 0.5, 'p90': 0.9, 'p99': 0.99}
+
+
+class DDSketch:
+    """
+    Relative-error quantile sketch (Masson et al., VLDB 2019) for
+    non-negative values. Bucket ``i`` counts values in (gamma^(i-1), gamma^i];
+    zeros are counted separately. When more than ``max_bins`` buckets are
+    in use the lowest ones are collapsed, so only low quantiles lose accuracy.
+    """
+
+    __slots__ = ('relative_accuracy', 'gamma', 'log_gamma', 'max_bins', 'bins', 'zero_count', 'count', 'sum')
+
+    def __init__(self, relative_accuracy: float = SKETCH_RELATIVE_ACCURACY, max_bins: int = SKETCH_MAX_BINS):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def _value(self, index: int) -> float:
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        if value < 0:
+            raise ValueError("DDSketch only accepts non-negative values")
+        if value == 0:
+            self.zero_count += count
+        else:
+            index = self._index(value)
+            self.bins[index] = self.bins.get(index, 0) + count
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += count
+        self.sum += value * count
+
+    def merge(self, other: 'DDSketch') -> 'DDSketch':
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same relative accuracy can be merged")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        return self
+
+    def _collapse(self):
+        indexes = sorted(self.bins)
+        excess = indexes[:len(indexes) - self.max_bins + 1]
+        self.bins[excess[-1]] += sum(self.bins.pop(index) for index in excess[:-1])
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1")
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                return self._value(index)
+        return self._value(max(self.bins))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'sum': self.sum,
+            'bins': {str(index): count for index, count in self.bins.items()},  # JSON object keys
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DDSketch':
+        sketch = cls(data.get('relative_accuracy', SKETCH_RELATIVE_ACCURACY))
+        sketch.bins = {int(index): count for index, count in data.get('bins', {}).items()}
+        sketch.zero_count = data.get('zero_count', 0)
+        sketch.count = data.get('count', 0)
+        sketch.sum = data.get('sum', 0.0)
+        return sketch
+
+
+def sketch_summary(sketch: DDSketch) -> Dict[str, Any]:
+    """Count, mean and reported quantiles (minutes, 1 decimal) of a sketch"""
+    summary = {'count': sketch.count, 'avg': round(sketch.sum / sketch.count, 1) if sketch.count else None}
+    for name, q in REPORTED_QUANTILES.items():
+        value = sketch.quantile(q)
+        summary[name] = round(value, 1) if value is not None else None
+    return summary
+
+
+def _visit_sketches(db: Session, pairs: Optional[Sequence[Tuple[int, int]]] = None) -> Dict[Tuple[int, int], DDSketch]:
+    """
+    Sketches built from the live visits and the closed months' sketches
+    (all, or only the given office x service pairs)
+    """
+    query = select(OfficeVisit.office_id, OfficeVisit.service_id, OfficeVisit.wait_duration_minutes).where(
+        OfficeVisit.wait_duration_minutes.isnot(None), live_visits()
+    )
+    closed = select(MonthlyVisitSummary.office_id, MonthlyVisitSummary.service_id, MonthlyVisitSummary.wait_sketch).where(
+        MonthlyVisitSummary.wait_sketch.isnot(None)
+    )
+    if pairs is not None:
+        service_ids = {service_id for _, service_id in pairs}
+        query = query.where(OfficeVisit.service_id.in_(service_ids))
+        closed = closed.where(MonthlyVisitSummary.service_id.in_(service_ids))
+    sketches: Dict[Tuple[int, int], DDSketch] = defaultdict(DDSketch)
+    for office_id, service_id, wait in db.execute(query):
+        if pairs is None or (office_id, service_id) in pairs:
+            sketches[(office_id, service_id)].add(max(wait, 0))
+    for office_id, service_id, data in db.execute(closed):
+        if pairs is None or (office_id, service_id) in pairs:
+            sketches[(office_id, service_id)].merge(DDSketch.from_dict(data))
+    return sketches
+
+
+def _store(db: Session, sketches: Dict[Tuple[int, int], DDSketch], existing: Dict[Tuple[int, int], int]):
+    """Insert or update sketch rows; ``existing`` maps office x service to row id"""
+    now = datetime.utcnow()
+    new_rows, changed_rows = [], []
+    for (office_id, service_id), sketch in sketches.items():
+        values = {'sketch': sketch.to_dict(), 'count': sketch.count, 'updated_at': now}
+        if (office_id, service_id) in existing:
+            changed_rows.append(dict(values, id=existing[(office_id, service_id)]))
+        else:
+            new_rows.append(dict(values, office_id=office_id, service_id=service_id))
+    if new_rows:
+        db.execute(insert(WaitTimeSketch), new_rows)
+    if changed_rows:
+        db.execute(update(WaitTimeSketch), changed_rows)
+
+
+def record_wait_times(db: Session, changes: Iterable[Tuple[int, int, Optional[int], Optional[int]]]):
+    """
+    Apply ``(office_id, service_id, old_wait, new_wait)`` visit changes to the
+    sketches. Must run inside the visit's transaction, before ``db.commit()``.
+    """
+    added: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    rebuild = set()
+    for office_id, service_id, old_wait, new_wait in changes:
+        if old_wait == new_wait:
+            continue
+        if old_wait is not None:
+            rebuild.add((office_id, service_id))
+        elif new_wait is not None:
+            added[(office_id, service_id)].append(max(new_wait, 0))
+    pairs = set(added) | rebuild
+    if not pairs:
+        return
+
+    db.flush()  # Rebuilds read the visits' new wait times
+    rows = db.execute(
+        select(WaitTimeSketch.id, WaitTimeSketch.office_id, WaitTimeSketch.service_id, WaitTimeSketch.sketch)
+        .where(WaitTimeSketch.office_id.in_({office_id for office_id, _ in pairs}))
+        .with_for_update()
+    ).all()
+    rows = {(row.office_id, row.service_id): row for row in rows if (row.office_id, row.service_id) in pairs}
+
+    sketches = _visit_sketches(db, sorted(rebuild)) if rebuild else {}
+    for pair in rebuild:
+        sketches.setdefault(pair, DDSketch())
+    for pair, waits in added.items():
+        if pair in rebuild:
+            continue
+        sketch = DDSketch.from_dict(rows[pair].sketch) if pair in rows else DDSketch()
+        for wait in waits:
+            sketch.add(wait)
+        sketches[pair] = sketch
+    _store(db, sketches, {pair: row.id for pair, row in rows.items()})
+
+
+def rebuild_wait_sketches(db: Session) -> int:
+    """Recompute every sketch from the visits (one scan); commits"""
+    sketches = _visit_sketches(db)
+    existing = {
+        (row.office_id, row.service_id): row.id
+        for row in db.execute(select(WaitTimeSketch.id, WaitTimeSketch.office_id, WaitTimeSketch.service_id))
+    }
+    stale = [row_id for pair, row_id in existing.items() if pair not in sketches]
+    if stale:
+        db.execute(delete(WaitTimeSketch).where(WaitTimeSketch.id.in_(stale)))
+    _store(db, sketches, existing)
+    db.commit()
+    return len(sketches)
+
+
+def merged_wait_sketch(db: Session, office_id: int = None, district: str = None, province: str = None,
+                       service: str = None) -> DDSketch:
+    """
+    Merge the stored sketches for an office, district, province or the whole
+    country, optionally for one kind of service (scraper ``service_id``).
+    """
+    query = select(WaitTimeSketch.sketch)
+    if district or province:
+        query = query.join(Office, Office.id == WaitTimeSketch.office_id)
+        if district:
+            query = query.where(Office.district == district)
+        if province:
+            query = query.where(Office.province == province)
+    if office_id is not None:
+        query = query.where(WaitTimeSketch.office_id == office_id)
+    if service:
+        query = query.join(OfficeService, OfficeService.id == WaitTimeSketch.service_id).where(
+            OfficeService.service_id == service
+        )
+    merged = DDSketch()
+    for data in db.execute(query).scalars():
+        merged.merge(DDSketch.from_dict(data))
+    return merged
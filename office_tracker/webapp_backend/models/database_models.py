@@ -4,7 +4,7 @@ Database models for Nepal Government Office User Experience Tracking
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, JSON, LargeBinary, ForeignKey, Index, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from enum import Enum
@@ -33,7 +33,7 @@ class Office(Base):
     phone = Column(String)
     website = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)  # Reference-data version
     
     # Relationships
     visits = relationship("OfficeVisit", back_populates="office")
@@ -85,6 +85,7 @@ class OfficeVisit(Base):
     office_id = Column(Integer, ForeignKey("offices.id"), nullable=False)
     service_id = Column(Integer, ForeignKey("office_services.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Anonymous allowed
+    client_visit_id = Column(String(36), nullable=True)  # UUID of visits recorded offline (batch sync)
     
     # Visit Timing
     visit_date = Column(DateTime, default=datetime.utcnow)
@@ -114,6 +115,7 @@ class OfficeVisit(Base):
     wait_reason = Column(String)  # Why did you wait? (lunch, system down, etc.)
     suggestions = Column(Text)    # सुझाव (Sujhav)
     complaints = Column(Text)     # गुनासो (Gunaso)
+    feedback_pending = Column(Boolean, default=False)  # Texts changed since the feedback pipeline last ran
     
     # Metadata
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -123,6 +125,23 @@ class OfficeVisit(Base):
     office = relationship("Office", back_populates="visits")
     service = relationship("OfficeService", back_populates="visits")
     user = relationship("User", back_populates="visits")
+    
+    # Hot query indexes: rankings/rollups group by office and read these columns
+    # (and visit_date, which bounds the live partition) from the index alone; the
+    # partial index only holds open visits (end_time IS NULL), which is what the
+    # active-visits monitor scans. updated_at finds the late writes to closed months.
+    __table_args__ = (
+        Index('ix_office_visits_office_status', 'office_id', 'service_status', 'visit_date'),
+        Index('ix_office_visits_office_rating', 'office_id', 'overall_rating', 'visit_date'),
+        Index('ix_office_visits_office_wait', 'office_id', 'wait_duration_minutes', 'visit_date'),
+        Index('ix_office_visits_visit_date', 'visit_date'),
+        Index('ix_office_visits_updated_at', 'updated_at', 'visit_date'),
+        Index('ix_office_visits_in_progress', 'service_status', 'start_time',
+              sqlite_where=text('end_time IS NULL'), postgresql_where=text('end_time IS NULL')),
+        Index('ix_office_visits_client_visit_id', 'client_visit_id', unique=True),
+        Index('ix_office_visits_feedback_pending', 'id',
+              sqlite_where=text('feedback_pending'), postgresql_where=text('feedback_pending')),
+    )
 
 
 class OfficeAnalytics(Base):
@@ -154,6 +173,20 @@ class OfficeAnalytics(Base):
     bribe_reports = Column(Integer, default=0)  # Number of bribe reports
     bribe_rate = Column(Float, default=0.0)     # Percentage
     
+    # Running sums and counts behind the averages (maintained per visit event)
+    overall_rating_sum = Column(Integer, default=0)
+    overall_rating_count = Column(Integer, default=0)
+    staff_behavior_sum = Column(Integer, default=0)
+    staff_behavior_count = Column(Integer, default=0)
+    cleanliness_sum = Column(Integer, default=0)
+    cleanliness_count = Column(Integer, default=0)
+    efficiency_sum = Column(Integer, default=0)
+    efficiency_count = Column(Integer, default=0)
+    information_clarity_sum = Column(Integer, default=0)
+    information_clarity_count = Column(Integer, default=0)
+    wait_time_sum = Column(Integer, default=0)
+    wait_time_count = Column(Integer, default=0)
+    
     # Rankings
     district_rank = Column(Integer)  # Rank within district
     province_rank = Column(Integer)  # Rank within province
@@ -166,7 +199,247 @@ class OfficeAnalytics(Base):
     office = relationship("Office")
 
 
+class OfficeRanking(Base):
+    """
+    Materialized office ranks per metric, nationally and within the province
+    and district; refreshed from OfficeAnalytics (see rollups.refresh_rankings)
+    """
+    __tablename__ = "office_rankings"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    metric = Column(String(32), nullable=False)  # overall_rating, efficiency, success_rate
+    office_id = Column(Integer, ForeignKey("offices.id"), nullable=False)
+    district = Column(String, nullable=False)    # Copied from the office for the scoped range reads
+    province = Column(String, nullable=False)
+    
+    value = Column(Float)                # Metric over the office's reviews
+    score = Column(Float)                # Bayesian-smoothed value the ranks are ordered by
+    review_count = Column(Integer, default=0)
+    national_rank = Column(Integer)
+    province_rank = Column(Integer)
+    district_rank = Column(Integer)
+    refreshed_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ix_office_rankings_metric_office', 'metric', 'office_id', unique=True),
+        # One index per scope: a page of rankings is a range read in rank order
+        Index('ix_office_rankings_national', 'metric', 'national_rank', 'office_id'),
+        Index('ix_office_rankings_province', 'metric', 'province', 'province_rank', 'office_id'),
+        Index('ix_office_rankings_district', 'metric', 'district', 'district_rank', 'office_id'),
+    )
+
+
+class WaitTimeSketch(Base):
+    """Mergeable wait-time quantile sketch (DDSketch) per office x service"""
+    __tablename__ = "wait_time_sketches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    office_id = Column(Integer, ForeignKey("offices.id"), nullable=False)
+    service_id = Column(Integer, ForeignKey("office_services.id"), nullable=False)
+    
+    sketch = Column(JSON, nullable=False)  # DDSketch.to_dict()
+    count = Column(Integer, default=0)     # Wait times in the sketch
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ix_wait_time_sketches_office_service', 'office_id', 'service_id', unique=True),
+    )
+
+
+class VisitTimeCube(Base):
+    """Visits and wait-time histograms by weekday x hour of arrival, per office x service"""
+    __tablename__ = "visit_time_cubes"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    office_id = Column(Integer, ForeignKey("offices.id"), nullable=False)
+    service_id = Column(Integer, ForeignKey("office_services.id"), nullable=False)
+    
+    histogram = Column(LargeBinary, nullable=False)    # int32 [weekday, hour, wait bucket], see visit_cube.py
+    wait_totals = Column(LargeBinary, nullable=False)  # float64 [weekday, hour] summed wait minutes
+    count = Column(Integer, default=0)                 # Visits in the cube
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ix_visit_time_cubes_office_service', 'office_id', 'service_id', unique=True),
+    )
+
+
+class SyncedVisitEvent(Base):
+    """Offline visit events already applied by the batch sync (idempotency keys)"""
+    __tablename__ = "synced_visit_events"
+    
+    event_id = Column(String(36), primary_key=True)  # Client-generated UUID
+    client_visit_id = Column(String(36), nullable=False)
+    visit_id = Column(Integer, ForeignKey("office_visits.id"), nullable=False)
+    event_type = Column(String, nullable=False)  # start, end, rating
+    occurred_at = Column(DateTime)  # Client clock
+    synced_at = Column(DateTime, default=datetime.utcnow)
+
+
+class VisitOutcomeEvent(Base):
+    """Append-only log of visit outcomes (failure / bribe report) consumed by the anomaly detector"""
+    __tablename__ = "visit_outcome_events"
+    
+    id = Column(Integer, primary_key=True)  # Replay position
+    office_id = Column(Integer, ForeignKey("offices.id"), nullable=False)
+    visit_id = Column(Integer, ForeignKey("office_visits.id"), nullable=False)
+    signal = Column(String, nullable=False)  # failure, bribe
+    value = Column(Boolean, nullable=False)  # Failed / asked for a bribe
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class AnomalyDetectorState(Base):
+    """Checkpointed EWMA / CUSUM state per office x signal (see database/anomaly_detector.py)"""
+    __tablename__ = "anomaly_detector_state"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    office_id = Column(Integer, ForeignKey("offices.id"), nullable=False)
+    signal = Column(String, nullable=False)
+    
+    state = Column(JSON, nullable=False)  # SignalState.to_dict()
+    last_event_id = Column(Integer, nullable=False)  # visit_outcome_events position when checkpointed
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ix_anomaly_detector_state_office_signal', 'office_id', 'signal', unique=True),
+    )
+
+
+class OfficeAlert(Base):
+    """Failure-rate or bribe-report spike detected for an office"""
+    __tablename__ = "office_alerts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    office_id = Column(Integer, ForeignKey("offices.id"), nullable=False, index=True)
+    signal = Column(String, nullable=False)  # failure, bribe
+    event_id = Column(Integer, nullable=False, unique=True)  # visit_outcome_events row that raised it
+    visit_id = Column(Integer, ForeignKey("office_visits.id"))
+    
+    recent_rate = Column(Float)    # Fast EWMA of the signal (0-1)
+    baseline_rate = Column(Float)  # Baseline the shift was measured against (0-1)
+    cusum = Column(Float)          # CUSUM statistic that crossed the threshold
+    observations = Column(Integer)  # Events seen for this office x signal
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class VisitMonth(Base):
+    """Calendar month (UTC, by visit_date) closed into summaries and optionally archived to cold storage"""
+    __tablename__ = "visit_months"
+    
+    month = Column(String(7), primary_key=True)  # YYYY-MM
+    starts_at = Column(DateTime, nullable=False)
+    ends_at = Column(DateTime, nullable=False)   # Exclusive; the live partition starts at the latest ends_at
+    visits = Column(Integer, default=0)
+    closed_at = Column(DateTime, default=datetime.utcnow)
+    archived_at = Column(DateTime)   # Raw visits moved out of office_visits
+    archive_path = Column(String)    # Per-month SQLite file holding them
+
+
+class MonthlyVisitSummary(Base):
+    """Pre-aggregated visits of a closed month per office x service (see database/visit_partitions.py)"""
+    __tablename__ = "monthly_visit_summaries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    month = Column(String(7), ForeignKey("visit_months.month"), nullable=False)
+    office_id = Column(Integer, ForeignKey("offices.id"), nullable=False)
+    service_id = Column(Integer, ForeignKey("office_services.id"), nullable=False)
+    
+    # Same counters as OfficeAnalytics, so rollups merge them with live visits
+    total_visits = Column(Integer, default=0)
+    successful_visits = Column(Integer, default=0)
+    failed_visits = Column(Integer, default=0)
+    bribe_reports = Column(Integer, default=0)
+    overall_rating_sum = Column(Integer, default=0)
+    overall_rating_count = Column(Integer, default=0)
+    staff_behavior_sum = Column(Integer, default=0)
+    staff_behavior_count = Column(Integer, default=0)
+    cleanliness_sum = Column(Integer, default=0)
+    cleanliness_count = Column(Integer, default=0)
+    efficiency_sum = Column(Integer, default=0)
+    efficiency_count = Column(Integer, default=0)
+    information_clarity_sum = Column(Integer, default=0)
+    information_clarity_count = Column(Integer, default=0)
+    wait_time_sum = Column(Integer, default=0)
+    wait_time_count = Column(Integer, default=0)
+    rated_staff_behavior_sum = Column(Integer, default=0)    # Over visits with an overall rating
+    rated_staff_behavior_count = Column(Integer, default=0)
+    rated_cleanliness_sum = Column(Integer, default=0)
+    rated_cleanliness_count = Column(Integer, default=0)
+    min_wait_time_minutes = Column(Integer)
+    max_wait_time_minutes = Column(Integer)
+    
+    wait_sketch = Column(JSON)            # DDSketch.to_dict() of the month's wait times
+    cube_histogram = Column(LargeBinary)  # zlib-compressed visit cube arrays (see visit_cube.py)
+    cube_wait_totals = Column(LargeBinary)
+    
+    __table_args__ = (
+        Index('ix_monthly_visit_summaries_month_office_service', 'month', 'office_id', 'service_id', unique=True),
+        Index('ix_monthly_visit_summaries_office', 'office_id'),
+    )
+
+
+class VisitFeedback(Base):
+    """Terms and sentiment extracted from a visit's complaint and suggestion (see database/feedback_terms.py)"""
+    __tablename__ = "visit_feedback"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    visit_id = Column(Integer, ForeignKey("office_visits.id"), nullable=False, unique=True)
+    office_id = Column(Integer, ForeignKey("offices.id"), nullable=False)
+    complaint_terms = Column(JSON)      # Distinct terms, as counted in office_feedback_terms
+    complaint_sentiment = Column(Float)  # -1 (negative) .. 1 (positive); NULL without a complaint
+    suggestion_terms = Column(JSON)
+    suggestion_sentiment = Column(Float)
+    processed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class OfficeFeedbackTerm(Base):
+    """
+    Number of complaints / suggestions of an office mentioning a term, with
+    their summed sentiment; the ``*`` term counts every text of that kind
+    """
+    __tablename__ = "office_feedback_terms"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    office_id = Column(Integer, ForeignKey("offices.id"), nullable=False)
+    kind = Column(String(16), nullable=False)  # complaint, suggestion
+    term = Column(String(64), nullable=False)
+    mentions = Column(Integer, default=0)
+    sentiment_sum = Column(Float, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ix_office_feedback_terms_office_kind_term', 'office_id', 'kind', 'term', unique=True),
+    )
+
+
 # Database initialization helper
 def create_tables(engine):
     """Create all database tables"""
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+    add_missing_indexes(engine)
+
+
+def add_missing_columns(engine):
+    """Add columns introduced after a table was first created (additive migrations only)"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                default_clause = f" DEFAULT {default!r}" if isinstance(default, (int, float)) else ""
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default_clause}"))
+
+
+def add_missing_indexes(engine):
+    """Create indexes declared after a table was first created (``create_all`` skips existing tables)"""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
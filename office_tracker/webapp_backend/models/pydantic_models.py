@@ -7,6 +7,7 @@ from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
+from uuid import UUID
 
 
 class ServiceStatus(str, Enum):
@@ -66,9 +67,8 @@ class VisitEndRequest(BaseModel):
     service_status: ServiceStatus  # kaam_bhayo or kaam_bhayena
 
 
-class RatingRequest(BaseModel):
-    """Rating and feedback request"""
-    visit_id: int
+class VisitRating(BaseModel):
+    """Rating and feedback answers"""
     
     # 1-5 Star Ratings
     overall_rating: int = Field(..., ge=1, le=5)
@@ -90,6 +90,55 @@ class RatingRequest(BaseModel):
     complaints: Optional[str] = None                # गुनासो
 
 
+class RatingRequest(VisitRating):
+    """Rating and feedback request"""
+    visit_id: int
+
+
+class SyncEventType(str, Enum):
+    START = "start"
+    END = "end"
+    RATING = "rating"
+
+
+class VisitSyncEvent(BaseModel):
+    """One visit event recorded offline; replaying the same event_id is a no-op"""
+    event_id: UUID
+    client_visit_id: UUID                           # Assigned by the client when the timer starts
+    type: SyncEventType
+    occurred_at: datetime                           # Client clock
+    
+    # start
+    office_id: Optional[int] = None
+    service_id: Optional[int] = None
+    user_id: Optional[int] = None
+    
+    # end
+    service_status: Optional[ServiceStatus] = None
+    
+    # rating
+    rating: Optional[VisitRating] = None
+
+
+class VisitSyncRequest(BaseModel):
+    """Batch of offline visit events (upper bound: VISIT_SYNC_MAX_EVENTS)"""
+    events: List[VisitSyncEvent]
+
+
+class VisitSyncResult(BaseModel):
+    event_id: UUID
+    status: str                                     # applied, duplicate, rejected
+    visit_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class VisitSyncResponse(BaseModel):
+    results: List[VisitSyncResult]
+    applied: int
+    duplicates: int
+    rejected: int
+
+
 class FeedbackQuestions(BaseModel):
     """Nepali feedback questions for frontend"""
     questions: List[Dict[str, str]] = [
@@ -195,7 +244,7 @@ class OfficeAnalyticsResponse(BaseModel):
 
 class ComparisonRequest(BaseModel):
     """Request to compare offices"""
-    office_ids: List[int] = Field(..., min_items=2, max_items=5)
+    office_ids: List[int] = Field(..., min_items=2)  # Upper bound: COMPARISON_MAX_OFFICES
     metrics: List[str] = ["overall_rating", "efficiency", "staff_behavior", "cleanliness", "bribe_rate"]
 
 
@@ -237,6 +286,7 @@ class AnalyticsDashboard(BaseModel):
 
 class OfficeSearchRequest(BaseModel):
     """Search and filter offices"""
+    query: Optional[str] = None  # Free text (English, Nepali or romanised Nepali); prefix matched
     district: Optional[str] = None
     province: Optional[str] = None
     office_type: Optional[str] = None
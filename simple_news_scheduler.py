@@ -11,6 +11,7 @@ Usage:
     python simple_news_scheduler.py --run-once  # Run collection once
     python simple_news_scheduler.py --stop      # Stop scheduler
     python simple_news_scheduler.py --status    # Check status
+    python simple_news_scheduler.py --start --adaptive  # Per-feed RSS polling by publication rate
 """
 
 import os
@@ -38,17 +39,28 @@ except ImportError as e:
 class SimpleNewsScheduler:
     """Simple scheduler that runs our existing collector periodically."""
 
-    def __init__(self, interval_hours=3):
+    def __init__(self, interval_hours=3, adaptive=False):
         self.interval_hours = interval_hours
+        self.adaptive = adaptive
         self.is_running = False
         self.scheduler_thread = None
         self.pid_file = Path("news_scheduler.pid")
+        self.db_path = 'news_aggregator/nepal_news_intelligence.db'
 
         # Setup logging
         self.setup_logging()
 
         # Initialize collector
-        self.collector = WorkingMultiSourceCollector(db_path='news_aggregator/nepal_news_intelligence.db')
+        self.collector = WorkingMultiSourceCollector(db_path=self.db_path)
+
+        # Adaptive mode polls each RSS feed at its own rate-based interval
+        self.poller = None
+        if adaptive:
+            from adaptive_poll_scheduler import AdaptivePollScheduler, rss_poll_function
+            from source_health_monitor import SourceHealthMonitor
+
+            self.poller = AdaptivePollScheduler(self.db_path, health_monitor=SourceHealthMonitor(self.db_path))
+            self.poll_feed = rss_poll_function(self.db_path)
 
     def setup_logging(self):
         """Setup simple logging."""
@@ -80,8 +92,33 @@ class SimpleNewsScheduler:
             self.logger.error(f"Collection failed: {e}")
             return 0
 
+    def run_adaptive_poll(self):
+        """Poll the RSS feeds that are due under the adaptive schedule."""
+        try:
+            results = self.poller.run_due(self.poll_feed)
+            if results:
+                self.logger.info(f"Adaptive poll: {len(results)} feeds, {sum(results.values())} new articles")
+            return sum(results.values())
+        except Exception as e:
+            self.logger.error(f"Adaptive poll failed: {e}")
+            return 0
+
+    def adaptive_scheduler_loop(self):
+        """Scheduler loop for adaptive mode: check for due feeds every minute."""
+        self.logger.info("Scheduler started - adaptive per-feed polling")
+        for schedule in self.poller.plan():
+            self.logger.info(f"  {schedule.name}: {schedule.rate_per_hour:.2f} articles/h, "
+                             f"every {schedule.interval_seconds / 60:.0f} min")
+
+        while self.is_running:
+            self.run_adaptive_poll()
+            time.sleep(60)
+
     def scheduler_loop(self):
         """Main scheduler loop that runs in background."""
+        if self.adaptive:
+            return self.adaptive_scheduler_loop()
+
         self.logger.info(f"Scheduler started - collecting every {self.interval_hours} hours")
 
         # Run initial collection
@@ -210,6 +247,8 @@ def main():
     parser.add_argument('--status', action='store_true', help='Check scheduler status')
     parser.add_argument('--run-once', action='store_true', help='Run collection once and exit')
     parser.add_argument('--interval', type=int, default=3, help='Hours between collections (default: 3)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Poll each RSS feed at an interval based on its publication rate')
 
     args = parser.parse_args()
 
@@ -217,7 +256,7 @@ def main():
         parser.print_help()
         return
 
-    scheduler = SimpleNewsScheduler(interval_hours=args.interval)
+    scheduler = SimpleNewsScheduler(interval_hours=args.interval, adaptive=args.adaptive)
 
     if args.status:
         status = scheduler.get_status()
@@ -232,14 +271,15 @@ def main():
 
     elif args.run_once:
         print("Running single news collection...")
-        count = scheduler.run_collection()
+        count = scheduler.run_adaptive_poll() if args.adaptive else scheduler.run_collection()
         print(f"Collected {count} articles")
 
     elif args.start:
         if scheduler.is_running_check():
             print("Scheduler is already running")
         else:
-            print(f"Starting scheduler (collecting every {args.interval} hours)...")
+            mode = "adaptive per-feed polling" if args.adaptive else f"collecting every {args.interval} hours"
+            print(f"Starting scheduler ({mode})...")
             scheduler.start_scheduler()
 
     elif args.stop:
@@ -8,6 +8,7 @@ This module provides:
 - Common testing utilities and helpers
 """
 
+import asyncio
 import pytest
 import sqlite3
 import tempfile
@@ -26,6 +27,23 @@ try:
 except ImportError as e:
     pytest.skip(f"Could not import news_aggregator modules: {e}", allow_module_level=True)
 
+# The office tracker backend (FastAPI app) lives apart from the news pipeline
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    import httpx
+    from fastapi import FastAPI
+    from sqlalchemy import create_engine, event, insert
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from sqlalchemy.orm import sessionmaker
+    from database.connection import async_database_url, get_async_database
+    from database.engine_config import create_profiled_engine
+    from models.database_models import Office, OfficeService, OfficeVisit, create_tables
+    from api.dependencies import API_KEY
+    OFFICE_TRACKER_AVAILABLE = True
+except ImportError:
+    OFFICE_TRACKER_AVAILABLE = False
+
 
 @pytest.fixture(scope="session")
 def test_database():
@@ -173,6 +191,120 @@ def analytics_engine(test_database):
     return NewsIntelligenceEngine(test_database)
 
 
+@pytest.fixture
+def office_tracker_db(tmp_path):
+    """
+    Provide a factory for seeded office tracker SQLite databases.
+
+    ``office_tracker_db(offices={}, services=None, visits=())`` creates the
+    tables in ``tmp_path`` and inserts:
+    - ``offices``: {id: (district, province)}, named ``DAO <id>``
+    - ``services``: OfficeService rows (default: one passport service per
+      office, sharing the office's id)
+    - ``visits``: OfficeVisit rows
+
+    Returns:
+        Callable: Factory returning (database url, session); sessions are
+        closed and engines disposed after the test
+    """
+    if not OFFICE_TRACKER_AVAILABLE:
+        pytest.skip("Could not import office tracker modules")
+    created = []
+
+    def create(offices={}, services=None, visits=()):
+        url = f"sqlite:///{tmp_path / f'tracker_{len(created)}.db'}"
+        engine = create_engine(url)
+        create_tables(engine)
+        with engine.begin() as conn:
+            if offices:
+                conn.execute(insert(Office), [
+                    {"id": o, "office_id": f"dao-{o}", "name": f"DAO {o}", "office_type": "dao",
+                     "district": district, "province": province} for o, (district, province) in offices.items()
+                ])
+            services = services if services is not None else [
+                {"id": o, "office_id": o, "service_id": "passport", "service_name": "Passport"} for o in offices
+            ]
+            if services:
+                conn.execute(insert(OfficeService), services)
+            if visits:
+                conn.execute(insert(OfficeVisit), list(visits))
+        db = sessionmaker(bind=engine)()
+        created.append((engine, db))
+        return url, db
+
+    yield create
+    for engine, db in created:
+        db.close()
+        engine.dispose()
+
+
+class TrackerClient:
+    """FastAPI app over the given routers on its own async engine, called through httpx's ASGI transport"""
+
+    def __init__(self, url: str, routers, **app_options):
+        self.engine = create_profiled_engine(async_database_url(url), "test", is_async=True)
+        self.statements: List[str] = []
+        self.parameters: List[Any] = []  # Parameters of each captured statement
+        event.listen(self.engine.sync_engine, "before_cursor_execute", self._capture)
+
+        async def get_test_database():
+            async with async_sessionmaker(self.engine, expire_on_commit=False)() as session:
+                yield session
+
+        self.app = FastAPI(**app_options)
+        for router in routers:
+            self.app.include_router(router)
+        self.app.dependency_overrides[get_async_database] = get_test_database
+
+    def _capture(self, conn, cursor, statement, parameters, *rest):
+        self.statements.append(statement)
+        self.parameters.append(parameters)
+
+    def clear(self):
+        self.statements.clear()
+        self.parameters.clear()
+
+    def run(self, send, headers=None):
+        """Run ``await send(client)`` on an httpx client for the app; ``headers`` are added to the API key"""
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://test",
+                                         headers={"api-key": API_KEY, **(headers or {})}) as client:
+                return await send(client)
+        return asyncio.run(run())
+
+    def call(self, method: str, path: str, headers=None, **kwargs):
+        """Send one request; ``statements`` then holds just its SQL"""
+        self.clear()
+        return self.run(lambda client: client.request(method, path, **kwargs), headers)
+
+
+@pytest.fixture
+def api_client():
+    """
+    Provide a factory for office tracker API clients.
+
+    ``api_client(url, *routers, **app_options)`` mounts the routers on a
+    FastAPI app (``app_options`` go to its constructor) whose database
+    dependency is an async engine on ``url``.
+
+    Returns:
+        Callable: Factory returning a TrackerClient; engines are disposed
+        after the test
+    """
+    if not OFFICE_TRACKER_AVAILABLE:
+        pytest.skip("Could not import office tracker modules")
+    clients = []
+
+    def create(url, *routers, **app_options):
+        client = TrackerClient(url, routers, **app_options)
+        clients.append(client)
+        return client
+
+    yield create
+    for client in clients:
+        asyncio.run(client.engine.dispose())
+
+
 class MockHTTPResponse:
     """Mock HTTP response for testing external service calls."""
 
@@ -236,11 +368,20 @@ def pytest_configure(config):
     config.addinivalue_line(
         "markers", "slow: mark test as slow running"
     )
+    config.addinivalue_line(
+        "markers", "benchmark: wall-clock benchmark, only run with RUN_BENCHMARKS=1"
+    )
 
 
 def pytest_collection_modifyitems(config, items):
     """Modify test collection to add markers based on test location."""
+    run_benchmarks = os.getenv("RUN_BENCHMARKS", "").lower() in ("1", "true", "yes")
+    skip_benchmark = pytest.mark.skip(reason="wall-clock benchmark; set RUN_BENCHMARKS=1 to run")
     for item in items:
+        # Timing comparisons are opt-in: they are flaky on loaded machines
+        if item.get_closest_marker("benchmark") and not run_benchmarks:
+            item.add_marker(skip_benchmark)
+
         # Add performance marker to performance tests
         if "performance" in str(item.fspath):
             item.add_marker(pytest.mark.performance)
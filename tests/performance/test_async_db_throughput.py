@@ -0,0 +1,224 @@
+"""
+Load test for the async database stack of the office tracker API.
+
+These tests verify:
+- Concurrent timer starts through the async routers all commit, with rollups intact
+- Under a mixed load of timer starts and dashboard reads the event loop keeps
+  serving other requests (the previous blocking Session stalled it)
+- Throughput of the async routers vs the previous blocking endpoints
+"""
+
+import asyncio
+import pytest
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    import httpx
+    from fastapi import APIRouter, Depends, FastAPI
+    from sqlalchemy import create_engine, func, insert, select
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from sqlalchemy.orm import Session, sessionmaker
+    from sqlalchemy.pool import NullPool
+    from database.connection import async_database_url, get_async_database
+    from database.aggregations import dashboard_aggregates
+    from database.engine_config import create_profiled_engine
+    from database.rollups import apply_visit_change, reconcile_office_analytics, visit_snapshot
+    from models.database_models import Office, OfficeAnalytics, OfficeService, OfficeVisit, ServiceStatus, create_tables
+    from models.pydantic_models import AnalyticsDashboard, TimerStartRequest, TimerStartResponse
+    from api.dependencies import API_KEY
+    from api.visit_tracking import router as visit_tracking_router
+    from api.analytics import router as analytics_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+OFFICES = 200
+VISITS_PER_OFFICE = 50
+CONCURRENCY = 20
+REQUESTS_PER_WORKER = 10
+HEADERS = {"api-key": API_KEY}
+
+
+def _seed(engine):
+    base_date = datetime(2025, 10, 1, 9, 0)
+    with engine.begin() as conn:
+        conn.execute(insert(Office), [
+            {"id": o + 1, "office_id": f"dao-{o}", "name": f"DAO {o}", "office_type": "dao",
+             "district": f"District {o % 77}", "province": f"Province {o % 7}"}
+            for o in range(OFFICES)
+        ])
+        conn.execute(insert(OfficeService), [
+            {"id": o + 1, "office_id": o + 1, "service_id": "passport", "service_name": "Passport"}
+            for o in range(OFFICES)
+        ])
+        conn.execute(insert(OfficeVisit), [
+            {
+                "office_id": o + 1, "service_id": o + 1,
+                "visit_date": base_date + timedelta(minutes=o * VISITS_PER_OFFICE + v),
+                "service_status": ServiceStatus.SUCCESS if v % 3 else ServiceStatus.FAILED,
+                "overall_rating": (o + v) % 5 + 1, "wait_duration_minutes": (o + v) % 90,
+                "asked_for_bribe": v % 17 == 0,
+            }
+            for o in range(OFFICES) for v in range(VISITS_PER_OFFICE)
+        ])
+    with sessionmaker(bind=engine)() as db:
+        reconcile_office_analytics(db)
+
+
+def _blocking_app(url):
+    """The previous endpoints: ``async def`` handlers calling a synchronous Session"""
+    # NullPool: with a QueuePool the deferred Session.close() calls need the
+    # event loop the handlers are blocking, and the pool times out under load
+    SessionLocal = sessionmaker(bind=create_engine(url, poolclass=NullPool), autoflush=False)
+
+    def get_database():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    router = APIRouter()
+
+    @router.post("/api/visit/start-timer", response_model=TimerStartResponse)
+    async def start_visit_timer(request: TimerStartRequest, db: Session = Depends(get_database)):
+        office = db.get(Office, request.office_id)
+        service = db.get(OfficeService, request.service_id)
+        visit = OfficeVisit(office_id=office.id, service_id=service.id,
+                            start_time=datetime.utcnow(), service_status=ServiceStatus.IN_PROGRESS)
+        db.add(visit)
+        apply_visit_change(db, visit.office_id, None, visit_snapshot(visit))
+        db.commit()
+        db.refresh(visit)
+        return TimerStartResponse(visit_id=visit.id, start_time=visit.start_time,
+                                  office_name=office.name, service_name=service.service_name)
+
+    @router.get("/api/analytics/dashboard", response_model=AnalyticsDashboard)
+    async def get_dashboard_data(db: Session = Depends(get_database)):
+        return AnalyticsDashboard(**dashboard_aggregates(db))
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+def _async_app(url):
+    """The async routers on the deployed (pooled "dev") engine profile, not the test fixtures' NullPool engine"""
+    async_engine = create_profiled_engine(async_database_url(url), "dev", is_async=True)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def get_test_database():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(visit_tracking_router)
+    app.include_router(analytics_router)
+    app.dependency_overrides[get_async_database] = get_test_database
+    return app, async_engine
+
+
+async def _heartbeat(stop, stalls, period=0.005):
+    """Record how late the event loop wakes up while the load runs"""
+    while not stop.is_set():
+        expected = time.perf_counter() + period
+        await asyncio.sleep(period)
+        stalls.append(time.perf_counter() - expected)
+
+
+async def _run_load(app):
+    """CONCURRENCY workers alternating timer starts and dashboard reads"""
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=HEADERS) as client:
+        async def worker(worker_id):
+            for i in range(REQUESTS_PER_WORKER):
+                start = time.perf_counter()
+                if i % 2:
+                    response = await client.get("/api/analytics/dashboard")
+                else:
+                    office_id = (worker_id * REQUESTS_PER_WORKER + i) % OFFICES + 1
+                    response = await client.post("/api/visit/start-timer",
+                                                 json={"office_id": office_id, "service_id": office_id})
+                assert response.status_code == 200, response.text
+                latencies.append(time.perf_counter() - start)
+
+        stop, stalls = asyncio.Event(), []
+        heartbeat = asyncio.create_task(_heartbeat(stop, stalls))
+        await asyncio.sleep(0)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(w) for w in range(CONCURRENCY)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await heartbeat
+
+    return {
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": statistics.quantiles(latencies, n=20)[18] * 1000,
+        "max_loop_stall_ms": max(stalls) * 1000,
+    }
+
+
+@pytest.fixture
+def tracker_db(tmp_path):
+    url = f"sqlite:///{tmp_path / 'tracker.db'}"
+    engine = create_engine(url)
+    create_tables(engine)
+    _seed(engine)
+    return url, engine
+
+
+class TestAsyncDatabaseStack:
+
+    @pytest.mark.database
+    def test_concurrent_timer_starts_commit(self, tracker_db, api_client):
+        url, engine = tracker_db
+        client = api_client(url, visit_tracking_router, analytics_router)
+
+        responses = client.run(lambda http: asyncio.gather(*(
+            http.post("/api/visit/start-timer", json={"office_id": 1, "service_id": 1})
+            for _ in range(CONCURRENCY)
+        )))
+
+        assert [response.status_code for response in responses] == [200] * CONCURRENCY
+        assert len({response.json()["visit_id"] for response in responses}) == CONCURRENCY
+        with engine.connect() as conn:
+            rollup = conn.execute(select(OfficeAnalytics.total_visits).where(OfficeAnalytics.office_id == 1)).scalar()
+            visits = conn.execute(select(func.count()).where(OfficeVisit.office_id == 1)).scalar()
+        assert rollup == visits == VISITS_PER_OFFICE + CONCURRENCY
+
+    @pytest.mark.slow
+    def test_mixed_load_benchmark(self, tracker_db):
+        """Timer starts + dashboard reads: blocking Session vs AsyncSession"""
+        url, engine = tracker_db
+
+        blocking = asyncio.run(_run_load(_blocking_app(url)))
+
+        app, async_engine = _async_app(url)
+
+        async def run_async():
+            try:
+                return await _run_load(app)
+            finally:
+                await async_engine.dispose()
+
+        non_blocking = asyncio.run(run_async())
+
+        print(f"\n{CONCURRENCY} workers x {REQUESTS_PER_WORKER} requests "
+              f"(timer starts + dashboard reads, {OFFICES * VISITS_PER_OFFICE} visits):")
+        for label, result in (("blocking Session", blocking), ("AsyncSession", non_blocking)):
+            print(f"  {label:<16} {result['requests_per_second']:7.1f} req/s  "
+                  f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  "
+                  f"max loop stall {result['max_loop_stall_ms']:6.1f} ms")
+
+        # The blocking handlers hold the loop for a whole dashboard query;
+        # with AsyncSession the loop only waits between driver round trips
+        assert non_blocking["max_loop_stall_ms"] < blocking["max_loop_stall_ms"]
@@ -0,0 +1,97 @@
+"""
+Performance benchmark for the fast JSON response path.
+
+These tests verify:
+- Serializing a 1000-office ranking response directly with FastJSONResponse is
+  several times faster than FastAPI's default jsonable_encoder + stdlib json path
+- The rankings endpoint returns 1000 offices in one response, gzipped when the client accepts it
+"""
+
+import json
+import pytest
+import statistics
+import time
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from api.responses import ORJSON_AVAILABLE, CompressionMiddleware, FastJSONResponse
+    from database.rollups import reconcile_office_analytics
+    from models.database_models import ServiceStatus
+    from api.analytics import router as analytics_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+OFFICES = 1_000
+ROUNDS = 30
+
+
+def _ranking_payload():
+    return {
+        "scope": "national",
+        "metric": "overall_rating",
+        "rankings": [
+            {"rank": rank, "office_name": f"District Administration Office {rank}", "district": f"District {rank % 77}",
+             "province": f"Province {rank % 7}", "metric_value": round(5 - rank / 400, 2),
+             "review_count": 20 + rank % 50, "office_id": rank}
+            for rank in range(1, OFFICES + 1)
+        ],
+        "total_ranked": OFFICES,
+    }
+
+
+def _median_seconds(fn):
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+class TestJSONSerializationPerformance:
+
+    @pytest.mark.slow
+    def test_ranking_serialization(self):
+        if not ORJSON_AVAILABLE:
+            pytest.skip("orjson is not installed")
+        payload = _ranking_payload()
+
+        default_path = _median_seconds(lambda: JSONResponse(jsonable_encoder(payload)))
+        fast_path = _median_seconds(lambda: FastJSONResponse(payload))
+        assert json.loads(FastJSONResponse(payload).body) == json.loads(JSONResponse(jsonable_encoder(payload)).body)
+
+        print(f"\n1000-office ranking: jsonable_encoder + json {default_path * 1000:.2f}ms, "
+              f"FastJSONResponse {fast_path * 1000:.2f}ms ({default_path / fast_path:.0f}x)")
+        assert fast_path * 5 < default_path
+
+    @pytest.mark.database
+    @pytest.mark.slow
+    def test_rankings_endpoint_1000_offices(self, office_tracker_db, api_client):
+        url, db = office_tracker_db(
+            {o: (f"District {o % 77}", f"Province {o % 7}") for o in range(1, OFFICES + 1)},
+            visits=[{"office_id": o, "service_id": o, "overall_rating": 1 + (o * v) % 5, "wait_duration_minutes": 5 * v,
+                     "service_status": ServiceStatus.SUCCESS}
+                    for o in range(1, OFFICES + 1) for v in range(1, 5)],
+        )
+        reconcile_office_analytics(db)  # Materializes the rankings
+        client = api_client(url, analytics_router, default_response_class=FastJSONResponse)
+        client.app.add_middleware(CompressionMiddleware)
+
+        start = time.perf_counter()
+        response = client.call("GET", "/api/analytics/rankings/national", params={"limit": OFFICES},
+                               headers={"accept-encoding": "gzip"})
+        elapsed = time.perf_counter() - start
+        body = response.json()
+        print(f"\nRankings endpoint, {OFFICES} offices: {elapsed * 1000:.1f}ms, "
+              f"{response.headers['content-length']} bytes gzipped of {len(response.content)}")
+        assert body["total_ranked"] == OFFICES
+        ranks = [entry["rank"] for entry in body["rankings"]]
+        assert ranks[0] == 1 and ranks == sorted(ranks) and len(ranks) == OFFICES  # RANK(): ties share a rank
+        assert response.headers["content-encoding"] == "gzip"
+        assert int(response.headers["content-length"]) * 4 < len(response.content)
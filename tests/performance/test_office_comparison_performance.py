@@ -0,0 +1,190 @@
+"""
+Performance benchmarks for the batched office comparison.
+
+These tests verify:
+- Grouped comparison metrics match the previous per-office queries
+- A comparison issues one query per chunk of offices, whatever its size
+- Large comparisons are streamed as the same JSON document
+- The grouped query is faster than per-office queries on 50 offices x 10k visits
+"""
+
+import pytest
+import time
+from datetime import datetime, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from sqlalchemy import create_engine, event, func, insert
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from models.database_models import Base, Office, OfficeService, OfficeVisit, ServiceStatus
+    from models.pydantic_models import ComparisonResponse
+    from database.aggregations import _efficiency_score, _integrity_score, office_comparison_chunks
+    from api import analytics
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+BENCHMARK_OFFICES = 50
+BENCHMARK_VISITS_PER_OFFICE = 10_000
+
+
+def _seed(engine, offices, visits_per_office):
+    """Bulk-insert ``offices`` offices with ``visits_per_office`` varied visits each."""
+    base_date = datetime(2025, 10, 1, 9, 0)
+    with engine.begin() as conn:
+        conn.execute(insert(Office), [
+            {"id": o + 1, "office_id": f"dao-{o}", "name": f"DAO {o}", "office_type": "dao",
+             "district": f"District {o % 7}", "province": f"Province {o % 3}"}
+            for o in range(offices)
+        ])
+        conn.execute(insert(OfficeService), [
+            {"id": o + 1, "office_id": o + 1, "service_id": "passport", "service_name": "Passport"}
+            for o in range(offices)
+        ])
+        for o in range(offices):
+            conn.execute(insert(OfficeVisit), [
+                {
+                    "office_id": o + 1,
+                    "service_id": o + 1,
+                    "visit_date": base_date + timedelta(minutes=v),
+                    "service_status": ServiceStatus.SUCCESS if v % 4 else ServiceStatus.FAILED,
+                    "overall_rating": (o + v) % 5 + 1 if v % 3 else None,
+                    "staff_behavior_rating": (o * v) % 5 + 1,
+                    "office_cleanliness_rating": v % 5 + 1 if v % 3 else None,
+                    "wait_duration_minutes": (o * 7 + v) % (20 + 10 * o) if v % 5 else None,
+                    "asked_for_bribe": (v % (o + 3) == 0) if o % 2 else False,
+                }
+                for v in range(visits_per_office)
+            ])
+
+
+def _legacy_compare(db, office_ids):
+    """Reference implementation of the previous per-office comparison loop."""
+    radar_data = []
+    for office_id in office_ids:
+        office = db.query(Office).filter(Office.id == office_id).first()
+        if not office:
+            continue
+        visits = db.query(OfficeVisit).filter(OfficeVisit.office_id == office_id)
+        total_visits = visits.count()
+        if total_visits == 0:
+            metrics = {"overall_rating": 0, "efficiency": 0, "staff_behavior": 0,
+                       "cleanliness": 0, "bribe_rate": 0}
+        else:
+            ratings_query = visits.filter(OfficeVisit.overall_rating.isnot(None))
+            overall_rating = ratings_query.with_entities(func.avg(OfficeVisit.overall_rating)).scalar() or 0
+            staff_behavior = ratings_query.with_entities(func.avg(OfficeVisit.staff_behavior_rating)).scalar() or 0
+            cleanliness = ratings_query.with_entities(func.avg(OfficeVisit.office_cleanliness_rating)).scalar() or 0
+            avg_wait = visits.filter(OfficeVisit.wait_duration_minutes.isnot(None)).with_entities(
+                func.avg(OfficeVisit.wait_duration_minutes)
+            ).scalar() or 60
+            bribe_count = visits.filter(OfficeVisit.asked_for_bribe == True).count()
+            metrics = {
+                "overall_rating": round(overall_rating, 1),
+                "efficiency": _efficiency_score(avg_wait),
+                "staff_behavior": round(staff_behavior, 1),
+                "cleanliness": round(cleanliness, 1),
+                "integrity": _integrity_score(bribe_count / total_visits * 100),
+            }
+        radar_data.append({"office_name": office.name, "metrics": metrics})
+    return radar_data
+
+
+def _count_queries(engine, fn):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return result, len(statements)
+
+
+def _chunked(db, office_ids, chunk_size):
+    """Comparisons as the compare endpoint builds them (it drives the same generator with run_sync)"""
+    return [comparison for chunk in office_comparison_chunks(db, office_ids, chunk_size) for comparison in chunk]
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+class TestBatchedComparison:
+    """Correctness, query count and speed of the grouped comparison."""
+
+    @pytest.mark.database
+    def test_matches_per_office_queries(self, engine):
+        _seed(engine, offices=12, visits_per_office=40)
+        with engine.begin() as conn:
+            conn.execute(insert(Office).values(id=99, office_id="empty", name="Empty", office_type="dao",
+                                               district="District 0", province="Province 0"))
+        office_ids = [5, 99, 1, 404, 12, 3, 5]
+
+        with sessionmaker(bind=engine)() as db:
+            expected = _legacy_compare(db, office_ids)
+            batched, query_count = _count_queries(
+                engine, lambda: _chunked(db, office_ids, 3)
+            )
+
+        assert batched == expected
+        assert [entry["office_name"] for entry in batched] == ["DAO 4", "Empty", "DAO 0", "DAO 11", "DAO 2", "DAO 4"]
+        assert query_count == 3  # ceil(7 ids / chunk of 3)
+
+    @pytest.mark.database
+    def test_cap_and_streaming(self, office_tracker_db, api_client, monkeypatch):
+        url, db = office_tracker_db()
+        _seed(db.get_bind(), offices=8, visits_per_office=10)
+        monkeypatch.setattr(analytics, "COMPARISON_CHUNK_SIZE", 3)
+        monkeypatch.setattr(analytics, "COMPARISON_MAX_OFFICES", 6)
+        client = api_client(url, analytics.router)
+
+        def compare(office_ids):
+            return client.call("POST", "/api/analytics/compare", json={"office_ids": office_ids})
+
+        small = compare([1, 2])
+        streamed = compare([1, 2, 3, 4, 5])
+        too_many = compare(list(range(1, 8)))
+
+        assert "content-length" in small.headers and "content-length" not in streamed.headers
+        small, body = ComparisonResponse.model_validate(small.json()), streamed.json()
+        assert [office.office_name for office in small.offices] == ["DAO 0", "DAO 1"]
+        assert body["metrics_info"] == small.metrics_info
+        assert [office["office_name"] for office in body["offices"]] == [f"DAO {i}" for i in range(5)]
+        assert body["offices"][:2] == [office.model_dump() for office in small.offices]
+        assert too_many.status_code == 400
+
+    @pytest.mark.slow
+    def test_comparison_benchmark(self, engine):
+        """Benchmark grouped vs per-office comparison on 50 offices x 10k visits."""
+        _seed(engine, BENCHMARK_OFFICES, BENCHMARK_VISITS_PER_OFFICE)
+        office_ids = list(range(1, BENCHMARK_OFFICES + 1))
+
+        with sessionmaker(bind=engine)() as db:
+            start = time.perf_counter()
+            (legacy, legacy_queries) = _count_queries(engine, lambda: _legacy_compare(db, office_ids))
+            legacy_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            (batched, batched_queries) = _count_queries(
+                engine, lambda: _chunked(db, office_ids, BENCHMARK_OFFICES)
+            )
+            batched_time = time.perf_counter() - start
+
+        print(f"\nComparison of {BENCHMARK_OFFICES} offices x {BENCHMARK_VISITS_PER_OFFICE} visits: "
+              f"per-office {legacy_time:.2f}s ({legacy_queries} queries), "
+              f"grouped {batched_time:.2f}s ({batched_queries} query)")
+
+        assert batched == legacy
+        assert batched_queries == 1
+        assert batched_time < legacy_time
@@ -0,0 +1,116 @@
+"""
+Performance benchmarks for office search.
+
+These tests verify:
+- Ranked full-text queries over 10k offices answer in under 20 ms
+- Typeahead completions over 10k offices answer in under 20 ms
+- The index beats the previous approach (LIKE scan over offices and services)
+"""
+
+import pytest
+import statistics
+import time
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from sqlalchemy import create_engine, insert, or_, select
+    from sqlalchemy.orm import sessionmaker
+    from models.database_models import Office, OfficeService, create_tables
+    from database.office_search import OfficeTypeahead, rebuild_search_index, search_offices
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+BENCHMARK_OFFICES = 10_000
+LATENCY_BUDGET_MS = 20
+
+OFFICE_KINDS = [
+    ("District Administration Office", "जिल्ला प्रशासन कार्यालय", "Citizenship", "नागरिकता"),
+    ("Land Revenue Office", "मालपोत कार्यालय", "Land Registration", "जग्गा दर्ता"),
+    ("Transport Management Office", "यातायात व्यवस्था कार्यालय", "Driving License", "सवारी चालक अनुमतिपत्र"),
+    ("Ward Office", "वडा कार्यालय", "Recommendation", "सिफारिस"),
+]
+PLACES = [("Kathmandu", "काठमाडौं"), ("Lalitpur", "ललितपुर"), ("Bhaktapur", "भक्तपुर"),
+          ("Pokhara", "पोखरा"), ("Biratnagar", "विराटनगर"), ("Butwal", "बुटवल")]
+
+QUERIES = ["district admin kathm", "land revenue pokhara", "यातायात", "मालपोत ललित", "driving",
+           "ward 1234", "citizenship bhakt", "malpot", "office", "zzzz"]
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('search') / 'tracker.db'}")
+    create_tables(engine)
+    with engine.begin() as conn:
+        offices, services = [], []
+        for i in range(BENCHMARK_OFFICES):
+            name, name_nepali, service, service_nepali = OFFICE_KINDS[i % len(OFFICE_KINDS)]
+            place, place_nepali = PLACES[(i // len(OFFICE_KINDS)) % len(PLACES)]
+            offices.append({"id": i + 1, "office_id": f"office-{i}", "name": f"{name} {place} {i}",
+                            "name_nepali": f"{name_nepali} {place_nepali}", "office_type": name,
+                            "district": place, "province": "Bagmati", "address": f"{place} road {i}"})
+            services.append({"office_id": i + 1, "service_id": "main", "service_name": service,
+                             "service_name_nepali": service_nepali})
+        conn.execute(insert(Office), offices)
+        conn.execute(insert(OfficeService), services)
+    session = sessionmaker(bind=engine)()
+    rebuild_search_index(session)
+    yield session
+    session.close()
+
+
+def _median_ms(fn, queries, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            fn(query)
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+def _legacy_search(db, query):
+    """Previous approach: LIKE on every searchable column for each term"""
+    statement = select(Office.id).outerjoin(OfficeService)
+    for term in query.split():
+        pattern = f"%{term}%"
+        statement = statement.where(or_(Office.name.ilike(pattern), Office.name_nepali.like(pattern),
+                                        Office.address.ilike(pattern), OfficeService.service_name.ilike(pattern)))
+    return db.execute(statement.distinct().limit(20)).all()
+
+
+class TestOfficeSearchPerformance:
+
+    @pytest.mark.slow
+    @pytest.mark.database
+    def test_full_text_latency(self, db):
+        assert search_offices(db, "district admin kathm")
+        assert search_offices(db, "मालपोत ललित")
+
+        median_ms, worst_ms = _median_ms(lambda q: search_offices(db, q, limit=20), QUERIES)
+        legacy_ms, _ = _median_ms(lambda q: _legacy_search(db, q), QUERIES, repeat=1)
+        print(f"\nFull-text search over {BENCHMARK_OFFICES} offices: median {median_ms:.2f} ms, "
+              f"worst {worst_ms:.2f} ms (LIKE scan: median {legacy_ms:.2f} ms)")
+
+        assert median_ms < LATENCY_BUDGET_MS
+        assert median_ms < legacy_ms
+
+    @pytest.mark.slow
+    @pytest.mark.database
+    def test_typeahead_latency(self, db):
+        typeahead = OfficeTypeahead()
+        started = time.perf_counter()
+        typeahead.generation = -1
+        typeahead.ensure_current(db)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        assert typeahead.complete("land rev pokh")
+        median_ms, worst_ms = _median_ms(lambda q: typeahead.complete(q, limit=10),
+                                         ["d", "dis", "land rev", "काठ", "malp", "ward 12", "office k"])
+        print(f"\nTypeahead over {BENCHMARK_OFFICES} offices: built in {build_ms:.0f} ms, "
+              f"median {median_ms:.2f} ms, worst {worst_ms:.2f} ms")
+
+        assert median_ms < LATENCY_BUDGET_MS
@@ -0,0 +1,174 @@
+"""
+Performance benchmark for the OfficeVisit hot-query indexes.
+
+These tests verify:
+- Once the indexes are added, SQLite plans rankings, active visits and recent visits on them
+- (Opt-in benchmark, RUN_BENCHMARKS=1) the hot queries get faster; set
+  OFFICE_VISIT_BENCHMARK_VISITS=1000000 for the production-sized run
+"""
+
+import pytest
+import random
+import time
+from datetime import datetime, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from sqlalchemy import case, create_engine, desc, func, insert, select, text
+    from models.database_models import (
+        Office, OfficeService, OfficeVisit, ServiceStatus, add_missing_indexes, create_tables
+    )
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+BENCHMARK_OFFICES = 1_000
+BENCHMARK_VISITS = int(os.getenv("OFFICE_VISIT_BENCHMARK_VISITS", 20_000))
+NEW_INDEXES = ["ix_office_visits_office_status", "ix_office_visits_office_rating", "ix_office_visits_office_wait",
+               "ix_office_visits_visit_date", "ix_office_visits_in_progress"]
+
+# Hot query -> the index its plan must use once the indexes exist
+EXPECTED_INDEXES = {
+    "rankings_rating": "ix_office_visits_office_rating",
+    "rankings_wait": "ix_office_visits_office_wait",
+    "rankings_success": "ix_office_visits_office_status",
+    "active_visits": "ix_office_visits_in_progress",
+    "recent_visits": "ix_office_visits_visit_date",
+}
+
+HOT_QUERIES = {
+    "rankings_rating": select(
+        Office.id, func.avg(OfficeVisit.overall_rating), func.count(OfficeVisit.id)
+    ).join(OfficeVisit).where(OfficeVisit.overall_rating.isnot(None)).group_by(Office.id).having(
+        func.count(OfficeVisit.id) >= 3
+    ).order_by(desc(func.avg(OfficeVisit.overall_rating))).limit(20),
+    "rankings_wait": select(
+        Office.id, func.avg(OfficeVisit.wait_duration_minutes), func.count(OfficeVisit.id)
+    ).join(OfficeVisit).where(OfficeVisit.wait_duration_minutes.isnot(None)).group_by(Office.id).having(
+        func.count(OfficeVisit.id) >= 3
+    ).order_by(func.avg(OfficeVisit.wait_duration_minutes)).limit(20),
+    "rankings_success": select(
+        OfficeVisit.office_id, func.count(OfficeVisit.id),
+        func.sum(case((OfficeVisit.service_status == ServiceStatus.SUCCESS, 1), else_=0))
+    ).group_by(OfficeVisit.office_id),
+    "active_visits": select(OfficeVisit, Office.name).join(Office).where(
+        OfficeVisit.service_status == ServiceStatus.IN_PROGRESS,
+        OfficeVisit.start_time.isnot(None),
+        OfficeVisit.end_time.is_(None)
+    ),
+    "recent_visits": select(OfficeVisit).order_by(desc(OfficeVisit.visit_date)).limit(10),
+}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """BENCHMARK_VISITS visits (0.5% still open) inserted before the new indexes exist"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'tracker.db'}")
+    create_tables(engine)
+    with engine.begin() as conn:
+        for name in NEW_INDEXES:
+            conn.execute(text(f"DROP INDEX {name}"))
+        conn.execute(insert(Office), [
+            {"id": o + 1, "office_id": f"office-{o}", "name": f"Office {o}", "office_type": "dao",
+             "district": f"District {o % 77}", "province": f"Province {o % 7 + 1}"}
+            for o in range(BENCHMARK_OFFICES)
+        ])
+        conn.execute(insert(OfficeService), [
+            {"id": o + 1, "office_id": o + 1, "service_id": "passport", "service_name": "Passport"}
+            for o in range(BENCHMARK_OFFICES)
+        ])
+
+    rng = random.Random(39)
+    base_date = datetime(2024, 1, 1)
+    statuses = [ServiceStatus.SUCCESS.value, ServiceStatus.FAILED.value]
+
+    def visits():
+        for v in range(BENCHMARK_VISITS):
+            office_id = rng.randrange(BENCHMARK_OFFICES) + 1
+            visited = base_date + timedelta(seconds=v * 30)
+            is_open = rng.random() < 0.005
+            yield (office_id, office_id, visited, visited, None if is_open else visited + timedelta(minutes=45),
+                   ServiceStatus.IN_PROGRESS.value if is_open else rng.choice(statuses),
+                   rng.randint(1, 5) if rng.random() < 0.6 else None,
+                   None if is_open else rng.randint(5, 240))
+
+    raw = engine.raw_connection()
+    try:
+        raw.executemany(
+            "INSERT INTO office_visits (office_id, service_id, visit_date, start_time, end_time, "
+            "service_status, overall_rating, wait_duration_minutes) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            visits()
+        )
+        raw.commit()
+    finally:
+        raw.close()
+    yield engine
+    engine.dispose()
+
+
+def _timings(engine, repeat=3):
+    """Best-of-``repeat`` seconds per hot query, plus the row counts"""
+    timings, rows = {}, {}
+    with engine.connect() as conn:
+        for name, statement in HOT_QUERIES.items():
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                rows[name] = len(conn.execute(statement).all())
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            timings[name] = best
+    return timings, rows
+
+
+def _plan(conn, statement):
+    compiled = statement.compile(dialect=conn.dialect)
+    parameters = tuple(compiled.params[name] for name in compiled.positiontup)
+    return "\n".join(str(row[-1]) for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", parameters))
+
+
+class TestOfficeVisitIndexPlans:
+
+    @pytest.mark.database
+    def test_hot_queries_use_indexes(self, engine):
+        with engine.connect() as conn:
+            before = {name: _plan(conn, statement) for name, statement in HOT_QUERIES.items()}
+        assert not [name for name, plan in before.items() if any(index in plan for index in NEW_INDEXES)]
+
+        add_missing_indexes(engine)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        with engine.connect() as conn:
+            for name, statement in HOT_QUERIES.items():
+                plan = _plan(conn, statement)
+                assert EXPECTED_INDEXES[name] in plan, (name, plan)
+                assert "SCAN office_visits" not in plan.splitlines(), (name, plan)  # No full table scan
+
+
+class TestOfficeVisitIndexPerformance:
+
+    @pytest.mark.slow
+    @pytest.mark.benchmark
+    @pytest.mark.database
+    def test_indexes_speed_up_hot_queries(self, engine):
+        before, before_rows = _timings(engine)
+
+        started = time.perf_counter()
+        add_missing_indexes(engine)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        build_seconds = time.perf_counter() - started
+
+        after, after_rows = _timings(engine)
+        print(f"\n{BENCHMARK_VISITS} visits, indexes built in {build_seconds:.1f}s")
+        for name in HOT_QUERIES:
+            print(f"  {name:18} {before[name] * 1000:9.1f} ms -> {after[name] * 1000:8.1f} ms "
+                  f"({before[name] / after[name]:.1f}x)")
+
+        assert after_rows == before_rows
+        assert before_rows["active_visits"] > 0
+        for name in HOT_QUERIES:
+            assert after[name] < before[name], name
@@ -0,0 +1,167 @@
+"""
+Performance benchmarks for the collector service temp-to-main article transfer.
+
+These tests verify:
+- ATTACH DATABASE bulk transfer returns accurate inserted counts
+- Chunked mode produces the same result as the single-transaction mode
+- Re-running a transfer inserts nothing and leaves no duplicate URLs
+- (Opt-in benchmark, RUN_BENCHMARKS=1) bulk transfer is faster than the previous
+  row-by-row copy on 100k rows
+"""
+
+import pytest
+import sqlite3
+import time
+from datetime import datetime
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+try:
+    from news_collector_service import NewsCollectorService
+except ImportError as e:
+    pytest.skip(f"Could not import news_collector_service: {e}", allow_module_level=True)
+
+
+BENCHMARK_ROWS = 100_000
+
+
+def _create_temp_db(path, rows, start=0):
+    """Create a collector-format temp database with ``rows`` articles."""
+    with sqlite3.connect(path) as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS articles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT UNIQUE, source_id TEXT, title TEXT, content TEXT,
+                author TEXT, published_date TEXT, collected_date TEXT,
+                language TEXT, word_count INTEGER, content_hash TEXT, title_hash TEXT
+            )
+        """)
+        conn.executemany(
+            "INSERT INTO articles (url, source_id, title, content, author, published_date, "
+            "collected_date, language, word_count, content_hash, title_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (f"https://example.com/news/{i}", None if i % 10 == 0 else 'ekantipur',
+                 f"समाचार {i}", "सामग्री " * 20, None, '2025-10-01 10:00:00',
+                 None if i % 7 == 0 else '2025-10-01 11:00:00', None, None,
+                 f"c{i}", f"t{i}")
+                for i in range(start, start + rows)
+            )
+        )
+
+
+def _legacy_row_by_row_transfer(temp_db, main_db):
+    """Reference implementation of the previous per-row transfer loop."""
+    transferred = 0
+    with sqlite3.connect(temp_db) as temp_conn, sqlite3.connect(main_db) as main_conn:
+        main_cursor = main_conn.cursor()
+        for row in temp_conn.execute("""
+            SELECT url, source_id, title, content, author, published_date,
+                   collected_date, language, word_count, content_hash, title_hash
+            FROM articles
+        """):
+            main_cursor.execute("""
+                INSERT OR IGNORE INTO articles_enhanced
+                (url, source_site, title, content, author, published_date,
+                 scraped_date, language, word_count, content_hash, title_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (row[0], row[1] or 'unknown', row[2], row[3], row[4], row[5],
+                  row[6] or datetime.now().isoformat(), row[7] or 'ne', row[8] or 0,
+                  row[9], row[10]))
+            if main_cursor.rowcount > 0:
+                transferred += 1
+        main_conn.commit()
+    return transferred
+
+
+@pytest.fixture
+def collector_service(tmp_path, monkeypatch):
+    """Collector service rooted in a temporary directory with an empty main DB."""
+    monkeypatch.chdir(tmp_path)
+    main_db = tmp_path / "main.db"
+    sqlite3.connect(main_db).close()
+    service = NewsCollectorService(main_db_path=str(main_db))
+    service.temp_db = tmp_path / "temp_collection.db"
+    return service
+
+
+class TestBulkTransfer:
+    """Correctness and speed of the ATTACH DATABASE transfer."""
+
+    @pytest.mark.database
+    @pytest.mark.parametrize("chunk_size", [None, 7])
+    def test_transfer_counts_only_new_rows(self, collector_service, chunk_size):
+        """Duplicates are ignored and column defaults are applied in SQL."""
+        _create_temp_db(collector_service.temp_db, 30)
+        assert collector_service._transfer_articles(chunk_size) == 30
+        assert not collector_service.temp_db.exists()
+
+        # Half overlap with what is already in the main database
+        _create_temp_db(collector_service.temp_db, 30, start=15)
+        assert collector_service._transfer_articles(chunk_size) == 15
+
+        with sqlite3.connect(collector_service.main_db_path) as conn:
+            total, unknown, languages, missing_dates = conn.execute("""
+                SELECT COUNT(*),
+                       SUM(source_site = 'unknown'),
+                       COUNT(DISTINCT language),
+                       SUM(scraped_date IS NULL)
+                FROM articles_enhanced
+            """).fetchone()
+        assert total == 45
+        assert unknown == 5
+        assert languages == 1
+        assert missing_dates == 0
+
+    @pytest.mark.database
+    def test_rerun_and_chunks_agree(self, collector_service):
+        """Chunked and single-transaction transfers count the same rows; a re-run adds none."""
+        _create_temp_db(collector_service.temp_db, 2_000)
+        assert collector_service._transfer_articles() == 2_000
+
+        _create_temp_db(collector_service.temp_db, 3_000)  # Re-run of the first 2000, plus 1000 new
+        assert collector_service._transfer_articles(chunk_size=256) == 1_000
+        _create_temp_db(collector_service.temp_db, 3_000)
+        assert collector_service._transfer_articles(chunk_size=256) == 0
+        assert collector_service._transfer_articles() == 0  # Nothing left to transfer
+
+        with sqlite3.connect(collector_service.main_db_path) as conn:
+            total, urls, hashes = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT url), COUNT(DISTINCT url_hash) FROM articles_enhanced"
+            ).fetchone()
+        assert total == urls == hashes == 3_000
+
+    @pytest.mark.slow
+    @pytest.mark.benchmark
+    def test_bulk_transfer_benchmark(self, collector_service, tmp_path):
+        """Benchmark bulk vs row-by-row transfer on a 100k-row temp database."""
+        _create_temp_db(collector_service.temp_db, BENCHMARK_ROWS)
+
+        legacy_main = tmp_path / "legacy_main.db"
+        with sqlite3.connect(collector_service.main_db_path) as conn:
+            schema = conn.execute(
+                "SELECT sql FROM sqlite_master WHERE name = 'articles_enhanced'"
+            ).fetchone()[0]
+        with sqlite3.connect(legacy_main) as conn:
+            conn.execute(schema)
+
+        start = time.perf_counter()
+        legacy_count = _legacy_row_by_row_transfer(collector_service.temp_db, legacy_main)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bulk_count = collector_service._transfer_articles()
+        bulk_time = time.perf_counter() - start
+
+        _create_temp_db(collector_service.temp_db, BENCHMARK_ROWS, start=BENCHMARK_ROWS)
+        start = time.perf_counter()
+        chunked_count = collector_service._transfer_articles(chunk_size=10_000)
+        chunked_time = time.perf_counter() - start
+
+        print(f"\nTransfer of {BENCHMARK_ROWS} rows: row-by-row {legacy_time:.2f}s, "
+              f"bulk {bulk_time:.2f}s, chunked(10k) {chunked_time:.2f}s")
+
+        assert legacy_count == bulk_count == chunked_count == BENCHMARK_ROWS
+        assert bulk_time < legacy_time
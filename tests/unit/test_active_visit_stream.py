@@ -0,0 +1,168 @@
+"""
+Unit tests for the live active-visit board.
+
+These tests verify:
+- The registry tracks per-office queues and publishes started/ended deltas to matching subscribers
+- Slow subscribers get a fresh snapshot instead of an unbounded backlog; resync publishes differences
+- The SSE endpoint streams a snapshot, then the deltas from start-timer and end-visit
+"""
+
+import asyncio
+import json
+import pytest
+from datetime import datetime, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from database.active_visits import SUBSCRIBER_QUEUE_SIZE, ActiveVisit, ActiveVisitRegistry, active_visit_registry
+    from models.database_models import ServiceStatus
+    from api.dependencies import API_KEY
+    from api.visit_tracking import router as visit_tracking_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+def _visit(visit_id, office_id, minutes_ago=10):
+    return ActiveVisit(visit_id=visit_id, office_id=office_id, office_name=f"DAO {office_id}",
+                       service_name="Passport", district="Kathmandu",
+                       start_time=datetime.utcnow() - timedelta(minutes=minutes_ago))
+
+
+def _drain(subscriber):
+    events = []
+    while not subscriber.queue.empty():
+        events.append(subscriber.queue.get_nowait())
+    return events
+
+
+class TestActiveVisitRegistry:
+
+    def test_deltas_and_queues(self):
+        async def run():
+            registry = ActiveVisitRegistry()
+            registry.resync([_visit(1, 10, minutes_ago=20)])
+            everything, office_11 = registry.subscribe(), registry.subscribe(office_id=11)
+
+            registry.visit_started(_visit(2, 10, minutes_ago=10))
+            registry.visit_started(_visit(3, 11, minutes_ago=0))
+            registry.visit_ended(1, 10, ServiceStatus.SUCCESS, 20)
+
+            all_events = _drain(everything)
+            assert [event for _, event, _ in all_events] == ["snapshot", "visit_started", "visit_started", "visit_ended"]
+            assert all_events[0][2]["total_active"] == 1
+            assert all_events[1][2]["office"] == {"office_id": 10, "queue_length": 2, "avg_wait_minutes": 15.0}
+            assert all_events[3][2]["office"]["queue_length"] == 1
+            assert all_events[3][2]["wait_duration_minutes"] == 20
+
+            office_events = _drain(office_11)
+            assert [event for _, event, _ in office_events] == ["snapshot", "visit_started"]
+            assert office_events[0][2] == {"active_visits": [], "offices": [
+                {"office_id": 11, "queue_length": 0, "avg_wait_minutes": 0.0}], "total_active": 0}
+
+            assert registry.stats() == {"active_visits": 2, "offices": 2, "subscribers": 2, "sequence": 3}
+            registry.unsubscribe(everything)
+            registry.unsubscribe(office_11)
+            assert not registry.subscribers
+        asyncio.run(run())
+
+    def test_overflow_and_resync(self):
+        async def run():
+            registry = ActiveVisitRegistry()
+            registry.resync([])
+            slow = registry.subscribe()
+            for visit_id in range(SUBSCRIBER_QUEUE_SIZE + 5):
+                registry.visit_started(_visit(visit_id, visit_id % 3))
+
+            events = _drain(slow)
+            assert len(events) < SUBSCRIBER_QUEUE_SIZE
+            snapshot = [data for _, event, data in events if event == "snapshot"][-1]
+            assert snapshot["total_active"] >= SUBSCRIBER_QUEUE_SIZE
+
+            # Another worker ended visits 1 and 2 and started 5000
+            registry = ActiveVisitRegistry()
+            registry.resync([_visit(0, 0), _visit(1, 1), _visit(2, 1)])
+            board = registry.subscribe()
+            registry.resync([_visit(0, 0), _visit(5000, 2)])
+            events = _drain(board)[1:]
+            assert sorted(data["visit_id"] for _, event, data in events if event == "visit_ended") == [1, 2]
+            assert [data["visit"]["visit_id"] for _, event, data in events if event == "visit_started"] == [5000]
+            assert set(registry.visits) == {0, 5000} and set(registry.by_office) == {0, 2}
+        asyncio.run(run())
+
+
+async def _open_stream(app, path):
+    """
+    Start a streaming GET on the ASGI app; returns (chunks queue, disconnect
+    event, task). Driven by hand: httpx's ASGITransport buffers the whole
+    body, which never ends for an event stream.
+    """
+    chunks, disconnected = asyncio.Queue(), asyncio.Event()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"api-key", API_KEY.encode()), (b"host", b"test")], "client": ("test", 1), "server": ("test", 80),
+    }
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            await chunks.put(("start", message["status"], dict(message["headers"])))
+        elif message.get("body"):
+            await chunks.put(("body", message["body"].decode()))
+
+    return chunks, disconnected, asyncio.create_task(app(scope, receive, send))
+
+
+def _parse_sse(text):
+    fields = dict(line.split(": ", 1) for line in text.strip().splitlines())
+    return fields["event"], json.loads(fields["data"])
+
+
+class TestActiveVisitStream:
+
+    @pytest.mark.database
+    def test_stream_snapshot_and_deltas(self, office_tracker_db, api_client):
+        url, _ = office_tracker_db({1: ("Kathmandu", "Bagmati")}, visits=[
+            {"office_id": 1, "service_id": 1, "start_time": datetime.utcnow(),
+             "service_status": ServiceStatus.IN_PROGRESS}
+        ])
+        client = api_client(url, visit_tracking_router)
+        active_visit_registry.__init__()
+
+        async def send(http):
+            chunks, disconnected, task = await _open_stream(client.app, "/api/visit/active-visits/stream")
+            _, status, headers = await asyncio.wait_for(chunks.get(), 5)
+            assert status == 200 and headers[b"content-type"].startswith(b"text/event-stream")
+
+            event, snapshot = _parse_sse((await asyncio.wait_for(chunks.get(), 5))[1])
+            assert event == "snapshot" and snapshot["total_active"] == 1
+            assert snapshot["active_visits"][0]["office_name"] == "DAO 1"
+
+            started = await http.post("/api/visit/start-timer", json={"office_id": 1, "service_id": 1})
+            event, data = _parse_sse((await asyncio.wait_for(chunks.get(), 5))[1])
+            assert event == "visit_started" and data["visit"]["visit_id"] == started.json()["visit_id"]
+            assert data["office"]["queue_length"] == 2
+
+            await http.post("/api/visit/end-visit", json={"visit_id": 1, "service_status": "kaam_bhayo"})
+            event, data = _parse_sse((await asyncio.wait_for(chunks.get(), 5))[1])
+            assert event == "visit_ended" and data["visit_id"] == 1 and data["service_status"] == "kaam_bhayo"
+            assert data["office"]["queue_length"] == 1
+
+            disconnected.set()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await asyncio.sleep(0)
+            assert not active_visit_registry.subscribers
+
+        client.run(send)
@@ -0,0 +1,122 @@
+"""
+Unit tests for the adaptive per-feed poll scheduler.
+
+These tests verify:
+- Arrival rates are estimated from articles_enhanced timestamps per feed
+- Busy feeds get shorter intervals, clamped to the configured bounds
+- Planned polls are stretched to fit the global request budget
+- Only due feeds are polled and the run-time budget is enforced, across restarts
+- Articles stored with space-separated dates count from the start of the window
+"""
+
+import pytest
+import sqlite3
+from datetime import datetime
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'news_aggregator'))
+
+from adaptive_poll_scheduler import AdaptivePollScheduler, fit_to_budget
+
+NOW = 1_760_000_000.0
+
+FEEDS = [
+    ("Ratopati", "https://www.ratopati.com/rss"),
+    ("Kathmandu Post", "https://kathmandupost.com/rss"),
+    ("Desh Sanchar", "https://www.deshsanchar.com/rss"),
+]
+
+CONFIG = {
+    'min_poll_interval': 120,
+    'max_poll_interval': 3 * 3600,
+    'target_articles_per_poll': 2,
+    'max_requests_per_hour': 60,
+    'rate_window_hours': 72,
+    'rate_half_life_hours': 12,
+}
+
+
+@pytest.fixture
+def news_db(tmp_path):
+    db_path = tmp_path / "news.db"
+    rows = []
+    # Ratopati: one article every 10 minutes for the last day (RSS source name)
+    for i in range(144):
+        ts = datetime.fromtimestamp(NOW - i * 600).isoformat()
+        rows.append((f"https://ratopati.com/story/{i}", "Ratopati", ts, ts))
+    # Kathmandu Post: one article every 2 hours, stored by host (site scraper)
+    for i in range(12):
+        ts = datetime.fromtimestamp(NOW - i * 7200).isoformat()
+        rows.append((f"https://kathmandupost.com/news/{i}", "kathmandupost.com", None, ts))
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE articles_enhanced (
+                id INTEGER PRIMARY KEY, url TEXT UNIQUE, source_site TEXT,
+                published_date TIMESTAMP, scraped_date TIMESTAMP
+            )
+        """)
+        conn.executemany(
+            "INSERT INTO articles_enhanced (url, source_site, published_date, scraped_date) VALUES (?, ?, ?, ?)",
+            rows
+        )
+    return str(db_path)
+
+
+class TestAdaptivePollScheduler:
+
+    @pytest.mark.database
+    def test_rates_follow_publication_history(self, news_db):
+        scheduler = AdaptivePollScheduler(news_db, feeds=FEEDS, config=CONFIG)
+        rates = scheduler.estimate_rates(NOW)
+        assert rates["Ratopati"] > rates["Kathmandu Post"] > rates["Desh Sanchar"] > 0
+        assert 3 < rates["Ratopati"] < 6  # ~6/h over the last day, decayed
+
+    @pytest.mark.database
+    def test_space_separated_dates_in_first_day(self, news_db):
+        scheduler = AdaptivePollScheduler(news_db, feeds=FEEDS, config=CONFIG)
+        prior_only = scheduler.estimate_rates(NOW)["Desh Sanchar"]
+        # Stored as sqlite3 adapts datetimes, shortly after the window starts
+        scraped = datetime.fromtimestamp(NOW - 71.9 * 3600).strftime('%Y-%m-%d %H:%M:%S')
+        with sqlite3.connect(news_db) as conn:
+            conn.execute("INSERT INTO articles_enhanced (url, source_site, scraped_date) VALUES (?, ?, ?)",
+                         ("https://deshsanchar.com/content/1", "Desh Sanchar", scraped))
+        assert scheduler.estimate_rates(NOW)["Desh Sanchar"] > prior_only
+
+    @pytest.mark.database
+    def test_intervals_scale_with_rate_and_bounds(self, news_db):
+        scheduler = AdaptivePollScheduler(news_db, feeds=FEEDS, config=CONFIG)
+        plan = {schedule.name: schedule for schedule in scheduler.plan(NOW)}
+        assert plan["Ratopati"].interval_seconds < plan["Kathmandu Post"].interval_seconds
+        assert plan["Desh Sanchar"].interval_seconds == CONFIG['max_poll_interval']
+        assert all(schedule.interval_seconds >= CONFIG['min_poll_interval'] for schedule in plan.values())
+
+    def test_budget_stretches_intervals(self):
+        intervals = {'busy': 120.0, 'medium': 600.0, 'quiet': 3600.0}
+        fitted = fit_to_budget(intervals, max_requests_per_hour=10, max_interval=3600)
+        assert sum(3600 / interval for interval in fitted.values()) == pytest.approx(10, rel=1e-3)
+        assert fitted['busy'] < fitted['medium'] <= fitted['quiet'] == 3600
+
+    @pytest.mark.database
+    def test_run_due_polls_and_reschedules(self, news_db):
+        scheduler = AdaptivePollScheduler(news_db, feeds=FEEDS, config=dict(CONFIG, max_requests_per_hour=2))
+        polled = []
+
+        def poll(name, url):
+            polled.append(name)
+            return 1
+
+        results = scheduler.run_due(poll, now=NOW)
+        assert len(results) == 2  # Budget of 2 requests/hour caps the first tick
+        assert scheduler.run_due(poll, now=NOW + 60) == {}
+
+        with sqlite3.connect(news_db) as conn:
+            stored = dict(conn.execute(
+                "SELECT feed_name, total_polls FROM source_poll_schedule WHERE last_polled_at IS NOT NULL"
+            ))
+        assert stored == {name: 1 for name in polled}
+
+        # A restart keeps the hour's budget; it frees up an hour after the polls
+        restarted = AdaptivePollScheduler(news_db, feeds=FEEDS, config=dict(CONFIG, max_requests_per_hour=2))
+        assert restarted.run_due(poll, now=NOW + 120) == {}
+        assert len(restarted.run_due(poll, now=NOW + 3601)) == 2
@@ -0,0 +1,153 @@
+"""
+Unit tests for the streaming failure-rate / bribe-report anomaly detector.
+
+These tests verify:
+- A stable rate raises no alert; a sustained spike raises exactly one
+- end_visit and rating log outcome events that the detector turns into alerts served by the endpoint
+- After a restart only events after the checkpoint are replayed, ending in the same state, without duplicate alerts
+"""
+
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from sqlalchemy import delete, select
+    from database.anomaly_detector import (
+        ANOMALY_WARMUP_EVENTS, AnomalyDetector, SignalState, outcome_events, record_outcome_events
+    )
+    from models.database_models import (
+        AnomalyDetectorState, OfficeAlert, OfficeVisit, ServiceStatus, VisitOutcomeEvent
+    )
+    from api.analytics import ALERTS_MAX_LIMIT, router as analytics_router
+    from api.visit_tracking import router as visit_tracking_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+RATINGS = {"overall_rating": 3, "staff_behavior_rating": 3, "office_cleanliness_rating": 4,
+           "process_efficiency_rating": 2, "information_clarity_rating": 3}
+
+
+def _pattern(events, every):
+    """Deterministic 0/1 stream with one positive per ``every`` events"""
+    return [i % every == every - 1 for i in range(events)]
+
+
+@pytest.fixture
+def tracker(office_tracker_db, api_client):
+    url, db = office_tracker_db({o: ("Kathmandu", "Bagmati") for o in (1, 2)})
+    return api_client(url, visit_tracking_router, analytics_router), db
+
+
+def _log(db, office_id, signal, values):
+    """Visits with the given outcomes, logged as end_visit / rating would"""
+    for value in values:
+        visit = OfficeVisit(office_id=office_id, service_id=office_id, service_status=ServiceStatus.IN_PROGRESS)
+        db.add(visit)
+        db.flush()
+        after = {'service_status': ServiceStatus.IN_PROGRESS, 'asked_for_bribe': None}
+        if signal == 'failure':
+            after['service_status'] = ServiceStatus.FAILED if value else ServiceStatus.SUCCESS
+        else:
+            after['asked_for_bribe'] = value
+        record_outcome_events(db, [(visit.id, office_id, None, after)])
+    db.commit()
+
+
+class TestSignalState:
+
+    def test_stable_rate_then_spike(self):
+        state = SignalState()
+        assert not any(state.update(value) for value in _pattern(400, 20))  # 5% failures
+        assert state.baseline == pytest.approx(0.05, abs=0.01)
+
+        alerts = [i for i, value in enumerate(_pattern(60, 2)) if state.update(value) and not state.rebaseline()]
+        assert len(alerts) == 1 and alerts[0] < 20
+        assert state.baseline > 0.2  # The new rate is the new normal
+
+    def test_outcome_events(self):
+        in_progress = {'service_status': ServiceStatus.IN_PROGRESS, 'asked_for_bribe': None}
+        failed = dict(in_progress, service_status=ServiceStatus.FAILED)
+        assert outcome_events(7, 1, in_progress, in_progress) == []
+        assert outcome_events(7, 1, in_progress, failed) == [
+            {'office_id': 1, 'visit_id': 7, 'signal': 'failure', 'value': True}
+        ]
+        assert outcome_events(7, 1, failed, dict(failed, asked_for_bribe=False)) == [
+            {'office_id': 1, 'visit_id': 7, 'signal': 'bribe', 'value': False}
+        ]
+
+
+class TestDetectorFeed:
+
+    @pytest.mark.database
+    def test_endpoints_feed_alerts(self, tracker):
+        client, db = tracker
+
+        def visits(outcomes):
+            async def send(http):
+                for failed, bribe in outcomes:
+                    visit_id = (await http.post("/api/visit/start-timer", json={"office_id": 2, "service_id": 2})).json()["visit_id"]
+                    status = "kaam_bhayena" if failed else "kaam_bhayo"
+                    assert (await http.post("/api/visit/end-visit", json={"visit_id": visit_id, "service_status": status})).status_code == 200
+                    rating = dict(RATINGS, visit_id=visit_id, asked_for_bribe=bribe)
+                    assert (await http.post("/api/visit/rating", json=rating)).status_code == 200
+                return (await http.get("/api/analytics/alerts", params={"office_id": 2})).json()
+            return client.run(send)
+
+        detector = AnomalyDetector()
+        visits([(False, False)] * ANOMALY_WARMUP_EVENTS)
+        assert detector.catch_up(db) == 2 * ANOMALY_WARMUP_EVENTS
+        assert visits([(True, False)] * 8)["total"] == 0  # Logged, not consumed yet
+        assert detector.catch_up(db) == 16
+
+        body = visits([])
+        assert body["total"] == 1
+        alert = body["alerts"][0]
+        assert (alert["office_name"], alert["signal"], alert["baseline_rate"] < 0.05) == ("DAO 2", "failure", True)
+        assert alert["recent_rate"] > 0.3 and alert["observations"] > ANOMALY_WARMUP_EVENTS
+
+        # The page size is bounded before it reaches the query
+        for limit in (0, ALERTS_MAX_LIMIT + 1):
+            assert client.call("GET", "/api/analytics/alerts", params={"limit": limit}).status_code == 422
+        assert client.call("GET", "/api/analytics/alerts", params={"limit": 1}).json()["total"] == 1
+
+        # Alerts are checkpointed with the state that raised them
+        assert db.execute(select(AnomalyDetectorState.last_event_id)).scalars().all() == [detector.last_event_id] * 2
+
+
+class TestCheckpointReplay:
+
+    @pytest.mark.database
+    def test_restart_replays_after_checkpoint(self, tracker):
+        _, db = tracker
+        _log(db, 1, 'failure', _pattern(100, 20))
+        _log(db, 1, 'bribe', _pattern(60, 30))
+        _log(db, 2, 'failure', _pattern(50, 10))
+
+        first = AnomalyDetector(checkpoint_events=10_000)
+        assert first.catch_up(db) == 210
+        first.checkpoint(db)
+        _log(db, 1, 'failure', _pattern(40, 2))   # Spike, checkpointed with its alert
+        assert first.catch_up(db) == 40
+        assert db.query(OfficeAlert).count() == 1
+        _log(db, 2, 'bribe', _pattern(30, 15))
+        assert first.catch_up(db) == 30
+
+        # Restart: only the 30 events after the alert's checkpoint are replayed
+        restarted = AnomalyDetector(checkpoint_events=10_000)
+        restarted.load(db)
+        assert restarted.last_event_id == 250
+        assert restarted.catch_up(db) == 30
+        assert restarted.last_event_id == first.last_event_id
+        assert {key: state.to_dict() for key, state in restarted.states.items()} == \
+               {key: state.to_dict() for key, state in first.states.items()}
+
+        # Losing every checkpoint means a full replay, still without duplicate alerts
+        db.execute(delete(AnomalyDetectorState))
+        db.commit()
+        fresh = AnomalyDetector()
+        assert fresh.catch_up(db) == db.query(VisitOutcomeEvent).count() == 280
+        assert db.query(OfficeAlert).count() == 1
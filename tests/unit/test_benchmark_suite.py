@@ -0,0 +1,113 @@
+"""
+Unit tests for the load benchmark package.
+
+These tests verify:
+- The data generator fills all 77 districts deterministically, with derived data rebuilt
+- The load scenario runs citizen flows and reads against the app without errors
+- The report computes per-endpoint percentiles and requests/second
+"""
+
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from sqlalchemy import create_engine, func, select
+    from benchmark.data_generator import DISTRICTS, OFFICE_TYPES, generate, service_row_id, visit_batches
+    from benchmark.load_scenario import run_load
+    from benchmark.report import LatencyRecorder, format_report
+    from models.database_models import (
+        Office, OfficeAnalytics, OfficeService, OfficeVisit, ServiceStatus, VisitTimeCube
+    )
+    from api.analytics import router as analytics_router
+    from api.office_selection import router as office_selection_router
+    from api.visit_tracking import router as visit_tracking_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+VISITS = 5_000
+
+
+@pytest.fixture
+def generated(tmp_path):
+    url = f"sqlite:///{tmp_path / 'benchmark.db'}"
+    engine = create_engine(url)
+    stats = generate(engine, VISITS, days=60, batch_size=2_000)
+    yield url, engine, stats
+    engine.dispose()
+
+
+class TestDataGenerator:
+
+    @pytest.mark.database
+    def test_fills_all_districts(self, generated):
+        _, engine, stats = generated
+        assert len(DISTRICTS) == 77 and len({district for district, _ in DISTRICTS}) == 77
+        assert stats["offices"] == 77 * len(OFFICE_TYPES) and stats["visits"] == VISITS
+
+        with engine.connect() as conn:
+            assert conn.execute(select(func.count(func.distinct(Office.district)))).scalar() == 77
+            assert conn.execute(select(func.count(func.distinct(Office.province)))).scalar() == 7
+            service = conn.execute(select(OfficeService).where(OfficeService.id == service_row_id(10, 2))).first()
+            assert service.office_id == 10
+            assert conn.execute(select(func.count()).where(OfficeVisit.service_id.not_in(
+                select(OfficeService.id).where(OfficeService.office_id == OfficeVisit.office_id)
+            ))).scalar() == 0
+
+            statuses = dict(conn.execute(select(OfficeVisit.service_status, func.count()).group_by(OfficeVisit.service_status)).all())
+            assert 0 < statuses.get(ServiceStatus.IN_PROGRESS.value, 0) < VISITS * 0.02
+            assert statuses[ServiceStatus.SUCCESS.value] > statuses[ServiceStatus.FAILED.value]
+            assert conn.execute(select(func.sum(OfficeAnalytics.total_visits))).scalar() == VISITS
+            assert conn.execute(select(func.sum(VisitTimeCube.count))).scalar() == VISITS - statuses[ServiceStatus.IN_PROGRESS.value]
+
+        # Same seed, same visits; a filled database is not generated into twice
+        first = next(visit_batches(462, 100, 60, seed=7, batch_size=100))
+        again = next(visit_batches(462, 100, 60, seed=7, batch_size=100))
+        assert [(v["office_id"], v["service_id"], v["wait_duration_minutes"]) for v in first] == \
+               [(v["office_id"], v["service_id"], v["wait_duration_minutes"]) for v in again]
+        with pytest.raises(RuntimeError):
+            generate(engine, 10)
+
+
+class TestLoadScenario:
+
+    @pytest.mark.database
+    def test_scenario_against_app(self, generated, api_client):
+        url, engine, _ = generated
+        client = api_client(url, office_selection_router, visit_tracking_router, analytics_router)
+
+        recorder = client.run(lambda http: run_load(http, concurrency=4, iterations=5, seed=1, citizen_share=0.7))
+        summary = recorder.summary()
+        assert summary["total"]["errors"] == 0
+        assert "POST /api/visit/start-timer" in summary["endpoints"]
+        assert "GET /api/selection/offices/{district}/{office_type}" in summary["endpoints"]
+        assert any(endpoint.startswith("GET /api/analytics") for endpoint in summary["endpoints"])
+
+        started = summary["endpoints"]["POST /api/visit/start-timer"]["requests"]
+        with engine.connect() as conn:
+            assert conn.execute(select(func.count(OfficeVisit.id))).scalar() == VISITS + started
+
+
+class TestReport:
+
+    def test_percentiles_and_throughput(self):
+        recorder = LatencyRecorder()
+        recorder.start()
+        for ms in range(1, 101):
+            recorder.record("GET /a", ms / 1000)
+        recorder.record("POST /b", 0.5, ok=False)
+        recorder.started_at, recorder.finished_at = 0.0, 10.0
+
+        summary = recorder.summary()
+        a = summary["endpoints"]["GET /a"]
+        assert a["requests"] == 100 and a["errors"] == 0
+        assert a["p50_ms"] == pytest.approx(50.5) and a["p95_ms"] == pytest.approx(95.05)
+        assert a["requests_per_second"] == 10.0
+        assert summary["endpoints"]["POST /b"]["errors"] == 1
+        assert summary["total"]["requests"] == 101 and summary["total"]["requests_per_second"] == 10.1
+
+        table = format_report(summary)
+        assert "GET /a" in table and "Total" in table
@@ -0,0 +1,91 @@
+"""
+Unit tests for the office tracker dashboard aggregation layer.
+
+These tests verify:
+- National and provincial statistics match a straightforward recomputation
+- Top-N lists honour the minimum review count
+- Recent visits come with office and service loaded (no lazy loads)
+- The dashboard issues a constant number of queries regardless of province count
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from models.database_models import Office, OfficeService, OfficeVisit, ServiceStatus
+    from database.aggregations import dashboard_aggregates
+    from models.pydantic_models import AnalyticsDashboard
+    from api.analytics import router as analytics_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+def _seed(session, province_count, offices_per_province=3, visits_per_office=6):
+    base_date = datetime(2025, 10, 1, 9, 0)
+    visit_number = 0
+    for p in range(province_count):
+        for o in range(offices_per_province):
+            office = Office(office_id=f"p{p}-o{o}", name=f"Office {p}-{o}", office_type="dao",
+                            district=f"District {p}", province=f"Province {p}")
+            session.add(office)
+            session.flush()
+            service = OfficeService(office_id=office.id, service_id="citizenship",
+                                    service_name="Citizenship Certificate")
+            session.add(service)
+            session.flush()
+            for v in range(visits_per_office):
+                visit_number += 1
+                session.add(OfficeVisit(
+                    office_id=office.id,
+                    service_id=service.id,
+                    visit_date=base_date + timedelta(minutes=visit_number),
+                    service_status=ServiceStatus.SUCCESS if v % 3 else ServiceStatus.FAILED,
+                    overall_rating=(o + v) % 5 + 1 if v < 4 else None,
+                    wait_duration_minutes=10 * (o + 1) + v,
+                    asked_for_bribe=(o == 2 and v == 0),
+                ))
+    session.commit()
+
+
+class TestDashboardAggregation:
+
+    @pytest.mark.database
+    def test_statistics_match_recomputation(self, office_tracker_db):
+        _, session = office_tracker_db()
+        _seed(session, province_count=2)
+        data = dashboard_aggregates(session)
+        visits = session.query(OfficeVisit).all()
+
+        ratings = [v.overall_rating for v in visits if v.overall_rating is not None]
+        successes = sum(v.service_status == ServiceStatus.SUCCESS for v in visits)
+        assert data["total_offices"] == 6
+        assert data["total_visits"] == len(visits) == 36
+        assert data["avg_success_rate"] == round(successes * 100 / len(visits), 1)
+        assert data["avg_overall_rating"] == round(sum(ratings) / len(ratings), 2)
+
+        province = data["provincial_stats"]["Province 0"]
+        assert province["total_visits"] == 18
+        assert province["avg_wait_minutes"] == round(sum(10 * (o + 1) + v for o in range(3) for v in range(6)) / 18, 1)
+
+        assert len(data["top_rated_offices"]) == 5
+        assert all(entry["review_count"] >= 3 for entry in data["top_rated_offices"])
+        assert data["most_efficient_offices"][0]["avg_wait_minutes"] == 12.5
+        assert {entry["bribe_reports"] for entry in data["offices_with_bribe_reports"]} == {1}
+        assert data["offices_with_bribe_reports"][0]["total_visits"] == 6
+        assert data["recent_visits"][0]["visit_date"] == max(v.visit_date for v in visits)
+
+    @pytest.mark.database
+    @pytest.mark.parametrize("province_count", [1, 3, 7])
+    def test_constant_query_count(self, office_tracker_db, api_client, province_count):
+        url, session = office_tracker_db()
+        _seed(session, province_count=province_count)
+        client = api_client(url, analytics_router)
+        response = client.call("GET", "/api/analytics/dashboard")
+        dashboard = AnalyticsDashboard.model_validate_json(response.content)
+        assert len(dashboard.provincial_stats) == province_count
+        assert len(dashboard.recent_visits) == 10
+        assert len(client.statements) == 3
@@ -0,0 +1,102 @@
+"""
+Unit tests for the office tracker engine profiles.
+
+These tests verify:
+- Profiles set pool sizing, pre-ping and statement cache; SQL echo is opt-in
+- Environment variables override individual profile values
+- SQLite connections get WAL and busy_timeout on connect; in-memory uses one shared connection
+- PostgreSQL options (psycopg2 executemany_mode, asyncpg statement cache) are applied
+- Pool metrics track checkouts and the checked-out high-water mark
+"""
+
+import asyncio
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from sqlalchemy import text
+    from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool, StaticPool
+    from database.engine_config import PoolMetrics, create_profiled_engine, current_profile, engine_arguments
+    from database.connection import pool_status
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+class TestEngineProfiles:
+
+    def test_profile_options(self, monkeypatch):
+        monkeypatch.delenv("SQL_ECHO", raising=False)
+        _, dev = engine_arguments("sqlite:///tracker.db", "dev")
+        _, prod = engine_arguments("sqlite:///tracker.db", "prod")
+        _, test = engine_arguments("sqlite:///tracker.db", "test")
+
+        assert dev["echo"] is False and dev["pool_pre_ping"] is True
+        assert (dev["pool_size"], dev["max_overflow"], dev["poolclass"]) == (5, 10, QueuePool)
+        assert prod["pool_size"] > dev["pool_size"] and prod["query_cache_size"] > dev["query_cache_size"]
+        assert test["poolclass"] is NullPool and "pool_size" not in test
+
+    def test_environment_overrides(self, monkeypatch):
+        monkeypatch.setenv("DB_PROFILE", "prod")
+        monkeypatch.setenv("DB_POOL_SIZE", "7")
+        monkeypatch.setenv("SQL_ECHO", "true")
+        _, options = engine_arguments("sqlite:///tracker.db")
+        assert current_profile() == "prod"
+        assert options["pool_size"] == 7 and options["max_overflow"] == 30
+        assert options["echo"] is True
+
+        monkeypatch.setenv("DB_PROFILE", "staging")
+        with pytest.raises(ValueError):
+            current_profile()
+
+    def test_postgres_options(self):
+        _, options = engine_arguments("postgresql+psycopg2://user:pass@db/tracker", "prod")
+        assert options["executemany_mode"] == "values_plus_batch"
+        url, options = engine_arguments("postgresql+asyncpg://user:pass@db/tracker", "prod", is_async=True)
+        assert url.query["prepared_statement_cache_size"] == "500"
+        assert options["poolclass"] is AsyncAdaptedQueuePool
+
+    @pytest.mark.database
+    def test_sqlite_pragmas(self, tmp_path):
+        engine = create_profiled_engine(f"sqlite:///{tmp_path / 'tracker.db'}", "dev")
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 30000
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+
+        async_engine = create_profiled_engine(f"sqlite+aiosqlite:///{tmp_path / 'tracker.db'}", "dev", is_async=True)
+
+        async def busy_timeout():
+            async with async_engine.connect() as conn:
+                value = (await conn.execute(text("PRAGMA busy_timeout"))).scalar()
+            await async_engine.dispose()
+            return value
+
+        assert asyncio.run(busy_timeout()) == 30000
+
+        memory = create_profiled_engine("sqlite://", "prod")
+        assert isinstance(memory.pool, StaticPool)
+        with memory.connect() as conn:
+            conn.execute(text("CREATE TABLE t (id INTEGER)"))
+        with memory.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM t")).scalar() == 0
+
+    @pytest.mark.database
+    def test_pool_metrics(self, tmp_path):
+        engine = create_profiled_engine(f"sqlite:///{tmp_path / 'tracker.db'}", "dev")
+        metrics = PoolMetrics(engine, "api")
+        with engine.connect(), engine.connect(), engine.connect():
+            during = metrics.snapshot()
+        with engine.connect():
+            pass
+        after = metrics.snapshot()
+
+        assert during["checked_out"] == 3 and during["utilization"] == 0.2
+        assert after["checked_out"] == 0 and after["peak_checked_out"] == 3
+        assert after["checkouts"] == 4 and after["connections_opened"] == 3
+        assert after["pool_size"] == 5 and after["checked_in"] == 3
+
+        status = pool_status()
+        assert [pool["engine"] for pool in status["pools"]] == ["api", "maintenance"]
@@ -0,0 +1,132 @@
+"""
+Unit tests for the fast JSON response path.
+
+These tests verify:
+- FastJSONResponse renders datetimes, Decimals, models and non-string keys (orjson and stdlib fallback alike)
+- Dashboard, rankings and comparison responses serialized directly match their response models
+- Large responses are gzipped above the threshold; event streams are never compressed
+"""
+
+import gzip
+import json
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from fastapi.responses import PlainTextResponse, StreamingResponse
+    import api.responses as responses
+    from api.responses import CompressionMiddleware, FastJSONResponse, dumps
+    from database.rollups import reconcile_office_analytics
+    from models.database_models import ServiceStatus
+    from models.pydantic_models import AnalyticsDashboard, ComparisonResponse, RadarChartData
+    from api.analytics import router as analytics_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+class TestFastJSONResponse:
+
+    @pytest.mark.parametrize("orjson_available", [True, False])
+    def test_renders_internal_types(self, monkeypatch, orjson_available):
+        if orjson_available and not responses.ORJSON_AVAILABLE:
+            pytest.skip("orjson is not installed")
+        monkeypatch.setattr(responses, "ORJSON_AVAILABLE", orjson_available)
+        content = {
+            "when": datetime(2025, 10, 1, 10, 30, 15),
+            "fee": Decimal("1000.50"),
+            "office": RadarChartData(office_name="जिल्ला प्रशासन कार्यालय", metrics={"overall_rating": 4.5}),
+            "by_id": {1: "a"},
+            "status": ServiceStatus.SUCCESS,
+        }
+        rendered = FastJSONResponse(content).body
+        assert json.loads(rendered) == {
+            "when": "2025-10-01T10:30:15",
+            "fee": 1000.5,
+            "office": {"office_name": "जिल्ला प्रशासन कार्यालय", "metrics": {"overall_rating": 4.5}},
+            "by_id": {"1": "a"},
+            "status": "kaam_bhayo",
+        }
+        assert "जिल्ला".encode() in rendered  # UTF-8, not \u escapes
+        with pytest.raises(TypeError):
+            dumps({"unsupported": object()})
+
+
+@pytest.fixture
+def analytics_client(office_tracker_db, api_client):
+    started = datetime(2025, 10, 1, 10, 0)
+    url, db = office_tracker_db({o: (f"District {o % 3}", f"Province {o % 2}") for o in range(1, 7)}, visits=[
+        {"office_id": o, "service_id": o, "visit_date": started + timedelta(hours=v), "start_time": started,
+         "wait_duration_minutes": 10 * o + v, "overall_rating": 1 + (o + v) % 5,
+         "staff_behavior_rating": 3, "office_cleanliness_rating": 4,
+         "service_status": ServiceStatus.SUCCESS if v % 3 else ServiceStatus.FAILED,
+         "asked_for_bribe": v == 0 and o == 2}
+        for o in range(1, 7) for v in range(5)
+    ])
+    reconcile_office_analytics(db)
+    return api_client(url, analytics_router, default_response_class=FastJSONResponse)
+
+
+class TestDirectSerialization:
+
+    @pytest.mark.database
+    def test_responses_match_models(self, analytics_client):
+        dashboard = analytics_client.call("GET", "/api/analytics/dashboard")
+        assert dashboard.status_code == 200 and dashboard.headers["content-type"] == "application/json"
+        body = dashboard.json()
+        assert body == json.loads(AnalyticsDashboard(**body).model_dump_json())
+        assert body["total_visits"] == 30 and len(body["recent_visits"]) == 10
+        assert body["recent_visits"][0]["visit_date"] == "2025-10-01T14:00:00"
+
+        compared = analytics_client.call("POST", "/api/analytics/compare", json={"office_ids": [3, 1, 99]})
+        body = compared.json()
+        assert body == json.loads(ComparisonResponse(**body).model_dump_json())
+        assert [office["office_name"] for office in body["offices"]] == ["DAO 3", "DAO 1"]
+        streamed = analytics_client.call("POST", "/api/analytics/compare?stream=true", json={"office_ids": [3, 1, 99]})
+        assert streamed.json() == body
+
+        rankings = analytics_client.call("GET", "/api/analytics/rankings/province",
+                                      params={"province": "Province 0", "metric": "efficiency"}).json()
+        assert rankings["total_ranked"] == 3
+        assert [r["office_id"] for r in rankings["rankings"]] == [2, 4, 6]
+        assert rankings["rankings"][0] == {"rank": 1, "office_name": "DAO 2", "district": "District 2",
+                                           "province": "Province 0", "metric_value": 22.0, "score": 32.0, "review_count": 5,
+                                           "office_id": 2}
+
+
+class TestCompression:
+
+    def test_gzip_threshold_and_event_streams(self, office_tracker_db, api_client):
+        url, _ = office_tracker_db()
+        client = api_client(url)
+        app = client.app
+        app.add_middleware(CompressionMiddleware, minimum_size=1000)
+
+        @app.get("/big")
+        async def big():
+            return FastJSONResponse({"rankings": [{"rank": rank, "office_name": f"Office {rank}"} for rank in range(200)]})
+
+        @app.get("/small")
+        async def small():
+            return PlainTextResponse("ok")
+
+        @app.get("/events")
+        async def events():
+            async def stream():
+                for n in range(100):
+                    yield f"event: tick\ndata: {n}\n\n"
+            return StreamingResponse(stream(), media_type="text/event-stream")
+
+        gzip_accepted = {"accept-encoding": "gzip"}
+        big = client.call("GET", "/big", headers=gzip_accepted)
+        assert big.headers["content-encoding"] == "gzip"
+        assert int(big.headers["content-length"]) < len(big.content) / 3   # httpx decodes the body
+        assert len(big.json()["rankings"]) == 200
+
+        assert "content-encoding" not in client.call("GET", "/small", headers=gzip_accepted).headers
+        events = client.call("GET", "/events", headers={**gzip_accepted, "accept": "text/event-stream"})
+        assert "content-encoding" not in events.headers and events.text.count("event: tick") == 100
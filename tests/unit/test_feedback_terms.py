@@ -0,0 +1,152 @@
+"""
+Unit tests for the batched complaint / suggestion term and sentiment pipeline.
+
+These tests verify:
+- Tokenization drops stop words and numbers, and the lexicon scores sentiment, with negation flipping the next opinion word
+- Rated visits are flagged, processed in batches and served as top terms per office and district,
+  without the endpoint reading office_visits
+- Re-rating moves the term counters to the new text and clearing the text removes them
+- Visits rated before the pipeline existed are queued by the backfill
+"""
+
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from sqlalchemy import update
+    from database.feedback_terms import (
+        TOTAL_TERM, FeedbackPipeline, process_pending_feedback, queue_unprocessed_feedback, score_sentiments,
+        tokenize
+    )
+    from models.database_models import OfficeFeedbackTerm, OfficeVisit, ServiceStatus, VisitFeedback
+    from api.analytics import FEEDBACK_TERMS_MAX_LIMIT, router as analytics_router
+    from api.visit_tracking import router as visit_tracking_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+RATINGS = {"overall_rating": 2, "staff_behavior_rating": 2, "office_cleanliness_rating": 3,
+           "process_efficiency_rating": 1, "information_clarity_rating": 2}
+
+
+@pytest.fixture
+def tracker(office_tracker_db, api_client):
+    url, db = office_tracker_db({o: ("Kathmandu" if o < 3 else "Lalitpur", "Bagmati") for o in (1, 2, 3)}, visits=[
+        {"id": v, "office_id": v % 3 + 1, "service_id": v % 3 + 1, "service_status": ServiceStatus.SUCCESS}
+        for v in range(1, 13)
+    ])
+    return api_client(url, visit_tracking_router, analytics_router), db
+
+
+def _run(client, requests, status=200):
+    """Send (method, path, body) requests; the client's statements are those of the last request"""
+    async def send(http):
+        responses = []
+        for method, path, body in requests:
+            client.clear()
+            if method == "post":
+                response = await http.post(path, json=body)
+            else:
+                response = await http.get(path, params=body)
+            assert response.status_code == status, (path, response.text)
+            responses.append(response.json())
+        return responses
+
+    return client.run(send)
+
+
+def _rate(visit_id, complaints=None, suggestions=None):
+    return ("post", "/api/visit/rating", dict(RATINGS, visit_id=visit_id, complaints=complaints, suggestions=suggestions))
+
+
+def _terms(body):
+    return {term["term"]: term["mentions"] for term in body["terms"]}
+
+
+class TestLexicon:
+
+    def test_tokenize(self):
+        assert tokenize("The staff were very slow, 3 hours!") == ["slow", "hours"]
+        assert tokenize(None) == tokenize("") == []
+
+    def test_sentiment(self):
+        scores = score_sentiments([
+            tokenize("slow and rude"), tokenize("clean and helpful, but slow"), tokenize("not helpful"),
+            tokenize("not slow at all"), tokenize("queue at counter"), tokenize("घुस माग्यो, ढिलो भयो"), [],
+        ])
+        assert scores[:5] == [-1.0, pytest.approx(1 / 3, abs=1e-3), -1.0, 1.0, 0.0]
+        assert scores[5] == -1.0
+        assert scores[6] is None
+
+
+class TestFeedbackPipeline:
+
+    @pytest.mark.database
+    def test_ratings_feed_top_terms(self, tracker):
+        client, db = tracker
+        _run(client, [
+            _rate(1, complaints="Very slow queue and broker asked for bribe"),        # office 2
+            _rate(4, complaints="Slow counter, long queue"),                          # office 2
+            _rate(7, complaints="Rude staff and slow", suggestions="More counters"),  # office 2
+            _rate(2, complaints="Dirty toilet"),                                      # office 3
+            _rate(3, suggestions="Clean and helpful, thanks"),                        # office 1
+        ])
+        assert db.query(OfficeVisit).filter(OfficeVisit.feedback_pending == True).count() == 5
+
+        assert process_pending_feedback(db, batch_size=2) == 2
+        assert FeedbackPipeline(batch_size=2).process(db) == 3
+        assert db.query(OfficeVisit).filter(OfficeVisit.feedback_pending == True).count() == 0
+        assert db.query(VisitFeedback).count() == 5
+
+        office, district, suggestions = _run(client, [
+            ("get", "/api/analytics/feedback-terms/office", {"office_id": 2}),
+            ("get", "/api/analytics/feedback-terms/district", {"district": "Kathmandu", "limit": 3}),
+            ("get", "/api/analytics/feedback-terms/national", {"kind": "suggestion"}),
+        ])
+        assert all("office_visits" not in statement for statement in client.statements)
+        assert (office["texts"], office["terms"][0]) == (3, {"term": "slow", "mentions": 3, "share": 1.0,
+                                                             "avg_sentiment": office["avg_sentiment"]})
+        assert _terms(office)["queue"] == 2 and office["avg_sentiment"] == -1.0
+        assert district["texts"] == 3 and list(_terms(district)) == ["slow", "queue", "asked"]
+        assert suggestions["texts"] == 2 and suggestions["avg_sentiment"] == 0.5
+
+    @pytest.mark.database
+    def test_rerate_moves_counts(self, tracker):
+        client, db = tracker
+        _run(client, [_rate(1, complaints="slow queue"), _rate(4, complaints="slow counter")])
+        process_pending_feedback(db)
+
+        # Unchanged text is not flagged again
+        _run(client, [_rate(4, complaints="slow counter")])
+        assert process_pending_feedback(db) == 0
+
+        _run(client, [_rate(1, complaints="dirty queue"), _rate(4)])
+        assert process_pending_feedback(db) == 2
+        counts = {(row.term): (row.mentions, row.sentiment_sum)
+                  for row in db.query(OfficeFeedbackTerm).filter(OfficeFeedbackTerm.kind == "complaint")}
+        assert counts == {TOTAL_TERM: (1, -1.0), "dirty": (1, -1.0), "queue": (1, -1.0)}
+        assert db.query(VisitFeedback).count() == 1
+
+        body, = _run(client, [("get", "/api/analytics/feedback-terms/province", {"province": "Bagmati"})])
+        assert (body["texts"], _terms(body)) == (1, {"dirty": 1, "queue": 1})
+
+    @pytest.mark.database
+    def test_backfill_and_validation(self, tracker):
+        client, db = tracker
+        db.execute(update(OfficeVisit).where(OfficeVisit.id.in_([5, 8])).values(complaints="Rude and slow"))
+        db.commit()
+        assert queue_unprocessed_feedback(db) == 2
+        assert process_pending_feedback(db) == 2
+        assert queue_unprocessed_feedback(db) == 0
+
+        body, = _run(client, [("get", "/api/analytics/feedback-terms/national", None)])
+        assert (body["texts"], _terms(body)) == (2, {"rude": 2, "slow": 2})
+
+        _run(client, [("get", "/api/analytics/feedback-terms/office", None),
+                      ("get", "/api/analytics/feedback-terms/ward", None),
+                      ("get", "/api/analytics/feedback-terms/national", {"kind": "praise"})], status=400)
+        _run(client, [("get", "/api/analytics/feedback-terms/national", {"limit": 0}),
+                      ("get", "/api/analytics/feedback-terms/national", {"limit": FEEDBACK_TERMS_MAX_LIMIT + 1})], status=422)
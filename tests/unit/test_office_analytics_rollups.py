@@ -0,0 +1,147 @@
+"""
+Unit tests for the maintained OfficeAnalytics rollups.
+
+These tests verify:
+- Visit start, end and rating events keep the rollup equal to a full recomputation
+- Re-submitted ratings and re-ended visits move contributions instead of double counting
+- Reconciliation fills district/province/national ranks with window functions
+- Office analytics reads are a single query
+- Columns added to existing tables are migrated in place
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from sqlalchemy import create_engine, inspect, text
+    from sqlalchemy.pool import StaticPool
+    from models.database_models import OfficeVisit, OfficeAnalytics, create_tables
+    from models.pydantic_models import ServiceStatus
+    from database.rollups import reconcile_office_analytics
+    from api.visit_tracking import router as visit_tracking_router
+    from api.analytics import router as analytics_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+ROLLUP_COLUMNS = [
+    'total_visits', 'successful_visits', 'failed_visits', 'success_rate',
+    'avg_overall_rating', 'avg_staff_behavior', 'avg_cleanliness', 'avg_efficiency',
+    'avg_information_clarity', 'avg_wait_time_minutes', 'min_wait_time_minutes',
+    'max_wait_time_minutes', 'bribe_reports', 'bribe_rate',
+]
+
+
+@pytest.fixture
+def tracker(office_tracker_db, api_client):
+    url, db = office_tracker_db({1: ("Kathmandu", "Bagmati"), 2: ("Kathmandu", "Bagmati"), 3: ("Lalitpur", "Bagmati")})
+    return api_client(url, visit_tracking_router, analytics_router), db
+
+
+@pytest.fixture
+def client(tracker):
+    return tracker[0]
+
+
+@pytest.fixture
+def db(tracker):
+    return tracker[1]
+
+
+def _post(client, path, **body):
+    response = client.call("POST", path, json=body)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _rate(client, visit_id, overall, bribe=False, **ratings):
+    ratings = {"staff_behavior_rating": overall, "office_cleanliness_rating": 3, "process_efficiency_rating": 4,
+               "information_clarity_rating": 5, **ratings}
+    return _post(client, "/api/visit/rating", visit_id=visit_id, overall_rating=overall, asked_for_bribe=bribe, **ratings)
+
+
+def _visit(client, db, office_id, wait_minutes, status, overall, bribe=False):
+    visit_id = _post(client, "/api/visit/start-timer", office_id=office_id, service_id=office_id)["visit_id"]
+    visit = db.get(OfficeVisit, visit_id)
+    visit.start_time = datetime.utcnow() - timedelta(minutes=wait_minutes, seconds=5)
+    db.commit()
+    _post(client, "/api/visit/end-visit", visit_id=visit_id, service_status=status.value)
+    if overall is not None:
+        _rate(client, visit_id, overall, bribe)
+    return visit_id
+
+
+def _rollups(db):
+    db.expire_all()
+    return {
+        analytics.office_id: {column: getattr(analytics, column) for column in ROLLUP_COLUMNS}
+        for analytics in db.query(OfficeAnalytics)
+    }
+
+
+class TestOfficeAnalyticsRollups:
+
+    @pytest.mark.database
+    def test_incremental_matches_reconciliation(self, client, db):
+        _visit(client, db, 1, 20, ServiceStatus.SUCCESS, 5)
+        _visit(client, db, 1, 45, ServiceStatus.FAILED, 2, bribe=True)
+        _visit(client, db, 1, 10, ServiceStatus.SUCCESS, None)
+        _visit(client, db, 2, 30, ServiceStatus.SUCCESS, 4)
+        in_progress = _post(client, "/api/visit/start-timer", office_id=3, service_id=3)
+
+        incremental = _rollups(db)
+        assert incremental[1]['total_visits'] == 3
+        assert incremental[1]['min_wait_time_minutes'] == 10
+        assert incremental[1]['max_wait_time_minutes'] == 45
+        assert incremental[1]['bribe_reports'] == 1
+        assert incremental[3]['total_visits'] == 1 and in_progress["visit_id"]
+
+        reconcile_office_analytics(db)
+        assert _rollups(db) == incremental
+
+    @pytest.mark.database
+    def test_resubmitted_rating_replaces_contribution(self, client, db):
+        visit_id = _visit(client, db, 1, 15, ServiceStatus.SUCCESS, 1, bribe=True)
+        _rate(client, visit_id, 5, office_cleanliness_rating=5, process_efficiency_rating=5)
+        visit = db.get(OfficeVisit, visit_id)
+        visit.start_time = datetime.utcnow() - timedelta(minutes=40, seconds=5)
+        db.commit()
+        _post(client, "/api/visit/end-visit", visit_id=visit_id, service_status=ServiceStatus.FAILED.value)
+
+        rollup = _rollups(db)[1]
+        assert rollup['total_visits'] == 1
+        assert rollup['avg_overall_rating'] == 5
+        assert rollup['bribe_reports'] == 0
+        assert (rollup['successful_visits'], rollup['failed_visits']) == (0, 1)
+        assert rollup['min_wait_time_minutes'] == rollup['max_wait_time_minutes'] == 40
+
+        reconcile_office_analytics(db)
+        assert _rollups(db)[1] == rollup
+
+    @pytest.mark.database
+    def test_rankings_and_single_query_read(self, client, db):
+        for rating in (5, 5, 4):
+            _visit(client, db, 1, 10, ServiceStatus.SUCCESS, rating)
+        for rating in (3, 3, 3):
+            _visit(client, db, 2, 10, ServiceStatus.SUCCESS, rating)
+        for rating in (4, 4, 4):
+            _visit(client, db, 3, 10, ServiceStatus.SUCCESS, rating)
+        reconcile_office_analytics(db)
+
+        response = client.call("GET", "/api/analytics/office/2").json()
+
+        assert len(client.statements) == 1
+        assert response["total_visits"] == 3
+        assert (response["district_rank"], response["province_rank"], response["national_rank"]) == (2, 3, 3)
+        assert client.call("GET", "/api/analytics/office/3").json()["district_rank"] == 1
+
+    def test_missing_columns_are_added(self):
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE office_analytics (id INTEGER PRIMARY KEY, office_id INTEGER UNIQUE)"))
+        create_tables(engine)
+        columns = {column['name'] for column in inspect(engine).get_columns('office_analytics')}
+        assert {'overall_rating_sum', 'wait_time_count', 'national_rank'} <= columns
@@ -0,0 +1,146 @@
+"""
+Unit tests for the materialized office rankings.
+
+These tests verify:
+- Ranks are ordered by the Bayesian-smoothed score, so a few perfect reviews do not top many good ones
+- National, province and district ranks come from RANK() window functions (ties share a rank)
+- The rankings endpoint pages through a scope with offset/limit (validated) and never reads office_visits
+- A refresh follows the per-visit rollups without scanning visits
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from sqlalchemy import event, select
+    from database.rollups import (
+        RANKING_PRIOR_REVIEWS, apply_visit_changes, reconcile_office_analytics, refresh_rankings, visit_snapshot
+    )
+    from models.database_models import OfficeAnalytics, OfficeRanking, OfficeVisit, ServiceStatus
+    from api.analytics import RANKING_MAX_PAGE_SIZE, router as analytics_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+# office -> (district, province, ratings, wait minutes)
+OFFICES = {
+    1: ("Kathmandu", "Bagmati", [5, 5, 5], 50),          # Few perfect reviews
+    2: ("Kathmandu", "Bagmati", [5, 4] * 20, 20),       # Many good ones
+    3: ("Lalitpur", "Bagmati", [3] * 10, 10),
+    4: ("Kaski", "Gandaki", [3] * 10, 30),              # Ties office 3 on rating
+    5: ("Kaski", "Gandaki", [2, 4], 5),                 # Too few reviews to rank
+}
+
+
+@pytest.fixture
+def tracker(office_tracker_db, api_client):
+    started = datetime(2025, 10, 1, 10, 0)
+    offices = {o: (district, province) for o, (district, province, _, _) in OFFICES.items()}
+    url, db = office_tracker_db(offices, visits=[
+        {"office_id": o, "service_id": o, "visit_date": started + timedelta(hours=v), "start_time": started,
+         "overall_rating": rating, "wait_duration_minutes": wait,
+         "service_status": ServiceStatus.SUCCESS if v % 4 else ServiceStatus.FAILED}
+        for o, (_, _, ratings, wait) in OFFICES.items() for v, rating in enumerate(ratings)
+    ])
+    reconcile_office_analytics(db)
+    return api_client(url, analytics_router), db
+
+
+def _get(client, requests):
+    """GET each (path, params) request; the client's statements cover all of them"""
+    async def send(http):
+        return [await http.get(path, params=params) for path, params in requests]
+    client.clear()
+    return client.run(send)
+
+
+def _ranks(db, metric, column="national_rank"):
+    return dict(db.execute(
+        select(OfficeRanking.office_id, getattr(OfficeRanking, column)).where(OfficeRanking.metric == metric)
+    ).all())
+
+
+class TestRefreshRankings:
+
+    @pytest.mark.database
+    def test_smoothed_scores_and_window_ranks(self, tracker):
+        _, db = tracker
+        assert _ranks(db, "overall_rating") == {2: 1, 1: 2, 3: 3, 4: 3}
+        assert _ranks(db, "overall_rating", "province_rank") == {2: 1, 1: 2, 3: 3, 4: 1}
+        assert _ranks(db, "overall_rating", "district_rank") == {2: 1, 1: 2, 3: 1, 4: 1}
+        assert _ranks(db, "efficiency") == {3: 1, 2: 2, 4: 3, 1: 4}  # Lower wait time first
+
+        ratings = [rating for _, _, office_ratings, _ in OFFICES.values() for rating in office_ratings]
+        prior = sum(ratings) / len(ratings)
+        perfect = db.execute(select(OfficeRanking).where(
+            OfficeRanking.metric == "overall_rating", OfficeRanking.office_id == 1
+        )).scalar_one()
+        assert (perfect.value, perfect.review_count) == (5.0, 3)
+        assert perfect.score == pytest.approx((15 + prior * RANKING_PRIOR_REVIEWS) / (3 + RANKING_PRIOR_REVIEWS))
+
+        # OfficeAnalytics keeps the overall rating ranks
+        assert db.execute(select(OfficeAnalytics.national_rank).where(OfficeAnalytics.office_id == 2)).scalar() == 1
+        assert db.execute(select(OfficeAnalytics.national_rank).where(OfficeAnalytics.office_id == 5)).scalar() is None
+
+    @pytest.mark.database
+    def test_refresh_follows_rollups(self, tracker):
+        _, db = tracker
+        for _ in range(30):
+            visit = OfficeVisit(office_id=1, service_id=1, overall_rating=5, wait_duration_minutes=5,
+                                service_status=ServiceStatus.SUCCESS)
+            db.add(visit)
+            db.flush()
+            apply_visit_changes(db, [(1, None, visit_snapshot(visit))])
+        db.commit()
+        assert _ranks(db, "overall_rating")[1] == 2  # Until the next refresh
+
+        statements = []
+        listener = lambda conn, cursor, statement, *rest: statements.append(statement)
+        event.listen(db.get_bind(), "before_cursor_execute", listener)
+        assert refresh_rankings(db) == 4
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+        db.commit()
+        assert all("office_visits" not in statement for statement in statements)
+        assert _ranks(db, "overall_rating")[1] == 1
+
+
+class TestRankingsEndpoint:
+
+    @pytest.mark.database
+    def test_pages_and_scopes(self, tracker):
+        client, _ = tracker
+        first, second, district, province = [response.json() for response in _get(client, [
+            ("/api/analytics/rankings/national", {"limit": 2}),
+            ("/api/analytics/rankings/national", {"limit": 2, "offset": 2}),
+            ("/api/analytics/rankings/district", {"district": "Kaski", "metric": "efficiency"}),
+            ("/api/analytics/rankings/province", {"province": "Bagmati", "metric": "success_rate"}),
+        ])]
+        assert all("office_visits" not in statement for statement in client.statements)
+
+        assert (first["total_ranked"], second["total_ranked"]) == (4, 4)
+        assert [(r["rank"], r["office_id"]) for r in first["rankings"] + second["rankings"]] == \
+            [(1, 2), (2, 1), (3, 3), (3, 4)]
+        assert first["rankings"][1]["metric_value"] == 5.0 and first["rankings"][1]["score"] < 5.0
+        assert first["last_updated"] is not None
+
+        assert [(r["rank"], r["office_id"], r["metric_value"]) for r in district["rankings"]] == [(1, 4, 30.0)]
+        assert {r["office_id"] for r in province["rankings"]} == {1, 2, 3}
+
+    @pytest.mark.database
+    def test_validation(self, tracker):
+        client, _ = tracker
+        responses = _get(client, [
+            ("/api/analytics/rankings/province", None),
+            ("/api/analytics/rankings/ward", None),
+            ("/api/analytics/rankings/national", {"metric": "popularity"}),
+            ("/api/analytics/rankings/national", {"limit": -1}),
+            ("/api/analytics/rankings/national", {"limit": 0}),
+            ("/api/analytics/rankings/national", {"limit": RANKING_MAX_PAGE_SIZE + 1}),
+            ("/api/analytics/rankings/national", {"offset": -1}),
+            ("/api/analytics/rankings/national", {"limit": RANKING_MAX_PAGE_SIZE}),
+        ])
+        assert [response.status_code for response in responses] == [400, 400, 400, 422, 422, 422, 422, 200]
@@ -0,0 +1,143 @@
+"""
+Unit tests for the office search index and typeahead.
+
+These tests verify:
+- Devanagari words are indexed whole and romanised for Latin-script search
+- Ranked prefix search over names, Nepali names and services, with filters and fallbacks
+- Dialects without a search index fall back to an ILIKE match
+- Imports rebuild the index, so the /search endpoint never rebuilds it on the request path
+- Typeahead completions match every word prefix and rank popular offices first
+"""
+
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    import database.office_search as office_search
+    from database.office_search import (
+        OfficeTypeahead, rebuild_search_index, search_offices, tokenize, transliterate
+    )
+    from database.scraper_import import import_scraper_offices
+    from models.database_models import OfficeAnalytics
+    from api.office_selection import router as office_selection_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+OFFICES = [
+    ("dao-ktm", "District Administration Office Kathmandu", "जिल्ला प्रशासन कार्यालय काठमाडौं", "Kathmandu",
+     [("citizenship", "Citizenship", "नागरिकता"), ("passport", "Passport", "राहदानी")]),
+    ("dao-ltp", "District Administration Office Lalitpur", "जिल्ला प्रशासन कार्यालय ललितपुर", "Lalitpur",
+     [("citizenship", "Citizenship", "नागरिकता")]),
+    ("tmo-ktm", "Transport Management Office Ekantakuna", "यातायात व्यवस्था कार्यालय एकान्तकुना", "Lalitpur",
+     [("driving_license", "Driving License", "सवारी चालक अनुमतिपत्र")]),
+    ("lro-ktm", "Land Revenue Office Kathmandu", "मालपोत कार्यालय काठमाडौं", "Kathmandu",
+     [("land_registration", "Land Registration", "जग्गा दर्ता")]),
+]
+
+
+def _scraper_offices(offices=OFFICES):
+    return [
+        {"id": office_id, "name": name, "name_nepali": name_nepali, "type": office_id.split("-")[0],
+         "location": {"district": district, "province": "Bagmati", "address": f"{district} main road"},
+         "services": [{"service_id": s, "service_name": n, "service_name_nepali": nn} for s, n, nn in services]}
+        for office_id, name, name_nepali, district, services in offices
+    ]
+
+
+@pytest.fixture
+def tracker(office_tracker_db):
+    url, db = office_tracker_db()
+    import_scraper_offices(db, _scraper_offices())
+    return url, db
+
+
+@pytest.fixture
+def db(tracker):
+    return tracker[1]
+
+
+def _names(db, matches):
+    from models.database_models import Office
+    return [db.get(Office, match["office_id"]).office_id for match in matches]
+
+
+class TestOfficeSearch:
+
+    def test_devanagari_tokens_and_transliteration(self):
+        assert tokenize("जिल्ला प्रशासन कार्यालय, काठमाडौं") == ["जिल्ला", "प्रशासन", "कार्यालय", "काठमाडौं"]
+        assert transliterate("जिल्ला प्रशासन कार्यालय") == "jilla prashasan karyalay"
+        assert transliterate("राहदानी") == "rahadani"
+
+    @pytest.mark.database
+    def test_ranked_prefix_search(self, db):
+        assert rebuild_search_index(db) == len(OFFICES)
+
+        # Name matches outrank address/district matches; prefixes complete words
+        assert _names(db, search_offices(db, "kathm"))[:2] in (["dao-ktm", "lro-ktm"], ["lro-ktm", "dao-ktm"])
+        assert _names(db, search_offices(db, "district admin lalit")) == ["dao-ltp"]
+        assert _names(db, search_offices(db, "काठमाडौं मालपोत")) == ["lro-ktm"]
+        assert _names(db, search_offices(db, "राहदा")) == ["dao-ktm"]        # Nepali service name
+        assert _names(db, search_offices(db, "yatayat")) == ["tmo-ktm"]      # Romanised Nepali name
+        assert _names(db, search_offices(db, "driving")) == ["tmo-ktm"]
+
+        # Filters apply inside the ranked query
+        assert _names(db, search_offices(db, "citizenship", district="Lalitpur")) == ["dao-ltp"]
+
+        any_term = search_offices(db, "passport ekantakuna")
+        assert {m["match"] for m in any_term} == {"any_term"}
+        assert set(_names(db, any_term)) == {"dao-ktm", "tmo-ktm"}
+
+        fuzzy = search_offices(db, "antakun")                               # Mid-word substring
+        assert _names(db, fuzzy) == ["tmo-ktm"] and fuzzy[0]["match"] == "fuzzy"
+        assert search_offices(db, 'x" OR "') == [] and search_offices(db, "  ") == []
+
+    @pytest.mark.database
+    def test_like_fallback_without_index(self, db, monkeypatch):
+        monkeypatch.setattr(office_search, "SEARCH_INDEX_DIALECTS", ())
+        assert rebuild_search_index(db) == 0
+        matches = search_offices(db, "land kath")
+        assert _names(db, matches) == ["lro-ktm"] and matches[0]["match"] == "like"
+        assert _names(db, search_offices(db, "citizenship", district="Lalitpur")) == ["dao-ltp"]
+        assert _names(db, search_offices(db, "राहदानी")) == ["dao-ktm"]
+
+    @pytest.mark.database
+    def test_search_endpoint(self, tracker, api_client):
+        url, db = tracker
+        client = api_client(url, office_selection_router)
+
+        def search(**body):
+            response = client.call("POST", "/api/selection/search", json=body)
+            assert response.status_code == 200
+            return response.json()
+
+        found = search(query="land rev")
+        assert [o["name"] for o in found["offices"]] == ["Land Revenue Office Kathmandu"]
+        assert found["offices"][0]["match"] == "all_terms"
+
+        # Without a query the endpoint keeps filtering by equality
+        assert search(district="Lalitpur")["total_found"] == 2
+
+        import_scraper_offices(db, _scraper_offices(OFFICES + [
+            ("lro-ltp", "Land Revenue Office Lalitpur", "मालपोत कार्यालय ललितपुर", "Lalitpur", []),
+        ]))
+        assert search(query="land rev")["total_found"] == 2
+
+    @pytest.mark.database
+    def test_typeahead(self, db):
+        db.add(OfficeAnalytics(office_id=4, total_visits=50))
+        db.add(OfficeAnalytics(office_id=1, total_visits=10))
+        db.commit()
+        typeahead = OfficeTypeahead()
+        typeahead.generation = -1
+        typeahead.ensure_current(db)
+
+        assert [o["id"] for o in typeahead.complete("kath")] == [4, 1]          # Most visited first
+        assert [o["id"] for o in typeahead.complete("office dis")] == [1, 2]
+        assert [o["id"] for o in typeahead.complete("मालपो")] == [4]
+        assert [o["id"] for o in typeahead.complete("malpot kath")] == [4]    # Romanised
+        assert typeahead.complete("zzz") == [] and typeahead.complete("") == []
+        assert len(typeahead.complete("office", limit=2)) == 2
@@ -0,0 +1,130 @@
+"""
+Query planner tests for the OfficeVisit hot-query indexes.
+
+These tests verify:
+- Existing databases get the new indexes from create_tables (additive migration)
+- Active visits, dashboard and compare statements are planned on those indexes
+- Rankings pages are range reads on the office_rankings scope indexes
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from sqlalchemy import create_engine, inspect, text
+    from database.rollups import reconcile_office_analytics
+    from models.database_models import ServiceStatus, create_tables
+    from api.analytics import router as analytics_router
+    from api.visit_tracking import router as visit_tracking_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+VISIT_INDEXES = {
+    "ix_office_visits_office_status", "ix_office_visits_office_rating", "ix_office_visits_office_wait",
+    "ix_office_visits_visit_date", "ix_office_visits_in_progress",
+}
+
+# Endpoint -> indexes its office_visits statements must be planned on
+EXPECTED_PLANS = [
+    ("GET", "/api/visit/active-visits", {"ix_office_visits_in_progress"}),
+    ("GET", "/api/analytics/dashboard", {"ix_office_visits_visit_date"}),
+]
+
+
+@pytest.fixture
+def tracker(office_tracker_db, api_client):
+    base_date = datetime(2025, 10, 1, 9, 0)
+    url, db = office_tracker_db({o + 1: (f"District {o % 4}", f"Province {o % 2}") for o in range(20)}, visits=[
+        {"office_id": v % 20 + 1, "service_id": v % 20 + 1, "visit_date": base_date + timedelta(minutes=v),
+         "start_time": base_date, "end_time": None if v % 10 == 0 else base_date + timedelta(minutes=30),
+         "service_status": ServiceStatus.IN_PROGRESS if v % 10 == 0 else ServiceStatus.SUCCESS,
+         "overall_rating": v % 5 + 1 if v % 2 else None, "wait_duration_minutes": v % 60 or None}
+        for v in range(2000)
+    ])
+    return api_client(url, analytics_router, visit_tracking_router), db
+
+
+def _captured_statements(client, requests):
+    """Run (method, path[, json]) requests against the routers; returns (method, path) -> [(statement, parameters)]"""
+    captured = {}
+
+    async def send(http):
+        for method, path, *body in requests:
+            client.clear()
+            response = await http.request(method, path, json=body[0] if body else None)
+            assert response.status_code == 200, (path, response.text)
+            captured[(method, path)] = list(zip(client.statements, client.parameters))
+
+    client.run(send)
+    return captured
+
+
+def _plan(engine, statement, parameters):
+    with engine.connect() as conn:
+        return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+class TestOfficeVisitIndexes:
+
+    @pytest.mark.database
+    def test_migration_adds_indexes(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+        create_tables(engine)
+        with engine.begin() as conn:
+            for name in VISIT_INDEXES:
+                conn.execute(text(f"DROP INDEX {name}"))
+        assert not VISIT_INDEXES & {index["name"] for index in inspect(engine).get_indexes("office_visits")}
+
+        create_tables(engine)
+        assert VISIT_INDEXES <= {index["name"] for index in inspect(engine).get_indexes("office_visits")}
+
+    @pytest.mark.database
+    def test_endpoints_use_indexes(self, tracker):
+        client, db = tracker
+        engine = db.get_bind()
+        captured = _captured_statements(client, [(method, path) for method, path, _ in EXPECTED_PLANS])
+
+        for method, path, expected in EXPECTED_PLANS:
+            plans = [
+                "\n".join(_plan(engine, statement, parameters))
+                for statement, parameters in captured[(method, path)]
+                if "office_visits" in statement
+            ]
+            used = {index for plan in plans for index in VISIT_INDEXES if index in plan}
+            assert expected <= used, f"{path}: {plans}"
+
+    @pytest.mark.database
+    def test_rankings_read_scope_indexes(self, tracker):
+        client, db = tracker
+        engine = db.get_bind()
+        reconcile_office_analytics(db)
+        requests = [
+            ("GET", "/api/analytics/rankings/national?metric=efficiency&offset=5", "ix_office_rankings_national"),
+            ("GET", "/api/analytics/rankings/province?province=Province%201", "ix_office_rankings_province"),
+            ("GET", "/api/analytics/rankings/district?district=District%202&metric=success_rate",
+             "ix_office_rankings_district"),
+        ]
+        captured = _captured_statements(client, [(method, path) for method, path, _ in requests])
+
+        for method, path, index in requests:
+            statements = captured[(method, path)]
+            assert all("office_visits" not in statement for statement, _ in statements)
+            plans = ["\n".join(_plan(engine, s, p)) for s, p in statements]
+            assert all("SCAN office_rankings" not in plan for plan in plans), plans
+            page = plans[-1]  # After the scope count
+            assert index in page and "TEMP B-TREE" not in page, page
+
+    @pytest.mark.database
+    def test_compare_searches_by_office(self, tracker):
+        client, db = tracker
+        engine = db.get_bind()
+        request = ("POST", "/api/analytics/compare", {"office_ids": [1, 2, 3]})
+        statements = _captured_statements(client, [request])[request[:2]]
+
+        plans = ["\n".join(_plan(engine, s, p)) for s, p in statements if "office_visits" in s]
+        assert plans and all("SCAN office_visits" not in plan for plan in plans), plans
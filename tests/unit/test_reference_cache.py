@@ -0,0 +1,133 @@
+"""
+Unit tests for the cached office picker reference data.
+
+These tests verify:
+- Districts, office types, offices and services are served from memory after the first request
+- Responses carry strong ETags (the payload digest) and If-None-Match returns 304
+- A scraper import that changes data starts a new generation (new ETag); a no-op import does not
+- Imports by another process are picked up through the offices.updated_at version marker
+"""
+
+import json
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from datetime import datetime, timedelta
+    from sqlalchemy import update
+    from database.reference_cache import etag_matches, reference_cache
+    from database.scraper_import import import_scraper_offices
+    from models.database_models import Office
+    from api.office_selection import router as office_selection_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+def _office(i, name=None):
+    return {
+        "id": f"dao-{i}", "name": name or f"DAO {i}", "type": "district_administration_office",
+        "location": {"district": f"District {i % 3}", "province": "Bagmati"},
+        "services": [{"service_id": "passport", "service_name": "Passport", "service_name_nepali": "राहदानी",
+                      "fees": {"normal": 5000}}],
+    }
+
+
+@pytest.fixture
+def picker(office_tracker_db, api_client):
+    """Seeded database and a client on the selection router (its statements log the API engine)"""
+    url, db = office_tracker_db()
+    import_scraper_offices(db, [_office(i) for i in range(6)])
+    reference_cache.invalidate()
+    client = api_client(url, office_selection_router)
+    return client, db, client.statements
+
+
+def _get(client, *paths, headers=None):
+    async def send(http):
+        return [await http.get(path) for path in paths]
+    return client.run(send, headers)
+
+
+PATHS = [
+    "/api/selection/districts",
+    "/api/selection/office-types/District 0",
+    "/api/selection/offices/District 0/district_administration_office",
+    "/api/selection/services/1",
+]
+
+
+class TestReferenceDataCache:
+
+    @pytest.mark.database
+    def test_served_from_memory_with_etag(self, picker):
+        client, db, statements = picker
+        first = _get(client, *PATHS)
+        queries_after_first = len(statements)
+        second = _get(client, *PATHS)
+
+        assert [response.status_code for response in first] == [200] * len(PATHS)
+        assert queries_after_first >= len(PATHS)
+        assert len(statements) == queries_after_first  # No database access on cache hits
+        assert [r.content for r in second] == [r.content for r in first]
+        assert all(r.headers["etag"].startswith('"') for r in first)
+
+        districts = json.loads(first[0].content)
+        assert districts["districts"] == ["District 0", "District 1", "District 2"]
+        assert json.loads(first[1].content)[0]["count"] == 2
+        assert json.loads(first[3].content)["services"][0]["fees"] == {"normal": 5000}
+
+        etag = first[0].headers["etag"]
+        not_modified, = _get(client, PATHS[0], headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304 and not_modified.content == b""
+        assert not_modified.headers["etag"] == etag
+
+    @pytest.mark.database
+    def test_import_invalidates(self, picker):
+        client, db, statements = picker
+        before, = _get(client, PATHS[2])
+
+        import_scraper_offices(db, [_office(i) for i in range(6)])  # No changes
+        unchanged, = _get(client, PATHS[2], headers={"If-None-Match": before.headers["etag"]})
+        assert unchanged.status_code == 304
+
+        import_scraper_offices(db, [_office(0, name="Renamed DAO")])
+        after, = _get(client, PATHS[2], headers={"If-None-Match": before.headers["etag"]})
+        assert after.status_code == 200
+        assert after.headers["etag"] != before.headers["etag"]
+        assert json.loads(after.content)["offices"][0]["name"] == "Renamed DAO"
+
+        # Same data, same tag: the ETag does not depend on the process or generation
+        reference_cache.invalidate()
+        again, = _get(client, PATHS[2], headers={"If-None-Match": after.headers["etag"]})
+        assert again.status_code == 304
+
+    @pytest.mark.database
+    def test_import_by_another_process(self, picker, monkeypatch):
+        client, db, statements = picker
+        monkeypatch.setattr(reference_cache, "version_check_seconds", 0)
+        before, = _get(client, PATHS[2])
+        generation = reference_cache.generation
+
+        # Written without this process's invalidate(), as the CLI import in another process would be
+        db.execute(update(Office).where(Office.office_id == "dao-0")
+                   .values(name="Imported Elsewhere", updated_at=datetime.utcnow() + timedelta(seconds=1)))
+        db.commit()
+        after, = _get(client, PATHS[2])
+        assert reference_cache.generation == generation + 1
+        assert json.loads(after.content)["offices"][0]["name"] == "Imported Elsewhere"
+
+        # Checked at most every version_check_seconds: cache hits skip the marker query otherwise
+        monkeypatch.setattr(reference_cache, "version_check_seconds", 3600)
+        queries = len(statements)
+        _get(client, PATHS[2])
+        assert len(statements) == queries
+
+    def test_etag_matching(self):
+        assert etag_matches('"1-abc"', '"1-abc"')
+        assert etag_matches('"0-zzz", W/"1-abc"', '"1-abc"')
+        assert etag_matches('*', '"1-abc"')
+        assert not etag_matches('"0-abc"', '"1-abc"')
+        assert not etag_matches(None, '"1-abc"')
@@ -0,0 +1,160 @@
+"""
+Unit tests for the opt-in profiling middleware and slow-query log.
+
+These tests verify:
+- Statements are normalized (literals, parameters, IN lists and VALUES rows) so repeats share one log entry
+- Requests are recorded per route template with latency histograms and, when sampled,
+  their statement count and database time
+- /debug/perf serves the slow-query log with query plans and can be reset; a failed plan leaves the transaction usable
+- An X-Profile request is answered with a pyinstrument profile (when installed)
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from sqlalchemy import create_engine
+    from database.query_profiler import QueryProfiler, normalize_statement
+    from models.database_models import ServiceStatus
+    from api.dependencies import API_KEY
+    from api.analytics import router as analytics_router
+    from api.profiling import (
+        LATENCY_BUCKETS_MS, PYINSTRUMENT_AVAILABLE, UNMATCHED_ROUTE, ProfilingMiddleware, perf_recorder,
+        router as profiling_router
+    )
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+@pytest.fixture
+def profiled_client(office_tracker_db, api_client):
+    """Clients with the profiling middleware on a fresh recorder, every request sampled and every statement slow"""
+    base_date = datetime(2025, 10, 1, 9, 0)
+    url, _ = office_tracker_db({o: ("Kathmandu", "Bagmati") for o in (1, 2)}, visits=[
+        {"office_id": v % 2 + 1, "service_id": v % 2 + 1, "visit_date": base_date + timedelta(hours=v),
+         "service_status": ServiceStatus.SUCCESS, "overall_rating": v % 5 + 1, "wait_duration_minutes": v}
+        for v in range(50)
+    ])
+    perf_recorder.reset()
+    profilers = []
+
+    def build(sample_rate=1.0):
+        client = api_client(url, analytics_router, profiling_router)
+        client.app.add_middleware(ProfilingMiddleware, sample_rate=sample_rate)
+        profiler = perf_recorder.instrument(client.engine, "api")
+        profiler.slow_query_ms = 0
+        profilers.append(profiler)
+        return client
+
+    yield build
+    for profiler in profilers:
+        perf_recorder.query_profilers.remove(profiler)
+        profiler.remove()
+    perf_recorder.reset()
+
+
+def _send(client, requests, headers=None):
+    async def send(http):
+        return [await http.request(method, path) for method, path in requests]
+    return client.run(send, headers)
+
+
+def _routes(body):
+    return {route["route"]: route for route in body["routes"]}
+
+
+class TestNormalizeStatement:
+
+    def test_literals_and_parameters(self):
+        assert normalize_statement("SELECT *\n  FROM offices WHERE id = 7 AND name = 'DAO ''A''' LIMIT ?") == \
+            "SELECT * FROM offices WHERE id = ? AND name = ? LIMIT ?"
+        assert normalize_statement("SELECT x::text FROM t WHERE a = %(a)s AND b = $2 AND c = :c_1") == \
+            "SELECT x::text FROM t WHERE a = ? AND b = ? AND c = ?"
+
+    def test_lists_collapse(self):
+        assert normalize_statement("SELECT * FROM office_visits_2025 WHERE id IN (?, ?, ?)") == \
+            normalize_statement("SELECT * FROM office_visits_2025 WHERE id IN (1, 2)") == \
+            "SELECT * FROM office_visits_2025 WHERE id IN (?, ...)"
+        assert normalize_statement("INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)") == \
+            "INSERT INTO t (a, b) VALUES (?, ...)"
+
+
+class TestExplain:
+
+    @pytest.mark.database
+    def test_failed_plan_keeps_transaction(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'explain.db'}")
+        profiler = QueryProfiler(engine, "test")
+        profiler._log_slow("SELECT * FROM missing WHERE id = ?", (1,), False, 50.0, None)
+        profiler._log_slow("SELECT * FROM offices WHERE id = ?", (1,), False, 20.0, None)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("CREATE TABLE offices (id INTEGER PRIMARY KEY)")
+            conn.exec_driver_sql("INSERT INTO offices (id) VALUES (1)")
+            assert profiler.explain(conn) == 2
+            conn.exec_driver_sql("INSERT INTO offices (id) VALUES (2)")
+        failed, planned = [entry["plan"] for entry in profiler.slow_queries()]
+        assert failed[0].startswith("EXPLAIN failed") and "offices" in planned[0]
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT COUNT(*) FROM offices").scalar() == 2
+        profiler.remove()
+        engine.dispose()
+
+
+class TestProfilingMiddleware:
+
+    @pytest.mark.database
+    def test_routes_and_slow_queries(self, profiled_client):
+        client = profiled_client()
+        responses = _send(client, [
+            ("GET", "/api/analytics/dashboard"), ("GET", "/api/analytics/office/1"),
+            ("GET", "/api/analytics/office/2"), ("GET", "/api/analytics/office/99"), ("GET", "/missing"),
+        ])
+        assert [response.status_code for response in responses] == [200, 200, 200, 404, 404]
+
+        body, = [response.json() for response in _send(client, [("GET", "/debug/perf")])]
+        routes = _routes(body)
+        assert set(routes) == {"GET /api/analytics/dashboard", "GET /api/analytics/office/{office_id}", UNMATCHED_ROUTE}
+        office = routes["GET /api/analytics/office/{office_id}"]
+        assert (office["requests"], office["profiled_requests"], office["errors"]) == (3, 3, 0)
+        assert sum(office["histogram"].values()) == 3 and len(office["histogram"]) == len(LATENCY_BUCKETS_MS) + 1
+        assert office["p50_ms"] <= office["p99_ms"] and office["max_ms"] > 0
+        assert routes["GET /api/analytics/dashboard"]["queries_per_request"] == 3
+        assert routes["GET /api/analytics/dashboard"]["query_ms_per_request"] > 0
+
+        # Every office read shares one entry; plans are taken on demand with the worst call's parameters
+        slow = body["slow_queries"]["api"]
+        assert [entry["max_ms"] for entry in slow] == sorted((entry["max_ms"] for entry in slow), reverse=True)
+        office_reads = [entry for entry in slow if entry["statement"].startswith("SELECT offices.")
+                        and "WHERE offices.id = ?" in entry["statement"]]
+        assert len(office_reads) == 1 and office_reads[0]["calls"] == 3
+        assert office_reads[0]["route"].startswith("GET /api/analytics/office/")
+        assert all(entry["plan"] for entry in slow if entry["statement"].startswith("SELECT"))
+        assert any("office_visits" in line for entry in slow for line in entry["plan"] or [])
+
+        responses = _send(client, [("DELETE", "/debug/perf"), ("GET", "/debug/perf")])
+        assert _routes(responses[1].json()).keys() == {"DELETE /debug/perf"}
+        assert responses[1].json()["slow_queries"]["api"] == []
+
+    @pytest.mark.database
+    def test_sampling(self, profiled_client):
+        client = profiled_client(sample_rate=0)
+        _send(client, [("GET", "/api/analytics/dashboard")] * 3)
+        dashboard = _routes(perf_recorder.snapshot())["GET /api/analytics/dashboard"]
+        assert (dashboard["requests"], dashboard["profiled_requests"], dashboard["queries_per_request"]) == (3, 0, None)
+        assert perf_recorder.snapshot()["slow_queries"]["api"] == []
+
+    @pytest.mark.database
+    def test_debug_endpoint_needs_api_key(self, profiled_client):
+        response, = _send(profiled_client(), [("GET", "/debug/perf")], headers={"api-key": "wrong"})
+        assert response.status_code == 403
+
+    @pytest.mark.database
+    @pytest.mark.skipif(not PYINSTRUMENT_AVAILABLE, reason="pyinstrument is not installed")
+    def test_profile_header(self, profiled_client):
+        response, = _send(profiled_client(), [("GET", "/api/analytics/dashboard")],
+                          headers={"api-key": API_KEY, "x-profile": "1"})
+        assert response.status_code == 200 and response.headers["content-type"].startswith("text/html")
@@ -0,0 +1,120 @@
+"""
+Unit tests for the bulk scraper data import.
+
+These tests verify:
+- Offices and services are imported with a query count independent of the office count
+- Refreshing the JSON updates changed rows and adds new ones without touching service ids
+- Streaming (ijson) and whole-file parsing import the same data
+"""
+
+import json
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from sqlalchemy import create_engine, event, select
+    from sqlalchemy.orm import sessionmaker
+    from models.database_models import Office, OfficeService, OfficeVisit, create_tables
+    from database.scraper_import import IJSON_AVAILABLE, import_scraper_offices, iter_scraper_offices
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+def _office(i, name=None, services=("citizenship", "passport")):
+    return {
+        "id": f"dao-{i}",
+        "name": name or f"District Administration Office {i}",
+        "name_nepali": f"जिल्ला प्रशासन कार्यालय {i}",
+        "type": "district_administration_office",
+        "location": {"district": f"District {i % 77}", "province": f"Province {i % 7 + 1}", "address": "Main road"},
+        "contact": {"phone_general": f"01-{i:06d}"},
+        "services": [
+            {"service_id": service_id, "service_name": service_id.title(),
+             "fees": {"normal": 500.5}, "processing_times": {"total_normal": "1 day"},
+             "required_documents": ["citizenship"]}
+            for service_id in services
+        ],
+    }
+
+
+def _write(path, offices):
+    path.write_text(json.dumps({"offices": offices}, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tracker.db'}")
+    create_tables(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _count_queries(db, fn):
+    statements = []
+    listener = lambda conn, cursor, statement, *rest: statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        return fn(), len(statements)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+
+class TestScraperImport:
+
+    @pytest.mark.database
+    def test_bulk_import_query_count(self, db, tmp_path):
+        path = _write(tmp_path / "offices.json", [_office(i) for i in range(300)])
+        stats, query_count = _count_queries(
+            db, lambda: import_scraper_offices(db, iter_scraper_offices(path, streaming=False), batch_size=100)
+        )
+
+        assert stats == {"offices_seen": 300, "offices_inserted": 300, "offices_updated": 0,
+                         "services_inserted": 600, "services_updated": 0}
+        assert db.query(Office).count() == 300 and db.query(OfficeService).count() == 600
+        # Preload + 3 batches x (office insert + service lookup + service insert), the
+        # version marker touch, then the search index rebuild (2 creates, 2 reads, 2 deletes, 2 inserts)
+        assert query_count <= 1 + 3 * 3 + 1 + 8
+
+        office = db.query(Office).filter(Office.office_id == "dao-42").one()
+        assert office.phone == "01-000042"
+        assert {s.service_id for s in office.services} == {"citizenship", "passport"}
+
+    @pytest.mark.database
+    def test_refresh_upserts(self, db, tmp_path):
+        import_scraper_offices(db, [_office(i) for i in range(5)])
+        service_ids = dict(db.execute(select(OfficeService.service_id + ':' + Office.office_id, OfficeService.id)
+                                      .join(Office)).all())
+        db.add(OfficeVisit(office_id=1, service_id=service_ids["citizenship:dao-0"]))
+        db.commit()
+
+        refreshed = [_office(i) for i in range(6)]
+        refreshed[1] = _office(1, name="Renamed Office")
+        refreshed[2] = _office(2, services=("citizenship", "passport", "driving_license"))
+        refreshed[3]["services"][0]["fees"] = {"normal": 1000}
+        stats = import_scraper_offices(db, refreshed, batch_size=4)
+
+        assert stats == {"offices_seen": 6, "offices_inserted": 1, "offices_updated": 1,
+                         "services_inserted": 3, "services_updated": 1}
+        db.expire_all()
+        assert db.query(Office).filter(Office.office_id == "dao-1").one().name == "Renamed Office"
+        assert db.query(OfficeService).count() == 13
+        # Existing services keep their ids, so visits stay attached
+        assert dict(db.execute(select(OfficeService.service_id + ':' + Office.office_id, OfficeService.id)
+                               .join(Office).where(Office.office_id.in_(["dao-0", "dao-4"]))).all()) == {
+            key: value for key, value in service_ids.items() if key.endswith(("dao-0", "dao-4"))
+        }
+
+        assert import_scraper_offices(db, refreshed)["offices_updated"] == 0
+
+    def test_streaming_matches_full_parse(self, tmp_path):
+        path = _write(tmp_path / "offices.json", [_office(i) for i in range(20)])
+        if not IJSON_AVAILABLE:
+            with pytest.raises(RuntimeError):
+                list(iter_scraper_offices(path, streaming=True))
+            pytest.skip("ijson not installed")
+        assert list(iter_scraper_offices(path, streaming=True)) == list(iter_scraper_offices(path, streaming=False))
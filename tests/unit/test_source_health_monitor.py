@@ -0,0 +1,147 @@
+"""
+Unit tests for the source health monitor.
+
+These tests verify:
+- Repeated failures mark a source down with exponential back-off
+- Down sources are skipped and slow sources deferred by filter_sources
+- Latency histograms produce percentiles and are pruned outside the window
+- Source tester results only count transport failures against a source and keep page timings apart
+- Probes time each phase against a local server and fall back to a range GET
+"""
+
+import asyncio
+import pytest
+import sqlite3
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'news_aggregator'))
+
+from source_health_monitor import (
+    ProbeResult, SourceHealthMonitor, histogram_percentile, source_key,
+    STATE_DOWN, STATE_SLOW, STATE_UP
+)
+
+NOW = 1_760_000_000.0
+
+
+@pytest.fixture
+def monitor(tmp_path):
+    return SourceHealthMonitor(str(tmp_path / "news.db"), slow_threshold_ms=1000,
+                               down_after_failures=2, base_backoff_seconds=600)
+
+
+def _result(url, ok=True, total_ms=100.0, at=NOW):
+    return ProbeResult(url=url, source=source_key(url), ok=ok, total_ms=total_ms,
+                       error_kind=None if ok else 'timeout', probed_at=at)
+
+
+class TestSourceHealthState:
+
+    def test_source_key_strips_www(self):
+        assert source_key("https://www.ratopati.com/rss") == "ratopati.com"
+        assert source_key("https://english.onlinekhabar.com/feed") == "english.onlinekhabar.com"
+
+    @pytest.mark.database
+    def test_failures_back_off_exponentially(self, monitor):
+        url = "https://www.ratopati.com/rss"
+        assert monitor.record(_result(url, ok=False)) == STATE_UP
+        assert monitor.record(_result(url, ok=False)) == STATE_DOWN
+        assert monitor.get_status(url)['defer_until'] == NOW + 600
+        monitor.record(_result(url, ok=False))
+        assert monitor.get_status(url)['defer_until'] == NOW + 1200
+
+        assert not monitor.should_collect(url, now=NOW + 60)
+        assert monitor.should_collect(url, now=NOW + 1201)
+
+        assert monitor.record(_result(url, ok=True, at=NOW + 1300)) == STATE_UP
+        assert monitor.get_status(url)['consecutive_failures'] == 0
+
+    @pytest.mark.database
+    def test_filter_skips_down_and_defers_slow(self, monitor):
+        sources = [("Ratopati", "https://ratopati.com/rss"),
+                   ("Kathmandu Post", "https://kathmandupost.com/rss"),
+                   ("Nepal News", "https://nepalnews.com/feed/"),
+                   ("New Source", "https://example.com/feed")]
+        for _ in range(2):
+            monitor.record(_result(sources[0][1], ok=False))
+        assert monitor.record(_result(sources[1][1], total_ms=4000)) == STATE_SLOW
+        monitor.record(_result(sources[2][1], total_ms=300))
+
+        ordered = monitor.filter_sources(sources, url_of=lambda s: s[1], now=NOW + 10)
+        assert [name for name, _ in ordered] == ["Nepal News", "New Source", "Kathmandu Post"]
+
+    @pytest.mark.database
+    def test_histogram_percentiles_and_prune(self, monitor):
+        url = "https://setopati.com"
+        for total_ms in [90] * 95 + [3000] * 5:
+            monitor.record(_result(url, total_ms=total_ms))
+        status = monitor.get_status(url)
+        assert status['p50_total_ms'] == 100
+        assert status['p95_total_ms'] == 100
+        assert status['state'] == STATE_UP
+
+        assert histogram_percentile({}, 95) is None
+        assert monitor.prune(now=NOW + 48 * 3600) > 0
+        with sqlite3.connect(monitor.db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM source_latency_histogram").fetchone()[0] == 0
+
+
+    @pytest.mark.database
+    def test_tester_results_count_transport_failures_only(self, monitor):
+        url = "https://www.ratopati.com"
+        for _ in range(3):
+            assert monitor.record_test_result(url, 8.0, 'broken') == STATE_UP
+            monitor.record_test_result(url, 0.5, 'broken', 'HTTP 404')
+        assert monitor.get_status(url)['consecutive_failures'] == 0
+        assert monitor.should_collect(url)
+
+        assert monitor.record_test_result(url, 30.0, 'error', 'Connection timeout') == STATE_UP
+        assert monitor.record_test_result(url, 0.2, 'broken', 'HTTP 503') == STATE_DOWN
+        status = monitor.get_status(url)
+        assert (status['last_status_code'], status['last_error']) == (503, 'http_5xx: HTTP 503')
+
+        # Full-page timings stay out of the probe latency used for slow/up
+        with sqlite3.connect(monitor.db_path) as conn:
+            metrics = dict(conn.execute(
+                "SELECT metric, SUM(count) FROM source_latency_histogram GROUP BY metric").fetchall())
+        assert metrics == {'page': 6}
+        assert status['p95_total_ms'] is None
+
+
+class TestProbe:
+
+    def test_probe_local_server_falls_back_to_range_get(self, monitor):
+        requests_seen = []
+
+        async def handle(reader, writer):
+            request_line = (await reader.readline()).decode()
+            headers = []
+            while (line := await reader.readline()) not in (b'\r\n', b''):
+                headers.append(line.decode().strip())
+            requests_seen.append((request_line.split()[0], headers))
+            if request_line.startswith('HEAD'):
+                writer.write(b'HTTP/1.1 405 Method Not Allowed\r\nContent-Length: 0\r\n\r\n')
+            else:
+                writer.write(b'HTTP/1.1 206 Partial Content\r\nContent-Length: 1\r\n\r\nx')
+            await writer.drain()
+            writer.close()
+
+        async def run():
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await monitor.probe_all([f"http://127.0.0.1:{port}/feed"])
+
+        [result] = asyncio.run(run())
+        assert result.ok and result.status_code == 206
+        assert [method for method, _ in requests_seen] == ['HEAD', 'GET']
+        assert 'Range: bytes=0-0' in requests_seen[1][1]
+        assert 0 <= result.dns_ms <= result.total_ms
+        assert result.connect_ms is not None and result.ttfb_ms is not None
+        assert monitor.get_status("127.0.0.1")['state'] == STATE_UP
+
+    def test_probe_refused_connection_is_failure(self, monitor):
+        [result] = monitor.run_probes(["http://127.0.0.1:9/"])
+        assert not result.ok
+        assert result.error_kind in ('connect', 'timeout')
@@ -0,0 +1,88 @@
+"""
+Unit tests for canonical article URLs and the url_hash migration.
+
+These tests verify:
+- Tracking parameters, scheme, host and slash variants collapse to one URL
+- url_hash is a stable signed 64-bit integer, and writers keep the URL as published
+- Writers only add the url_hash column; the one-off backfill hashes the oldest of a group of URL
+  variants and leaves the others unhashed instead of deleting them
+"""
+
+import pytest
+import sqlite3
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'news_aggregator'))
+
+from url_canonicalizer import backfill_url_hashes, canonicalize_url, ensure_url_hash_column, url_and_hash, url_hash
+
+
+class TestCanonicalizeUrl:
+
+    @pytest.mark.parametrize("variant", [
+        "https://ekantipur.com/news/2025/10/01/budget",
+        "http://ekantipur.com/news/2025/10/01/budget",
+        "https://www.ekantipur.com/news/2025/10/01/budget/",
+        "https://EKANTIPUR.com//news/2025/10/01/budget?utm_source=facebook&fbclid=abc",
+        "https://m.ekantipur.com/news/2025/10/01/budget#comments",
+        "https://ekantipur.com/news/2025/10/01/budget/amp",
+    ])
+    def test_variants_collapse(self, variant):
+        assert canonicalize_url(variant) == "https://ekantipur.com/news/2025/10/01/budget"
+        assert url_hash(variant) == url_hash("https://ekantipur.com/news/2025/10/01/budget")
+
+    def test_identifying_query_kept_and_sorted(self):
+        assert canonicalize_url("https://setopati.com/detail?page=2&id=77&utm_medium=x") == \
+            "https://setopati.com/detail?id=77&page=2"
+        assert url_hash("https://setopati.com/detail?id=77") != url_hash("https://setopati.com/detail?id=78")
+
+    @pytest.mark.parametrize("query", ["ref=4411", "share=77", "amp=1"])
+    def test_generic_params_kept(self, query):
+        assert canonicalize_url(f"https://example.com/story?{query}") == f"https://example.com/story?{query}"
+
+    def test_devanagari_path_encoding_normalised(self):
+        assert canonicalize_url("https://setopati.com/समाचार") == \
+            canonicalize_url("https://setopati.com/%E0%A4%B8%E0%A4%AE%E0%A4%BE%E0%A4%9A%E0%A4%BE%E0%A4%B0")
+
+    def test_hash_fits_sqlite_integer(self):
+        value = url_hash("https://bbc.com/nepali/articles/c123")
+        assert isinstance(value, int)
+        assert -2 ** 63 <= value < 2 ** 63
+        assert url_hash(None) is None
+
+    def test_writers_keep_published_url(self):
+        published = "https://www.setopati.com/politics/1/?utm_source=facebook"
+        assert url_and_hash(published) == (published, url_hash("https://setopati.com/politics/1"))
+
+
+class TestUrlHashMigration:
+
+    @pytest.mark.database
+    def test_backfill_keeps_every_variant(self, tmp_path):
+        conn = sqlite3.connect(tmp_path / "news.db")
+        conn.execute("CREATE TABLE articles_enhanced (id INTEGER PRIMARY KEY, url TEXT UNIQUE)")
+        conn.executemany("INSERT INTO articles_enhanced (url) VALUES (?)", [
+            ("https://setopati.com/politics/1",),
+            ("http://www.setopati.com/politics/1/",),
+            ("https://setopati.com/politics/2",),
+        ])
+        conn.commit()
+
+        assert ensure_url_hash_column(conn) is True
+        assert conn.execute("SELECT COUNT(url_hash) FROM articles_enhanced").fetchone()[0] == 0
+
+        assert backfill_url_hashes(conn) == 2
+        assert backfill_url_hashes(conn) == 0
+        rows = conn.execute("SELECT id, url, url_hash FROM articles_enhanced ORDER BY id").fetchall()
+        assert rows == [
+            (1, "https://setopati.com/politics/1", url_hash("https://setopati.com/politics/1")),
+            (2, "http://www.setopati.com/politics/1/", None),
+            (3, "https://setopati.com/politics/2", url_hash("https://setopati.com/politics/2")),
+        ]
+
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO articles_enhanced (url, url_hash) VALUES (?, ?)",
+                         ("https://setopati.com/politics/1?utm_source=x",
+                          url_hash("https://setopati.com/politics/1?utm_source=x")))
+        conn.close()
@@ -0,0 +1,148 @@
+"""
+Unit tests for the persisted URL-seen index used by the collectors.
+
+These tests verify:
+- Existing table URLs are found and unknown URLs are not
+- URLs added in one run are visible after reopening the index file
+- Rows inserted by other writers are picked up from the rowid watermark
+- Filter slices grow when capacity is exceeded
+- Processes sharing the file see each other's slices and keep every count
+- Slices are re-read only when another handle changed the file's layout
+- A failed database lookup is logged and the URL reported as seen
+"""
+
+import multiprocessing
+import pytest
+import sqlite3
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'news_aggregator'))
+
+from url_canonicalizer import canonicalize_url
+from url_seen_index import FCNTL_AVAILABLE, UrlSeenIndex
+
+
+@pytest.fixture
+def articles_db(tmp_path):
+    db_path = tmp_path / "news.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE articles_enhanced (id INTEGER PRIMARY KEY, url TEXT UNIQUE)")
+        conn.executemany("INSERT INTO articles_enhanced (url) VALUES (?)",
+                         [(f"https://ekantipur.com/news/{i}",) for i in range(500)])
+    return db_path
+
+
+def _add_urls(db_path, prefix, count):
+    with UrlSeenIndex(db_path, initial_capacity=100) as index:
+        for i in range(count):
+            index.add(f"https://{prefix}.com/news/{i}")
+
+
+def _insert(db_path, url):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO articles_enhanced (url) VALUES (?)", (url,))
+
+
+class TestUrlSeenIndex:
+
+    @pytest.mark.database
+    def test_membership_matches_table(self, articles_db):
+        with UrlSeenIndex(articles_db) as index:
+            assert "https://ekantipur.com/news/0" in index
+            assert "https://ekantipur.com/news/499" in index
+            assert "https://ekantipur.com/news/500" not in index
+            assert not any(f"https://setopati.com/{i}" in index for i in range(2000))
+            assert index.watermark == 500
+
+    @pytest.mark.database
+    def test_added_urls_persist_and_catch_up(self, articles_db):
+        with UrlSeenIndex(articles_db) as index:
+            _insert(articles_db, "https://setopati.com/detail/1")
+            index.add("https://setopati.com/detail/1")
+
+        # Written by another collector without touching the index
+        _insert(articles_db, "https://nagariknews.nagariknetwork.com/x")
+
+        with UrlSeenIndex(articles_db) as index:
+            assert index.sync() == 0  # already caught up on open
+            assert "https://setopati.com/detail/1" in index
+            assert "https://nagariknews.nagariknetwork.com/x" in index
+            assert index.watermark == 502
+
+    @pytest.mark.database
+    def test_session_urls_and_slice_growth(self, articles_db):
+        with UrlSeenIndex(articles_db, initial_capacity=100) as index:
+            assert len(index._slices) >= 3
+            # Marked as visited but never saved: only known within this run
+            index.add("https://bbc.com/nepali/unsaved")
+            assert "https://bbc.com/nepali/unsaved" in index
+
+        with UrlSeenIndex(articles_db, initial_capacity=100) as index:
+            assert "https://bbc.com/nepali/unsaved" not in index
+            assert "https://ekantipur.com/news/250" in index
+
+    @pytest.mark.database
+    def test_two_handles_share_slices(self, articles_db):
+        with UrlSeenIndex(articles_db, initial_capacity=100) as first, \
+                UrlSeenIndex(articles_db, initial_capacity=100) as second:
+            slices = len(second._slices)
+            for i in range(400):
+                first.add(f"https://setopati.com/news/{i}")
+                _insert(articles_db, f"https://setopati.com/news/{i}")
+            # Found through the slices added by the other handle
+            assert "https://setopati.com/news/399" in second
+            assert len(second._slices) > slices
+            second.add("https://setopati.com/news/extra")
+            assert len(first) == len(second)
+
+    @pytest.mark.database
+    def test_slices_reloaded_on_layout_change(self, articles_db, monkeypatch):
+        with UrlSeenIndex(articles_db, initial_capacity=100) as first, \
+                UrlSeenIndex(articles_db, initial_capacity=100) as second:
+            loads = []
+            load_slices = second._load_slices
+            monkeypatch.setattr(second, "_load_slices", lambda: loads.append(1) or load_slices())
+
+            for i in range(100):
+                assert f"https://ekantipur.com/news/{i}" in second
+            first.add("https://setopati.com/news/0")  # Counted into the last slice: same layout
+            assert "https://setopati.com/news/1" not in second
+            assert loads == []
+
+            slices, added = len(first._slices), 1
+            while len(first._slices) == slices:
+                added += 1
+                first.add(f"https://setopati.com/news/{added}")
+            len(second)
+            assert loads == [1] and len(second._slices) == slices + 1
+
+            first.rebuild()  # Same slices again, new generation
+            len(second)
+            assert loads == [1, 1]
+
+    @pytest.mark.database
+    def test_lookup_error_fails_closed(self, articles_db, caplog):
+        with UrlSeenIndex(articles_db) as index:
+            with sqlite3.connect(articles_db) as conn:
+                conn.execute("ALTER TABLE articles_enhanced RENAME TO articles_archive")
+            assert "https://ekantipur.com/news/7" in index
+            assert "treating https://ekantipur.com/news/7 as seen" in caplog.text
+            assert "https://setopati.com/news/7" not in index  # Not in the filter: no lookup
+
+    @pytest.mark.database
+    @pytest.mark.skipif(not FCNTL_AVAILABLE, reason="file locking needs fcntl")
+    def test_concurrent_processes(self, articles_db):
+        UrlSeenIndex(articles_db, initial_capacity=100).close()
+        workers = [multiprocessing.Process(target=_add_urls, args=(articles_db, prefix, 400))
+                   for prefix in ("ratopati", "onlinekhabar", "setopati")]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert all(worker.exitcode == 0 for worker in workers)
+
+        with UrlSeenIndex(articles_db, initial_capacity=100) as index:
+            assert len(index) >= (500 + 3 * 400) * 0.99  # Bloom false positives are not counted twice
+            assert all(index._bloom_contains(canonicalize_url(f"https://{prefix}.com/news/{i}"))
+                       for prefix in ("ratopati", "onlinekhabar", "setopati") for i in range(400))
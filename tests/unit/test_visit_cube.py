@@ -0,0 +1,145 @@
+"""
+Unit tests for the "best time to visit" cube.
+
+These tests verify:
+- Arrival slots are computed in Nepal time and slot medians are interpolated from the wait histogram
+- end-visit and offline sync update the cube incrementally; the rollup job rebuilds the same cube
+- The heatmap endpoint recommends the slot with the shortest median wait without reading office_visits
+"""
+
+import pytest
+import uuid
+from datetime import datetime, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    import numpy as np
+    from sqlalchemy import insert
+    from database.visit_cube import (
+        BEST_TIME_MIN_VISITS, CUBE_SHAPE, arrival_slots, median_waits, rebuild_visit_cubes, record_visit_slots
+    )
+    from models.database_models import OfficeVisit, ServiceStatus, VisitTimeCube
+    from api.analytics import router as analytics_router
+    from api.visit_tracking import router as visit_tracking_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+MONDAY = datetime(2025, 10, 6)  # UTC midnight; 05:45 on Monday in Nepal
+
+
+class TestCubeArithmetic:
+
+    def test_arrival_slots_in_nepal_time(self):
+        weekdays, hours = arrival_slots([
+            MONDAY + timedelta(hours=4, minutes=15),   # 10:00 Monday
+            MONDAY - timedelta(hours=4),               # Sunday 20:00 UTC -> 01:45 Monday
+            MONDAY + timedelta(hours=18, minutes=14),  # 23:59 Monday
+            MONDAY + timedelta(hours=18, minutes=15),  # 00:00 Tuesday
+        ])
+        assert weekdays.tolist() == [0, 0, 0, 1]
+        assert hours.tolist() == [10, 1, 23, 0]
+
+    def test_median_interpolation(self):
+        histogram = np.zeros(CUBE_SHAPE, dtype=np.int32)
+        histogram[0, 10, 1] = 4    # Four waits of 5-10 minutes
+        histogram[2, 14, 7] = 1    # 60-90 minutes
+        histogram[2, 14, 8] = 1    # 90-120 minutes
+        histogram[6, 23, 13] = 1   # Over 8 hours
+        medians = median_waits(histogram)
+        assert medians[0, 10] == pytest.approx(7.5)
+        assert medians[2, 14] == pytest.approx(90)
+        assert medians[6, 23] >= 480
+        assert np.isnan(medians[1, 1])
+
+
+@pytest.fixture
+def tracker(office_tracker_db, api_client):
+    url, db = office_tracker_db({o: ("Kathmandu", "Bagmati") for o in (1, 2)}, services=[
+        {"id": 1, "office_id": 1, "service_id": "passport", "service_name": "Passport"},
+        {"id": 2, "office_id": 1, "service_id": "citizenship", "service_name": "Citizenship"},
+        {"id": 3, "office_id": 2, "service_id": "passport", "service_name": "Passport"},
+    ])
+    client = api_client(url, visit_tracking_router, analytics_router)
+    return client.call, db, db.get_bind(), client.statements
+
+
+def _cubes(db):
+    db.expire_all()
+    return {(row.office_id, row.service_id): (row.histogram, row.wait_totals, row.count)
+            for row in db.query(VisitTimeCube)}
+
+
+class TestBestTimeToVisit:
+
+    @pytest.mark.database
+    def test_incremental_updates_match_rebuild(self, tracker):
+        call, db, _, _ = tracker
+        for wait in (12, 40):
+            visit_id = call("POST", "/api/visit/start-timer", json={"office_id": 1, "service_id": 1}).json()["visit_id"]
+            db.get(OfficeVisit, visit_id).start_time = datetime.utcnow() - timedelta(minutes=wait, seconds=5)
+            db.commit()
+            call("POST", "/api/visit/end-visit", json={"visit_id": visit_id, "service_status": "kaam_bhayo"})
+
+        client_visit_id = str(uuid.uuid4())
+        started = MONDAY + timedelta(hours=4, minutes=20)
+        call("POST", "/api/visit/sync", json={"events": [
+            {"event_id": str(uuid.uuid4()), "client_visit_id": client_visit_id, "type": "start",
+             "occurred_at": started.isoformat(), "office_id": 1, "service_id": 2},
+            {"event_id": str(uuid.uuid4()), "client_visit_id": client_visit_id, "type": "end",
+             "occurred_at": (started + timedelta(minutes=25)).isoformat(), "service_status": "kaam_bhayo"},
+        ]})
+
+        maintained = _cubes(db)
+        assert {pair: count for pair, (_, _, count) in maintained.items()} == {(1, 1): 2, (1, 2): 1}
+        assert rebuild_visit_cubes(db) == 2
+        assert _cubes(db) == maintained
+
+        # A corrected wait time rebuilds that office x service from its visits
+        visit = db.query(OfficeVisit).filter(OfficeVisit.service_id == 1).first()
+        old_wait, visit.wait_duration_minutes = visit.wait_duration_minutes, 200
+        record_visit_slots(db, [(1, 1, visit.start_time, old_wait, 200)])
+        db.commit()
+        corrected = _cubes(db)
+        rebuild_visit_cubes(db)
+        assert _cubes(db) == corrected and corrected[(1, 1)] != maintained[(1, 1)]
+
+    @pytest.mark.database
+    def test_heatmap_and_recommendation(self, tracker):
+        call, db, engine, statements = tracker
+        visits = []
+        for day in range(4):
+            week = MONDAY + timedelta(weeks=day)
+            # Monday 10:00 Nepal time: long queue; Tuesday 14:00: short queue
+            visits += [(1, week + timedelta(hours=4, minutes=15 + i), 60 + 10 * i) for i in range(3)]
+            visits += [(1, week + timedelta(days=1, hours=8, minutes=15 + i), 5 + i) for i in range(2)]
+            visits += [(2, week + timedelta(days=1, hours=8, minutes=30), 2)]  # Another service
+        with engine.begin() as conn:
+            conn.execute(insert(OfficeVisit), [
+                {"office_id": 1, "service_id": service_id, "start_time": start, "wait_duration_minutes": wait,
+                 "service_status": ServiceStatus.SUCCESS}
+                for service_id, start, wait in visits
+            ])
+            conn.execute(insert(OfficeVisit).values(office_id=1, service_id=1, start_time=MONDAY,
+                                                    service_status=ServiceStatus.IN_PROGRESS))
+        rebuild_visit_cubes(db)
+
+        response = call("GET", "/api/analytics/best-time/1", params={"service_id": 1})
+        assert response.status_code == 200
+        assert not [s for s in statements if "office_visits" in s]
+        body = response.json()
+        assert len(body["visits"]) == 7 and all(len(day) == 24 for day in body["visits"])
+        assert body["total_visits"] == 20 and body["visits"][0][10] == 12 and body["visits"][1][14] == 8
+        assert body["median_wait_minutes"][0][10] > 60 and body["median_wait_minutes"][3][3] is None
+        assert body["avg_wait_minutes"][1][14] == 5.5
+        assert body["recommended"]["weekday_name"] == "Tuesday" and body["recommended"]["hour"] == 14
+        assert body["recommended"]["visits"] >= BEST_TIME_MIN_VISITS
+
+        # Across services the citizenship visits count too
+        assert call("GET", "/api/analytics/best-time/1").json()["visits"][1][14] == 12
+        empty = call("GET", "/api/analytics/best-time/2").json()
+        assert empty["total_visits"] == 0 and empty["recommended"] is None
+        assert call("GET", "/api/analytics/best-time/99").status_code == 404
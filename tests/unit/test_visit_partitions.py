@@ -0,0 +1,189 @@
+"""
+Unit tests for monthly visit partitions (closed-month summaries and archival).
+
+These tests verify:
+- Closing months leaves the dashboard, office analytics, comparison, rankings,
+  wait-time quantiles and best-time heatmap unchanged
+- Archiving moves a closed month's visits and outcome events to its SQLite file;
+  reconciliation and per-pair sketch rebuilds still count them
+- Only months past the grace period are closed, and a month that received late
+  visits must be closed again before it can be archived
+- Late changes to a closed month's visits survive the reconcile: the month is closed again
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from sqlalchemy import create_engine, func, select
+    from database.anomaly_detector import record_outcome_events
+    from database.rollups import apply_visit_changes, reconcile_office_analytics, visit_snapshot
+    from database.visit_cube import rebuild_visit_cubes
+    from database.visit_partitions import archive_month, close_month, close_months, stale_months
+    from database.wait_sketches import rebuild_wait_sketches, record_wait_times
+    from models.database_models import (
+        MonthlyVisitSummary, OfficeAnalytics, OfficeVisit, ServiceStatus, VisitMonth, VisitOutcomeEvent, WaitTimeSketch
+    )
+    from api.analytics import router as analytics_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+MONTHS = [datetime(2025, 8, 1), datetime(2025, 9, 1), datetime(2025, 10, 1), datetime(2025, 11, 1)]
+NOW = datetime(2025, 11, 20)
+READS = [
+    ("get", "/api/analytics/dashboard", None),
+    ("get", "/api/analytics/office/1", None),
+    ("post", "/api/analytics/compare", {"office_ids": [1, 2, 3]}),
+    ("get", "/api/analytics/rankings/national", {"metric": "overall_rating"}),
+    ("get", "/api/analytics/rankings/national", {"metric": "efficiency"}),
+    ("get", "/api/analytics/rankings/national", {"metric": "success_rate"}),
+    ("get", "/api/analytics/wait-times/national", None),
+    ("get", "/api/analytics/best-time/1", None),
+]
+
+
+@pytest.fixture
+def tracker(office_tracker_db, api_client):
+    visits = []
+    for m, month in enumerate(MONTHS):
+        for o in (1, 2, 3):
+            for v in range(5 + m):
+                start = month + timedelta(days=v * 3, hours=4 + v % 5, minutes=o)
+                wait = None if v == 4 else 5 * o + 7 * v + m
+                visits.append({
+                    "office_id": o, "service_id": o, "visit_date": start, "start_time": start,
+                    "end_time": start + timedelta(minutes=wait) if wait is not None else None,
+                    "wait_duration_minutes": wait,
+                    "service_status": ServiceStatus.IN_PROGRESS if wait is None else
+                    ServiceStatus.FAILED if (v + o) % 4 == 0 else ServiceStatus.SUCCESS,
+                    "overall_rating": (o + v + m) % 5 + 1 if v != 3 else None,
+                    "staff_behavior_rating": (o * v) % 5 + 1,
+                    "office_cleanliness_rating": (o + 2 * v) % 5 + 1 if v != 1 else None,
+                    "asked_for_bribe": v == 2 and o == 3,
+                })
+    url, db = office_tracker_db({o: ("Kathmandu" if o < 3 else "Lalitpur", "Bagmati") for o in (1, 2, 3)},
+                                visits=visits)
+    _reconcile(db)
+    return api_client(url, analytics_router), db
+
+
+def _reconcile(db):
+    reconcile_office_analytics(db)
+    rebuild_wait_sketches(db)
+    rebuild_visit_cubes(db)
+
+
+def _read_all(client):
+    async def send(http):
+        responses = []
+        for method, path, params in READS:
+            if method == "post":
+                response = await http.post(path, json=params)
+            else:
+                response = await http.get(path, params=params)
+            assert response.status_code == 200, (path, response.text)
+            body = response.json()
+            body.pop("last_updated", None)  # Time of the read
+            responses.append(body)
+        return responses
+
+    return client.run(send)
+
+
+class TestCloseMonths:
+
+    @pytest.mark.database
+    def test_closing_keeps_every_read(self, tracker):
+        client, db = tracker
+        before = _read_all(client)
+
+        assert close_months(db, now=NOW) == ["2025-08", "2025-09", "2025-10"]
+        assert close_months(db, now=NOW) == []
+        assert db.get(VisitMonth, "2025-09").visits == 3 * 6
+        assert db.query(MonthlyVisitSummary).count() == 9
+        _reconcile(db)
+        assert _read_all(client) == before
+
+    @pytest.mark.database
+    def test_grace_period(self, tracker):
+        _, db = tracker
+        assert close_months(db, now=datetime(2025, 9, 7)) == []
+        assert close_months(db, now=datetime(2025, 9, 8)) == ["2025-08"]
+
+    @pytest.mark.database
+    def test_late_changes_survive_reconcile(self, tracker):
+        _, db = tracker
+        close_months(db, now=NOW)
+        assert stale_months(db) == []
+
+        visit = db.query(OfficeVisit).filter(OfficeVisit.visit_date < MONTHS[1],
+                                             OfficeVisit.service_status == ServiceStatus.IN_PROGRESS).first()
+        before = visit_snapshot(visit)
+        visit.service_status, visit.overall_rating = ServiceStatus.SUCCESS, 5
+        apply_visit_changes(db, [(visit.office_id, before, visit_snapshot(visit))])
+        db.commit()
+        row = OfficeAnalytics.office_id == visit.office_id
+        expected = db.execute(select(OfficeAnalytics.successful_visits, OfficeAnalytics.avg_overall_rating).where(row)).one()
+
+        assert stale_months(db) == ["2025-08"]
+        assert close_months(db, now=NOW) == ["2025-08"]
+        _reconcile(db)
+        assert db.execute(select(OfficeAnalytics.successful_visits, OfficeAnalytics.avg_overall_rating).where(row)).one() == \
+            pytest.approx(expected)
+        assert close_months(db, now=NOW) == []
+
+
+class TestArchiveMonth:
+
+    @pytest.mark.database
+    def test_archive_keeps_analytics(self, tracker, tmp_path):
+        client, db = tracker
+        august = db.execute(select(OfficeVisit.id, OfficeVisit.office_id).where(OfficeVisit.visit_date < MONTHS[1])).all()
+        record_outcome_events(db, [
+            (visit_id, office_id, None, {'service_status': ServiceStatus.SUCCESS, 'asked_for_bribe': None})
+            for visit_id, office_id in august
+        ])
+        db.commit()
+        before = _read_all(client)
+
+        close_months(db, now=NOW)
+        stats = archive_month(db, "2025-08", str(tmp_path / "archive"))
+        assert (stats["office_visits"], stats["visit_outcome_events"]) == (len(august), len(august))
+        assert db.query(OfficeVisit).filter(OfficeVisit.visit_date < MONTHS[1]).count() == 0
+        assert db.query(VisitOutcomeEvent).count() == 0
+        archive = create_engine(f"sqlite:///{stats['path']}")
+        with archive.connect() as conn:
+            assert conn.execute(select(func.count()).select_from(OfficeVisit.__table__)).scalar() == len(august)
+        archive.dispose()
+        with pytest.raises(ValueError):
+            close_month(db, "2025-08")
+
+        _reconcile(db)
+        assert _read_all(client) == before
+
+        # A replaced wait rebuilds the office x service sketch, still counting archived visits
+        sketch_count = db.execute(select(WaitTimeSketch.count).where(WaitTimeSketch.office_id == 1)).scalar()
+        visit = db.query(OfficeVisit).filter(OfficeVisit.office_id == 1, OfficeVisit.wait_duration_minutes.isnot(None)).first()
+        old_wait, visit.wait_duration_minutes = visit.wait_duration_minutes, visit.wait_duration_minutes + 1
+        record_wait_times(db, [(1, 1, old_wait, visit.wait_duration_minutes)])
+        db.commit()
+        assert db.execute(select(WaitTimeSketch.count).where(WaitTimeSketch.office_id == 1)).scalar() == sketch_count
+
+    @pytest.mark.database
+    def test_late_visits_need_reclose(self, tracker, tmp_path):
+        _, db = tracker
+        close_months(db, now=NOW)
+        db.add(OfficeVisit(office_id=1, service_id=1, visit_date=datetime(2025, 9, 30, 12),
+                           service_status=ServiceStatus.SUCCESS))
+        db.commit()
+        with pytest.raises(RuntimeError):
+            archive_month(db, "2025-09", str(tmp_path / "archive"))
+        assert db.query(OfficeVisit).filter(OfficeVisit.visit_date < MONTHS[2]).count() == 2 * 3 * 5 + 3 + 1
+
+        assert close_month(db, "2025-09") == 3 * 6 + 1
+        assert archive_month(db, "2025-09", str(tmp_path / "archive"))["office_visits"] == 3 * 6 + 1
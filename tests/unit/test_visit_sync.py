@@ -0,0 +1,133 @@
+"""
+Unit tests for the offline visit sync endpoint.
+
+These tests verify:
+- A batch of start/end/rating events is applied in one transaction with per-event results
+- Replays (whole batch, repeated events, restarted visits) are deduplicated without side effects
+- Query count does not grow with the number of events; office rollups match the applied visits
+"""
+
+import pytest
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from sqlalchemy import select
+    from database.active_visits import active_visit_registry
+    from models.database_models import OfficeAnalytics, OfficeVisit, SyncedVisitEvent
+    from api.visit_tracking import VISIT_SYNC_MAX_EVENTS, router as visit_tracking_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+RATING = {"overall_rating": 4, "staff_behavior_rating": 3, "office_cleanliness_rating": 5,
+          "process_efficiency_rating": 4, "information_clarity_rating": 2, "asked_for_bribe": True,
+          "suggestions": "लाइन छिटो बनाउनुहोस्"}
+STARTED = datetime(2025, 10, 1, 10, 0, tzinfo=timezone.utc)
+
+
+def _events(visit_uuid, office_id=1, service_id=1, wait_minutes=30, status="kaam_bhayo", rate=True):
+    client_visit_id = str(visit_uuid)
+    events = [
+        {"event_id": str(uuid.uuid4()), "client_visit_id": client_visit_id, "type": "start",
+         "occurred_at": STARTED.isoformat(), "office_id": office_id, "service_id": service_id},
+        {"event_id": str(uuid.uuid4()), "client_visit_id": client_visit_id, "type": "end",
+         "occurred_at": (STARTED + timedelta(minutes=wait_minutes)).isoformat(), "service_status": status},
+    ]
+    if rate:
+        events.append({"event_id": str(uuid.uuid4()), "client_visit_id": client_visit_id, "type": "rating",
+                       "occurred_at": (STARTED + timedelta(minutes=wait_minutes + 1)).isoformat(), "rating": RATING})
+    return events
+
+
+@pytest.fixture
+def tracker(office_tracker_db, api_client):
+    url, db = office_tracker_db({o: ("Kathmandu", "Bagmati") for o in (1, 2)})
+    client = api_client(url, visit_tracking_router)
+
+    def sync(events):
+        return client.call("POST", "/api/visit/sync", json={"events": events})
+
+    return sync, db, client.statements
+
+
+def first_visit_id(db, client_visit_id):
+    return db.execute(select(OfficeVisit.id).where(OfficeVisit.client_visit_id == str(client_visit_id))).scalar()
+
+
+class TestVisitSync:
+
+    @pytest.mark.database
+    def test_batch_applies_events(self, tracker):
+        sync, db, _ = tracker
+        visit_a, visit_b = uuid.uuid4(), uuid.uuid4()
+        open_start = _events(visit_b, office_id=2, service_id=2)[0]
+        events = _events(visit_a)[::-1] + [open_start] + [
+            _events(uuid.uuid4(), office_id=1, service_id=2)[0],        # Service of another office
+            _events(uuid.uuid4())[1],                                   # End without a start
+        ]
+        active_visit_registry.__init__()
+        active_visit_registry.resync([])
+
+        response = sync(events)
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["applied"], body["duplicates"], body["rejected"]) == (4, 0, 2)
+        assert [r["status"] for r in body["results"]] == ["applied"] * 4 + ["rejected"] * 2
+        assert body["results"][4]["error"] == "Service not found for this office"
+        assert body["results"][5]["error"].startswith("Unknown visit")
+
+        visit = db.execute(select(OfficeVisit).where(OfficeVisit.client_visit_id == str(visit_a))).scalar_one()
+        assert body["results"][0]["visit_id"] == visit.id
+        assert visit.start_time == datetime(2025, 10, 1, 10, 0) and visit.wait_duration_minutes == 30
+        assert visit.service_status == "kaam_bhayo" and visit.overall_rating == 4 and visit.asked_for_bribe
+        assert visit.suggestions == RATING["suggestions"]
+
+        analytics = db.execute(select(OfficeAnalytics).where(OfficeAnalytics.office_id == 1)).scalar_one()
+        assert (analytics.total_visits, analytics.successful_visits, analytics.bribe_reports) == (1, 1, 1)
+        assert (analytics.avg_overall_rating, analytics.min_wait_time_minutes, analytics.max_wait_time_minutes) == (4.0, 30, 30)
+        assert db.execute(select(OfficeAnalytics.total_visits).where(OfficeAnalytics.office_id == 2)).scalar() == 1
+
+        # Only the still-open visit reaches the live board
+        assert [v.office_id for v in active_visit_registry.visits.values()] == [2]
+
+    @pytest.mark.database
+    def test_replays_are_deduplicated(self, tracker):
+        sync, db, _ = tracker
+        visit_a, visit_b = uuid.uuid4(), uuid.uuid4()
+        first = _events(visit_a) + _events(visit_b, rate=False)[:1]
+        assert sync(first).json()["applied"] == 4
+
+        replay = sync(first + [first[0]]).json()
+        assert replay["duplicates"] == 5 and replay["applied"] == 0
+        assert {r["visit_id"] for r in replay["results"][:3]} == {first_visit_id(db, visit_a)}
+
+        # The client lost its ack for B's start and retries it with a new event id, plus the end
+        retry_start = dict(first[3], event_id=str(uuid.uuid4()))
+        end_b = _events(visit_b, status="kaam_bhayena", wait_minutes=90, rate=False)[1]
+        second = sync([retry_start, end_b, end_b]).json()
+        assert [r["status"] for r in second["results"]] == ["duplicate", "applied", "duplicate"]
+        assert len({r["visit_id"] for r in second["results"]}) == 1
+
+        assert db.query(OfficeVisit).count() == 2
+        assert db.query(SyncedVisitEvent).count() == 5
+        analytics = db.execute(select(OfficeAnalytics).where(OfficeAnalytics.office_id == 1)).scalar_one()
+        assert (analytics.total_visits, analytics.failed_visits, analytics.max_wait_time_minutes) == (2, 1, 90)
+
+        assert sync([end_b | {"event_id": str(uuid.uuid4())}]).json()["results"][0]["error"] == "Visit already ended"
+
+    @pytest.mark.database
+    def test_query_count_and_limit(self, tracker):
+        sync, db, statements = tracker
+        sync([event for i in range(5) for event in _events(uuid.uuid4(), office_id=i % 2 + 1, service_id=i % 2 + 1)])
+        small = len(statements)
+        sync([event for i in range(100) for event in _events(uuid.uuid4(), office_id=i % 2 + 1, service_id=i % 2 + 1)])
+        assert len(statements) <= small + 2  # Bulk statements, not one per event
+        assert db.query(OfficeVisit).count() == 105
+
+        too_many = _events(uuid.uuid4()) * (VISIT_SYNC_MAX_EVENTS // 3 + 1)
+        assert sync(too_many).status_code == 400
@@ -0,0 +1,170 @@
+"""
+Unit tests for wait-time quantile sketches.
+
+These tests verify:
+- DDSketch quantiles stay within 1% of the exact quantiles and merged sketches equal one sketch of all values
+- end-visit and offline sync update the office x service sketch; a replaced wait time rebuilds it
+- District and national quantiles are merged from stored sketches without reading office_visits
+"""
+
+import json
+import random
+import pytest
+import uuid
+from datetime import datetime, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'office_tracker', 'webapp_backend'))
+
+try:
+    from sqlalchemy import insert
+    from database.wait_sketches import DDSketch, merged_wait_sketch, rebuild_wait_sketches, record_wait_times
+    from models.database_models import OfficeVisit, ServiceStatus, WaitTimeSketch
+    from api.analytics import router as analytics_router
+    from api.visit_tracking import router as visit_tracking_router
+except ImportError as e:
+    pytest.skip(f"Could not import office tracker modules: {e}", allow_module_level=True)
+
+
+def _exact(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+class TestDDSketch:
+
+    def test_relative_accuracy(self):
+        rng = random.Random(42)
+        values = [rng.lognormvariate(3, 1) for _ in range(20000)]
+        sketch = DDSketch()
+        for value in values:
+            sketch.add(value)
+        for q in (0.01, 0.5, 0.9, 0.99, 1.0):
+            assert abs(sketch.quantile(q) - _exact(values, q)) <= 0.01 * _exact(values, q) + 1e-9
+
+        assert DDSketch().quantile(0.5) is None
+        with pytest.raises(ValueError):
+            sketch.add(-1)
+
+    def test_merge_and_serialization(self):
+        rng = random.Random(7)
+        parts = [[rng.randint(0, 240) for _ in range(500)] for _ in range(4)]
+        whole = DDSketch()
+        merged = DDSketch()
+        for part in parts:
+            sketch = DDSketch()
+            for value in part:
+                sketch.add(value)
+                whole.add(value)
+            merged.merge(DDSketch.from_dict(json.loads(json.dumps(sketch.to_dict()))))
+        assert merged.to_dict() == whole.to_dict()
+        assert merged.quantile(0.5) == whole.quantile(0.5) and merged.count == 2000
+
+    def test_collapse_keeps_high_quantiles(self):
+        sketch = DDSketch(max_bins=50)
+        values = [1.05 ** i for i in range(400)]
+        for value in values:
+            sketch.add(value)
+        assert len(sketch.bins) <= 50
+        assert abs(sketch.quantile(0.99) - _exact(values, 0.99)) <= 0.01 * _exact(values, 0.99)
+
+
+@pytest.fixture
+def tracker(office_tracker_db, api_client):
+    url, db = office_tracker_db(
+        {1: ("Kathmandu", "Bagmati"), 2: ("Kathmandu", "Bagmati"), 3: ("Kaski", "Gandaki")},
+        services=[
+            {"id": o, "office_id": o, "service_id": "passport", "service_name": "Passport"} for o in (1, 2, 3)
+        ] + [{"id": 4, "office_id": 1, "service_id": "citizenship", "service_name": "Citizenship"}]
+    )
+    client = api_client(url, visit_tracking_router, analytics_router)
+    return client.call, db, db.get_bind(), client.statements
+
+
+def _end_open_visit(call, db, office_id, service_id, wait_minutes):
+    """Start a visit, backdate its start and end it through the API"""
+    visit_id = call("POST", "/api/visit/start-timer", json={"office_id": office_id, "service_id": service_id}).json()["visit_id"]
+    visit = db.get(OfficeVisit, visit_id)
+    visit.start_time = datetime.utcnow() - timedelta(minutes=wait_minutes, seconds=5)
+    db.commit()
+    assert call("POST", "/api/visit/end-visit", json={"visit_id": visit_id, "service_status": "kaam_bhayo"}).status_code == 200
+    return visit_id
+
+
+class TestWaitTimeSketches:
+
+    @pytest.mark.database
+    def test_visit_endpoints_update_sketches(self, tracker):
+        call, db, _, _ = tracker
+        for wait in (10, 20, 30):
+            _end_open_visit(call, db, 1, 1, wait)
+        sketch = merged_wait_sketch(db, office_id=1)
+        assert sketch.count == 3 and abs(sketch.quantile(0.5) - 20) <= 0.2
+
+        # Offline sync: one visit with a 90 minute wait at the citizenship counter
+        started = datetime(2025, 10, 1, 10, 0)
+        client_visit_id = str(uuid.uuid4())
+        call("POST", "/api/visit/sync", json={"events": [
+            {"event_id": str(uuid.uuid4()), "client_visit_id": client_visit_id, "type": "start",
+             "occurred_at": started.isoformat(), "office_id": 1, "service_id": 4},
+            {"event_id": str(uuid.uuid4()), "client_visit_id": client_visit_id, "type": "end",
+             "occurred_at": (started + timedelta(minutes=90)).isoformat(), "service_status": "kaam_bhayena"},
+        ]})
+        db.expire_all()
+        assert merged_wait_sketch(db, office_id=1).count == 4
+        assert merged_wait_sketch(db, office_id=1, service="citizenship").quantile(1.0) == pytest.approx(90, rel=0.01)
+
+        # A rebuild from the visits yields the sketches the endpoints maintained
+        maintained = {(row.office_id, row.service_id): row.sketch for row in db.query(WaitTimeSketch)}
+        assert rebuild_wait_sketches(db) == 2
+        db.expire_all()
+        assert {(row.office_id, row.service_id): row.sketch for row in db.query(WaitTimeSketch)} == maintained
+
+        body = call("GET", "/api/analytics/wait-times/office", params={"office_id": 1}).json()["wait_time_minutes"]
+        assert body["count"] == 4 and body["avg"] == 37.5
+        assert body["p50"] == pytest.approx(20, abs=0.3) and body["p99"] == pytest.approx(30, abs=0.4)
+
+    @pytest.mark.database
+    def test_replaced_wait_rebuilds_sketch(self, tracker):
+        call, db, _, _ = tracker
+        visit_id = _end_open_visit(call, db, 2, 2, 15)
+        _end_open_visit(call, db, 2, 2, 45)
+
+        # Correct the first visit's wait time directly, then record the change like end_visit does
+        db.get(OfficeVisit, visit_id).wait_duration_minutes = 5
+        record_wait_times(db, [(2, 2, 15, 5)])
+        db.commit()
+        sketch = merged_wait_sketch(db, office_id=2)
+        assert sketch.count == 2 and sketch.quantile(0.0) == pytest.approx(5, rel=0.01)
+
+    @pytest.mark.database
+    def test_rollup_merges_without_scanning_visits(self, tracker):
+        call, db, engine, statements = tracker
+        rng = random.Random(3)
+        waits = {office_id: [rng.randint(1, 180) for _ in range(300)] for office_id in (1, 2, 3)}
+        with engine.begin() as conn:
+            conn.execute(insert(OfficeVisit), [
+                {"office_id": office_id, "service_id": office_id, "wait_duration_minutes": wait,
+                 "service_status": ServiceStatus.SUCCESS}
+                for office_id, office_waits in waits.items() for wait in office_waits
+            ])
+        rebuild_wait_sketches(db)
+
+        response = call("GET", "/api/analytics/wait-times/district", params={"district": "Kathmandu"})
+        assert response.status_code == 200
+        assert not [s for s in statements if "office_visits" in s]
+        kathmandu = waits[1] + waits[2]
+        summary = response.json()["wait_time_minutes"]
+        assert summary["count"] == 600
+        for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+            assert abs(summary[name] - _exact(kathmandu, q)) <= 0.01 * _exact(kathmandu, q) + 0.05
+
+        national = call("GET", "/api/analytics/wait-times/national", params={"service": "passport"}).json()
+        assert national["wait_time_minutes"]["count"] == 900
+        province = call("GET", "/api/analytics/wait-times/province", params={"province": "Gandaki"}).json()
+        assert province["wait_time_minutes"]["count"] == 300
+        assert call("GET", "/api/analytics/wait-times/office", params={"office_id": 3}).json()["wait_time_minutes"] == province["wait_time_minutes"]
+
+        assert call("GET", "/api/analytics/wait-times/ward").status_code == 400
+        assert call("GET", "/api/analytics/wait-times/district").status_code == 400